@@ -0,0 +1,74 @@
+"""rollup tables steps_rollup + heart_rate_rollup (day / ISO week / month)
+
+Revision ID: 3d6e7f8a9b02
+Revises: 2c5d6e7f8a91
+Create Date: 2026-10-18 10:00:00.000000
+
+Tables dérivées de steps_hourly / heart_rate_hourly, 1 ligne par
+(user_id, granularity, period_start). Maintenues par les chemins d'ingest
+(server/db/rollups.py). Les données déjà présentes ne sont pas backfillées ici
+(heart rate chiffré → clé applicative requise) : lancer
+`python3 scripts/rollups.py rebuild` après l'upgrade.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+import server.db.uuid7
+from server.db.encrypted import EncryptedInt
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3d6e7f8a9b02"
+down_revision: Union[str, Sequence[str], None] = "2c5d6e7f8a91"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _common_columns() -> list[sa.Column]:
+    return [
+        sa.Column("id", server.db.uuid7.Uuid7(), nullable=False),
+        sa.Column("user_id", server.db.uuid7.Uuid7(), nullable=False),
+        sa.Column("granularity", sa.String(length=5), nullable=False),
+        sa.Column("period_start", sa.String(length=10), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "steps_rollup",
+        *_common_columns(),
+        sa.Column("step_count", sa.Integer(), nullable=False),
+        sa.Column("hour_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "granularity", "period_start", name="uq_steps_rollup_period"),
+    )
+    op.create_index("idx_steps_rollup_user_id", "steps_rollup", ["user_id"])
+
+    op.create_table(
+        "heart_rate_rollup",
+        *_common_columns(),
+        sa.Column("min_bpm", EncryptedInt(), nullable=False),
+        sa.Column("max_bpm", EncryptedInt(), nullable=False),
+        sa.Column("avg_bpm", EncryptedInt(), nullable=False),
+        sa.Column("sample_count", sa.Integer(), nullable=False),
+        sa.Column("hour_count", sa.Integer(), nullable=False),
+        sa.Column("min_bpm_crypto_v", sa.Integer(), server_default="1", nullable=False),
+        sa.Column("max_bpm_crypto_v", sa.Integer(), server_default="1", nullable=False),
+        sa.Column("avg_bpm_crypto_v", sa.Integer(), server_default="1", nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "granularity", "period_start", name="uq_hr_rollup_period"),
+    )
+    op.create_index("idx_heart_rate_rollup_user_id", "heart_rate_rollup", ["user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_heart_rate_rollup_user_id", table_name="heart_rate_rollup")
+    op.drop_table("heart_rate_rollup")
+    op.drop_index("idx_steps_rollup_user_id", table_name="steps_rollup")
+    op.drop_table("steps_rollup")
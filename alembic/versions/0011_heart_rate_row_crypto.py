@@ -0,0 +1,62 @@
+"""heart_rate_hourly row-level crypto (crypto_v=2) : row_blob + colonnes Art.9 nullable
+
+Revision ID: 4e7f8a9b0c13
+Revises: 3d6e7f8a9b02
+Create Date: 2026-10-18 12:00:00.000000
+
+- `row_blob BYTEA NULL` : min/max/avg_bpm packés (`struct`) et chiffrés en un
+  seul AEAD (cf. server/db/row_crypto.py).
+- min_bpm / max_bpm / avg_bpm passent NULL-able (NULL pour les lignes v2).
+- CHECK `ck_hr_hourly_crypto_payload` : v1 ⇒ 3 colonnes renseignées, v2 ⇒ row_blob.
+  Ajouté NOT VALID, puis VALIDATE dans un bloc autocommit.
+
+Aucune réécriture de données ici (opération metadata-only) : la conversion des
+lignes existantes est faite en ligne par `scripts/reencrypt_rows.py`.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from server.db.encrypted import EncryptedInt
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4e7f8a9b0c13"
+down_revision: Union[str, Sequence[str], None] = "3d6e7f8a9b02"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_ART9_COLS = ("min_bpm", "max_bpm", "avg_bpm")
+
+
+def upgrade() -> None:
+    op.add_column("heart_rate_hourly", sa.Column("row_blob", sa.LargeBinary(), nullable=True))
+    for col in _ART9_COLS:
+        op.alter_column("heart_rate_hourly", col, existing_type=EncryptedInt(), nullable=True)
+    # NOT VALID puis VALIDATE : pas de lock exclusif long sur une grosse table.
+    op.execute(
+        "ALTER TABLE heart_rate_hourly ADD CONSTRAINT ck_hr_hourly_crypto_payload CHECK ("
+        "(avg_bpm_crypto_v = 2 AND row_blob IS NOT NULL)"
+        " OR (avg_bpm_crypto_v = 1 AND min_bpm IS NOT NULL AND max_bpm IS NOT NULL AND avg_bpm IS NOT NULL)"
+        ") NOT VALID"
+    )
+    # Hors de la transaction du DDL (commitée avant le bloc) : VALIDATE ne prend
+    # qu'un SHARE UPDATE EXCLUSIVE, lectures et écritures continuent pendant le scan.
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE heart_rate_hourly VALIDATE CONSTRAINT ck_hr_hourly_crypto_payload")
+
+
+def downgrade() -> None:
+    remaining = op.get_bind().execute(
+        sa.text("SELECT count(*) FROM heart_rate_hourly WHERE avg_bpm_crypto_v = 2")
+    ).scalar_one()
+    if remaining:
+        raise RuntimeError(
+            f"{remaining} lignes heart_rate_hourly en crypto_v=2 : lancer "
+            "`python3 scripts/reencrypt_rows.py --to 1` avant le downgrade."
+        )
+    op.drop_constraint("ck_hr_hourly_crypto_payload", "heart_rate_hourly", type_="check")
+    for col in _ART9_COLS:
+        op.alter_column("heart_rate_hourly", col, existing_type=EncryptedInt(), nullable=False)
+    op.drop_column("heart_rate_hourly", "row_blob")
@@ -0,0 +1,109 @@
+"""index (user_id, temps) : composites seuls, sans index concurrents
+
+Revision ID: 5f8a9b0c1d24
+Revises: 4e7f8a9b0c13
+Create Date: 2026-10-18 14:00:00.000000
+
+Les GET santé filtrent `user_id = :uid` + plage de temps + `ORDER BY` temps.
+Les contraintes UNIQUE de 0004 (`(user_id, <colonnes temps>)`) sont déjà les
+index composites qui servent ces requêtes (range scan ordonné, pas de tri).
+En revanche les index mono-colonne posés à côté leur font concurrence :
+- `idx_<table>_user_id` (préfixe strict du UNIQUE) : le planner peut le
+  préférer avec des stats périmées → bitmap heap scan + Sort ;
+- `idx_sleep_start` / `idx_stress_start` / `idx_spo2_start` : temps sans
+  user_id, aucune requête applicative ne les utilise.
+Ils sont supprimés (coût d'écriture en moins à l'ingest) ; les FK users
+restent couvertes par le préfixe `user_id` des UNIQUE.
+
+auth_events : `(user_id, created_at)` remplace `idx_auth_events_user_id`
+(GET /me/audit-log trie par created_at DESC).
+
+Index créés / supprimés en CONCURRENTLY (hors transaction) : pas de verrou
+bloquant l'ingest pendant la migration.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5f8a9b0c1d24"
+down_revision: Union[str, Sequence[str], None] = "4e7f8a9b0c13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Tables dont le UNIQUE commence par user_id (HEALTH_TABLES_UNIQUE de 0005 + rollups 0010).
+USER_PREFIXED_TABLES: list[str] = [
+    "activity_daily",
+    "activity_level",
+    "blood_pressure",
+    "ecg",
+    "exercise_sessions",
+    "floors_daily",
+    "heart_rate_hourly",
+    "height",
+    "hrv",
+    "mood",
+    "respiratory_rate",
+    "skin_temperature",
+    "sleep_sessions",
+    "sleep_stages",
+    "spo2",
+    "steps_daily",
+    "steps_hourly",
+    "stress",
+    "vitality_score",
+    "water_intake",
+    "weight",
+    "steps_rollup",
+    "heart_rate_rollup",
+]
+
+# (nom, table, colonne) — index temps sans user_id (0001).
+TIME_ONLY_INDEXES: list[tuple[str, str, str]] = [
+    ("idx_sleep_start", "sleep_sessions", "sleep_start"),
+    ("idx_stress_start", "stress", "start_time"),
+    ("idx_spo2_start", "spo2", "start_time"),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_auth_events_user_created",
+            "auth_events",
+            ["user_id", "created_at"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "idx_auth_events_user_id", table_name="auth_events",
+            postgresql_concurrently=True, if_exists=True,
+        )
+        for table_name in USER_PREFIXED_TABLES:
+            op.drop_index(
+                f"idx_{table_name}_user_id", table_name=table_name,
+                postgresql_concurrently=True, if_exists=True,
+            )
+        for name, table_name, _col in TIME_ONLY_INDEXES:
+            op.drop_index(name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table_name, col in TIME_ONLY_INDEXES:
+            op.create_index(name, table_name, [col], postgresql_concurrently=True, if_not_exists=True)
+        for table_name in USER_PREFIXED_TABLES:
+            op.create_index(
+                f"idx_{table_name}_user_id", table_name, ["user_id"],
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+        op.create_index(
+            "idx_auth_events_user_id", "auth_events", ["user_id"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index(
+            "idx_auth_events_user_created", table_name="auth_events",
+            postgresql_concurrently=True, if_exists=True,
+        )
@@ -0,0 +1,166 @@
+"""colonnes jour natives : steps/heart_rate_hourly.date, *_daily.day_date et *_rollup.period_start en DATE
+
+Revision ID: 6a9b0c1d2e35
+Revises: 5f8a9b0c1d24
+Create Date: 2026-10-18 16:00:00.000000
+
+VARCHAR(10) 'YYYY-MM-DD' → DATE (4 bytes au lieu de 11, comparaison native,
+arithmétique de dates côté Postgres). Côté Python, `server.db.dates.IsoDate`
+garde le contrat str ISO : API et code applicatif inchangés.
+
+Migration en ligne (pas de `ALTER COLUMN TYPE`, qui réécrit la table sous
+ACCESS EXCLUSIVE) :
+1. transaction : colonne `<col>_d DATE NULL` + trigger qui la renseigne sur
+   INSERT/UPDATE (l'ingest continue pendant la migration) ;
+2. hors transaction : backfill par batchs (keyset sur id), index UNIQUE
+   `(user_id, <col>_d[, hour])` CONCURRENTLY, CHECK NOT NULL NOT VALID puis
+   VALIDATE (verrou SHARE UPDATE EXCLUSIVE, écritures non bloquées) ;
+3. transaction courte, metadata uniquement : SET NOT NULL (scan évité grâce au
+   CHECK validé), swap des colonnes, UNIQUE recréé `USING INDEX`.
+
+Pré-requis : toutes les valeurs existantes doivent être des dates valides
+(l'API acceptait un `date: str` libre) — sinon l'upgrade échoue avant toute
+modification avec la liste des tables à corriger.
+
+Downgrade : `ALTER COLUMN TYPE varchar(10)` (réécriture, hors ligne).
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6a9b0c1d2e35"
+down_revision: Union[str, Sequence[str], None] = "5f8a9b0c1d24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, colonne jour, UNIQUE qui la contient : nom, colonnes dans l'ordre)
+# `uq_<table>_user_window` de 0004, `uq_*_rollup_period` de 0010.
+DATE_COLUMNS: list[tuple[str, str, str, list[str]]] = [
+    ("steps_hourly", "date", "uq_steps_hourly_user_window", ["user_id", "date", "hour"]),
+    ("heart_rate_hourly", "date", "uq_heart_rate_hourly_user_window", ["user_id", "date", "hour"]),
+    ("steps_daily", "day_date", "uq_steps_daily_user_window", ["user_id", "day_date"]),
+    ("activity_daily", "day_date", "uq_activity_daily_user_window", ["user_id", "day_date"]),
+    ("vitality_score", "day_date", "uq_vitality_score_user_window", ["user_id", "day_date"]),
+    ("floors_daily", "day_date", "uq_floors_daily_user_window", ["user_id", "day_date"]),
+    ("steps_rollup", "period_start", "uq_steps_rollup_period", ["user_id", "granularity", "period_start"]),
+    ("heart_rate_rollup", "period_start", "uq_hr_rollup_period", ["user_id", "granularity", "period_start"]),
+]
+
+BACKFILL_BATCH = 5000
+
+
+def _names(table: str, col: str, uq: str) -> dict[str, str]:
+    return {
+        "new": f"{col}_d",
+        "fn": f"{table}_{col}_d_sync",
+        "trigger": f"trg_{table}_{col}_d_sync",
+        "uq": uq,
+        "uq_new": f"{uq}_d",
+        "ck": f"ck_{table}_{col}_d_not_null",
+    }
+
+
+def _check_values() -> None:
+    bind = op.get_bind()
+    bad = []
+    for table, col, _uq, _cols in DATE_COLUMNS:
+        n = bind.execute(
+            sa.text(f"SELECT count(*) FROM {table} WHERE NOT pg_input_is_valid({col}, 'date')")
+        ).scalar_one()
+        if n:
+            bad.append(f"{table}.{col}: {n}")
+    if bad:
+        raise RuntimeError("valeurs non convertibles en DATE — " + ", ".join(bad))
+
+
+def _expand(table: str, col: str, uq: str) -> None:
+    n = _names(table, col, uq)
+    op.add_column(table, sa.Column(n["new"], sa.Date(), nullable=True))
+    op.execute(
+        f"""
+        CREATE FUNCTION {n['fn']}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.{n['new']} := NEW.{col}::date;
+            RETURN NEW;
+        END $$
+        """
+    )
+    op.execute(
+        f"CREATE TRIGGER {n['trigger']} BEFORE INSERT OR UPDATE OF {col} ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION {n['fn']}()"
+    )
+
+
+def _backfill(table: str, col: str, uq: str) -> None:
+    """1 UPDATE par batch d'ids croissants (chacun commit en autocommit)."""
+    bind = op.get_bind()
+    new = _names(table, col, uq)["new"]
+
+    def _stmt(keyset: str) -> sa.TextClause:
+        return sa.text(
+            f"""
+            WITH batch AS (
+                SELECT id FROM {table} {keyset} ORDER BY id LIMIT :n
+            )
+            UPDATE {table} t SET {new} = t.{col}::date
+            FROM batch WHERE t.id = batch.id
+            RETURNING t.id
+            """
+        )
+
+    first, rest = _stmt(""), _stmt("WHERE id > :after")
+    ids = bind.execute(first, {"n": BACKFILL_BATCH}).scalars().all()
+    while ids:
+        ids = bind.execute(rest, {"after": max(ids), "n": BACKFILL_BATCH}).scalars().all()
+
+
+def _prepare_swap(table: str, col: str, uq: str, uq_cols: list[str]) -> None:
+    n = _names(table, col, uq)
+    cols = ", ".join(n["new"] if c == col else c for c in uq_cols)
+    op.execute(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {n['uq_new']} ON {table} ({cols})")
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {n['ck']} CHECK ({n['new']} IS NOT NULL) NOT VALID")
+    op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {n['ck']}")
+
+
+def _swap(table: str, col: str, uq: str) -> None:
+    n = _names(table, col, uq)
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN {n['new']} SET NOT NULL")
+    op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {n['ck']}")
+    op.execute(f"DROP TRIGGER {n['trigger']} ON {table}")
+    op.execute(f"DROP FUNCTION {n['fn']}()")
+    op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {n['uq']}")
+    op.execute(f"ALTER TABLE {table} DROP COLUMN {col}")
+    op.execute(f"ALTER TABLE {table} RENAME COLUMN {n['new']} TO {col}")
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {n['uq']} UNIQUE USING INDEX {n['uq_new']}")
+
+
+def upgrade() -> None:
+    _check_values()
+    for table, col, uq, _cols in DATE_COLUMNS:
+        _expand(table, col, uq)
+
+    with op.get_context().autocommit_block():
+        for table, col, uq, uq_cols in DATE_COLUMNS:
+            _backfill(table, col, uq)
+            _prepare_swap(table, col, uq, uq_cols)
+
+    # Verrous ACCESS EXCLUSIVE courts : abandon plutôt qu'attente derrière une longue transaction.
+    op.execute("SET LOCAL lock_timeout = '10s'")
+    for table, col, uq, _cols in DATE_COLUMNS:
+        _swap(table, col, uq)
+
+
+def downgrade() -> None:
+    for table, col, _uq, _cols in DATE_COLUMNS:
+        op.alter_column(
+            table,
+            col,
+            existing_type=sa.Date(),
+            type_=sa.String(length=10),
+            postgresql_using=f"to_char({col}, 'YYYY-MM-DD')",
+            existing_nullable=False,
+        )
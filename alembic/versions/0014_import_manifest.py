@@ -0,0 +1,50 @@
+"""import_manifest : reprise incrémentale de l'import CSV Samsung
+
+Revision ID: 7b0c1d2e3f46
+Revises: 6a9b0c1d2e35
+Create Date: 2026-10-18 18:00:00.000000
+
+1 ligne par (user_id, fichier source) tenue par scripts/import_samsung_csv.py :
+hash SHA-256 du fichier, lignes commitées, max start_time importé, watermark
+et début (`run_started_at`) du run en cours. Fichier inchangé → sauté ; fichier modifié → repris au
+watermark ; import interrompu → repris au dernier lot commité.
+Le UNIQUE `(user_id, source)` couvre la FK users (pas d'index séparé).
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+import server.db.uuid7
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7b0c1d2e3f46"
+down_revision: Union[str, Sequence[str], None] = "6a9b0c1d2e35"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "import_manifest",
+        sa.Column("id", server.db.uuid7.Uuid7(), nullable=False),
+        sa.Column("user_id", server.db.uuid7.Uuid7(), nullable=False),
+        sa.Column("source", sa.Text(), nullable=False),
+        sa.Column("file_name", sa.Text(), nullable=False),
+        sa.Column("file_sha256", sa.String(length=64), nullable=False),
+        sa.Column("row_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("max_start_time", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("resume_from", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("completed", sa.Boolean(), server_default="false", nullable=False),
+        sa.Column("run_started_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "source", name="uq_import_manifest_source"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("import_manifest")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Charge concurrente sur les GET santé — req/s et p50/p99 sous N clients.
+
+Contrairement à `bench_get_heartrate.py` (TestClient, une requête à la fois),
+vise un vrai serveur uvicorn : c'est la concurrence qui distingue des routes
+sync (threadpool AnyIO, 40 threads par défaut, 1 connexion du pool chacune)
+des routes async (AsyncSession, boucle unique). Comparer avant / après en
+relançant le script contre chaque version du serveur, mêmes données.
+
+Seed un user jetable (`--days` jours de FC horaire, cf. bench_get_heartrate),
+lance `--concurrency` clients httpx qui enchaînent les GET de `URLS` pendant
+`--duration` secondes, puis supprime le user (erase RGPD). `--writers N` ajoute
+N clients qui postent en parallèle 1 jour de FC horaire par requête (AES +
+refresh des rollups) : latence des GET quand l'ingest tourne hors de la boucle.
+
+Lancer le serveur sans cache de réponses, sinon on mesure le cache :
+
+    SAMSUNGHEALTH_RESPONSE_CACHE=false uvicorn server.main:app --workers 1
+
+Usage:
+    DATABASE_URL=postgresql+psycopg://... SAMSUNGHEALTH_ENCRYPTION_KEY=... \\
+    SAMSUNGHEALTH_JWT_SECRET=... python3 scripts/bench_concurrency.py \\
+        [--url http://127.0.0.1:8000] [--concurrency 200] [--duration 30] [--writers 0]
+"""
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+from datetime import date, timedelta
+
+import httpx
+
+from bench_get_heartrate import _cleanup, _seed
+
+from server.security.auth import create_access_token
+
+
+URLS = (
+    "/api/heartrate?from=2025-06-01&to=2025-06-30",
+    "/api/steps?from=2025-06-01&to=2025-06-30",
+    "/api/trends",
+)
+
+
+async def _client(http: httpx.AsyncClient, deadline: float, latencies: list[float], errors: list[int]) -> None:
+    i = 0
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        r = await http.get(URLS[i % len(URLS)])
+        latencies.append(time.perf_counter() - t0)
+        if r.status_code != 200:
+            errors.append(r.status_code)
+        i += 1
+
+
+async def _writer(
+    http: httpx.AsyncClient, deadline: float, days, latencies: list[float], errors: list[int]
+) -> None:
+    while time.perf_counter() < deadline:
+        day = next(days).isoformat()
+        records = [
+            {"date": day, "hour": h, "min_bpm": 55, "max_bpm": 95, "avg_bpm": 70, "sample_count": 60}
+            for h in range(24)
+        ]
+        t0 = time.perf_counter()
+        r = await http.post("/api/heartrate", json={"records": records})
+        latencies.append(time.perf_counter() - t0)
+        if r.status_code != 201:
+            errors.append(r.status_code)
+
+
+async def _run(
+    url: str, token: str, concurrency: int, duration: float, writers: int
+) -> tuple[list[float], list[int], list[float], list[int], float]:
+    latencies: list[float] = []
+    errors: list[int] = []
+    write_latencies: list[float] = []
+    write_errors: list[int] = []
+    # Jours postés après la plage seedée : chaque POST insère et recalcule ses rollups.
+    days = (date(2030, 1, 1) + timedelta(days=i) for i in itertools.count())
+    limits = httpx.Limits(max_connections=concurrency + writers, max_keepalive_connections=concurrency + writers)
+    async with httpx.AsyncClient(
+        base_url=url, headers={"Authorization": f"Bearer {token}"}, limits=limits, timeout=60
+    ) as http:
+        await http.get(URLS[0])  # warm-up
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(
+            *(_client(http, deadline, latencies, errors) for _ in range(concurrency)),
+            *(_writer(http, deadline, days, write_latencies, write_errors) for _ in range(writers)),
+        )
+        elapsed = time.perf_counter() - start
+    return latencies, errors, write_latencies, write_errors, elapsed
+
+
+def _line(label: str, clients: int, latencies: list[float], errors: list[int], elapsed: float) -> str:
+    q = statistics.quantiles(latencies, n=100, method="inclusive")
+    return (
+        f"{label:<6} {clients:>7} {len(latencies):>8} {len(errors):>6} "
+        f"{len(latencies) / elapsed:>8.1f} {q[49] * 1000:>8.2f} {q[98] * 1000:>8.2f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="serveur cible")
+    parser.add_argument("--days", type=int, default=365, help="jours horaires seedés (défaut 365)")
+    parser.add_argument("--concurrency", type=int, default=200, help="clients simultanés (défaut 200)")
+    parser.add_argument("--duration", type=float, default=30, help="durée de mesure en s (défaut 30)")
+    parser.add_argument("--writers", type=int, default=0, help="clients POST /api/heartrate en parallèle (défaut 0)")
+    args = parser.parse_args()
+
+    user_id = _seed(args.days)
+    try:
+        latencies, errors, write_latencies, write_errors, elapsed = asyncio.run(
+            _run(args.url, create_access_token(str(user_id)), args.concurrency, args.duration, args.writers)
+        )
+    finally:
+        _cleanup(user_id)
+
+    print(f"{'':<6} {'clients':>7} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    print(_line("GET", args.concurrency, latencies, errors, elapsed))
+    if write_latencies:
+        print(_line("POST", args.writers, write_latencies, write_errors, elapsed))
+
+
+if __name__ == "__main__":
+    main()
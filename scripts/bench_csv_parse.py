@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Benchmark du parsing CSV fréquence cardiaque de scripts/import_samsung_csv.py (sans DB).
+
+Génère un export heart_rate synthétique de `--rows` lignes (une mesure toutes
+les 10 s, quelques lignes vides ou illisibles), puis compare le bucketing
+horaire :
+
+- `rows` : chemin historique (csv.DictReader + fv + parse_dt à 3 formats +
+  defaultdict(list) de bpm par heure) ;
+- `streaming` : iter_column_chunks + HourlyAggregator (agrégats courants,
+  heures complètes émises au fil de l'eau), NumPy si installé ;
+- `streaming-py` : idem, agrégation pur Python (NumPy masqué).
+
+Chaque mode tourne dans un processus neuf : pic RSS (ru_maxrss) comparable.
+Vérifie que tous produisent les mêmes lignes heart_rate_hourly.
+
+Usage:
+    python3 scripts/bench_csv_parse.py [--rows 1000000]
+"""
+
+import argparse
+import csv
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import import_samsung_csv as importer
+
+
+START = datetime(2018, 1, 1, tzinfo=timezone.utc)
+NAME = "com.samsung.shealth.tracker.heart_rate"
+PFX = "com.samsung.health.heart_rate."
+
+
+def _generate(export_dir: Path, total: int) -> None:
+    with (export_dir / f"{NAME}.bench.csv").open("w", newline="", encoding="utf-8") as f:
+        f.write("bench\n")
+        writer = csv.writer(f)
+        writer.writerow([f"{PFX}start_time", f"{PFX}heart_rate", f"{PFX}datauuid"])
+        for i in range(total):
+            ts = (START + timedelta(seconds=10 * i)).strftime("%Y-%m-%d %H:%M:%S.000")
+            if i % 10_007 == 0:
+                ts = ts[:19]  # sans millisecondes : repli parse_dt
+            elif i % 10_009 == 0:
+                ts = ""
+            writer.writerow([ts, 50 + i % 70, f"uuid-{i}"])
+
+
+def _legacy() -> dict:
+    buckets: dict[tuple, list] = defaultdict(list)
+    for row in importer.read_csv(NAME):
+        start = importer.parse_dt(importer.fv(row, f"{PFX}start_time"))
+        bpm = importer.to_float(importer.fv(row, f"{PFX}heart_rate"))
+        if not start or bpm is None:
+            continue
+        buckets[(start.date(), start.hour)].append(bpm)
+    return {
+        key: (round(min(bpms)), round(max(bpms)), round(sum(bpms) / len(bpms)), len(bpms))
+        for key, bpms in buckets.items()
+    }
+
+
+def _streaming() -> dict:
+    agg = importer.HourlyAggregator()
+    buckets = dict(importer.stream_hourly(NAME, f"{PFX}start_time", f"{PFX}heart_rate", importer.to_float, agg))
+    if agg.dirty:
+        exact = importer.HourlyAggregator(only=agg.dirty)
+        buckets.update(importer.stream_hourly(NAME, f"{PFX}start_time", f"{PFX}heart_rate", importer.to_float, exact))
+    return {key: (round(lo), round(hi), round(total / n), n) for key, (n, total, lo, hi) in buckets.items()}
+
+
+def _run(label: str, export_dir: Path) -> tuple[float, dict, int]:
+    """Processus neuf : (secondes, buckets, pic RSS en Mo)."""
+    importer.EXPORT_DIR = export_dir
+    if label == "streaming-py":
+        importer.np = None
+    fn = _legacy if label == "rows" else _streaming
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    return elapsed, result, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="lignes CSV générées (défaut 1000000)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-csv-parse-") as tmp:
+        export_dir = Path(tmp)
+        _generate(export_dir, args.rows)
+
+        labels = ["rows", "streaming"]
+        if importer.np is not None:
+            labels.append("streaming-py")
+        else:
+            print("numpy absent : streaming = agrégation pur Python")
+
+        print(f"{'parser':<13} {'rows':>9} {'s':>8} {'rows/s':>10} {'speedup':>8} {'peak MB':>8}")
+        reference = baseline = None
+        for label in labels:
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                elapsed, result, peak_mb = pool.submit(_run, label, export_dir).result()
+            if reference is None:
+                reference, baseline = result, elapsed
+            elif result != reference:
+                raise SystemExit(f"ERROR: {label} diverge du chemin ligne à ligne")
+            print(
+                f"{label:<13} {args.rows:>9} {elapsed:>8.2f} {args.rows / elapsed:>10.0f}"
+                f" {baseline / elapsed:>7.1f}x {peak_mb:>8}"
+            )
+        print(f"{len(reference)} buckets horaires identiques")
+
+
+if __name__ == "__main__":
+    main()
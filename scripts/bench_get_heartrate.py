@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Benchmark GET /api/heartrate — latence p50/p99 à 1 mois vs 1 an de données.
+
+Seed un user jetable avec `--days` jours horaires (chiffrés comme via l'API),
+puis mesure contre un vrai Postgres :
+- `endpoint` : requête HTTP complète (TestClient, cache de réponses et ETag
+  hors jeu) — lecture, déchiffrement, dicts depuis `Row`, encodage orjson ;
+- `encode models` : chemin historique, `HeartRateHourlyOut` construits puis
+  validés + encodés par pydantic (ce que faisait FastAPI sur la liste retournée) ;
+- `encode fast` : `server.responses.dumps` sur les dicts des `Row`.
+Le user et ses lignes sont supprimés en fin de run (erase RGPD).
+
+Usage:
+    DATABASE_URL=postgresql+psycopg://... SAMSUNGHEALTH_ENCRYPTION_KEY=... \\
+    SAMSUNGHEALTH_JWT_SECRET=... python3 scripts/bench_get_heartrate.py [--repeat 50]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["SAMSUNGHEALTH_RESPONSE_CACHE"] = "false"
+
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+
+from server.database import get_session
+from server.db.bulk import insert_on_conflict_do_nothing
+from server.db.models import HeartRateHourly, User
+from server.db.row_crypto import HEART_RATE_ROW
+from server.main import app
+from server.models import HeartRateHourlyOut
+from server.responses import dumps
+from server.security.auth import create_access_token
+from server.security.rgpd import erase_user_cascade
+
+
+BENCH_EMAIL = "bench-get-heartrate@samsunghealth.local"
+START = date(2025, 1, 1)
+WINDOWS = {
+    "1 month": (date(2025, 6, 1), date(2025, 6, 30)),
+    "1 year": (START, date(2025, 12, 31)),
+}
+SEED_CHUNK = 2000
+
+
+def _seed(days: int):
+    db = get_session()
+    try:
+        user = User(email=BENCH_EMAIL, password_hash="!bench-no-login", is_active=True)
+        db.add(user)
+        db.flush()
+        rows = [
+            HEART_RATE_ROW.to_storage(
+                dict(
+                    user_id=user.id,
+                    date=START + timedelta(days=i // 24),
+                    hour=i % 24,
+                    min_bpm=50,
+                    max_bpm=130,
+                    avg_bpm=60 + i % 40,
+                    sample_count=60,
+                )
+            )
+            for i in range(days * 24)
+        ]
+        for i in range(0, len(rows), SEED_CHUNK):
+            insert_on_conflict_do_nothing(db, HeartRateHourly, rows[i : i + SEED_CHUNK], ["user_id", "date", "hour"])
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def _cleanup(user_id) -> None:
+    db = get_session()
+    try:
+        erase_user_cascade(db, user_id)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _percentiles(samples: list[float]) -> tuple[float, float]:
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return q[49] * 1000, q[98] * 1000
+
+
+def _timed(fn, repeat: int) -> list[float]:
+    fn()  # warm-up (plans, caches de types)
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365, help="jours horaires seedés (défaut 365)")
+    parser.add_argument("--repeat", type=int, default=50, help="requêtes mesurées par fenêtre (défaut 50)")
+    args = parser.parse_args()
+
+    user_id = _seed(args.days)
+    try:
+        client = TestClient(app)
+        client.headers["Authorization"] = f"Bearer {create_access_token(str(user_id))}"
+        adapter = TypeAdapter(list[HeartRateHourlyOut])
+
+        print(f"{'window':<8} {'rows':>6} {'stage':<14} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, (first, last) in WINDOWS.items():
+            url = f"/api/heartrate?from={first}&to={last}"
+            rows = client.get(url).json()
+
+            def _get():
+                r = client.get(url)
+                assert r.status_code == 200, r.text
+
+            stages = {
+                "endpoint": _get,
+                "encode models": lambda: adapter.dump_json(
+                    adapter.validate_python([HeartRateHourlyOut(**d) for d in rows])
+                ),
+                "encode fast": lambda: dumps(rows),
+            }
+            for stage, fn in stages.items():
+                p50, p99 = _percentiles(_timed(fn, args.repeat))
+                print(f"{name:<8} {len(rows):>6} {stage:<14} {p50:>8.2f} {p99:>8.2f}")
+    finally:
+        _cleanup(user_id)
+
+
+if __name__ == "__main__":
+    main()
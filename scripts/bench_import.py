@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Benchmark de l'import CSV Samsung (scripts/import_samsung_csv.py) sur un export généré.
+
+Génère un export synthétique de `--rows` lignes CSV (40 % podomètre, 40 %
+fréquence cardiaque, 20 % stress, une mesure par minute), l'importe pour un
+user jetable via le chargeur COPY + merge, le ré-importe en `--full` (tout en
+conflit → skipped), puis une dernière fois via le manifest (fichiers inchangés
+→ sautés). Rapporte secondes et lignes CSV/s par table.
+
+`--baseline-rows` : le chemin historique (1 INSERT ... ON CONFLICT RETURNING
+par ligne) est mesuré sur un échantillon de lignes stress, dans une
+transaction rollbackée, et extrapolé au volume stress complet.
+
+Usage:
+    DATABASE_URL=postgresql+psycopg://... python3 scripts/bench_import.py [--rows 5000000] [--baseline-rows 20000]
+
+Le user jetable et ses lignes sont supprimés en fin de run (erase_user_cascade).
+"""
+
+import argparse
+import csv
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import import_samsung_csv as importer
+from bench_ingest import _per_row
+from server.database import get_session
+from server.db.models import Stress, User
+from server.security.rgpd import erase_user_cascade
+
+
+BENCH_EMAIL = "bench-import@samsunghealth.local"
+START = datetime(2018, 1, 1, tzinfo=timezone.utc)
+STEP_PFX = "com.samsung.health.step_count."
+HR_PFX = "com.samsung.health.heart_rate."
+
+# (fichier, part des lignes, importer)
+TABLES = (
+    ("com.samsung.shealth.tracker.pedometer_step_count", 0.4, importer.import_steps_hourly),
+    ("com.samsung.shealth.tracker.heart_rate", 0.4, importer.import_heart_rate_hourly),
+    ("com.samsung.shealth.stress", 0.2, importer.import_stress),
+)
+
+
+def _ts(i: int) -> str:
+    return (START + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S.000")
+
+
+def _write(path: Path, header: list[str], rows) -> None:
+    with path.open("w", newline="", encoding="utf-8") as f:
+        f.write("bench\n")  # ligne descriptor Samsung, ignorée par read_csv
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def _generate(export_dir: Path, total: int) -> dict[str, int]:
+    counts = {name: int(total * share) for name, share, _ in TABLES}
+    steps, hr, stress = (counts[name] for name, _, _ in TABLES)
+    _write(
+        export_dir / f"{TABLES[0][0]}.bench.csv",
+        [f"{STEP_PFX}start_time", f"{STEP_PFX}count"],
+        ((_ts(i), 10 + i % 90) for i in range(steps)),
+    )
+    _write(
+        export_dir / f"{TABLES[1][0]}.bench.csv",
+        [f"{HR_PFX}start_time", f"{HR_PFX}heart_rate"],
+        ((_ts(i), 55 + i % 60) for i in range(hr)),
+    )
+    _write(
+        export_dir / f"{TABLES[2][0]}.bench.csv",
+        ["start_time", "end_time", "score", "tag_id"],
+        ((_ts(i), _ts(i + 1), i % 100, "") for i in range(stress)),
+    )
+    return counts
+
+
+def _baseline(user_id, export_dir: Path, n: int) -> float:
+    """Secondes pour `n` lignes stress en 1 statement par ligne (rollback)."""
+    importer.EXPORT_DIR = export_dir
+    rows = []
+    for row in importer.read_csv(TABLES[2][0]):
+        rows.append(
+            dict(
+                user_id=user_id,
+                start_time=importer.parse_dt(row["start_time"]),
+                end_time=importer.parse_dt(row["end_time"]),
+                score=importer.to_float(row["score"]),
+                tag_id=None,
+            )
+        )
+        if len(rows) == n:
+            break
+    db = get_session()
+    try:
+        t0 = time.perf_counter()
+        _per_row(db, Stress, rows, ["user_id", "start_time", "end_time"])
+        return time.perf_counter() - t0
+    finally:
+        db.rollback()
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5_000_000, help="lignes CSV générées (défaut 5000000)")
+    parser.add_argument("--baseline-rows", type=int, default=20_000, help="échantillon du chemin 1 INSERT/ligne (0 = off)")
+    parser.add_argument("--dir", type=Path, default=None, help="répertoire de l'export généré (défaut : temporaire)")
+    args = parser.parse_args()
+
+    tmp = None
+    export_dir = args.dir
+    if export_dir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="bench-import-")
+        export_dir = Path(tmp.name)
+    export_dir.mkdir(parents=True, exist_ok=True)
+
+    t0 = time.perf_counter()
+    counts = _generate(export_dir, args.rows)
+    print(f"export: {sum(counts.values())} lignes CSV générées en {time.perf_counter() - t0:.1f}s ({export_dir})")
+
+    db = get_session()
+    user = User(email=BENCH_EMAIL, password_hash="!bench-no-login", is_active=False)
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    importer.EXPORT_DIR = export_dir
+    importer.TARGET_USER_ID = str(user_id)
+    try:
+        # Avant l'import : tables vides, le baseline mesure de vraies insertions.
+        if args.baseline_rows:
+            n = min(args.baseline_rows, counts[TABLES[2][0]])
+            elapsed = _baseline(user_id, export_dir, n)
+            full = elapsed / n * counts[TABLES[2][0]]
+            print(f"baseline 1 INSERT/ligne (stress) : {n / elapsed:.0f} rows/s → ~{full:.0f}s extrapolés")
+        print(f"{'table':<48} {'pass':<7} {'rows':>9} {'s':>8} {'rows/s':>10}")
+        for name, _, fn in TABLES:
+            for label, full in (("fresh", False), ("replay", True), ("manifest", False)):
+                importer.FULL_IMPORT = full
+                t0 = time.perf_counter()
+                fn(db)
+                elapsed = time.perf_counter() - t0
+                print(f"{name:<48} {label:<7} {counts[name]:>9} {elapsed:>8.2f} {counts[name] / elapsed:>10.0f}")
+    finally:
+        db.close()
+        db = get_session()
+        try:
+            erase_user_cascade(db, user_id)
+            db.commit()
+        finally:
+            db.close()
+        if tmp is not None:
+            tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Benchmark ingest POST /api/* — per-row (historique) vs bulk multi-VALUES.
+
+Mesure rows/sec des chemins d'insertion des routers santé contre un vrai
+Postgres. Chaque mesure tourne dans une transaction rollbackée (user jetable
+inclus) : la base n'est pas modifiée.
+
+Usage:
+    DATABASE_URL=postgresql+psycopg://... python3 scripts/bench_ingest.py [--rows 2000] [--repeat 3]
+
+Deux passes par scénario : `fresh` (table vide, tout inséré) puis `replay`
+(même payload, tout en conflit → skipped).
+
+Le scénario sleep (`--nights` sessions × `--stages` stages) compare l'ancien
+pipeline SELECT + flush par session au pipeline set-based du router et
+rapporte la latence par session.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from server.database import get_session
+from server.db.bulk import insert_on_conflict_do_nothing
+from server.db.models import HeartRateHourly, SleepSession, SleepStage, StepsHourly, User
+from server.models import SleepSessionIn, SleepStageIn
+from server.routers.sleep import _insert_sessions
+
+
+BENCH_EMAIL = "bench-ingest@samsunghealth.local"
+
+
+def _steps_rows(user_id, n: int) -> list[dict]:
+    start = date(2020, 1, 1)
+    return [
+        dict(
+            user_id=user_id,
+            date=(start + timedelta(days=i // 24)).isoformat(),
+            hour=i % 24,
+            step_count=100 + i % 900,
+        )
+        for i in range(n)
+    ]
+
+
+def _hr_rows(user_id, n: int) -> list[dict]:
+    start = date(2020, 1, 1)
+    return [
+        dict(
+            user_id=user_id,
+            date=(start + timedelta(days=i // 24)).isoformat(),
+            hour=i % 24,
+            min_bpm=50,
+            max_bpm=130,
+            avg_bpm=60 + i % 40,
+            sample_count=60,
+        )
+        for i in range(n)
+    ]
+
+
+def _per_row(db: Session, model, rows: list[dict], conflict_cols: list[str]) -> int:
+    """Chemin historique des routers : 1 INSERT ... RETURNING par record."""
+    inserted = 0
+    for values in rows:
+        stmt = (
+            pg_insert(model)
+            .values(**values)
+            .on_conflict_do_nothing(index_elements=conflict_cols)
+            .returning(model.id)
+        )
+        if db.execute(stmt).first() is not None:
+            inserted += 1
+    return inserted
+
+
+def _bulk(db: Session, model, rows: list[dict], conflict_cols: list[str]) -> int:
+    return len(insert_on_conflict_do_nothing(db, model, rows, conflict_cols))
+
+
+def _sleep_sessions(nights: int, stages: int) -> list[SleepSessionIn]:
+    out = []
+    for n in range(nights):
+        start = datetime(2020, 1, 1, 23, tzinfo=timezone.utc) + timedelta(days=n)
+        out.append(
+            SleepSessionIn(
+                sleep_start=start,
+                sleep_end=start + timedelta(minutes=10 * stages),
+                stages=[
+                    SleepStageIn(
+                        stage_type=("light", "deep", "rem", "awake")[i % 4],
+                        stage_start=start + timedelta(minutes=10 * i),
+                        stage_end=start + timedelta(minutes=10 * (i + 1)),
+                    )
+                    for i in range(stages)
+                ],
+            )
+        )
+    return out
+
+
+def _sleep_per_session(db: Session, user_id, sessions: list[SleepSessionIn]) -> int:
+    """Chemin historique de create_sleep_sessions : SELECT + add + flush par session."""
+    inserted = 0
+    for s in sessions:
+        existing = db.execute(
+            select(SleepSession).where(
+                SleepSession.user_id == user_id,
+                SleepSession.sleep_start == s.sleep_start,
+                SleepSession.sleep_end == s.sleep_end,
+            )
+        ).scalar_one_or_none()
+        if existing is not None:
+            continue
+        new_session = SleepSession(user_id=user_id, sleep_start=s.sleep_start, sleep_end=s.sleep_end)
+        db.add(new_session)
+        db.flush()
+        for st in s.stages or []:
+            db.add(
+                SleepStage(
+                    user_id=user_id,
+                    session_id=new_session.id,
+                    stage_type=st.stage_type,
+                    stage_start=st.stage_start,
+                    stage_end=st.stage_end,
+                )
+            )
+        inserted += 1
+    db.flush()
+    return inserted
+
+
+SLEEP_STRATEGIES = {"per_session": _sleep_per_session, "set_based": _insert_sessions}
+
+
+def _bench_sleep_once(strategy, nights: int, stages: int) -> float:
+    db = get_session()
+    try:
+        user = User(email=BENCH_EMAIL, password_hash="!bench-no-login", is_active=False)
+        db.add(user)
+        db.flush()
+        sessions = _sleep_sessions(nights, stages)
+        t0 = time.perf_counter()
+        inserted = strategy(db, user.id, sessions)
+        elapsed = time.perf_counter() - t0
+        assert inserted == nights, f"sleep: attendu {nights} insérées, got {inserted}"
+        return elapsed
+    finally:
+        db.rollback()
+        db.close()
+
+
+SCENARIOS = {
+    "steps_hourly": (StepsHourly, _steps_rows),
+    "heart_rate_hourly": (HeartRateHourly, _hr_rows),
+}
+STRATEGIES = {"per_row": _per_row, "bulk": _bulk}
+
+
+def _bench_once(model, make_rows, strategy, n: int) -> tuple[float, float]:
+    """Retourne (secondes fresh, secondes replay) dans une transaction rollbackée."""
+    db = get_session()
+    try:
+        user = User(email=BENCH_EMAIL, password_hash="!bench-no-login", is_active=False)
+        db.add(user)
+        db.flush()
+        rows = make_rows(user.id, n)
+        conflict_cols = ["user_id", "date", "hour"]
+
+        t0 = time.perf_counter()
+        inserted = strategy(db, model, rows, conflict_cols)
+        t_fresh = time.perf_counter() - t0
+        assert inserted == n, f"fresh: attendu {n} insérés, got {inserted}"
+
+        t0 = time.perf_counter()
+        inserted = strategy(db, model, rows, conflict_cols)
+        t_replay = time.perf_counter() - t0
+        assert inserted == 0, f"replay: attendu 0 insérés, got {inserted}"
+        return t_fresh, t_replay
+    finally:
+        db.rollback()
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000, help="records par payload (défaut 2000 ≈ 90j horaires)")
+    parser.add_argument("--repeat", type=int, default=3, help="répétitions, médiane retenue (défaut 3)")
+    parser.add_argument("--nights", type=int, default=30, help="sessions sleep par payload (défaut 30)")
+    parser.add_argument("--stages", type=int, default=40, help="stages par session (défaut 40)")
+    args = parser.parse_args()
+
+    print(f"{'table':<20} {'strategy':<9} {'fresh rows/s':>13} {'replay rows/s':>14}")
+    for table, (model, make_rows) in SCENARIOS.items():
+        for name, strategy in STRATEGIES.items():
+            runs = [_bench_once(model, make_rows, strategy, args.rows) for _ in range(args.repeat)]
+            fresh = statistics.median(r[0] for r in runs)
+            replay = statistics.median(r[1] for r in runs)
+            print(f"{table:<20} {name:<9} {args.rows / fresh:>13,.0f} {args.rows / replay:>14,.0f}")
+
+    print()
+    print(f"sleep: {args.nights} sessions × {args.stages} stages")
+    print(f"{'strategy':<12} {'total ms':>10} {'ms/session':>11}")
+    for name, strategy in SLEEP_STRATEGIES.items():
+        elapsed = statistics.median(
+            _bench_sleep_once(strategy, args.nights, args.stages) for _ in range(args.repeat)
+        )
+        print(f"{name:<12} {elapsed * 1000:>10.1f} {elapsed * 1000 / args.nights:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Benchmark du coût des métriques par requête (server/metrics.py).
+
+Mesure, hors DB et hors réseau :
+- `request`   : ce que `RequestContextMiddleware` ajoute à chaque requête —
+  `track_request()`, `request_stats()`, `observe_request()` (histogramme
+  route / méthode / status + compteurs SQL / déchiffrement) ;
+- `query`     : listeners `before/after_cursor_execute` pour une requête SQL ;
+- `decrypt`   : `count_decrypts()` appelé par `decrypt_field(s)` ;
+- `render`    : un scrape GET /metrics (hors requête, pour info).
+Le budget visé est de quelques µs par requête (cf. docstring du module).
+
+Usage:
+    python3 scripts/bench_metrics.py [--number 200000] [--routes 30]
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from server.metrics import (
+    REGISTRY,
+    _after_cursor_execute,
+    _before_cursor_execute,
+    count_decrypts,
+    observe_request,
+    request_stats,
+    track_request,
+)
+
+
+def _request(routes: list[str]):
+    i = 0
+
+    def run():
+        nonlocal i
+        token = track_request()
+        stats = request_stats(token) or {"db_queries": 3, "db_time_ms": 1.2, "db_rows": 720, "decrypts": 720}
+        observe_request(routes[i % len(routes)], "GET", 200, 0.004, stats)
+        i += 1
+
+    return run
+
+
+def _query():
+    conn = SimpleNamespace(info={})
+    cursor = SimpleNamespace(rowcount=24)
+    context = SimpleNamespace(isinsert=False, isupdate=False, isdelete=False, isddl=False)
+    track_request()
+
+    def run():
+        _before_cursor_execute(conn, cursor, "SELECT 1", None, context, False)
+        _after_cursor_execute(conn, cursor, "SELECT 1", None, context, False)
+
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=200_000, help="itérations par mesure (défaut 200000)")
+    parser.add_argument("--routes", type=int, default=30, help="routes distinctes (séries, défaut 30)")
+    args = parser.parse_args()
+
+    routes = [f"/api/route{i}" for i in range(args.routes)]
+    token = track_request()
+    cases = {
+        "request": (_request(routes), args.number),
+        "query": (_query(), args.number),
+        "decrypt": (lambda: count_decrypts(24), args.number),
+        "render": (REGISTRY.render, 200),
+    }
+    print(f"{'case':<8} {'µs/call':>8}")
+    for name, (fn, number) in cases.items():
+        best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+        print(f"{name:<8} {best * 1e6:>8.2f}")
+    request_stats(token)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Build des statiques : copies hashées + siblings précompressés + manifest.
+
+Pour chaque fichier de static/ (hors HTML, servis par les routes, et hors
+static/dist/) :
+- `static/dist/<chemin>.<sha256[:10]>.<ext>` — nom qui change avec le contenu,
+  servi `immutable` ;
+- types compressibles : siblings `.gz` (gzip 9, mtime 0 → build reproductible)
+  et `.br` (brotli 11, si le module `brotli` est installé) ;
+- `static/dist/manifest.json` : chemin source → chemin hashé.
+
+Les CSS sont traitées en dernier, leurs `url(/static/...)` (polices) réécrites
+vers les copies hashées avant hash. static/dist/ est recréé à chaque run.
+
+Usage:
+    python3 scripts/build_static.py [--static-dir static]
+"""
+
+import argparse
+import gzip
+import json
+import shutil
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from server.static_assets import (
+    STATIC_DIR,
+    hashed_name,
+    precompressible,
+    rewrite_asset_urls,
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+SKIPPED_SUFFIXES = {".html", ".gz", ".br"}
+
+
+def _sources(static_dir: Path, dist_dir: Path) -> list[Path]:
+    files = [
+        p
+        for p in static_dir.rglob("*")
+        if p.is_file() and dist_dir not in p.parents and p.suffix not in SKIPPED_SUFFIXES
+    ]
+    # CSS après le reste : elles référencent polices / images déjà hashées.
+    return sorted(files, key=lambda p: (p.suffix == ".css", p.as_posix()))
+
+
+def _write(dist_dir: Path, rel: str, data: bytes) -> None:
+    out = dist_dir / rel
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_bytes(data)
+    if precompressible(rel):
+        out.with_name(out.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            out.with_name(out.name + ".br").write_bytes(brotli.compress(data, quality=11))
+
+
+def build(static_dir: Path) -> dict[str, str]:
+    dist_dir = static_dir / "dist"
+    if dist_dir.exists():
+        shutil.rmtree(dist_dir)
+    manifest: dict[str, str] = {}
+    for path in _sources(static_dir, dist_dir):
+        rel = path.relative_to(static_dir).as_posix()
+        data = path.read_bytes()
+        if path.suffix == ".css":
+            data = rewrite_asset_urls(data.decode("utf-8"), manifest).encode("utf-8")
+        manifest[rel] = hashed_name(rel, data)
+        _write(dist_dir, manifest[rel], data)
+    dist_dir.mkdir(parents=True, exist_ok=True)
+    (dist_dir / "manifest.json").write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--static-dir", type=Path, default=STATIC_DIR, help="répertoire source (défaut static/)")
+    args = parser.parse_args()
+
+    manifest = build(args.static_dir)
+    print(f"{len(manifest)} assets → {args.static_dir / 'dist'} (brotli: {'oui' if brotli else 'non'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -28,6 +28,8 @@ from server.db.models import (
     StepsHourly,
     User,
 )
+from server.db.rollups import refresh_heart_rate_rollups, refresh_steps_rollups
+from server.db.row_crypto import HEART_RATE_ROW
 
 
 DEFAULT_LEGACY_EMAIL = "legacy@samsunghealth.local"
@@ -69,6 +71,7 @@ def generate_stages(sleep_start: datetime, sleep_end: datetime) -> list[dict]:
 
 def _upsert_steps(db: Session, base_date: datetime, num_days: int, user_id: str) -> int:  # base_date timezone-aware
     inserted = 0
+    touched: set[str] = set()
     for day_offset in range(num_days):
         date = base_date + timedelta(days=day_offset)
         date_str = date.strftime("%Y-%m-%d")
@@ -97,11 +100,14 @@ def _upsert_steps(db: Session, base_date: datetime, num_days: int, user_id: str)
             )
             if db.execute(stmt).first() is not None:
                 inserted += 1
+                touched.add(date_str)
+    refresh_steps_rollups(db, user_id, touched)
     return inserted
 
 
 def _upsert_heart_rate(db: Session, base_date: datetime, num_days: int, user_id: str) -> int:
     inserted = 0
+    touched: set[str] = set()
     for day_offset in range(num_days):
         date = base_date + timedelta(days=day_offset)
         date_str = date.strftime("%Y-%m-%d")
@@ -121,13 +127,17 @@ def _upsert_heart_rate(db: Session, base_date: datetime, num_days: int, user_id:
             stmt = (
                 pg_insert(HeartRateHourly)
                 .values(
-                    user_id=user_id,
-                    date=date_str,
-                    hour=hour,
-                    min_bpm=min_bpm,
-                    max_bpm=max_bpm,
-                    avg_bpm=avg,
-                    sample_count=random.randint(5, 30),
+                    **HEART_RATE_ROW.to_storage(
+                        dict(
+                            user_id=user_id,
+                            date=date_str,
+                            hour=hour,
+                            min_bpm=min_bpm,
+                            max_bpm=max_bpm,
+                            avg_bpm=avg,
+                            sample_count=random.randint(5, 30),
+                        )
+                    )
                 )
                 .on_conflict_do_nothing(
                     index_elements=["user_id", "date", "hour"],
@@ -136,6 +146,8 @@ def _upsert_heart_rate(db: Session, base_date: datetime, num_days: int, user_id:
             )
             if db.execute(stmt).first() is not None:
                 inserted += 1
+                touched.add(date_str)
+    refresh_heart_rate_rollups(db, user_id, touched)
     return inserted
 
 
@@ -3,8 +3,36 @@ Import Samsung Health CSV export into Postgres (V2.1.2 SQLAlchemy refactor).
 
 Idempotent — toutes les insertions utilisent `ON CONFLICT DO NOTHING`.
 
+Chargement en masse : chaque table est poussée par `COPY` dans une table
+temporaire de staging (colonnes Art.9 chiffrées par lot), puis fusionnée en un
+seul `INSERT ... SELECT ... ON CONFLICT DO NOTHING` (server/db/bulk.py) au lieu
+d'un aller-retour par ligne CSV. Bench : scripts/bench_import.py.
+
+Podomètre et fréquence cardiaque (les plus gros fichiers) sont lus en flux,
+par blocs de colonnes (`iter_column_chunks`) : format du timestamp détecté une
+fois par colonne, agrégats courants (n, somme, min, max) par heure, vectorisés
+avec NumPy si installé (repli pur Python sinon). Les heures complètes sont
+émises au fil de l'eau (`HourlyAggregator`) : mémoire bornée quelle que soit
+la taille de l'export. Bench : scripts/bench_csv_parse.py.
+
+`--jobs N` : les importers sont planifiés selon leurs dépendances (seul
+sleep_stages attend sleep, pour l'uuid_map) dans un pool de N processus, chacun
+avec son propre engine — parsing CSV/dates et chiffrement AES sur tous les
+cœurs. Temps et lignes/s par importer affichés en fin de run.
+
+Reprise incrémentale (table import_manifest, 1 ligne par user et fichier
+source) : fichier inchangé depuis le dernier import complet → sauté sans
+lecture ; fichier modifié (export plus récent) → seules les lignes à partir du
+max start_time déjà importé moins WATERMARK_MARGIN sont fusionnées (données
+tardives d'une montre resynchronisée ; ON CONFLICT absorbe le recouvrement) ;
+import interrompu → repris au dernier lot commité (CHECKPOINT_ROWS lignes,
+manifest avancé dans la même transaction). Le début du run
+(`run_started_at`) est conservé entre reprises : les buckets horaires partiels
+commités avant un crash restent identifiables pour la 2e passe.
+`--full` ignore le manifest.
+
 Usage:
-    python3 scripts/import_samsung_csv.py [export_dir] [--user-email <email>]
+    python3 scripts/import_samsung_csv.py [export_dir] [--user-email <email>] [--jobs N] [--full]
 
 Default export_dir: /mnt/c/Users/idsmf/Desktop/SamsungHealth
 Default user_email: legacy@samsunghealth.local (créé par alembic 0004 backfill)
@@ -12,18 +40,34 @@ Default user_email: legacy@samsunghealth.local (créé par alembic 0004 backfill
 
 import argparse
 import csv
+import hashlib
+import itertools
+import multiprocessing
+import os
+import re
 import sys
-from collections import defaultdict
-from datetime import datetime, timezone
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
+from typing import NamedTuple
+from uuid import UUID
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from sqlalchemy import select
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover — agrégation pur Python
+    np = None
+
+from sqlalchemy import delete, func, select, tuple_
 from sqlalchemy.orm import Session
 
 from server.database import get_session
+from server.db.bulk import CopyResult, copy_insert_on_conflict_do_nothing
+from server.db.rollups import refresh_heart_rate_rollups, refresh_steps_rollups
+from server.db.row_crypto import HEART_RATE_ROW
 from server.db.models import (
     ActivityDaily,
     ActivityLevel,
@@ -34,6 +78,7 @@ from server.db.models import (
     HeartRateHourly,
     Height,
     Hrv,
+    ImportManifest,
     Mood,
     RespiratoryRate,
     SkinTemperature,
@@ -56,6 +101,13 @@ DEFAULT_EXPORT_DIR = Path("/mnt/c/Users/idsmf/Desktop/SamsungHealth")
 # avoir à propager un user_id à chaque signature import_*(db).
 EXPORT_DIR: Path = DEFAULT_EXPORT_DIR
 TARGET_USER_ID: str | None = None
+FULL_IMPORT = False  # --full : manifest ignoré (mais mis à jour)
+
+# Lignes mappées par transaction ; le manifest avance dans le même commit.
+CHECKPOINT_ROWS = 100_000
+
+# Fichier modifié : lignes re-fusionnées sous le max start_time déjà importé.
+WATERMARK_MARGIN = timedelta(days=7)
 
 # Samsung shealth CSV stage codes (different from Health Connect 1-4)
 SLEEP_STAGE_MAP = {40001: "awake", 40002: "light", 40003: "deep", 40004: "rem"}
@@ -132,28 +184,366 @@ def to_int(s) -> int | None:
         return None
 
 
+# ── lecture colonnaire en flux ───────────────────────────────────────────────
+
+# Formats de parse_dt, dans le même ordre. Un timestamp qui matche la regex du
+# format détecté est forcément accepté par strptime : seul le préfixe
+# "YYYY-MM-DD HH" est réellement parsé (une fois par heure distincte). Tout le
+# reste repasse par parse_dt, d'où un résultat identique au chemin ligne à ligne.
+_SECONDS = r"\d{4}-\d{2}-\d{2} \d{2}:[0-5]\d:(?:[0-5]\d|6[01])"
+_DT_FORMATS = (
+    (re.compile(_SECONDS + r"\.\d{1,6}"), "%Y-%m-%d %H"),
+    (re.compile(_SECONDS), "%Y-%m-%d %H"),
+    (re.compile(r"\d{4}-\d{2}-\d{2}"), "%Y-%m-%d"),
+)
+_INVALID = object()
+
+CHUNK_ROWS = 65_536  # lignes CSV par bloc de colonnes
+# Retard toléré (heures) avant d'émettre un bucket : les exports Samsung sont
+# quasi triés par start_time, quelques lignes arrivent en léger désordre.
+LATE_HOURS = 6
+_PREFIX_CACHE_MAX = 4096
+
+
+def iter_column_chunks(name_pattern: str, *columns: str, chunk_rows: int = CHUNK_ROWS):
+    """Blocs de `chunk_rows` lignes : tuple de listes str par colonne ("" si absente), sans dict par ligne."""
+    path = find_csv(name_pattern)
+    if path is None:
+        return
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        f.readline()  # skip Samsung's metadata line 1
+        reader = csv.reader(f)
+        header = next(reader, [])
+        index = {name: i for i, name in enumerate(header)}  # doublon : la dernière gagne, comme DictReader
+        picks = [index.get(name) for name in columns]
+        rows = (r for r in reader if r)
+        while True:
+            out = tuple([] for _ in columns)
+            count = 0
+            for row in itertools.islice(rows, chunk_rows):
+                count += 1
+                for i, col in zip(picks, out):
+                    col.append(row[i] if i is not None and i < len(row) else "")
+            if not count:
+                return
+            yield out
+
+
+def _detect_dt_format(values: list[str], sample: int = 100):
+    """(regex, format du préfixe) majoritaire sur les premiers timestamps non vides, None si aucun."""
+    head = list(itertools.islice((v for v in values if v), sample))
+    hits = [(sum(1 for v in head if regex.fullmatch(v)), regex, fmt) for regex, fmt in _DT_FORMATS]
+    best = max(hits, key=lambda h: h[0])
+    return (best[1], best[2]) if best[0] else None
+
+
+class HourlyAggregator:
+    """Agrégats courants (n, somme, min, max) par heure UTC, alimentés bloc par bloc.
+
+    Un bucket est émis dès qu'il a plus de `lateness_h` heures de retard sur
+    l'heure la plus récente vue. Une ligne qui tombe avant cet horizon (bucket
+    peut-être déjà émis) n'est pas agrégée : son heure va dans `dirty`, à
+    recalculer par une 2e passe `HourlyAggregator(only=dirty)` (aucune
+    émission anticipée, seules ces heures sont agrégées).
+
+    Heures = `date.toordinal() * 24 + hour` ; buckets émis en
+    `((date, hour), (n, somme, min, max))`.
+    """
+
+    def __init__(self, lateness_h: int = LATE_HOURS, only: set[int] | None = None) -> None:
+        self.lateness_h = lateness_h
+        self.only = only
+        self.dirty: set[int] = set()
+        self._open: dict[int, list] = {}
+        self._horizon: int | None = None
+        self._format = None
+        self._detected = False
+        self._prefixes: dict[str, object] = {}
+
+    def _hour(self, ts: str):
+        if self._format is not None and self._format[0].fullmatch(ts):
+            prefix = ts[:13]
+            hour = self._prefixes.get(prefix)
+            if hour is None:
+                try:
+                    dt = datetime.strptime(prefix, self._format[1])
+                    hour = dt.toordinal() * 24 + dt.hour
+                except ValueError:
+                    hour = _INVALID
+                if len(self._prefixes) >= _PREFIX_CACHE_MAX:
+                    self._prefixes.clear()
+                self._prefixes[prefix] = hour
+            return hour
+        dt = parse_dt(ts)
+        return dt.toordinal() * 24 + dt.hour if dt else _INVALID
+
+    def _merge(self, hour: int, n: int, total, lo, hi) -> None:
+        a = self._open.get(hour)
+        if a is None:
+            self._open[hour] = [n, total, lo, hi]
+            return
+        a[0] += n
+        a[1] += total
+        if lo < a[2]:
+            a[2] = lo
+        if hi > a[3]:
+            a[3] = hi
+
+    def add(self, timestamps: list[str], values: list[float | int | None]):
+        """Agrège un bloc ; génère les buckets devenus complets."""
+        if not self._detected:
+            self._format, self._detected = _detect_dt_format(timestamps), True
+        hours: list[int] = []
+        kept: list[float | int] = []
+        for ts, value in zip(timestamps, values):
+            if value is None or not ts:
+                continue
+            hour = self._hour(ts)
+            if hour is _INVALID:
+                continue
+            if self.only is not None:
+                if hour not in self.only:
+                    continue
+            elif self._horizon is not None and hour < self._horizon:
+                self.dirty.add(hour)
+                continue
+            hours.append(hour)
+            kept.append(value)
+        if not kept:
+            return
+
+        if np is not None:
+            uniq, inverse = np.unique(np.asarray(hours), return_inverse=True)
+            vals = np.asarray(kept)
+            n = np.bincount(inverse, minlength=len(uniq))
+            total = np.zeros(len(uniq), dtype=vals.dtype)
+            np.add.at(total, inverse, vals)
+            lo = np.full(len(uniq), vals.max(), dtype=vals.dtype)
+            hi = np.full(len(uniq), vals.min(), dtype=vals.dtype)
+            np.minimum.at(lo, inverse, vals)
+            np.maximum.at(hi, inverse, vals)
+            for part in zip(uniq.tolist(), n.tolist(), total.tolist(), lo.tolist(), hi.tolist()):
+                self._merge(*part)
+        else:
+            for hour, value in zip(hours, kept):
+                self._merge(hour, 1, value, value, value)
+
+        if self.only is None:
+            horizon = max(hours) - self.lateness_h
+            if self._horizon is None or horizon > self._horizon:
+                self._horizon = horizon
+                yield from self._flush(lambda hour: hour < horizon)
+
+    def finish(self):
+        """Génère les buckets restants."""
+        yield from self._flush(lambda hour: True)
+
+    def _flush(self, due):
+        for hour in sorted(h for h in self._open if due(h)):
+            n, total, lo, hi = self._open.pop(hour)
+            yield (date.fromordinal(hour // 24), hour % 24), (n, total, lo, hi)
+
+
+def stream_hourly(source: str, ts_col: str, value_col: str, convert: Callable, agg: HourlyAggregator):
+    """Buckets horaires de `source` au fil de la lecture (`convert` : to_int / to_float)."""
+    for starts, raw in iter_column_chunks(source, ts_col, value_col):
+        yield from agg.add(starts, [convert(v) for v in raw])
+    yield from agg.finish()
+
+
+def _reaggregate_dirty(
+    db: Session, label: str, model, buckets: Callable, dirty: set[int], run: "SourceRun", to_row, refresh
+) -> None:
+    """2e passe exacte sur les heures reçues en désordre, dans la transaction du dernier lot.
+
+    `buckets(agg)` relit le fichier (stream_hourly). Seuls les buckets partiels
+    insérés par ce run, reprises après crash comprises (`created_at >=
+    run.started_at`), sont supprimés puis remplacés par l'agrégat complet ; les
+    autres heures passent par ON CONFLICT DO NOTHING (lignes préexistantes
+    intactes). Mêmes heures ignorées sous le watermark `run.since` que le
+    chargement principal.
+    """
+    if not dirty:
+        return
+    rows = [to_row(key, stats) for key, stats in buckets(HourlyAggregator(only=dirty))]
+    if run.since is not None:
+        rows = [r for r in rows if _as_datetime(r["date"]) >= run.since]
+    keys = [(r["date"], r["hour"]) for r in rows]
+    replaced = 0
+    for i in range(0, len(keys), 1000):
+        replaced += db.execute(
+            delete(model).where(
+                model.user_id == UUID(TARGET_USER_ID),
+                model.created_at >= run.started_at,
+                tuple_(model.date, model.hour).in_(keys[i : i + 1000]),
+            )
+        ).rowcount
+    res = _load(db, model, rows, ["date", "hour"], returning=(model.date,))
+    refresh(db, TARGET_USER_ID, {r.date for r in res.returned})
+    print(f"  {label:<35} re-aggregated {replaced} out-of-order hours ({res.inserted - replaced} new)")
+
+
+# Lignes rapportées (inserted + skipped) par l'importer en cours (_run_importer).
+_REPORTED: list[int] = []
+
+
 def report(label: str, ins: int, skp: int) -> None:
+    _REPORTED.append(ins + skp)
     print(f"  {label:<35} inserted {ins:>6} | skipped {skp:>6}")
 
 
-def _upsert(db: Session, model, values: dict, conflict_cols: list[str]) -> bool:
-    """Insert via ON CONFLICT DO NOTHING. Returns True si insert effectif, False si skip.
+def _load(db: Session, model, rows: Iterable[dict], conflict_cols: list[str], returning=None) -> CopyResult:
+    """COPY en staging + merge ON CONFLICT DO NOTHING (server/db/bulk.py).
 
     V2.3.0.1 — l'unique constraint matche `(user_id, ...cols)` pour permettre
-    le multi-user. Le helper injecte `user_id=TARGET_USER_ID` côté serveur.
+    le multi-user. Le helper injecte `user_id=TARGET_USER_ID` sur chaque ligne.
     """
     if TARGET_USER_ID is None:
         raise RuntimeError("TARGET_USER_ID not initialized — call main() first")
+    return copy_insert_on_conflict_do_nothing(
+        db,
+        model,
+        ({"user_id": TARGET_USER_ID, **values} for values in rows),
+        ["user_id", *conflict_cols],
+        returning=returning,
+    )
+
+
+def report_unchanged(label: str) -> None:
+    _REPORTED.append(0)
+    print(f"  {label:<35} unchanged (manifest)")
+
+
+# ── manifest ─────────────────────────────────────────────────────────────────
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _as_datetime(value) -> datetime:
+    """Valeur de la colonne temps d'une ligne mappée (datetime, date ou 'YYYY-MM-DD') → datetime UTC."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+
+
+class SourceRun:
+    """Avancement d'un fichier source pendant l'import (`entry` None : fichier absent).
+
+    `started_at` (manifest, horloge Postgres) survit aux reprises : les lignes
+    insérées par ce run, crash compris, sont celles de `created_at >= started_at`.
+    """
+
+    def __init__(self, entry: ImportManifest | None) -> None:
+        self.entry = entry
+        self.since = entry.resume_from if entry is not None else None
+        self.offset = entry.row_count if entry is not None else 0
+        self.started_at = entry.run_started_at if entry is not None else None
 
-    stmt = (
-        pg_insert(model)
-        .values(user_id=TARGET_USER_ID, **values)
-        .on_conflict_do_nothing(
-            index_elements=["user_id", *conflict_cols],
+    def advance(self, rows: int, max_time: datetime | None) -> None:
+        if self.entry is None:
+            return
+        self.entry.row_count += rows
+        if max_time is not None and (self.entry.max_start_time is None or max_time > self.entry.max_start_time):
+            self.entry.max_start_time = max_time
+
+    def complete(self) -> None:
+        if self.entry is not None:
+            self.entry.completed = True
+
+
+def _open_source(db: Session, source: str) -> SourceRun | None:
+    """Manifest du fichier `source` ; None si inchangé depuis le dernier import complet."""
+    path = find_csv(source)
+    if path is None:
+        return SourceRun(None)
+    digest = _file_sha256(path)
+    entry = db.execute(
+        select(ImportManifest).where(
+            ImportManifest.user_id == UUID(TARGET_USER_ID), ImportManifest.source == source
         )
-        .returning(model.id)
-    )
-    return db.execute(stmt).first() is not None
+    ).scalar_one_or_none()
+    if entry is None:
+        entry = ImportManifest(
+            user_id=UUID(TARGET_USER_ID), source=source, file_name=path.name, file_sha256=digest, row_count=0
+        )
+        db.add(entry)
+    elif FULL_IMPORT or entry.file_sha256 != digest:
+        # Import précédent interrompu : son watermark (marge incluse) reste le seul sûr.
+        watermark = entry.resume_from
+        if entry.completed and entry.max_start_time is not None:
+            watermark = entry.max_start_time - WATERMARK_MARGIN
+        entry.resume_from = None if FULL_IMPORT else watermark
+        entry.file_name, entry.file_sha256 = path.name, digest
+        if entry.completed:
+            entry.run_started_at = func.now()
+        entry.row_count, entry.completed = 0, False
+    elif entry.completed:
+        return None
+    db.commit()
+    return SourceRun(entry)
+
+
+def _load_source(
+    db: Session,
+    model,
+    source: str,
+    rows: Callable[[], Iterable[dict]],
+    conflict_cols: list[str],
+    returning=None,
+    after_batch: Callable[[CopyResult], None] | None = None,
+    finalize: Callable[[SourceRun], None] | None = None,
+) -> tuple[CopyResult, int] | None:
+    """Charge `rows()` par lots de CHECKPOINT_ROWS commités avec l'avancement du manifest.
+
+    La colonne temps (watermark) est `conflict_cols[0]`. `after_batch` tourne
+    dans la transaction de chaque lot (rollups), `finalize(run)` dans celle
+    du dernier, avant de marquer le fichier complet. Retourne (cumul, lignes
+    ignorées : déjà commitées ou antérieures au watermark), None si `source`
+    est inchangé (`rows` jamais appelé).
+    """
+    run = _open_source(db, source)
+    if run is None:
+        return None
+    time_col = conflict_cols[0]
+    it = iter(rows())
+    ignored = sum(1 for _ in itertools.islice(it, run.offset))
+    staged = inserted = 0
+    while True:
+        batch = list(itertools.islice(it, CHECKPOINT_ROWS))
+        kept = batch if run.since is None else [r for r in batch if _as_datetime(r[time_col]) >= run.since]
+        ignored += len(batch) - len(kept)
+        res = _load(db, model, kept, conflict_cols, returning=returning)
+        staged, inserted = staged + res.staged, inserted + res.inserted
+        if after_batch is not None:
+            after_batch(res)
+        run.advance(len(batch), _as_datetime(max(r[time_col] for r in kept)) if kept else None)
+        if len(batch) < CHECKPOINT_ROWS:
+            break
+        db.commit()
+    if finalize is not None:
+        finalize(run)
+    run.complete()
+    db.commit()
+    return CopyResult(staged, inserted, []), ignored
+
+
+def _load_and_report(db: Session, label: str, model, source: str, rows, conflict_cols: list[str], **kwargs) -> bool:
+    """`_load_source` + ligne de rapport. False si le fichier est inchangé."""
+    loaded = _load_source(db, model, source, rows, conflict_cols, **kwargs)
+    if loaded is None:
+        report_unchanged(label)
+        return False
+    res, ignored = loaded
+    report(label, res.inserted, res.staged - res.inserted + ignored)
+    return True
 
 
 def _resolve_target_user_id(db: Session, email: str) -> str:
@@ -171,487 +561,583 @@ def _resolve_target_user_id(db: Session, email: str) -> str:
 
 def import_sleep(db: Session) -> dict:
     """Import sleep_sessions, retourne {datauuid: (sleep_start, sleep_end)} pour stages FK."""
+    source = "com.samsung.shealth.sleep"
     pfx = "com.samsung.health.sleep."
     uuid_map: dict[str, tuple[datetime, datetime]] = {}
-    ins = skp = 0
-    for row in read_csv("com.samsung.shealth.sleep"):
-        start = parse_dt(fv(row, f"{pfx}start_time"))
-        end = parse_dt(fv(row, f"{pfx}end_time"))
-        if not start or not end:
-            continue
-        uuid = fv(row, f"{pfx}datauuid")
-        if uuid:
-            uuid_map[uuid] = (start, end)
-        values = dict(
-            sleep_start=start,
-            sleep_end=end,
-            sleep_score=to_int(fv(row, "sleep_score")),
-            efficiency=to_float(fv(row, "efficiency")),
-            sleep_duration_min=to_int(fv(row, "sleep_duration")),
-            sleep_cycle=to_int(fv(row, "sleep_cycle")),
-            mental_recovery=to_float(fv(row, "mental_recovery")),
-            physical_recovery=to_float(fv(row, "physical_recovery")),
-            sleep_type=to_int(fv(row, "sleep_type")),
-        )
-        if _upsert(db, SleepSession, values, ["sleep_start", "sleep_end"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("sleep_sessions", ins, skp)
+
+    def rows():
+        for row in read_csv(source):
+            start = parse_dt(fv(row, f"{pfx}start_time"))
+            end = parse_dt(fv(row, f"{pfx}end_time"))
+            if not start or not end:
+                continue
+            uuid = fv(row, f"{pfx}datauuid")
+            if uuid:
+                uuid_map[uuid] = (start, end)
+            yield dict(
+                sleep_start=start,
+                sleep_end=end,
+                sleep_score=to_int(fv(row, "sleep_score")),
+                efficiency=to_float(fv(row, "efficiency")),
+                sleep_duration_min=to_int(fv(row, "sleep_duration")),
+                sleep_cycle=to_int(fv(row, "sleep_cycle")),
+                mental_recovery=to_float(fv(row, "mental_recovery")),
+                physical_recovery=to_float(fv(row, "physical_recovery")),
+                sleep_type=to_int(fv(row, "sleep_type")),
+            )
+
+    if not _load_and_report(db, "sleep_sessions", SleepSession, source, rows, ["sleep_start", "sleep_end"]):
+        for _ in rows():  # fichier inchangé : uuid_map quand même requis par sleep_stages
+            pass
     return uuid_map
 
 
 def import_sleep_stages(db: Session, uuid_map: dict) -> None:
+    source = "com.samsung.health.sleep_stage"
     # Build (start, end) → session_id from PG
     rows = db.execute(select(SleepSession.id, SleepSession.sleep_start, SleepSession.sleep_end)).all()
     session_id_map = {(r.sleep_start, r.sleep_end): r.id for r in rows}
 
-    ins = skp = 0
-    for row in read_csv("com.samsung.health.sleep_stage"):
-        sleep_uuid = fv(row, "sleep_id")
-        if sleep_uuid not in uuid_map:
-            skp += 1
-            continue
-        se = uuid_map[sleep_uuid]
-        session_id = session_id_map.get(se)
-        if session_id is None:
-            skp += 1
-            continue
-        stage_int = to_int(fv(row, "stage"))
-        stage_type = SLEEP_STAGE_MAP.get(stage_int, f"unknown_{stage_int}")
-        start = parse_dt(fv(row, "start_time"))
-        end = parse_dt(fv(row, "end_time"))
-        if not start or not end:
-            skp += 1
-            continue
-        values = dict(
-            session_id=session_id,
-            stage_type=stage_type,
-            stage_start=start,
-            stage_end=end,
-        )
-        if _upsert(db, SleepStage, values, ["stage_start", "stage_end"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("sleep_stages", ins, skp)
+    unmatched = 0
+
+    def stage_rows():
+        nonlocal unmatched
+        for row in read_csv(source):
+            sleep_uuid = fv(row, "sleep_id")
+            if sleep_uuid not in uuid_map:
+                unmatched += 1
+                continue
+            se = uuid_map[sleep_uuid]
+            session_id = session_id_map.get(se)
+            if session_id is None:
+                unmatched += 1
+                continue
+            stage_int = to_int(fv(row, "stage"))
+            stage_type = SLEEP_STAGE_MAP.get(stage_int, f"unknown_{stage_int}")
+            start = parse_dt(fv(row, "start_time"))
+            end = parse_dt(fv(row, "end_time"))
+            if not start or not end:
+                unmatched += 1
+                continue
+            yield dict(
+                session_id=session_id,
+                stage_type=stage_type,
+                stage_start=start,
+                stage_end=end,
+            )
+
+    loaded = _load_source(db, SleepStage, source, stage_rows, ["stage_start", "stage_end"])
+    if loaded is None:
+        report_unchanged("sleep_stages")
+        return
+    res, ignored = loaded
+    report("sleep_stages", res.inserted, res.staged - res.inserted + ignored + unmatched)
 
 
 def import_steps_hourly(db: Session) -> None:
-    buckets: dict[tuple, int] = defaultdict(int)
-    for row in read_csv("com.samsung.shealth.tracker.pedometer_step_count"):
-        start = parse_dt(fv(row, "com.samsung.health.step_count.start_time"))
-        count = to_int(fv(row, "com.samsung.health.step_count.count"))
-        if not start or count is None:
-            continue
-        buckets[(start.strftime("%Y-%m-%d"), start.hour)] += count
-    ins = skp = 0
-    for (date, hour), total in buckets.items():
-        if _upsert(db, StepsHourly, dict(date=date, hour=hour, step_count=total), ["date", "hour"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("steps_hourly", ins, skp)
+    source = "com.samsung.shealth.tracker.pedometer_step_count"
+    pfx = "com.samsung.health.step_count."
+    agg = HourlyAggregator()
+
+    def buckets(agg: HourlyAggregator):
+        return stream_hourly(source, f"{pfx}start_time", f"{pfx}count", to_int, agg)
+
+    def to_row(key, stats) -> dict:
+        (day, hour), (_, total, _, _) = key, stats
+        return dict(date=day, hour=hour, step_count=total)
+
+    def rows():
+        for key, stats in buckets(agg):
+            yield to_row(key, stats)
+
+    _load_and_report(
+        db,
+        "steps_hourly",
+        StepsHourly,
+        source,
+        rows,
+        ["date", "hour"],
+        returning=(StepsHourly.date,),
+        after_batch=lambda res: refresh_steps_rollups(db, TARGET_USER_ID, {r.date for r in res.returned}),
+        finalize=lambda run: _reaggregate_dirty(
+            db, "steps_hourly", StepsHourly, buckets, agg.dirty, run, to_row, refresh_steps_rollups
+        ),
+    )
 
 
 def import_steps_daily(db: Session) -> None:
-    ins = skp = 0
-    for row in read_csv("com.samsung.shealth.tracker.pedometer_day_summary"):
-        day = ms_to_date_str(fv(row, "day_time"))
-        if not day:
-            continue
-        values = dict(
-            day_date=day,
-            step_count=to_int(fv(row, "step_count")),
-            walk_step_count=to_int(fv(row, "walk_step_count")),
-            run_step_count=to_int(fv(row, "run_step_count")),
-            distance_m=to_float(fv(row, "distance")),
-            calorie_kcal=to_float(fv(row, "calorie")),
-            active_time_ms=to_int(fv(row, "active_time")),
-        )
-        if _upsert(db, StepsDaily, values, ["day_date"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("steps_daily", ins, skp)
+    source = "com.samsung.shealth.tracker.pedometer_day_summary"
+    def rows():
+        for row in read_csv(source):
+            day = ms_to_date_str(fv(row, "day_time"))
+            if not day:
+                continue
+            yield dict(
+                day_date=day,
+                step_count=to_int(fv(row, "step_count")),
+                walk_step_count=to_int(fv(row, "walk_step_count")),
+                run_step_count=to_int(fv(row, "run_step_count")),
+                distance_m=to_float(fv(row, "distance")),
+                calorie_kcal=to_float(fv(row, "calorie")),
+                active_time_ms=to_int(fv(row, "active_time")),
+            )
+
+    _load_and_report(db, "steps_daily", StepsDaily, source, rows, ["day_date"])
 
 
 def import_heart_rate_hourly(db: Session) -> None:
-    buckets: dict[tuple, list] = defaultdict(list)
+    source = "com.samsung.shealth.tracker.heart_rate"
     pfx = "com.samsung.health.heart_rate."
-    for row in read_csv("com.samsung.shealth.tracker.heart_rate"):
-        start = parse_dt(fv(row, f"{pfx}start_time"))
-        bpm = to_float(fv(row, f"{pfx}heart_rate"))
-        if not start or bpm is None:
-            continue
-        buckets[(start.strftime("%Y-%m-%d"), start.hour)].append(bpm)
-    ins = skp = 0
-    for (date, hour), bpms in buckets.items():
-        values = dict(
-            date=date,
-            hour=hour,
-            min_bpm=round(min(bpms)),
-            max_bpm=round(max(bpms)),
-            avg_bpm=round(sum(bpms) / len(bpms)),
-            sample_count=len(bpms),
+    agg = HourlyAggregator()
+
+    def buckets(agg: HourlyAggregator):
+        return stream_hourly(source, f"{pfx}start_time", f"{pfx}heart_rate", to_float, agg)
+
+    def to_row(key, stats) -> dict:
+        (day, hour), (n, total, lo, hi) = key, stats
+        values = HEART_RATE_ROW.to_storage(
+            dict(
+                user_id=TARGET_USER_ID,
+                date=day,
+                hour=hour,
+                min_bpm=round(lo),
+                max_bpm=round(hi),
+                avg_bpm=round(total / n),
+                sample_count=n,
+            )
         )
-        if _upsert(db, HeartRateHourly, values, ["date", "hour"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("heart_rate_hourly", ins, skp)
+        del values["user_id"]  # réinjecté par _load
+        return values
+
+    def rows():
+        for key, stats in buckets(agg):
+            yield to_row(key, stats)
+
+    _load_and_report(
+        db,
+        "heart_rate_hourly",
+        HeartRateHourly,
+        source,
+        rows,
+        ["date", "hour"],
+        returning=(HeartRateHourly.date,),
+        after_batch=lambda res: refresh_heart_rate_rollups(db, TARGET_USER_ID, {r.date for r in res.returned}),
+        finalize=lambda run: _reaggregate_dirty(
+            db, "heart_rate_hourly", HeartRateHourly, buckets, agg.dirty, run, to_row, refresh_heart_rate_rollups
+        ),
+    )
 
 
 def import_exercise(db: Session) -> None:
+    source = "com.samsung.shealth.exercise"
     pfx = "com.samsung.health.exercise."
-    ins = skp = 0
-    for row in read_csv("com.samsung.shealth.exercise"):
-        start = parse_dt(fv(row, f"{pfx}start_time"))
-        end = parse_dt(fv(row, f"{pfx}end_time"))
-        ex_type = fv(row, f"{pfx}exercise_type", default="unknown")
-        duration_ms = to_int(fv(row, f"{pfx}duration"))
-        if not start or not end:
-            continue
-        dur_min = round(duration_ms / 60000, 2) if duration_ms else 0.0
-        values = dict(
-            exercise_type=str(ex_type),
-            exercise_start=start,
-            exercise_end=end,
-            duration_minutes=dur_min,
-            calorie_kcal=to_float(fv(row, f"{pfx}calorie")),
-            distance_m=to_float(fv(row, f"{pfx}distance")),
-            mean_heart_rate=to_float(fv(row, f"{pfx}mean_heart_rate")),
-            max_heart_rate=to_float(fv(row, f"{pfx}max_heart_rate")),
-            min_heart_rate=to_float(fv(row, f"{pfx}min_heart_rate")),
-            mean_speed_ms=to_float(fv(row, f"{pfx}mean_speed")),
-        )
-        if _upsert(db, ExerciseSession, values, ["exercise_start", "exercise_end"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("exercise_sessions", ins, skp)
+
+    def rows():
+        for row in read_csv(source):
+            start = parse_dt(fv(row, f"{pfx}start_time"))
+            end = parse_dt(fv(row, f"{pfx}end_time"))
+            ex_type = fv(row, f"{pfx}exercise_type", default="unknown")
+            duration_ms = to_int(fv(row, f"{pfx}duration"))
+            if not start or not end:
+                continue
+            dur_min = round(duration_ms / 60000, 2) if duration_ms else 0.0
+            yield dict(
+                exercise_type=str(ex_type),
+                exercise_start=start,
+                exercise_end=end,
+                duration_minutes=dur_min,
+                calorie_kcal=to_float(fv(row, f"{pfx}calorie")),
+                distance_m=to_float(fv(row, f"{pfx}distance")),
+                mean_heart_rate=to_float(fv(row, f"{pfx}mean_heart_rate")),
+                max_heart_rate=to_float(fv(row, f"{pfx}max_heart_rate")),
+                min_heart_rate=to_float(fv(row, f"{pfx}min_heart_rate")),
+                mean_speed_ms=to_float(fv(row, f"{pfx}mean_speed")),
+            )
+
+    _load_and_report(db, "exercise_sessions", ExerciseSession, source, rows, ["exercise_start", "exercise_end"])
 
 
 def import_stress(db: Session) -> None:
-    ins = skp = 0
-    for row in read_csv("com.samsung.shealth.stress"):
-        start = parse_dt(fv(row, "start_time"))
-        end = parse_dt(fv(row, "end_time"))
-        if not start or not end:
-            continue
-        values = dict(
-            start_time=start,
-            end_time=end,
-            score=to_float(fv(row, "score")),
-            tag_id=to_int(fv(row, "tag_id")),
-        )
-        if _upsert(db, Stress, values, ["start_time", "end_time"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("stress", ins, skp)
+    source = "com.samsung.shealth.stress"
+    def rows():
+        for row in read_csv(source):
+            start = parse_dt(fv(row, "start_time"))
+            end = parse_dt(fv(row, "end_time"))
+            if not start or not end:
+                continue
+            yield dict(
+                start_time=start,
+                end_time=end,
+                score=to_float(fv(row, "score")),
+                tag_id=to_int(fv(row, "tag_id")),
+            )
+
+    _load_and_report(db, "stress", Stress, source, rows, ["start_time", "end_time"])
 
 
 def import_spo2(db: Session) -> None:
+    source = "com.samsung.shealth.tracker.oxygen_saturation"
     pfx = "com.samsung.health.oxygen_saturation."
-    ins = skp = 0
-    for row in read_csv("com.samsung.shealth.tracker.oxygen_saturation"):
-        start = parse_dt(fv(row, f"{pfx}start_time"))
-        end = parse_dt(fv(row, f"{pfx}end_time"))
-        if not start or not end:
-            continue
-        values = dict(
-            start_time=start,
-            end_time=end,
-            spo2=to_float(fv(row, f"{pfx}spo2")),
-            min_spo2=to_float(fv(row, f"{pfx}min")),
-            max_spo2=to_float(fv(row, f"{pfx}max")),
-            low_duration_s=to_int(fv(row, f"{pfx}low_duration")),
-            tag_id=to_int(fv(row, "tag_id")),
-        )
-        if _upsert(db, Spo2, values, ["start_time", "end_time"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("spo2", ins, skp)
+
+    def rows():
+        for row in read_csv(source):
+            start = parse_dt(fv(row, f"{pfx}start_time"))
+            end = parse_dt(fv(row, f"{pfx}end_time"))
+            if not start or not end:
+                continue
+            yield dict(
+                start_time=start,
+                end_time=end,
+                spo2=to_float(fv(row, f"{pfx}spo2")),
+                min_spo2=to_float(fv(row, f"{pfx}min")),
+                max_spo2=to_float(fv(row, f"{pfx}max")),
+                low_duration_s=to_int(fv(row, f"{pfx}low_duration")),
+                tag_id=to_int(fv(row, "tag_id")),
+            )
+
+    _load_and_report(db, "spo2", Spo2, source, rows, ["start_time", "end_time"])
 
 
 def import_respiratory_rate(db: Session) -> None:
-    ins = skp = 0
-    for row in read_csv("com.samsung.health.respiratory_rate"):
-        start = parse_dt(fv(row, "start_time"))
-        end = parse_dt(fv(row, "end_time"))
-        if not start or not end:
-            continue
-        values = dict(
-            start_time=start,
-            end_time=end,
-            average=to_float(fv(row, "average")),
-            lower_limit=to_float(fv(row, "lower_limit")),
-            upper_limit=to_float(fv(row, "upper_limit")),
-        )
-        if _upsert(db, RespiratoryRate, values, ["start_time", "end_time"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("respiratory_rate", ins, skp)
+    source = "com.samsung.health.respiratory_rate"
+    def rows():
+        for row in read_csv(source):
+            start = parse_dt(fv(row, "start_time"))
+            end = parse_dt(fv(row, "end_time"))
+            if not start or not end:
+                continue
+            yield dict(
+                start_time=start,
+                end_time=end,
+                average=to_float(fv(row, "average")),
+                lower_limit=to_float(fv(row, "lower_limit")),
+                upper_limit=to_float(fv(row, "upper_limit")),
+            )
+
+    _load_and_report(db, "respiratory_rate", RespiratoryRate, source, rows, ["start_time", "end_time"])
 
 
 def import_hrv(db: Session) -> None:
-    ins = skp = 0
-    for row in read_csv("com.samsung.health.hrv"):
-        start = parse_dt(fv(row, "start_time"))
-        end = parse_dt(fv(row, "end_time"))
-        if not start or not end:
-            continue
-        if _upsert(db, Hrv, dict(start_time=start, end_time=end), ["start_time", "end_time"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("hrv", ins, skp)
+    source = "com.samsung.health.hrv"
+    def rows():
+        for row in read_csv(source):
+            start = parse_dt(fv(row, "start_time"))
+            end = parse_dt(fv(row, "end_time"))
+            if not start or not end:
+                continue
+            yield dict(start_time=start, end_time=end)
+
+    _load_and_report(db, "hrv", Hrv, source, rows, ["start_time", "end_time"])
 
 
 def import_skin_temperature(db: Session) -> None:
-    ins = skp = 0
-    for row in read_csv("com.samsung.health.skin_temperature"):
-        start = parse_dt(fv(row, "start_time"))
-        end = parse_dt(fv(row, "end_time"))
-        if not start or not end:
-            continue
-        values = dict(
-            start_time=start,
-            end_time=end,
-            temperature=to_float(fv(row, "temperature")),
-            min_temp=to_float(fv(row, "min")),
-            max_temp=to_float(fv(row, "max")),
-            tag_id=to_int(fv(row, "tag_id")),
-        )
-        if _upsert(db, SkinTemperature, values, ["start_time", "end_time"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("skin_temperature", ins, skp)
+    source = "com.samsung.health.skin_temperature"
+    def rows():
+        for row in read_csv(source):
+            start = parse_dt(fv(row, "start_time"))
+            end = parse_dt(fv(row, "end_time"))
+            if not start or not end:
+                continue
+            yield dict(
+                start_time=start,
+                end_time=end,
+                temperature=to_float(fv(row, "temperature")),
+                min_temp=to_float(fv(row, "min")),
+                max_temp=to_float(fv(row, "max")),
+                tag_id=to_int(fv(row, "tag_id")),
+            )
+
+    _load_and_report(db, "skin_temperature", SkinTemperature, source, rows, ["start_time", "end_time"])
 
 
 def import_weight(db: Session) -> None:
-    ins = skp = 0
-    for row in read_csv("com.samsung.health.weight"):
-        start = parse_dt(fv(row, "start_time"))
-        if not start:
-            continue
-        values = dict(
-            start_time=start,
-            weight_kg=to_float(fv(row, "weight")),
-            body_fat_pct=to_float(fv(row, "body_fat")),
-            skeletal_muscle_pct=to_float(fv(row, "skeletal_muscle")),
-            skeletal_muscle_mass_kg=to_float(fv(row, "skeletal_muscle_mass")),
-            fat_free_mass_kg=to_float(fv(row, "fat_free_mass")),
-            basal_metabolic_rate=to_int(fv(row, "basal_metabolic_rate")),
-            total_body_water_kg=to_float(fv(row, "total_body_water")),
-        )
-        if _upsert(db, Weight, values, ["start_time"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("weight", ins, skp)
+    source = "com.samsung.health.weight"
+    def rows():
+        for row in read_csv(source):
+            start = parse_dt(fv(row, "start_time"))
+            if not start:
+                continue
+            yield dict(
+                start_time=start,
+                weight_kg=to_float(fv(row, "weight")),
+                body_fat_pct=to_float(fv(row, "body_fat")),
+                skeletal_muscle_pct=to_float(fv(row, "skeletal_muscle")),
+                skeletal_muscle_mass_kg=to_float(fv(row, "skeletal_muscle_mass")),
+                fat_free_mass_kg=to_float(fv(row, "fat_free_mass")),
+                basal_metabolic_rate=to_int(fv(row, "basal_metabolic_rate")),
+                total_body_water_kg=to_float(fv(row, "total_body_water")),
+            )
+
+    _load_and_report(db, "weight", Weight, source, rows, ["start_time"])
 
 
 def import_height(db: Session) -> None:
-    ins = skp = 0
-    for row in read_csv("com.samsung.health.height"):
-        start = parse_dt(fv(row, "start_time"))
-        if not start:
-            continue
-        values = dict(start_time=start, height_cm=to_float(fv(row, "height")))
-        if _upsert(db, Height, values, ["start_time"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("height", ins, skp)
+    source = "com.samsung.health.height"
+    def rows():
+        for row in read_csv(source):
+            start = parse_dt(fv(row, "start_time"))
+            if not start:
+                continue
+            yield dict(start_time=start, height_cm=to_float(fv(row, "height")))
+
+    _load_and_report(db, "height", Height, source, rows, ["start_time"])
 
 
 def import_blood_pressure(db: Session) -> None:
+    source = "com.samsung.shealth.blood_pressure"
     pfx = "com.samsung.health.blood_pressure."
-    ins = skp = 0
-    for row in read_csv("com.samsung.shealth.blood_pressure"):
-        start = parse_dt(fv(row, f"{pfx}start_time"))
-        if not start:
-            continue
-        values = dict(
-            start_time=start,
-            systolic=to_float(fv(row, f"{pfx}systolic")),
-            diastolic=to_float(fv(row, f"{pfx}diastolic")),
-            pulse=to_int(fv(row, f"{pfx}pulse")),
-            mean_bp=to_float(fv(row, f"{pfx}mean")),
-        )
-        if _upsert(db, BloodPressure, values, ["start_time"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("blood_pressure", ins, skp)
+
+    def rows():
+        for row in read_csv(source):
+            start = parse_dt(fv(row, f"{pfx}start_time"))
+            if not start:
+                continue
+            yield dict(
+                start_time=start,
+                systolic=to_float(fv(row, f"{pfx}systolic")),
+                diastolic=to_float(fv(row, f"{pfx}diastolic")),
+                pulse=to_int(fv(row, f"{pfx}pulse")),
+                mean_bp=to_float(fv(row, f"{pfx}mean")),
+            )
+
+    _load_and_report(db, "blood_pressure", BloodPressure, source, rows, ["start_time"])
 
 
 def import_mood(db: Session) -> None:
-    ins = skp = 0
-    for row in read_csv("com.samsung.shealth.mood"):
-        start = parse_dt(fv(row, "start_time"))
-        if not start:
-            continue
-        values = dict(
-            start_time=start,
-            mood_type=to_int(fv(row, "mood_type")),
-            emotions=fv(row, "emotions"),
-            factors=fv(row, "factors"),
-            notes=fv(row, "notes"),
-            place=fv(row, "place"),
-            company=fv(row, "company"),
-        )
-        if _upsert(db, Mood, values, ["start_time"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("mood", ins, skp)
+    source = "com.samsung.shealth.mood"
+    def rows():
+        for row in read_csv(source):
+            start = parse_dt(fv(row, "start_time"))
+            if not start:
+                continue
+            yield dict(
+                start_time=start,
+                mood_type=to_int(fv(row, "mood_type")),
+                emotions=fv(row, "emotions"),
+                factors=fv(row, "factors"),
+                notes=fv(row, "notes"),
+                place=fv(row, "place"),
+                company=fv(row, "company"),
+            )
+
+    _load_and_report(db, "mood", Mood, source, rows, ["start_time"])
 
 
 def import_water_intake(db: Session) -> None:
-    ins = skp = 0
-    for row in read_csv("com.samsung.health.water_intake"):
-        start = parse_dt(fv(row, "start_time"))
-        if not start:
-            continue
-        values = dict(start_time=start, amount_ml=to_float(fv(row, "amount")))
-        if _upsert(db, WaterIntake, values, ["start_time"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("water_intake", ins, skp)
+    source = "com.samsung.health.water_intake"
+    def rows():
+        for row in read_csv(source):
+            start = parse_dt(fv(row, "start_time"))
+            if not start:
+                continue
+            yield dict(start_time=start, amount_ml=to_float(fv(row, "amount")))
+
+    _load_and_report(db, "water_intake", WaterIntake, source, rows, ["start_time"])
 
 
 def import_activity_daily(db: Session) -> None:
-    ins = skp = 0
-    for row in read_csv("com.samsung.shealth.activity.day_summary"):
-        day = parse_day(fv(row, "day_time"))
-        if not day:
-            continue
-        values = dict(
-            day_date=day,
-            step_count=to_int(fv(row, "step_count")),
-            distance_m=to_float(fv(row, "distance")),
-            calorie_kcal=to_float(fv(row, "calorie")),
-            exercise_time_ms=to_int(fv(row, "exercise_time")),
-            active_time_ms=to_int(fv(row, "active_time")),
-            floor_count=to_float(fv(row, "floor_count")),
-            score=to_int(fv(row, "score")),
-        )
-        if _upsert(db, ActivityDaily, values, ["day_date"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("activity_daily", ins, skp)
+    source = "com.samsung.shealth.activity.day_summary"
+    def rows():
+        for row in read_csv(source):
+            day = parse_day(fv(row, "day_time"))
+            if not day:
+                continue
+            yield dict(
+                day_date=day,
+                step_count=to_int(fv(row, "step_count")),
+                distance_m=to_float(fv(row, "distance")),
+                calorie_kcal=to_float(fv(row, "calorie")),
+                exercise_time_ms=to_int(fv(row, "exercise_time")),
+                active_time_ms=to_int(fv(row, "active_time")),
+                floor_count=to_float(fv(row, "floor_count")),
+                score=to_int(fv(row, "score")),
+            )
+
+    _load_and_report(db, "activity_daily", ActivityDaily, source, rows, ["day_date"])
 
 
 def import_vitality_score(db: Session) -> None:
-    ins = skp = 0
-    for row in read_csv("com.samsung.shealth.vitality_score"):
-        day = parse_day(fv(row, "day_time"))
-        if not day:
-            continue
-        values = dict(
-            day_date=day,
-            total_score=to_float(fv(row, "total_score")),
-            sleep_score=to_float(fv(row, "sleep_score")),
-            sleep_balance=to_float(fv(row, "sleep_balance")),
-            sleep_regularity=to_float(fv(row, "sleep_regularity")),
-            sleep_timing=to_float(fv(row, "sleep_timing")),
-            activity_score=to_float(fv(row, "activity_score")),
-            active_time_ms=to_int(fv(row, "active_time")),
-            mvpa_time_ms=to_int(fv(row, "mvpa_time")),
-            shr_score=to_float(fv(row, "shr_score")),
-            shr_value=to_float(fv(row, "shr_value")),
-            shrv_score=to_float(fv(row, "shrv_score")),
-            shrv_value=to_float(fv(row, "shrv_value")),
-        )
-        if _upsert(db, VitalityScore, values, ["day_date"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("vitality_score", ins, skp)
+    source = "com.samsung.shealth.vitality_score"
+    def rows():
+        for row in read_csv(source):
+            day = parse_day(fv(row, "day_time"))
+            if not day:
+                continue
+            yield dict(
+                day_date=day,
+                total_score=to_float(fv(row, "total_score")),
+                sleep_score=to_float(fv(row, "sleep_score")),
+                sleep_balance=to_float(fv(row, "sleep_balance")),
+                sleep_regularity=to_float(fv(row, "sleep_regularity")),
+                sleep_timing=to_float(fv(row, "sleep_timing")),
+                activity_score=to_float(fv(row, "activity_score")),
+                active_time_ms=to_int(fv(row, "active_time")),
+                mvpa_time_ms=to_int(fv(row, "mvpa_time")),
+                shr_score=to_float(fv(row, "shr_score")),
+                shr_value=to_float(fv(row, "shr_value")),
+                shrv_score=to_float(fv(row, "shrv_score")),
+                shrv_value=to_float(fv(row, "shrv_value")),
+            )
+
+    _load_and_report(db, "vitality_score", VitalityScore, source, rows, ["day_date"])
 
 
 def import_floors_daily(db: Session) -> None:
-    ins = skp = 0
-    for row in read_csv("com.samsung.shealth.tracker.floors_day_summary"):
-        day = ms_to_date_str(fv(row, "day_time"))
-        if not day:
-            continue
-        if _upsert(db, FloorsDaily, dict(day_date=day, floor_count=to_int(fv(row, "floor_count"))), ["day_date"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("floors_daily", ins, skp)
+    source = "com.samsung.shealth.tracker.floors_day_summary"
+    def rows():
+        for row in read_csv(source):
+            day = ms_to_date_str(fv(row, "day_time"))
+            if not day:
+                continue
+            yield dict(day_date=day, floor_count=to_int(fv(row, "floor_count")))
+
+    _load_and_report(db, "floors_daily", FloorsDaily, source, rows, ["day_date"])
 
 
 def import_activity_level(db: Session) -> None:
-    ins = skp = 0
-    for row in read_csv("com.samsung.shealth.activity_level"):
-        start = parse_dt(fv(row, "start_time"))
-        if not start:
-            continue
-        if _upsert(db, ActivityLevel, dict(start_time=start, activity_level=to_int(fv(row, "activity_level"))), ["start_time"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("activity_level", ins, skp)
+    source = "com.samsung.shealth.activity_level"
+    def rows():
+        for row in read_csv(source):
+            start = parse_dt(fv(row, "start_time"))
+            if not start:
+                continue
+            yield dict(start_time=start, activity_level=to_int(fv(row, "activity_level")))
+
+    _load_and_report(db, "activity_level", ActivityLevel, source, rows, ["start_time"])
 
 
 def import_ecg(db: Session) -> None:
-    ins = skp = 0
-    for row in read_csv("com.samsung.health.ecg"):
-        start = parse_dt(fv(row, "start_time"))
-        end = parse_dt(fv(row, "end_time"))
-        if not start or not end:
-            continue
-        values = dict(
-            start_time=start,
-            end_time=end,
-            mean_heart_rate=to_float(fv(row, "mean_heart_rate")),
-            sample_frequency=to_int(fv(row, "sample_frequency")),
-            sample_count=to_int(fv(row, "sample_count")),
-            classification=to_int(fv(row, "classification")),
-        )
-        if _upsert(db, Ecg, values, ["start_time", "end_time"]):
-            ins += 1
-        else:
-            skp += 1
-    db.commit()
-    report("ecg", ins, skp)
+    source = "com.samsung.health.ecg"
+    def rows():
+        for row in read_csv(source):
+            start = parse_dt(fv(row, "start_time"))
+            end = parse_dt(fv(row, "end_time"))
+            if not start or not end:
+                continue
+            yield dict(
+                start_time=start,
+                end_time=end,
+                mean_heart_rate=to_float(fv(row, "mean_heart_rate")),
+                sample_frequency=to_int(fv(row, "sample_frequency")),
+                sample_count=to_int(fv(row, "sample_count")),
+                classification=to_int(fv(row, "classification")),
+            )
+
+    _load_and_report(db, "ecg", Ecg, source, rows, ["start_time", "end_time"])
+
+
+# ── scheduling ───────────────────────────────────────────────────────────────
+
+# (nom, importer, dépendances) dans l'ordre séquentiel historique (topologique).
+# Un importer reçoit en arguments les valeurs retournées par ses dépendances.
+IMPORTERS: tuple[tuple[str, Callable, tuple[str, ...]], ...] = (
+    ("sleep", import_sleep, ()),
+    ("sleep_stages", import_sleep_stages, ("sleep",)),
+    ("steps_hourly", import_steps_hourly, ()),
+    ("steps_daily", import_steps_daily, ()),
+    ("heart_rate_hourly", import_heart_rate_hourly, ()),
+    ("exercise", import_exercise, ()),
+    ("stress", import_stress, ()),
+    ("spo2", import_spo2, ()),
+    ("respiratory_rate", import_respiratory_rate, ()),
+    ("hrv", import_hrv, ()),
+    ("skin_temperature", import_skin_temperature, ()),
+    ("weight", import_weight, ()),
+    ("height", import_height, ()),
+    ("blood_pressure", import_blood_pressure, ()),
+    ("mood", import_mood, ()),
+    ("water_intake", import_water_intake, ()),
+    ("activity_daily", import_activity_daily, ()),
+    ("vitality_score", import_vitality_score, ()),
+    ("floors_daily", import_floors_daily, ()),
+    ("activity_level", import_activity_level, ()),
+    ("ecg", import_ecg, ()),
+)
+_IMPORTERS_BY_NAME = {name: fn for name, fn, _ in IMPORTERS}
+
+
+class ImportTiming(NamedTuple):
+    name: str
+    rows: int  # lignes rapportées par report() (inserted + skipped)
+    seconds: float
+
+
+def _run_importer(db: Session, name: str, args: tuple) -> tuple[object, ImportTiming]:
+    _REPORTED.clear()
+    t0 = time.perf_counter()
+    result = _IMPORTERS_BY_NAME[name](db, *args)
+    return result, ImportTiming(name, sum(_REPORTED), time.perf_counter() - t0)
+
+
+def _init_worker(export_dir: Path, target_user_id: str, full_import: bool) -> None:
+    global EXPORT_DIR, TARGET_USER_ID, FULL_IMPORT
+    EXPORT_DIR, TARGET_USER_ID, FULL_IMPORT = export_dir, target_user_id, full_import
+
+
+def _worker(name: str, args: tuple) -> tuple[object, ImportTiming]:
+    db = get_session()
+    try:
+        return _run_importer(db, name, args)
+    finally:
+        db.close()
+
+
+def run_sequential(db: Session, importers=IMPORTERS) -> list[ImportTiming]:
+    results: dict[str, object] = {}
+    timings = []
+    for name, _, deps in importers:
+        results[name], timing = _run_importer(db, name, tuple(results[d] for d in deps))
+        timings.append(timing)
+    return timings
+
+
+def run_parallel(jobs: int, importers=IMPORTERS) -> list[ImportTiming]:
+    """Soumet chaque importer au pool dès que ses dépendances sont terminées.
+
+    Workers en `spawn` : aucun engine ni connexion hérités du parent, chaque
+    processus ouvre le sien (get_session) avec EXPORT_DIR / TARGET_USER_ID /
+    FULL_IMPORT.
+    """
+    results: dict[str, object] = {}
+    timings = []
+    pending = list(importers)
+    running = {}
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(EXPORT_DIR, TARGET_USER_ID, FULL_IMPORT),
+    ) as pool:
+        while pending or running:
+            ready = [entry for entry in pending if all(d in results for d in entry[2])]
+            if not ready and not running:
+                raise RuntimeError(f"dépendances non satisfaisables : {[name for name, _, _ in pending]}")
+            for entry in ready:
+                name, _, deps = entry
+                pending.remove(entry)
+                running[pool.submit(_worker, name, tuple(results[d] for d in deps))] = name
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name], timing = future.result()
+                timings.append(timing)
+    return timings
+
+
+def print_timings(timings: list[ImportTiming], wall_s: float) -> None:
+    print(f"\n  {'importer':<20} {'rows':>9} {'s':>8} {'rows/s':>10}")
+    for t in sorted(timings, key=lambda t: t.seconds, reverse=True):
+        rate = t.rows / t.seconds if t.seconds else 0.0
+        print(f"  {t.name:<20} {t.rows:>9} {t.seconds:>8.2f} {rate:>10.0f}")
+    total = sum(t.rows for t in timings)
+    print(f"  {'total (wall)':<20} {total:>9} {wall_s:>8.2f} {total / wall_s if wall_s else 0.0:>10.0f}")
 
 
 # ── main ─────────────────────────────────────────────────────────────────────
 
 
 def main() -> None:
-    global EXPORT_DIR, TARGET_USER_ID
+    global EXPORT_DIR, TARGET_USER_ID, FULL_IMPORT
 
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument(
@@ -666,8 +1152,21 @@ def main() -> None:
         default=DEFAULT_LEGACY_EMAIL,
         help=f"Email of the target user (default: {DEFAULT_LEGACY_EMAIL})",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Importers run in parallel worker processes (default: 1 = sequential, 0 = CPU count)",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore the import manifest and re-read every file (manifest still updated)",
+    )
     args = parser.parse_args()
     EXPORT_DIR = args.export_dir
+    FULL_IMPORT = args.full
+    jobs = args.jobs or os.cpu_count() or 1
 
     if not EXPORT_DIR.exists():
         print(f"ERROR: export dir not found: {EXPORT_DIR}", file=sys.stderr)
@@ -679,29 +1178,15 @@ def main() -> None:
     TARGET_USER_ID = _resolve_target_user_id(db, args.user_email)
     print(f"Target user: {args.user_email} ({TARGET_USER_ID})")
 
-    uuid_map = import_sleep(db)
-    import_sleep_stages(db, uuid_map)
-    import_steps_hourly(db)
-    import_steps_daily(db)
-    import_heart_rate_hourly(db)
-    import_exercise(db)
-    import_stress(db)
-    import_spo2(db)
-    import_respiratory_rate(db)
-    import_hrv(db)
-    import_skin_temperature(db)
-    import_weight(db)
-    import_height(db)
-    import_blood_pressure(db)
-    import_mood(db)
-    import_water_intake(db)
-    import_activity_daily(db)
-    import_vitality_score(db)
-    import_floors_daily(db)
-    import_activity_level(db)
-    import_ecg(db)
-
-    db.close()
+    t0 = time.perf_counter()
+    if jobs > 1:
+        db.close()
+        print(f"Workers: {jobs}")
+        timings = run_parallel(jobs)
+    else:
+        timings = run_sequential(db)
+        db.close()
+    print_timings(timings, time.perf_counter() - t0)
     print("\nDone.")
 
 
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Ré-chiffrement en ligne des lignes Art.9 vers crypto_v=2 (row-level) ou retour v1.
+
+Usage:
+    python3 scripts/reencrypt_rows.py [--to 2] [--batch 1000] [--sleep 0.05] [--max-batches N]
+
+Traite les tables de `server.db.row_crypto.ROW_CODECS` par batches : chaque
+batch verrouille ses lignes (`FOR UPDATE SKIP LOCKED`), les convertit et
+commit. Interruptible / relançable à tout moment — seules les lignes encore
+dans l'ancienne version sont reprises. L'ingest concurrent n'est pas bloqué
+(`--sleep` pour lisser la charge).
+
+`--to 1` fait la conversion inverse (pré-requis au downgrade alembic 0011).
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+from server.database import get_session
+from server.db.row_crypto import FIELD_CRYPTO_V, ROW_CODECS, ROW_CRYPTO_V, reencrypt_batch
+
+
+def _table_bytes(db, table: str) -> int:
+    return db.execute(text("SELECT pg_total_relation_size(:t)"), {"t": table}).scalar_one()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--to", type=int, choices=(FIELD_CRYPTO_V, ROW_CRYPTO_V), default=ROW_CRYPTO_V)
+    parser.add_argument("--batch", type=int, default=1000, help="lignes par transaction (défaut 1000)")
+    parser.add_argument("--sleep", type=float, default=0.0, help="pause entre batches, secondes")
+    parser.add_argument("--max-batches", type=int, default=None, help="s'arrêter après N batches")
+    args = parser.parse_args()
+
+    db = get_session()
+    try:
+        for codec in ROW_CODECS:
+            before = _table_bytes(db, codec.table)
+            total = batches = 0
+            last_id = None
+            t0 = time.perf_counter()
+            while args.max_batches is None or batches < args.max_batches:
+                n, last_id = reencrypt_batch(db, codec, args.to, after_id=last_id, limit=args.batch)
+                db.commit()
+                if n == 0:
+                    break
+                total += n
+                batches += 1
+                print(f"  {codec.table:<20} batch {batches:>5} | {total:>9} lignes → v{args.to} (dernier id {last_id})")
+                if args.sleep:
+                    time.sleep(args.sleep)
+            elapsed = time.perf_counter() - t0
+            print(
+                f"{codec.table}: {total} lignes converties en {elapsed:.1f}s ; "
+                f"taille {before / 1e6:.1f} MB → {_table_bytes(db, codec.table) / 1e6:.1f} MB "
+                "(espace rendu après VACUUM)"
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
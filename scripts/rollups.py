@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Maintenance des rollups steps / heart rate (tables steps_rollup, heart_rate_rollup).
+
+Usage:
+    python3 scripts/rollups.py rebuild [--user-email <email>]
+    python3 scripts/rollups.py check   [--user-email <email>]
+
+`rebuild` recalcule tous les rollups depuis les lignes horaires brutes (à lancer
+après `alembic upgrade` 0010 sur une base existante). Une transaction par user.
+
+`check` compare les rollups stockés à un recalcul complet, liste les écarts et
+sort en code 1 s'il y en a. Lecture seule.
+
+Sans `--user-email`, traite tous les users.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import select
+
+from server.database import get_session
+from server.db.models import User
+from server.db.rollups import check_rollups, rebuild_rollups
+
+
+def _users(db, email: str | None) -> list[User]:
+    stmt = select(User).order_by(User.email)
+    if email:
+        stmt = stmt.where(User.email == email)
+    users = list(db.execute(stmt).scalars())
+    if email and not users:
+        raise SystemExit(f"ERROR: user '{email}' introuvable.")
+    return users
+
+
+def rebuild(db, users: list[User]) -> int:
+    for user in users:
+        counts = rebuild_rollups(db, user.id)
+        db.commit()
+        print(f"  {user.email:<40} " + " | ".join(f"{t} {n:>6}" for t, n in counts.items()))
+    return 0
+
+
+def check(db, users: list[User]) -> int:
+    status = 0
+    for user in users:
+        problems = check_rollups(db, user.id)
+        print(f"  {user.email:<40} {'OK' if not problems else f'{len(problems)} écart(s)'}")
+        for p in problems:
+            print(f"    - {p}")
+        if problems:
+            status = 1
+    db.rollback()
+    return status
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("rebuild", "check"))
+    parser.add_argument("--user-email", default=None, help="limiter à un user (défaut : tous)")
+    args = parser.parse_args()
+
+    db = get_session()
+    try:
+        users = _users(db, args.user_email)
+        status = (rebuild if args.command == "rebuild" else check)(db, users)
+    finally:
+        db.close()
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
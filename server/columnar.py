@@ -0,0 +1,78 @@
+"""Format colonnes (struct-of-arrays) des GET séries santé — `?format=columnar`.
+
+`{"date": [...], "hour": [...], "avg_bpm": [...]}` : 1 tableau par champ du
+modèle `*Out` de la route, lignes dans l'ordre (et la pagination) du format
+JSON. Les clés ne sont plus répétées à chaque ligne (l'essentiel des octets
+d'une réponse HR ligne à ligne) et le client parse quelques grands tableaux
+homogènes au lieu de milliers de petits objets.
+
+`&delta=true` : colonnes temporelles de la série en deltas entiers, unité dans
+`_delta` (`{"date": "day"}`) :
+- `day` (dates) : jours depuis 1970-01-01 pour la 1re ligne, puis écarts ;
+- `s` (datetimes) : secondes epoch pour la 1re ligne, puis écarts.
+Valeurs absolues = somme cumulée. Une journée horaire = 23 zéros + 1 petit
+entier au lieu de 24 chaînes `"YYYY-MM-DD"`.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any
+
+
+DELTA_KEY = "_delta"
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _day_number(value: str | date) -> int:
+    d = date.fromisoformat(value) if isinstance(value, str) else value
+    return d.toordinal() - _EPOCH_ORDINAL
+
+
+def _epoch_seconds(value: datetime) -> int | float:
+    ts = value.timestamp()
+    return int(ts) if ts.is_integer() else ts
+
+
+_ABSOLUTE: dict[str, Callable[[Any], int | float]] = {"day": _day_number, "s": _epoch_seconds}
+
+
+def _deltas(values: Sequence, unit: str) -> list:
+    absolute = _ABSOLUTE[unit]
+    out, prev = [], 0
+    for v in values:
+        cur = absolute(v)
+        out.append(cur - prev)
+        prev = cur
+    return out
+
+
+@dataclass(frozen=True)
+class Columns:
+    """Champs d'une série + conversions JSON par champ + colonnes temporelles delta-encodables."""
+
+    fields: tuple[str, ...]
+    convert: Mapping[str, Callable[[Any], Any]] = field(default_factory=dict)
+    delta: Mapping[str, str] = field(default_factory=dict)
+
+    def encode(self, rows: Sequence, *, delta: bool = False, extra: Mapping[str, list] | None = None) -> dict:
+        """`rows` : `Row` / namedtuples portant au moins `fields` (ordre quelconque)."""
+        if rows:
+            by_name = dict(zip(rows[0]._fields, zip(*rows)))
+        else:
+            by_name = {f: () for f in self.fields}
+        cols: dict[str, Any] = {}
+        for f in self.fields:
+            values = by_name[f]
+            if delta and f in self.delta:
+                cols[f] = _deltas(values, self.delta[f])
+            elif f in self.convert:
+                cols[f] = [self.convert[f](v) for v in values]
+            else:
+                cols[f] = list(values)
+        if extra:
+            cols.update(extra)
+        if delta and self.delta:
+            cols[DELTA_KEY] = dict(self.delta)
+        return cols
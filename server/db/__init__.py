@@ -0,0 +1,3 @@
+# Hooks ORM de row_crypto (lignes crypto_v=2 déchiffrées au load) actifs dès
+# que le package est importé, quel que soit le module qui charge les modèles.
+from server.db import row_crypto  # noqa: F401
@@ -0,0 +1,175 @@
+"""Bulk ingest helpers — INSERT multi-VALUES ... ON CONFLICT DO NOTHING RETURNING.
+
+Remplace la boucle « 1 statement par record » des routers POST : un seul
+aller-retour par chunk au lieu d'un par ligne. Le chunk est dimensionné pour
+rester sous la limite de 65535 bind params du protocole Postgres (un param par
+colonne et par ligne, colonnes à default Python incluses).
+
+Sémantique identique à la boucle historique : une ligne en conflit — y compris
+un doublon à l'intérieur du même payload — ne revient pas dans le RETURNING,
+donc `skipped = len(rows) - len(returned)`.
+
+Imports volumineux (scripts/import_samsung_csv.py) : `copy_insert_on_conflict_do_nothing`
+pousse les lignes par `COPY` dans une table temporaire de staging (colonnes
+`Encrypted*` chiffrées par lot), puis fusionne par un seul
+`INSERT ... SELECT ... ON CONFLICT DO NOTHING` : ni bind params, ni un
+aller-retour par chunk. Postgres (psycopg 3) uniquement.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import islice
+from typing import NamedTuple
+
+from sqlalchemy import Row, column, func, select, table, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from server.db.encrypted import _EncryptedType
+
+
+PG_MAX_BIND_PARAMS = 65_535
+DEFAULT_MAX_ROWS_PER_CHUNK = 1_000
+# COPY : lignes encodées / chiffrées par lot avant écriture dans le flux.
+COPY_BATCH_ROWS = 10_000
+
+
+def chunk_size_for(model, max_rows: int = DEFAULT_MAX_ROWS_PER_CHUNK) -> int:
+    """Nombre de lignes par statement tel que `lignes × colonnes ≤ PG_MAX_BIND_PARAMS`."""
+    n_cols = len(model.__table__.columns)
+    return max(1, min(max_rows, PG_MAX_BIND_PARAMS // n_cols))
+
+
+def iter_chunks(rows: Sequence[dict], size: int) -> Iterator[Sequence[dict]]:
+    for i in range(0, len(rows), size):
+        yield rows[i : i + size]
+
+
+def insert_on_conflict_do_nothing(
+    db: Session,
+    model,
+    rows: Sequence[dict],
+    conflict_cols: list[str],
+    returning: Sequence | None = None,
+) -> list[Row]:
+    """INSERT `rows` par chunks, ON CONFLICT DO NOTHING. Retourne les lignes insérées.
+
+    `rows` doivent partager le même jeu de clés (contrainte multi-VALUES).
+    `returning` défaut = `(model.id,)`. Caller responsable du commit.
+    """
+    if not rows:
+        return []
+    returning = tuple(returning) if returning is not None else (model.id,)
+    inserted: list[Row] = []
+    for chunk in iter_chunks(rows, chunk_size_for(model)):
+        stmt = (
+            pg_insert(model)
+            .values(list(chunk))
+            .on_conflict_do_nothing(index_elements=conflict_cols)
+            .returning(*returning)
+        )
+        inserted.extend(db.execute(stmt).all())
+    return inserted
+
+
+def upsert(
+    db: Session,
+    model,
+    rows: Sequence[dict],
+    conflict_cols: list[str],
+    update_cols: Sequence[str],
+) -> int:
+    """INSERT `rows` par chunks, ON CONFLICT DO UPDATE sur `update_cols`. Retourne len(rows).
+
+    Utilisé pour les tables dérivées (rollups) où la ligne recalculée remplace
+    l'existante. `updated_at` est rafraîchi au passage. Caller responsable du commit.
+    """
+    if not rows:
+        return 0
+    for chunk in iter_chunks(rows, chunk_size_for(model)):
+        stmt = pg_insert(model).values(list(chunk))
+        set_ = {c: stmt.excluded[c] for c in update_cols}
+        set_["updated_at"] = func.now()
+        db.execute(stmt.on_conflict_do_update(index_elements=conflict_cols, set_=set_))
+    return len(rows)
+
+
+class CopyResult(NamedTuple):
+    staged: int
+    inserted: int
+    returned: list[Row]
+
+
+def _copy_columns(model, first: dict) -> list:
+    """Colonnes stagées : clés des lignes + colonnes à default Python (id uuid7, *_crypto_v)."""
+    cols = [c for c in model.__table__.columns if c.key in first]
+    cols += [c for c in model.__table__.columns if c.key not in first and c.default is not None]
+    return cols
+
+
+def _encode_batch(rows: Sequence[dict], cols: Sequence, dialect) -> list[tuple]:
+    """Lignes → tuples pour COPY : defaults Python, bind processing, chiffrement par colonne."""
+    columns = []
+    for c in cols:
+        if c.default is not None and c.key not in rows[0]:
+            default = c.default
+            values = [default.arg(None) if default.is_callable else default.arg for _ in rows]
+        else:
+            values = [r[c.key] for r in rows]
+        if isinstance(c.type, _EncryptedType):
+            values = c.type.encode_many(values)
+        else:
+            process = c.type.bind_processor(dialect)
+            if process is not None:
+                values = [None if v is None else process(v) for v in values]
+        columns.append(values)
+    return list(zip(*columns))
+
+
+def copy_insert_on_conflict_do_nothing(
+    db: Session,
+    model,
+    rows: Iterable[dict],
+    conflict_cols: list[str],
+    returning: Sequence | None = None,
+    batch_rows: int = COPY_BATCH_ROWS,
+) -> CopyResult:
+    """COPY `rows` (itérable consommé par lots) en staging puis INSERT ... SELECT ON CONFLICT DO NOTHING.
+
+    Même sémantique que `insert_on_conflict_do_nothing` : doublons du flux et
+    lignes déjà présentes sont ignorés, `skipped = staged - inserted`.
+    `returned` n'est rempli que si `returning` est fourni. Les lignes partagent
+    le même jeu de clés. Staging `ON COMMIT DROP` ; caller responsable du commit.
+    """
+    it = iter(rows)
+    batch = list(islice(it, batch_rows))
+    if not batch:
+        return CopyResult(0, 0, [])
+    cols = _copy_columns(model, batch[0])
+    names = [c.name for c in cols]
+    target = model.__tablename__
+    stage = f"_copy_{target}"
+    quoted = ", ".join(f'"{n}"' for n in names)
+    db.execute(text(f"DROP TABLE IF EXISTS {stage}"))
+    db.execute(text(f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS SELECT {quoted} FROM {target} WITH NO DATA"))
+
+    dialect = db.get_bind().dialect
+    staged = 0
+    raw = db.connection().connection.driver_connection
+    with raw.cursor() as cursor, cursor.copy(f"COPY {stage} ({quoted}) FROM STDIN") as copy:
+        while batch:
+            for record in _encode_batch(batch, cols, dialect):
+                copy.write_row(record)
+            staged += len(batch)
+            batch = list(islice(it, batch_rows))
+
+    stmt = (
+        pg_insert(model)
+        .from_select(names, select(*(column(n) for n in names)).select_from(table(stage)))
+        .on_conflict_do_nothing(index_elements=conflict_cols)
+    )
+    if returning is not None:
+        returned = db.execute(stmt.returning(*returning)).all()
+        return CopyResult(staged, len(returned), returned)
+    # Sans `preserve_rowcount`, SQLAlchemy ne garantit pas le rowcount d'un INSERT.
+    return CopyResult(staged, db.execute(stmt.execution_options(preserve_rowcount=True)).rowcount, [])
@@ -0,0 +1,31 @@
+"""Colonne jour native (DATE) exposée en str ISO côté Python (migration 0013)."""
+from datetime import date, datetime
+
+from sqlalchemy import Date
+from sqlalchemy.types import TypeDecorator
+
+
+class IsoDate(TypeDecorator):
+    """DATE en base, 'YYYY-MM-DD' côté Python.
+
+    Couche de compatibilité : les colonnes jour étaient des VARCHAR(10) ISO, tout
+    le code (API, rollups, AAD row-level) manipule des str. Bind : str ISO,
+    `date` ou `datetime` (jour UTC supposé déjà calculé) ; lecture : str ISO.
+    """
+
+    impl = Date
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return date.fromisoformat(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return value.isoformat()
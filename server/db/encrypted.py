@@ -1,85 +1,188 @@
-"""SQLAlchemy TypeDecorator wrappers pour chiffrement transparent (V2.2)."""
+"""SQLAlchemy TypeDecorator wrappers pour chiffrement transparent (V2.2).
+
+Lecture par défaut : 1 `decrypt_field` par cellule (`process_result_value`).
+Pour les gros result sets, `execute_decrypted(db, stmt)` lit les ciphertexts
+bruts et déchiffre chaque colonne chiffrée en une passe (`decrypt_fields`,
+éventuellement multi-thread), puis décode. `iter_decrypted` fait de même par
+partitions d'un curseur serveur (GET streamés). Variantes `AsyncSession` : les
+lots de plus de OFFLOAD_MIN_ROWS lignes sont déchiffrés dans un worker thread.
+"""
 from __future__ import annotations
 
-from sqlalchemy import LargeBinary
+from collections import namedtuple
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+
+import anyio
+from sqlalchemy import LargeBinary, Select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from sqlalchemy.types import TypeDecorator
 
-from server.security.crypto import decrypt_field, encrypt_field
+from server.security.crypto import decrypt_field, decrypt_fields, encrypt_field, encrypt_fields
 
 
-class EncryptedBytes(TypeDecorator):
-    """Stocke `bytes` chiffrés en BYTEA. Les valeurs Python restent des bytes."""
+class _EncryptedType(TypeDecorator):
+    """Base : `_encode(value) -> bytes` / `_decode(bytes) -> value` autour d'AES-GCM."""
 
     impl = LargeBinary
     cache_ok = True
 
+    def _encode(self, value) -> bytes:
+        raise NotImplementedError
+
+    def _decode(self, plaintext: bytes):
+        raise NotImplementedError
+
     def process_bind_param(self, value, dialect):
         if value is None:
             return None
-        if not isinstance(value, (bytes, bytearray, memoryview)):
-            raise TypeError(f"EncryptedBytes attend bytes, got {type(value).__name__}")
-        return encrypt_field(bytes(value))
+        return encrypt_field(self._encode(value))
 
     def process_result_value(self, value, dialect):
         if value is None:
             return None
-        return decrypt_field(bytes(value))
+        return self._decode(decrypt_field(bytes(value)))
 
+    def decode_many(self, blobs: Sequence[bytes | None]) -> list:
+        """Déchiffre + décode une colonne entière (chemin batch)."""
+        decode = self._decode
+        return [None if p is None else decode(p) for p in decrypt_fields(blobs)]
 
-class EncryptedString(TypeDecorator):
-    """Stocke `str` chiffrés en BYTEA. Sérialise UTF-8."""
+    def encode_many(self, values: Sequence) -> list[bytes | None]:
+        """Encode + chiffre une colonne entière (chemin batch : COPY des imports)."""
+        encode = self._encode
+        return encrypt_fields([None if v is None else encode(v) for v in values])
 
-    impl = LargeBinary
-    cache_ok = True
 
-    def process_bind_param(self, value, dialect):
-        if value is None:
-            return None
+class EncryptedBytes(_EncryptedType):
+    """Stocke `bytes` chiffrés en BYTEA. Les valeurs Python restent des bytes."""
+
+    def _encode(self, value) -> bytes:
+        if not isinstance(value, (bytes, bytearray, memoryview)):
+            raise TypeError(f"EncryptedBytes attend bytes, got {type(value).__name__}")
+        return bytes(value)
+
+    def _decode(self, plaintext: bytes) -> bytes:
+        return plaintext
+
+
+class EncryptedString(_EncryptedType):
+    """Stocke `str` chiffrés en BYTEA. Sérialise UTF-8."""
+
+    def _encode(self, value) -> bytes:
         if not isinstance(value, str):
             raise TypeError(f"EncryptedString attend str, got {type(value).__name__}")
-        return encrypt_field(value.encode("utf-8"))
+        return value.encode("utf-8")
 
-    def process_result_value(self, value, dialect):
-        if value is None:
-            return None
-        return decrypt_field(bytes(value)).decode("utf-8")
+    def _decode(self, plaintext: bytes) -> str:
+        return plaintext.decode("utf-8")
 
 
-class EncryptedInt(TypeDecorator):
+class EncryptedInt(_EncryptedType):
     """Stocke `int` chiffrés en BYTEA. Sérialise via str(int).encode('ascii')."""
 
-    impl = LargeBinary
-    cache_ok = True
-
-    def process_bind_param(self, value, dialect):
-        if value is None:
-            return None
+    def _encode(self, value) -> bytes:
         if not isinstance(value, int) or isinstance(value, bool):
             raise TypeError(f"EncryptedInt attend int, got {type(value).__name__}")
-        return encrypt_field(str(value).encode("ascii"))
+        return str(value).encode("ascii")
 
-    def process_result_value(self, value, dialect):
-        if value is None:
-            return None
-        return int(decrypt_field(bytes(value)).decode("ascii"))
+    def _decode(self, plaintext: bytes) -> int:
+        return int(plaintext)
 
 
-class EncryptedFloat(TypeDecorator):
+class EncryptedFloat(_EncryptedType):
     """Stocke `float` chiffrés en BYTEA. Sérialise via repr(float).encode('ascii') (préserve IEEE 754)."""
 
-    impl = LargeBinary
-    cache_ok = True
-
-    def process_bind_param(self, value, dialect):
-        if value is None:
-            return None
+    def _encode(self, value) -> bytes:
         if isinstance(value, int) and not isinstance(value, bool):
             value = float(value)
         if not isinstance(value, float):
             raise TypeError(f"EncryptedFloat attend float, got {type(value).__name__}")
-        return encrypt_field(repr(value).encode("ascii"))
-
-    def process_result_value(self, value, dialect):
-        if value is None:
-            return None
-        return float(decrypt_field(bytes(value)).decode("ascii"))
+        return repr(value).encode("ascii")
+
+    def _decode(self, plaintext: bytes) -> float:
+        return float(plaintext)
+
+
+def _raw_select(stmt: Select) -> tuple[Select, dict[int, _EncryptedType]]:
+    """`stmt` avec les colonnes `Encrypted*` relues en BYTEA brut + {position: type}."""
+    cols = list(stmt.selected_columns)
+    encrypted = {i: c.type for i, c in enumerate(cols) if isinstance(c.type, _EncryptedType)}
+    if not encrypted:
+        return stmt, encrypted
+    raw_stmt = stmt.with_only_columns(
+        *(
+            type_coerce(c, LargeBinary).label(c.key) if i in encrypted else c
+            for i, c in enumerate(cols)
+        ),
+        maintain_column_froms=True,
+    )
+    return raw_stmt, encrypted
+
+
+def _decode_rows(RowT, rows: Sequence, encrypted: dict[int, _EncryptedType]) -> list[tuple]:
+    if not rows:
+        return []
+    columns = [list(col) for col in zip(*rows)]
+    for i, type_ in encrypted.items():
+        columns[i] = type_.decode_many(columns[i])
+    return [RowT._make(values) for values in zip(*columns)]
+
+
+# Lignes au-delà desquelles un lot lu en async est décodé hors de l'event loop.
+OFFLOAD_MIN_ROWS = 512
+
+
+async def decode_off_loop(rows: Sequence, fn: Callable[..., list], *args) -> list:
+    """`fn(*args)` pour décoder `rows` : inline si petit lot, sinon worker thread anyio."""
+    if len(rows) < OFFLOAD_MIN_ROWS:
+        return fn(*args)
+    return await anyio.to_thread.run_sync(fn, *args)
+
+
+def execute_decrypted(db: Session, stmt: Select) -> list[tuple]:
+    """Exécute un `select(col, ...)` en déchiffrant les colonnes chiffrées par lot.
+
+    Les colonnes `Encrypted*` sont relues en BYTEA brut (`type_coerce`), puis
+    chaque colonne est déchiffrée en une passe via `decode_many`. Retourne des
+    namedtuples (accès `r.col` comme un `Row`). Sélection d'entités ORM non
+    supportée : lister les colonnes.
+    """
+    raw_stmt, encrypted = _raw_select(stmt)
+    if not encrypted:
+        return list(db.execute(stmt).all())
+    result = db.execute(raw_stmt)
+    RowT = namedtuple("DecryptedRow", list(result.keys()), rename=True)
+    return _decode_rows(RowT, result.all(), encrypted)
+
+
+def iter_decrypted(db: Session, stmt: Select, batch_size: int) -> Iterator[list[tuple]]:
+    """Variante streaming : curseur serveur (`yield_per`), 1 lot déchiffré par partition.
+
+    Mémoire bornée par `batch_size` lignes quel que soit le volume du résultat.
+    """
+    raw_stmt, encrypted = _raw_select(stmt)
+    result = db.execute(raw_stmt.execution_options(yield_per=batch_size))
+    RowT = namedtuple("DecryptedRow", list(result.keys()), rename=True)
+    for part in result.partitions():
+        yield _decode_rows(RowT, part, encrypted) if encrypted else list(part)
+
+
+async def execute_decrypted_async(db: AsyncSession, stmt: Select) -> list[tuple]:
+    """`execute_decrypted` sur une `AsyncSession`."""
+    raw_stmt, encrypted = _raw_select(stmt)
+    if not encrypted:
+        return list((await db.execute(stmt)).all())
+    result = await db.execute(raw_stmt)
+    RowT = namedtuple("DecryptedRow", list(result.keys()), rename=True)
+    rows = result.all()
+    return await decode_off_loop(rows, _decode_rows, RowT, rows, encrypted)
+
+
+async def stream_decrypted(db: AsyncSession, stmt: Select, batch_size: int) -> AsyncIterator[list[tuple]]:
+    """`iter_decrypted` sur une `AsyncSession` (curseur serveur `db.stream`)."""
+    raw_stmt, encrypted = _raw_select(stmt)
+    result = await db.stream(raw_stmt.execution_options(yield_per=batch_size))
+    RowT = namedtuple("DecryptedRow", list(result.keys()), rename=True)
+    async for part in result.partitions():
+        yield await decode_off_loop(part, _decode_rows, RowT, part, encrypted) if encrypted else list(part)
@@ -12,11 +12,13 @@ from uuid import UUID
 
 from sqlalchemy import (
     Boolean,
+    CheckConstraint,
     DateTime,
     Float,
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     String,
     Text,
     UniqueConstraint,
@@ -25,6 +27,7 @@ from sqlalchemy import (
 from sqlalchemy.dialects.postgresql import CITEXT, INET, JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+from .dates import IsoDate
 from .encrypted import EncryptedFloat, EncryptedInt, EncryptedString
 from .uuid7 import Uuid7, uuid7
 
@@ -54,8 +57,6 @@ class SleepSession(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "sleep_sessions"
     __table_args__ = (
         UniqueConstraint("user_id", "sleep_start", "sleep_end", name="uq_sleep_sessions_window"),
-        Index("idx_sleep_start", "sleep_start"),
-        Index("idx_sleep_sessions_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
@@ -89,7 +90,6 @@ class SleepStage(Uuid7PkMixin, TimestampedMixin, Base):
     __table_args__ = (
         UniqueConstraint("user_id", "stage_start", "stage_end", name="uq_sleep_stages_window"),
         Index("idx_stages_session", "session_id"),
-        Index("idx_sleep_stages_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
@@ -110,13 +110,12 @@ class StepsHourly(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "steps_hourly"
     __table_args__ = (
         UniqueConstraint("user_id", "date", "hour", name="uq_steps_hourly_slot"),
-        Index("idx_steps_hourly_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
         Uuid7(), ForeignKey("users.id"), nullable=False
     )
-    date: Mapped[str] = mapped_column(String(10), nullable=False)
+    date: Mapped[str] = mapped_column(IsoDate(), nullable=False)
     hour: Mapped[int] = mapped_column(Integer, nullable=False)
     step_count: Mapped[int] = mapped_column(Integer, nullable=False)
 
@@ -125,13 +124,12 @@ class StepsDaily(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "steps_daily"
     __table_args__ = (
         UniqueConstraint("user_id", "day_date", name="uq_steps_daily_day"),
-        Index("idx_steps_daily_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
         Uuid7(), ForeignKey("users.id"), nullable=False
     )
-    day_date: Mapped[str] = mapped_column(String(10), nullable=False)
+    day_date: Mapped[str] = mapped_column(IsoDate(), nullable=False)
     step_count: Mapped[int | None] = mapped_column(Integer)
     walk_step_count: Mapped[int | None] = mapped_column(Integer)
     run_step_count: Mapped[int | None] = mapped_column(Integer)
@@ -145,19 +143,65 @@ class HeartRateHourly(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "heart_rate_hourly"
     __table_args__ = (
         UniqueConstraint("user_id", "date", "hour", name="uq_hr_hourly_slot"),
-        Index("idx_heart_rate_hourly_user_id", "user_id"),
+        CheckConstraint(
+            "(avg_bpm_crypto_v = 2 AND row_blob IS NOT NULL)"
+            " OR (avg_bpm_crypto_v = 1 AND min_bpm IS NOT NULL AND max_bpm IS NOT NULL AND avg_bpm IS NOT NULL)",
+            name="ck_hr_hourly_crypto_payload",
+        ),
     )
 
     user_id: Mapped[UUID] = mapped_column(
         Uuid7(), ForeignKey("users.id"), nullable=False
     )
-    date: Mapped[str] = mapped_column(String(10), nullable=False)
+    date: Mapped[str] = mapped_column(IsoDate(), nullable=False)
     hour: Mapped[int] = mapped_column(Integer, nullable=False)
-    # V2.2.1 — colonnes Art.9 chiffrées
+    # V2.2.1 — colonnes Art.9 chiffrées. crypto_v=2 : NULL ici, valeurs dans
+    # `row_blob` (1 AEAD pour la ligne, cf. server/db/row_crypto.py).
+    min_bpm: Mapped[int | None] = mapped_column(EncryptedInt)
+    max_bpm: Mapped[int | None] = mapped_column(EncryptedInt)
+    avg_bpm: Mapped[int | None] = mapped_column(EncryptedInt)
+    sample_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    min_bpm_crypto_v: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    max_bpm_crypto_v: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    avg_bpm_crypto_v: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    row_blob: Mapped[bytes | None] = mapped_column(LargeBinary)
+
+
+# ── rollups (dérivées de steps_hourly / heart_rate_hourly) ──────────────────
+# Maintenues incrémentalement par les chemins d'ingest (cf. server/db/rollups.py).
+# `period_start` = 1er jour de la période : jour, lundi ISO, 1er du mois.
+class StepsRollup(Uuid7PkMixin, TimestampedMixin, Base):
+    __tablename__ = "steps_rollup"
+    __table_args__ = (
+        UniqueConstraint("user_id", "granularity", "period_start", name="uq_steps_rollup_period"),
+    )
+
+    user_id: Mapped[UUID] = mapped_column(
+        Uuid7(), ForeignKey("users.id"), nullable=False
+    )
+    granularity: Mapped[str] = mapped_column(String(5), nullable=False)
+    period_start: Mapped[str] = mapped_column(IsoDate(), nullable=False)
+    step_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    hour_count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class HeartRateRollup(Uuid7PkMixin, TimestampedMixin, Base):
+    __tablename__ = "heart_rate_rollup"
+    __table_args__ = (
+        UniqueConstraint("user_id", "granularity", "period_start", name="uq_hr_rollup_period"),
+    )
+
+    user_id: Mapped[UUID] = mapped_column(
+        Uuid7(), ForeignKey("users.id"), nullable=False
+    )
+    granularity: Mapped[str] = mapped_column(String(5), nullable=False)
+    period_start: Mapped[str] = mapped_column(IsoDate(), nullable=False)
+    # Art.9 — mêmes colonnes chiffrées que heart_rate_hourly
     min_bpm: Mapped[int] = mapped_column(EncryptedInt, nullable=False)
     max_bpm: Mapped[int] = mapped_column(EncryptedInt, nullable=False)
     avg_bpm: Mapped[int] = mapped_column(EncryptedInt, nullable=False)
     sample_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    hour_count: Mapped[int] = mapped_column(Integer, nullable=False)
     min_bpm_crypto_v: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
     max_bpm_crypto_v: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
     avg_bpm_crypto_v: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
@@ -168,7 +212,6 @@ class ExerciseSession(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "exercise_sessions"
     __table_args__ = (
         UniqueConstraint("user_id", "exercise_start", "exercise_end", name="uq_exercise_window"),
-        Index("idx_exercise_sessions_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
@@ -191,8 +234,6 @@ class Stress(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "stress"
     __table_args__ = (
         UniqueConstraint("user_id", "start_time", "end_time", name="uq_stress_window"),
-        Index("idx_stress_start", "start_time"),
-        Index("idx_stress_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
@@ -210,8 +251,6 @@ class Spo2(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "spo2"
     __table_args__ = (
         UniqueConstraint("user_id", "start_time", "end_time", name="uq_spo2_window"),
-        Index("idx_spo2_start", "start_time"),
-        Index("idx_spo2_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
@@ -235,7 +274,6 @@ class RespiratoryRate(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "respiratory_rate"
     __table_args__ = (
         UniqueConstraint("user_id", "start_time", "end_time", name="uq_respi_window"),
-        Index("idx_respiratory_rate_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
@@ -256,7 +294,6 @@ class Hrv(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "hrv"
     __table_args__ = (
         UniqueConstraint("user_id", "start_time", "end_time", name="uq_hrv_window"),
-        Index("idx_hrv_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
@@ -270,7 +307,6 @@ class SkinTemperature(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "skin_temperature"
     __table_args__ = (
         UniqueConstraint("user_id", "start_time", "end_time", name="uq_skin_temp_window"),
-        Index("idx_skin_temperature_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
@@ -293,7 +329,6 @@ class Weight(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "weight"
     __table_args__ = (
         UniqueConstraint("user_id", "start_time", name="uq_weight_time"),
-        Index("idx_weight_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
@@ -321,7 +356,6 @@ class Height(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "height"
     __table_args__ = (
         UniqueConstraint("user_id", "start_time", name="uq_height_time"),
-        Index("idx_height_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
@@ -335,7 +369,6 @@ class BloodPressure(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "blood_pressure"
     __table_args__ = (
         UniqueConstraint("user_id", "start_time", name="uq_bp_time"),
-        Index("idx_blood_pressure_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
@@ -357,7 +390,6 @@ class Mood(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "mood"
     __table_args__ = (
         UniqueConstraint("user_id", "start_time", name="uq_mood_time"),
-        Index("idx_mood_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
@@ -383,7 +415,6 @@ class WaterIntake(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "water_intake"
     __table_args__ = (
         UniqueConstraint("user_id", "start_time", name="uq_water_time"),
-        Index("idx_water_intake_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
@@ -398,13 +429,12 @@ class ActivityDaily(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "activity_daily"
     __table_args__ = (
         UniqueConstraint("user_id", "day_date", name="uq_activity_daily_day"),
-        Index("idx_activity_daily_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
         Uuid7(), ForeignKey("users.id"), nullable=False
     )
-    day_date: Mapped[str] = mapped_column(String(10), nullable=False)
+    day_date: Mapped[str] = mapped_column(IsoDate(), nullable=False)
     step_count: Mapped[int | None] = mapped_column(Integer)
     distance_m: Mapped[float | None] = mapped_column(Float)
     calorie_kcal: Mapped[float | None] = mapped_column(Float)
@@ -418,13 +448,12 @@ class VitalityScore(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "vitality_score"
     __table_args__ = (
         UniqueConstraint("user_id", "day_date", name="uq_vitality_day"),
-        Index("idx_vitality_score_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
         Uuid7(), ForeignKey("users.id"), nullable=False
     )
-    day_date: Mapped[str] = mapped_column(String(10), nullable=False)
+    day_date: Mapped[str] = mapped_column(IsoDate(), nullable=False)
     total_score: Mapped[float | None] = mapped_column(Float)
     sleep_score: Mapped[float | None] = mapped_column(Float)
     sleep_balance: Mapped[float | None] = mapped_column(Float)
@@ -443,13 +472,12 @@ class FloorsDaily(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "floors_daily"
     __table_args__ = (
         UniqueConstraint("user_id", "day_date", name="uq_floors_day"),
-        Index("idx_floors_daily_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
         Uuid7(), ForeignKey("users.id"), nullable=False
     )
-    day_date: Mapped[str] = mapped_column(String(10), nullable=False)
+    day_date: Mapped[str] = mapped_column(IsoDate(), nullable=False)
     floor_count: Mapped[int | None] = mapped_column(Integer)
 
 
@@ -457,7 +485,6 @@ class ActivityLevel(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "activity_level"
     __table_args__ = (
         UniqueConstraint("user_id", "start_time", name="uq_activity_level_time"),
-        Index("idx_activity_level_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
@@ -472,7 +499,6 @@ class Ecg(Uuid7PkMixin, TimestampedMixin, Base):
     __tablename__ = "ecg"
     __table_args__ = (
         UniqueConstraint("user_id", "start_time", "end_time", name="uq_ecg_window"),
-        Index("idx_ecg_user_id", "user_id"),
     )
 
     user_id: Mapped[UUID] = mapped_column(
@@ -539,7 +565,7 @@ class RefreshToken(Uuid7PkMixin, Base):
 class AuthEvent(Uuid7PkMixin, Base):
     __tablename__ = "auth_events"
     __table_args__ = (
-        Index("idx_auth_events_user_id", "user_id"),
+        Index("idx_auth_events_user_created", "user_id", "created_at"),
         Index("idx_auth_events_event_type", "event_type"),
     )
 
@@ -613,3 +639,34 @@ class IdentityProvider(Uuid7PkMixin, Base):
     )
     last_used_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     raw_claims: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+
+
+# ── import CSV Samsung : manifest de reprise (scripts/import_samsung_csv.py) ──
+class ImportManifest(Uuid7PkMixin, TimestampedMixin, Base):
+    """1 ligne par (user, fichier source) : hash, avancement commité, watermark."""
+
+    __tablename__ = "import_manifest"
+    __table_args__ = (
+        UniqueConstraint("user_id", "source", name="uq_import_manifest_source"),
+    )
+
+    user_id: Mapped[UUID] = mapped_column(
+        Uuid7(), ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    # Motif du fichier sans suffixe d'export (ex. com.samsung.shealth.stress)
+    source: Mapped[str] = mapped_column(Text, nullable=False)
+    file_name: Mapped[str] = mapped_column(Text, nullable=False)
+    file_sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    # Lignes mappées du fichier déjà commitées (reprise après crash)
+    row_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    max_start_time: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    # Watermark appliqué au fichier en cours (lignes antérieures ignorées)
+    resume_from: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    completed: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, server_default="false"
+    )
+    # Début du run en cours, conservé jusqu'à `completed` (reprises comprises) :
+    # lignes de ce run = created_at >= run_started_at.
+    run_started_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
@@ -0,0 +1,154 @@
+"""Pool de connexions : options par env + métriques de saturation.
+
+Options (`engine_options()`, communes aux engines sync et async) :
+- `SAMSUNGHEALTH_DB_POOL_SIZE` (5) / `SAMSUNGHEALTH_DB_MAX_OVERFLOW` (10) :
+  connexions gardées / en plus sous pic ;
+- `SAMSUNGHEALTH_DB_POOL_TIMEOUT_S` (30) : attente max d'une connexion libre
+  avant `sqlalchemy.exc.TimeoutError` ;
+- `SAMSUNGHEALTH_DB_POOL_RECYCLE_S` (1800) : âge max d'une connexion (-1 = jamais) ;
+- `SAMSUNGHEALTH_DB_PRE_PING` : `true` (défaut, pessimiste : `SELECT 1` à
+  chaque checkout) ou `false` (optimiste : pas d'aller-retour, une connexion
+  morte échoue une requête puis SQLAlchemy invalide le pool ; à coupler avec
+  le recycle) ;
+- `SAMSUNGHEALTH_DB_EXTERNAL_POOLER=transaction` : derrière PgBouncer /
+  pgcat en mode transaction, une connexion serveur change d'une transaction à
+  l'autre → prepared statements psycopg désactivés (`prepare_threshold=None`).
+  Les curseurs serveur (GET NDJSON) restent valides : ouverts et fermés dans
+  la transaction de la requête.
+
+Métriques par engine (`POOL_METRICS["sync" | "async"]`) : checkouts, attentes
+(pool plein au moment de la demande), timeouts, histogrammes de latence de
+checkout et d'attente (s), exportés par GET /metrics. Par requête, checkouts
+et temps passé s'ajoutent au cumul de server/metrics.py (log `request.complete`).
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from server.metrics import Histogram, current_request_stats
+
+
+POOL_SIZE_ENV = "SAMSUNGHEALTH_DB_POOL_SIZE"
+MAX_OVERFLOW_ENV = "SAMSUNGHEALTH_DB_MAX_OVERFLOW"
+POOL_TIMEOUT_ENV = "SAMSUNGHEALTH_DB_POOL_TIMEOUT_S"
+POOL_RECYCLE_ENV = "SAMSUNGHEALTH_DB_POOL_RECYCLE_S"
+PRE_PING_ENV = "SAMSUNGHEALTH_DB_PRE_PING"
+EXTERNAL_POOLER_ENV = "SAMSUNGHEALTH_DB_EXTERNAL_POOLER"
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+DEFAULT_POOL_TIMEOUT_S = 30.0
+DEFAULT_POOL_RECYCLE_S = 1800
+
+
+def _env_int(name: str, default: int, minimum: int) -> int:
+    try:
+        return max(minimum, int(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+class PoolMetrics:
+    def __init__(self, max_overflow: int) -> None:
+        self.max_overflow = max_overflow
+        self.checkout_s = Histogram()
+        self.wait_s = Histogram()
+        self._counters = {"checkouts": 0, "waits": 0, "timeouts": 0}
+        self._lock = threading.Lock()
+
+    def observe(self, elapsed_s: float, *, waited: bool, timed_out: bool = False) -> None:
+        with self._lock:
+            self._counters["timeouts" if timed_out else "checkouts"] += 1
+            if waited:
+                self._counters["waits"] += 1
+        if not timed_out:
+            self.checkout_s.observe(elapsed_s)
+        if waited:
+            self.wait_s.observe(elapsed_s)
+        if (current := current_request_stats()) is not None:
+            current["db_checkouts"] += 1
+            current["db_checkout_ms"] += elapsed_s * 1000.0
+            if waited:
+                current["db_wait_ms"] += elapsed_s * 1000.0
+
+    def counters(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+
+POOL_METRICS: dict[str, PoolMetrics] = {}
+
+
+def _timed_pool_class(base: type[QueuePool], metrics: PoolMetrics) -> type[QueuePool]:
+    """Sous-classe de `base` qui chronomètre `connect()` (attente + connexion + pre-ping).
+
+    Classe (et non attribut d'instance) : `Pool.recreate()` (dispose,
+    invalidation) réinstancie `self.__class__`.
+    """
+
+    def connect(self):
+        # Pool plein (overflow épuisé, rien en réserve) : ce checkout va attendre.
+        waited = self.checkedin() == 0 and self.overflow() >= metrics.max_overflow
+        t0 = time.perf_counter()
+        try:
+            conn = base.connect(self)
+        except exc.TimeoutError:
+            metrics.observe(time.perf_counter() - t0, waited=True, timed_out=True)
+            raise
+        metrics.observe(time.perf_counter() - t0, waited=waited)
+        return conn
+
+    return type(f"Timed{base.__name__}", (base,), {"connect": connect, "metrics": metrics})
+
+
+def engine_options(url: str, name: str, *, is_async: bool = False) -> dict[str, Any]:
+    """kwargs de `create_engine` / `create_async_engine` d'après l'env ; enregistre `POOL_METRICS[name]`."""
+    max_overflow = _env_int(MAX_OVERFLOW_ENV, DEFAULT_MAX_OVERFLOW, -1)
+    metrics = POOL_METRICS[name] = PoolMetrics(max_overflow)
+    options: dict[str, Any] = {
+        "poolclass": _timed_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool, metrics),
+        "pool_size": _env_int(POOL_SIZE_ENV, DEFAULT_POOL_SIZE, 1),
+        "max_overflow": max_overflow,
+        "pool_timeout": _env_float(POOL_TIMEOUT_ENV, DEFAULT_POOL_TIMEOUT_S),
+        "pool_recycle": _env_int(POOL_RECYCLE_ENV, DEFAULT_POOL_RECYCLE_S, -1),
+        "pool_pre_ping": os.environ.get(PRE_PING_ENV, "true").lower() != "false",
+    }
+    if os.environ.get(EXTERNAL_POOLER_ENV, "").lower() == "transaction" and url.startswith("postgresql+psycopg"):
+        options["connect_args"] = {"prepare_threshold": None}
+    return options
+
+
+def pool_snapshot(pool: Pool) -> dict[str, Any]:
+    """Jauges instantanées + compteurs / histogrammes cumulés depuis le boot."""
+    out: dict[str, Any] = {}
+    if isinstance(pool, QueuePool):
+        out.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(0, pool.overflow()),
+            timeout_s=pool.timeout(),
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        out.update(
+            metrics.counters(),
+            max_overflow=metrics.max_overflow,
+            checkout_s=metrics.checkout_s.snapshot(),
+            wait_s=metrics.wait_s.snapshot(),
+        )
+    return out
+
@@ -0,0 +1,283 @@
+"""Rollups jour / semaine ISO / mois de steps_hourly et heart_rate_hourly.
+
+Tables `steps_rollup` et `heart_rate_rollup` (1 ligne par user × granularité ×
+période). Elles sont maintenues incrémentalement : chaque chemin d'ingest
+(POST JSON, `/stream`, importer CSV) appelle `refresh_*_rollups` avec les dates
+des lignes horaires effectivement insérées, dans la même transaction.
+
+Seuls les jours touchés sont recalculés depuis les lignes horaires brutes ;
+les semaines et mois qui les contiennent sont ensuite repliés depuis les
+rollups jour (≤ 31 lignes), puis UPSERT. Côté heart rate, min/max/avg sont
+chiffrés (Art.9) : pas d'agrégat SQL possible, déchiffrement batch des seules
+heures des jours touchés. `avg_bpm` est pondéré par `sample_count` (semaine /
+mois : moyennes jour pondérées).
+
+Un verrou consultatif transactionnel par (table de rollup, user) sérialise les
+recalculs concurrents : le second attend le commit du premier et relit ses
+lignes horaires.
+
+`rebuild_rollups` reconstruit tout l'historique d'un user (données existantes,
+cf. scripts/rollups.py) ; `check_rollups` compare les rollups stockés à un
+recalcul complet et retourne les écarts.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import date, timedelta
+from uuid import UUID
+
+from sqlalchemy import delete, func, or_, select, tuple_
+from sqlalchemy.orm import Session
+
+from server.db.bulk import upsert
+from server.db.encrypted import execute_decrypted
+from server.db.models import HeartRateHourly, HeartRateRollup, StepsHourly, StepsRollup
+from server.db.row_crypto import HEART_RATE_ROW, execute_row_decrypted
+
+
+GRANULARITIES: tuple[str, ...] = ("day", "week", "month")
+_UPPER = ("week", "month")
+
+PeriodKey = tuple[str, str]  # (granularity, period_start ISO)
+
+_CONFLICT_COLS = ["user_id", "granularity", "period_start"]
+_STEPS_COLS = ("step_count", "hour_count")
+_HR_COLS = ("min_bpm", "max_bpm", "avg_bpm", "sample_count", "hour_count")
+
+
+def period_start(day: date, granularity: str) -> date:
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    raise ValueError(f"granularity inconnue: {granularity!r}")
+
+
+def _period_end(start: date, granularity: str) -> date:
+    """Dernier jour (inclus) de la période commençant à `start`."""
+    if granularity == "day":
+        return start
+    if granularity == "week":
+        return start + timedelta(days=6)
+    nxt = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return nxt - timedelta(days=1)
+
+
+def affected_periods(days: Iterable[str | date]) -> set[PeriodKey]:
+    out: set[PeriodKey] = set()
+    for d in {s if isinstance(s, date) else date.fromisoformat(s) for s in days}:
+        for g in GRANULARITIES:
+            out.add((g, period_start(d, g).isoformat()))
+    return out
+
+
+def _covering_ranges(periods: Iterable[PeriodKey]) -> list[tuple[date, date]]:
+    """Plages [début, fin] fusionnées couvrant entièrement `periods`."""
+    spans = sorted(
+        (date.fromisoformat(start), _period_end(date.fromisoformat(start), g)) for g, start in periods
+    )
+    merged: list[list[date]] = []
+    for lo, hi in spans:
+        if merged and lo <= merged[-1][1] + timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return [(lo, hi) for lo, hi in merged]
+
+
+def _merge_steps(values: list[dict]) -> dict:
+    return {
+        "step_count": sum(v["step_count"] for v in values),
+        "hour_count": sum(v["hour_count"] for v in values),
+    }
+
+
+def _merge_heart_rate(values: list[dict]) -> dict:
+    """Fusionne des heures (hour_count=1) ou des jours en une période."""
+    samples = sum(v["sample_count"] for v in values)
+    hours = sum(v["hour_count"] for v in values)
+    if samples:
+        # Moyenne pondérée par échantillons.
+        avg = round(sum(v["avg_bpm"] * v["sample_count"] for v in values) / samples)
+    else:
+        # Repli sur la moyenne des heures si aucune n'a de sample_count.
+        avg = round(sum(v["avg_bpm"] * v["hour_count"] for v in values) / hours)
+    return {
+        "min_bpm": min(v["min_bpm"] for v in values),
+        "max_bpm": max(v["max_bpm"] for v in values),
+        "avg_bpm": avg,
+        "sample_count": samples,
+        "hour_count": hours,
+    }
+
+
+def _fold_days(by_day: dict[str, dict], merge, granularities: Iterable[str]) -> dict[PeriodKey, dict]:
+    """Valeurs par jour → `{(granularité, début): merge(jours de la période)}`."""
+    groups: dict[PeriodKey, list[dict]] = {}
+    for day, values in by_day.items():
+        d = date.fromisoformat(day)
+        for g in granularities:
+            groups.setdefault((g, period_start(d, g).isoformat()), []).append(values)
+    return {key: merge(values) for key, values in groups.items()}
+
+
+def _steps_by_day(days: Iterable[tuple[str, int, int]]) -> dict[str, dict]:
+    return {day: {"step_count": steps, "hour_count": hours} for day, steps, hours in days}
+
+
+def _heart_rate_by_day(hours: Iterable[tuple[str, int, int, int, int]]) -> dict[str, dict]:
+    per_day: dict[str, list[dict]] = {}
+    for day, lo, hi, avg, samples in hours:
+        per_day.setdefault(day, []).append(
+            {"min_bpm": lo, "max_bpm": hi, "avg_bpm": avg, "sample_count": samples, "hour_count": 1}
+        )
+    return {day: _merge_heart_rate(values) for day, values in per_day.items()}
+
+
+def _with_upper(by_day: dict[str, dict], merge) -> dict[PeriodKey, dict]:
+    out = {("day", day): values for day, values in by_day.items()}
+    out.update(_fold_days(by_day, merge, _UPPER))
+    return out
+
+
+def fold_steps(days: Iterable[tuple[str, int, int]]) -> dict[PeriodKey, dict]:
+    """`(date, step_count, hour_count)` par jour → `{(granularité, début): valeurs}`."""
+    return _with_upper(_steps_by_day(days), _merge_steps)
+
+
+def fold_heart_rate(hours: Iterable[tuple[str, int, int, int, int]]) -> dict[PeriodKey, dict]:
+    """`(date, min, max, avg, sample_count)` par heure → `{(granularité, début): valeurs}`.
+
+    Jour depuis les heures, semaine / mois depuis les jours (même calcul que
+    le rafraîchissement incrémental).
+    """
+    return _with_upper(_heart_rate_by_day(hours), _merge_heart_rate)
+
+
+def _range_filter(col, ranges: list[tuple[date, date]]):
+    return or_(*(col.between(lo, hi) for lo, hi in ranges))
+
+
+def _steps_days(db: Session, user_id: UUID, days: list[str] | None):
+    stmt = select(StepsHourly.date, func.sum(StepsHourly.step_count), func.count()).where(
+        StepsHourly.user_id == user_id
+    )
+    if days is not None:
+        stmt = stmt.where(StepsHourly.date.in_(days))
+    return db.execute(stmt.group_by(StepsHourly.date)).all()
+
+
+def _hr_hours(db: Session, user_id: UUID, days: list[str] | None):
+    stmt = select(
+        HeartRateHourly.date,
+        HeartRateHourly.min_bpm,
+        HeartRateHourly.max_bpm,
+        HeartRateHourly.avg_bpm,
+        HeartRateHourly.sample_count,
+    ).where(HeartRateHourly.user_id == user_id)
+    if days is not None:
+        stmt = stmt.where(HeartRateHourly.date.in_(days))
+    return execute_row_decrypted(db, stmt, HEART_RATE_ROW)
+
+
+def _lock(db: Session, model, user_id: UUID) -> None:
+    """Sérialise les recalculs d'un user sur `model` jusqu'à la fin de la transaction.
+
+    Sans verrou, deux ingests concurrents (READ COMMITTED) recalculent chacun
+    sans voir les lignes horaires de l'autre et le dernier écrit un total faux.
+    """
+    db.execute(
+        select(func.pg_advisory_xact_lock(func.hashtext(model.__tablename__), func.hashtext(str(user_id))))
+    )
+
+
+def _write(db: Session, model, user_id: UUID, periods: set[PeriodKey], values: dict[PeriodKey, dict], cols) -> int:
+    rows = [
+        dict(user_id=user_id, granularity=g, period_start=start, **values[(g, start)])
+        for g, start in sorted(periods)
+        if (g, start) in values
+    ]
+    upsert(db, model, rows, _CONFLICT_COLS, cols)
+    # Périodes touchées sans plus aucune ligne horaire (suppression côté brut).
+    gone = [p for p in periods if p not in values]
+    if gone:
+        db.execute(
+            delete(model).where(
+                model.user_id == user_id,
+                tuple_(model.granularity, model.period_start).in_(gone),
+            )
+        )
+    return len(rows)
+
+
+def _refresh(db: Session, model, user_id: UUID, days: Iterable[str | date], load_days, by_day, merge, cols) -> int:
+    """Jours touchés recalculés depuis les heures, semaines / mois depuis les rollups jour."""
+    touched = sorted({d if isinstance(d, str) else d.isoformat() for d in days})
+    if not touched:
+        return 0
+    _lock(db, model, user_id)
+    day_values = {("day", day): values for day, values in by_day(load_days(db, user_id, touched)).items()}
+    count = _write(db, model, user_id, {("day", day) for day in touched}, day_values, cols)
+
+    upper = {p for p in affected_periods(touched) if p[0] != "day"}
+    stored = execute_decrypted(
+        db,
+        select(model.period_start, *(getattr(model, c) for c in cols)).where(
+            model.user_id == user_id,
+            model.granularity == "day",
+            _range_filter(model.period_start, _covering_ranges(upper)),
+        ),
+    )
+    folded = _fold_days({r[0]: dict(zip(cols, r[1:])) for r in stored}, merge, _UPPER)
+    return count + _write(db, model, user_id, upper, folded, cols)
+
+
+def refresh_steps_rollups(db: Session, user_id: UUID, days: Iterable[str | date]) -> int:
+    """Recalcule les rollups steps des périodes contenant `days`. Caller commit."""
+    return _refresh(db, StepsRollup, user_id, days, _steps_days, _steps_by_day, _merge_steps, _STEPS_COLS)
+
+
+def refresh_heart_rate_rollups(db: Session, user_id: UUID, days: Iterable[str | date]) -> int:
+    """Recalcule les rollups heart rate des périodes contenant `days`. Caller commit."""
+    return _refresh(
+        db, HeartRateRollup, user_id, days, _hr_hours, _heart_rate_by_day, _merge_heart_rate, _HR_COLS
+    )
+
+
+def rebuild_rollups(db: Session, user_id: UUID) -> dict[str, int]:
+    """Supprime puis recalcule tous les rollups d'un user depuis les lignes horaires."""
+    out: dict[str, int] = {}
+    for model, fold, load, cols in (
+        (StepsRollup, fold_steps, _steps_days, _STEPS_COLS),
+        (HeartRateRollup, fold_heart_rate, _hr_hours, _HR_COLS),
+    ):
+        _lock(db, model, user_id)
+        db.execute(delete(model).where(model.user_id == user_id))
+        folded = fold(load(db, user_id, None))
+        out[model.__tablename__] = _write(db, model, user_id, set(folded), folded, cols)
+    return out
+
+
+def check_rollups(db: Session, user_id: UUID) -> list[str]:
+    """Compare rollups stockés vs recalcul complet. Retourne les écarts (vide = cohérent)."""
+    problems: list[str] = []
+    for model, fold, load, cols in (
+        (StepsRollup, fold_steps, _steps_days, _STEPS_COLS),
+        (HeartRateRollup, fold_heart_rate, _hr_hours, _HR_COLS),
+    ):
+        expected = fold(load(db, user_id, None))
+        stored = {
+            (r.granularity, r.period_start): {c: getattr(r, c) for c in cols}
+            for r in db.execute(select(model).where(model.user_id == user_id)).scalars()
+        }
+        table = model.__tablename__
+        for key in sorted(expected.keys() - stored.keys()):
+            problems.append(f"{table} {key[0]} {key[1]}: manquant")
+        for key in sorted(stored.keys() - expected.keys()):
+            problems.append(f"{table} {key[0]} {key[1]}: orphelin")
+        for key in sorted(expected.keys() & stored.keys()):
+            if expected[key] != stored[key]:
+                problems.append(f"{table} {key[0]} {key[1]}: attendu {expected[key]}, stocké {stored[key]}")
+    return problems
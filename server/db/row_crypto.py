@@ -0,0 +1,264 @@
+"""Chiffrement row-level (crypto_v=2) des colonnes Art.9 numériques.
+
+crypto_v=1 (historique) : 1 blob AES-GCM par cellule, entier sérialisé en
+ASCII — `nonce(12) + ct + tag(16)` soit ~30 bytes par bpm et 3 déchiffrements
+par ligne `heart_rate_hourly`.
+
+crypto_v=2 : tous les champs Art.9 de la ligne packés en binaire fixe
+(`struct`, bitmap des NULL en tête) puis chiffrés en un seul AEAD stocké dans
+`row_blob`. Les colonnes par champ restent à NULL. La clé naturelle de la ligne
+est passée en associated data : un blob recopié sur une autre ligne ne se
+déchiffre pas. heart_rate_hourly : 3 × ~30 bytes → 35 bytes, 1 déchiffrement.
+
+La version est portée par les colonnes `*_crypto_v` existantes (toutes mises à
+jour ensemble). Lecture :
+- ORM : hook `load`/`refresh` qui remplit les attributs depuis `row_blob`
+  (export RGPD, tests ORM inchangés) ;
+- Core : `execute_row_decrypted` / `iter_row_decrypted` (batch, mélange v1/v2
+  supporté).
+Écriture : `RowCodec.to_storage` dans les chemins bulk (routers, importers),
+version choisie par `SAMSUNGHEALTH_ROW_CRYPTO_V` (défaut 2). Les inserts ORM
+unitaires restent en v1 ; `scripts/reencrypt_rows.py` migre l'existant.
+"""
+from __future__ import annotations
+
+import os
+import struct
+from collections import namedtuple
+from collections.abc import AsyncIterator, Iterator, Mapping, Sequence
+from dataclasses import dataclass
+from functools import cached_property
+
+from sqlalchemy import Select, event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from server.db.encrypted import (
+    decode_off_loop,
+    execute_decrypted,
+    execute_decrypted_async,
+    iter_decrypted,
+    stream_decrypted,
+)
+from server.db.models import HeartRateHourly
+from server.security.crypto import decrypt_field, decrypt_fields, encrypt_field
+
+
+FIELD_CRYPTO_V = 1
+ROW_CRYPTO_V = 2
+WRITE_CRYPTO_V_ENV_VAR = "SAMSUNGHEALTH_ROW_CRYPTO_V"
+
+
+def write_crypto_v() -> int:
+    """Version utilisée par les chemins bulk pour les nouvelles lignes (1 = rollback)."""
+    return FIELD_CRYPTO_V if os.environ.get(WRITE_CRYPTO_V_ENV_VAR, "").strip() == "1" else ROW_CRYPTO_V
+
+
+@dataclass(frozen=True)
+class RowCodec:
+    """Layout d'un blob row-level : champs, format `struct` (sans bitmap), clé naturelle (AAD)."""
+
+    model: type
+    fields: tuple[str, ...]
+    fmt: str
+    key_cols: tuple[str, ...]
+
+    def __post_init__(self) -> None:
+        if len(self.fields) > 8 or len(self.fields) != len(self.fmt.lstrip("<>=!@")):
+            raise ValueError("RowCodec: 1 code struct par champ, 8 champs max")
+
+    @property
+    def table(self) -> str:
+        return self.model.__tablename__
+
+    @property
+    def version_col(self) -> str:
+        return f"{self.fields[-1]}_crypto_v"
+
+    @cached_property
+    def _struct(self) -> struct.Struct:
+        return struct.Struct("<B" + self.fmt.lstrip("<>=!@"))
+
+    def aad(self, key: Sequence) -> bytes:
+        return "|".join([self.table, *(str(k) for k in key)]).encode("utf-8")
+
+    def pack(self, values: Mapping) -> bytes:
+        nulls = 0
+        packed = []
+        for i, f in enumerate(self.fields):
+            v = values.get(f)
+            if v is None:
+                nulls |= 1 << i
+                v = 0
+            packed.append(v)
+        return self._struct.pack(nulls, *packed)
+
+    def unpack(self, plaintext: bytes) -> dict:
+        nulls, *vals = self._struct.unpack(plaintext)
+        return {f: None if nulls >> i & 1 else v for i, (f, v) in enumerate(zip(self.fields, vals))}
+
+    def encrypt(self, values: Mapping, key: Sequence) -> bytes:
+        return encrypt_field(self.pack(values), aad=self.aad(key))
+
+    def decrypt(self, blob: bytes, key: Sequence) -> dict:
+        return self.unpack(decrypt_field(bytes(blob), aad=self.aad(key)))
+
+    def decrypt_many(self, blobs: Sequence[bytes], keys: Sequence[Sequence]) -> list[dict]:
+        plain = decrypt_fields(blobs, aads=[self.aad(k) for k in keys])
+        return [self.unpack(p) for p in plain]
+
+    def versions(self, v: int) -> dict:
+        return {f"{f}_crypto_v": v for f in self.fields}
+
+    def to_storage(self, values: Mapping, crypto_v: int | None = None) -> dict:
+        """Ligne prête pour INSERT (mêmes clés pour chaque ligne, contrainte multi-VALUES).
+
+        `values` doit contenir les `key_cols` (AAD) et les `fields` en clair.
+        Valeur hors du format `struct` → repli v1 pour cette ligne.
+        """
+        crypto_v = crypto_v or write_crypto_v()
+        row = dict(values)
+        row["row_blob"] = None
+        if crypto_v == ROW_CRYPTO_V:
+            try:
+                row["row_blob"] = self.encrypt(values, [values[k] for k in self.key_cols])
+            except struct.error:
+                crypto_v = FIELD_CRYPTO_V
+            else:
+                for f in self.fields:
+                    row[f] = None
+        row.update(self.versions(crypto_v))
+        return row
+
+
+HEART_RATE_ROW = RowCodec(
+    model=HeartRateHourly,
+    fields=("min_bpm", "max_bpm", "avg_bpm"),
+    fmt="hhh",
+    key_cols=("user_id", "date", "hour"),
+)
+
+ROW_CODECS: tuple[RowCodec, ...] = (HEART_RATE_ROW,)
+
+
+def _install_orm_hooks(codec: RowCodec) -> None:
+    def _fill(target, *_args) -> None:
+        if getattr(target, codec.version_col, None) != ROW_CRYPTO_V:
+            return
+        blob = target.__dict__.get("row_blob")
+        if blob is None:
+            return
+        values = codec.decrypt(blob, [getattr(target, k) for k in codec.key_cols])
+        for f, v in values.items():
+            set_committed_value(target, f, v)
+
+    event.listen(codec.model, "load", _fill)
+    event.listen(codec.model, "refresh", _fill)
+
+
+for _codec in ROW_CODECS:
+    _install_orm_hooks(_codec)
+
+
+def _with_row_columns(stmt: Select, codec: RowCodec) -> tuple[Select, list[str]]:
+    model = codec.model
+    keys = [c.key for c in stmt.selected_columns]
+    extra = [model.row_blob, getattr(model, codec.version_col), *(getattr(model, k) for k in codec.key_cols)]
+    return stmt.add_columns(*(c.label(f"rc_{i}") for i, c in enumerate(extra))), keys
+
+
+def _resolve_rows(rows: Sequence, keys: list[str], codec: RowCodec) -> list[tuple]:
+    n = len(keys)
+    v2 = [i for i, r in enumerate(rows) if r[n + 1] == ROW_CRYPTO_V]
+    RowT = namedtuple("DecryptedRow", keys, rename=True)
+    out = [list(r[:n]) for r in rows]
+    if v2:
+        positions = {f: keys.index(f) for f in codec.fields if f in keys}
+        decoded = codec.decrypt_many([rows[i][n] for i in v2], [rows[i][n + 2 :] for i in v2])
+        for i, values in zip(v2, decoded):
+            for f, pos in positions.items():
+                out[i][pos] = values[f]
+    return [RowT._make(r) for r in out]
+
+
+def execute_row_decrypted(db: Session, stmt: Select, codec: RowCodec) -> list[tuple]:
+    """Comme `execute_decrypted`, en résolvant aussi les lignes crypto_v=2.
+
+    `stmt` sélectionne des colonnes de `codec.model` (champs chiffrés compris) ;
+    `row_blob`, la version et la clé naturelle sont ajoutés en interne puis
+    retirés. Les blobs v2 sont déchiffrés en un lot.
+    """
+    full, keys = _with_row_columns(stmt, codec)
+    rows = execute_decrypted(db, full)
+    if not rows:
+        return []
+    return _resolve_rows(rows, keys, codec)
+
+
+def iter_row_decrypted(db: Session, stmt: Select, codec: RowCodec, batch_size: int) -> Iterator[list[tuple]]:
+    """Variante streaming d'`execute_row_decrypted` (1 lot par partition `yield_per`)."""
+    full, keys = _with_row_columns(stmt, codec)
+    for part in iter_decrypted(db, full, batch_size):
+        yield _resolve_rows(part, keys, codec)
+
+
+async def execute_row_decrypted_async(db: AsyncSession, stmt: Select, codec: RowCodec) -> list[tuple]:
+    """`execute_row_decrypted` sur une `AsyncSession`."""
+    full, keys = _with_row_columns(stmt, codec)
+    rows = await execute_decrypted_async(db, full)
+    if not rows:
+        return []
+    return await decode_off_loop(rows, _resolve_rows, rows, keys, codec)
+
+
+async def stream_row_decrypted(
+    db: AsyncSession, stmt: Select, codec: RowCodec, batch_size: int
+) -> AsyncIterator[list[tuple]]:
+    """`iter_row_decrypted` sur une `AsyncSession`."""
+    full, keys = _with_row_columns(stmt, codec)
+    async for part in stream_decrypted(db, full, batch_size):
+        yield await decode_off_loop(part, _resolve_rows, part, keys, codec)
+
+
+def reencrypt_batch(
+    db: Session, codec: RowCodec, target_v: int, *, after_id=None, limit: int = 1000
+) -> tuple[int, object]:
+    """Convertit jusqu'à `limit` lignes vers `target_v`. Retourne (n, dernier id).
+
+    Sélection `FOR UPDATE SKIP LOCKED` des lignes encore dans l'autre version,
+    par id croissant depuis `after_id` : reprise possible n'importe quand (les
+    lignes déjà converties ne sont plus sélectionnées), compatible avec
+    l'ingest concurrent. Caller commit (1 transaction par batch).
+    """
+    model = codec.model
+    source_v = FIELD_CRYPTO_V if target_v == ROW_CRYPTO_V else ROW_CRYPTO_V
+    cols = [model.id, *(getattr(model, k) for k in codec.key_cols)]
+    if source_v == FIELD_CRYPTO_V:
+        cols += [getattr(model, f) for f in codec.fields]
+    else:
+        cols.append(model.row_blob)
+    stmt = select(*cols).where(getattr(model, codec.version_col) == source_v)
+    if after_id is not None:
+        stmt = stmt.where(model.id > after_id)
+    stmt = stmt.order_by(model.id).limit(limit).with_for_update(skip_locked=True)
+    rows = execute_decrypted(db, stmt)
+    if not rows:
+        return 0, after_id
+
+    nk = len(codec.key_cols)
+    params = []
+    if source_v == FIELD_CRYPTO_V:
+        for r in rows:
+            values = dict(zip(codec.fields, r[1 + nk :]))
+            params.append({"id": r[0], **codec.to_storage({**values, **dict(zip(codec.key_cols, r[1 : 1 + nk]))}, ROW_CRYPTO_V)})
+    else:
+        decoded = codec.decrypt_many([r[-1] for r in rows], [r[1 : 1 + nk] for r in rows])
+        for r, values in zip(rows, decoded):
+            params.append({"id": r[0], **values, "row_blob": None, **codec.versions(FIELD_CRYPTO_V)})
+    # Clés naturelles inchangées : on ne réécrit que payload + versions.
+    for p in params:
+        for k in codec.key_cols:
+            p.pop(k, None)
+    db.execute(update(model), params)
+    return len(rows), rows[-1][0]
@@ -0,0 +1,123 @@
+"""ETag fort + GET conditionnels (304) des séries santé.
+
+L'ETag d'une réponse est dérivé d'un watermark SQL bon marché calculé sur les
+lignes que la requête couvre (mêmes filtres user / plage, range scan sur
+l'index (user_id, temps)) :
+- `count(*)`          → insertions / suppressions (erase RGPD compris) ;
+- `max(updated_at)`   → mises à jour (upsert des rollups) ;
+- `sum(xmin)`         → mises à jour d'une transaction démarrée avant la
+  dernière connue (`now()` = début de transaction, `max(updated_at)` ne bouge
+  alors pas ; `xmin` change à chaque nouvelle version de ligne).
+Le watermark est haché avec le user, la route et la query string complète
+(format, granularité, page... = représentations distinctes).
+
+`If-None-Match` correspondant → 304 immédiat : ni lecture des lignes, ni
+déchiffrement, ni sérialisation. `Cache-Control: private, no-cache` : le
+navigateur garde la réponse et revalide à chaque fetch, les proxies ne stockent
+rien. Compteurs hit / miss par route (`etag_counters()`), et champ `etag` de
+l'événement `request.complete`.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import Counter
+from uuid import UUID
+
+from fastapi import Request, Response
+from sqlalchemy import Select, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.metrics import REGISTRY
+
+
+# À incrémenter quand la représentation JSON d'une route change à données égales.
+ETAG_VERSION = "1"
+CACHE_CONTROL = "private, no-cache"
+
+_counters: Counter[tuple[str, str]] = Counter()
+_counters_lock = threading.Lock()
+
+
+def watermark(model, *filters) -> Select:
+    """`(count, max(updated_at), sum(xmin))` des lignes de `model` filtrées."""
+    return select(
+        func.count(),
+        func.max(model.updated_at),
+        func.sum(literal_column(f"{model.__tablename__}.xmin::text::bigint")),
+    ).where(*filters)
+
+
+def _etag(request: Request, user_id: UUID, mark: tuple) -> str:
+    h = hashlib.sha256()
+    parts = (
+        ETAG_VERSION,
+        str(user_id),
+        request.url.path,
+        repr(sorted(request.query_params.multi_items())),
+        *(v.isoformat() if hasattr(v, "isoformat") else str(v) for v in mark),
+    )
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return f'"{h.hexdigest()[:32]}"'
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    """Comparaison faible (RFC 9110 §13.1.2) : `W/` ignoré, `*` accepté."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _record(request: Request, route: str, outcome: str) -> None:
+    request.state.etag = outcome
+    with _counters_lock:
+        _counters[(route, outcome)] += 1
+
+
+def etag_counters() -> dict[str, dict[str, int]]:
+    """`{route: {"hit": n, "miss": n}}` depuis le démarrage du process."""
+    with _counters_lock:
+        items = list(_counters.items())
+    out: dict[str, dict[str, int]] = {}
+    for (route, outcome), n in items:
+        out.setdefault(route, {"hit": 0, "miss": 0})[outcome] = n
+    return out
+
+
+def reset_etag_counters() -> None:
+    with _counters_lock:
+        _counters.clear()
+
+
+def cache_headers(response: Response) -> dict[str, str]:
+    """ETag / Cache-Control posés par `not_modified`, à reporter sur une `Response` retournée (NDJSON)."""
+    return {k: response.headers[k] for k in ("etag", "cache-control") if k in response.headers}
+
+
+async def not_modified(
+    request: Request, response: Response, db: AsyncSession, user_id: UUID, *marks: Select, route: str
+) -> Response | None:
+    """304 si `If-None-Match` correspond au watermark courant, sinon None + headers posés sur `response`."""
+    mark: tuple = ()
+    for stmt in marks:
+        mark += tuple((await db.execute(stmt)).one())
+    etag = _etag(request, user_id, mark)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _matches(request.headers.get("if-none-match"), etag):
+        _record(request, route, "hit")
+        return Response(status_code=304, headers=headers)
+    _record(request, route, "miss")
+    response.headers.update(headers)
+    return None
+
+
+@REGISTRY.collector
+def _etag_metrics():
+    points = [((route, outcome), n) for route, counts in etag_counters().items() for outcome, n in counts.items()]
+    yield "samsunghealth_etag_total", "counter", "GET conditionnels : 304 (hit) / 200 (miss).", ("route", "outcome"), points
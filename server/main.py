@@ -1,13 +1,11 @@
 import time
 from contextlib import asynccontextmanager
-from pathlib import Path
 
 from fastapi import FastAPI
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
 from slowapi.errors import RateLimitExceeded
 
 from server.logging_config import configure_logging, get_logger
+from server.middleware.compression import CompressionMiddleware
 from server.middleware.rate_limit_context import RateLimitContextMiddleware
 from server.middleware.request_context import RequestContextMiddleware
 from server.middleware.security_headers import SecurityHeadersMiddleware
@@ -17,6 +15,7 @@ from server.security.rate_limit import (
     _validate_trusted_proxies_at_boot,
     limiter,
 )
+from server.static_assets import STATIC_DIR, PrecompressedStaticFiles, html_page
 
 
 def _validate_encryption_at_boot() -> None:
@@ -80,10 +79,12 @@ from server.routers import (  # noqa: E402
     health as health_router,
     heartrate,
     me as me_router,
+    metrics as metrics_router,
     mood,
     sleep,
     static_pages,
     steps,
+    trends,
 )
 
 app = FastAPI(title="SamsungHealth", lifespan=lifespan)
@@ -94,7 +95,9 @@ app = FastAPI(title="SamsungHealth", lifespan=lifespan)
 # is set before slowapi key_func is invoked), and per-route slowapi check runs
 # BEFORE FastAPI dependency resolution (so rate-limit fires before auth — H1 / #43).
 app.state.limiter = limiter
-app.add_middleware(RequestContextMiddleware)       # innermost
+# Compression au plus près de l'app : les couches externes ne posent que des headers.
+app.add_middleware(CompressionMiddleware)          # innermost
+app.add_middleware(RequestContextMiddleware)
 # V2.3.3.2 — security headers wrap the response BEFORE slowapi can inject its own
 # rate-limit headers; mounted between request_context (innermost) and slowapi
 # layers so all responses (404, 4xx, 5xx) carry CSP/XFO/etc.
@@ -114,14 +117,16 @@ app.include_router(steps.router)
 app.include_router(heartrate.router)
 app.include_router(exercise.router)
 app.include_router(mood.router)
+app.include_router(trends.router)
 app.include_router(me_router.router)
 # Phase 6 CI/CD MVP — liveness/readiness probes (public, no auth).
 app.include_router(health_router.router)
+app.include_router(metrics_router.router)
 
-static_dir = Path(__file__).resolve().parent.parent / "static"
-app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+# Siblings .br/.gz et copies hashées de static/dist/ : scripts/build_static.py.
+app.mount("/static", PrecompressedStaticFiles(directory=str(STATIC_DIR)), name="static")
 
 
 @app.get("/")
 def index():
-    return FileResponse(str(static_dir / "index.html"))
+    return html_page(STATIC_DIR / "index.html")
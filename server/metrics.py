@@ -0,0 +1,394 @@
+"""Registre de métriques in-process, exposé au format texte Prometheus (GET /metrics).
+
+Pas de dépendance (`prometheus_client`) : compteurs et histogrammes à buckets
+fixes, un verrou par série, quelques centaines de ns par observation —
+laissé actif en prod (mesure : `scripts/bench_metrics.py`).
+
+Séries par requête (`RequestContextMiddleware`, en fin de requête) :
+- `samsunghealth_http_request_duration_seconds{route,method,status}` ;
+- `samsunghealth_request_db_seconds{route}` : temps passé dans le driver
+  (`before/after_cursor_execute`) par requête ayant exécuté du SQL ;
+- `samsunghealth_db_queries_total`, `samsunghealth_db_rows_total` (lignes
+  renvoyées par les SELECT bufferisés ; pas les curseurs serveur NDJSON),
+  `samsunghealth_decrypt_total` (blobs AES-GCM déchiffrés) par route ;
+- `samsunghealth_rate_limit_hits_total{route}` : compté par le handler 429
+  (server/security/rate_limit.py), les 429 pré-auth ne traversant pas ce
+  middleware.
+`route` = template FastAPI ; hors route (404...) : `<unmatched>` (pas de
+cardinalité pilotée par le client).
+
+Ailleurs : collecteurs lus au scrape (pools DB dans server/database.py,
+ETag dans server/etag.py, cache de réponses dans server/response_cache.py)
+et compteur de compression (server/middleware/compression.py).
+
+Cumul par requête : `track_request()` ouvre un dict dans une ContextVar
+(partagé par le threadpool AnyIO et les greenlets SQLAlchemy, qui héritent du
+contexte), `request_stats(token)` le referme ; repris dans `request.complete`.
+
+Détecteur N+1 (dev / test) : seuil `SAMSUNGHEALTH_N_PLUS_ONE_THRESHOLD`
+(défaut 10 si `APP_ENV` vaut dev ou test, désactivé sinon ; 0 = désactivé).
+Les statements de la requête sont regroupés par forme (`statement_shape` :
+paramètres et listes IN / VALUES réduits à `?`) ; une forme exécutée plus de
+N fois sort dans `n_plus_one` et un warning `db.n_plus_one`. Un
+`executemany` compte pour un statement. En prod, aucun coût par statement.
+"""
+from __future__ import annotations
+
+import math
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _Tally
+from collections.abc import Callable, Iterable
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import Engine, event
+
+
+# Bornes hautes (s), +Inf implicite.
+LATENCY_BUCKETS_S = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+UNMATCHED_ROUTE = "<unmatched>"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+N_PLUS_ONE_ENV = "SAMSUNGHEALTH_N_PLUS_ONE_THRESHOLD"
+DEFAULT_N_PLUS_ONE_THRESHOLD = 10
+_SHAPE_MAX_CHARS = 200
+
+_request_stats: ContextVar[dict[str, float] | None] = ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    """Une série : buckets fixes (style Prometheus), thread-safe."""
+
+    __slots__ = ("bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS_S) -> None:
+        self.bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict[str, Any]:
+        """`{"buckets": {borne: cumul}, "count", "sum"}`."""
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, running = {}, 0
+        for bound, n in zip((*map(_fmt, self.bounds), "+Inf"), counts):
+            running += n
+            cumulative[bound] = running
+        return {"buckets": cumulative, "count": running, "sum": total}
+
+
+class _Family:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self) -> Iterable[tuple[str, tuple, float]]:
+        with self._lock:
+            items = list(self._values.items())
+        for values, v in items:
+            yield self.name, values, v
+
+    def value(self, *label_values: str) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+
+class LabeledHistogram(_Family):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labels: tuple[str, ...] = (), bounds: tuple[float, ...] = LATENCY_BUCKETS_S
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.bounds = bounds
+        self._series: dict[tuple, Histogram] = {}
+
+    def series(self, *label_values: str) -> Histogram:
+        hist = self._series.get(label_values)
+        if hist is None:
+            with self._lock:
+                hist = self._series.setdefault(label_values, Histogram(self.bounds))
+        return hist
+
+    def observe(self, value: float, *label_values: str) -> None:
+        self.series(*label_values).observe(value)
+
+    def samples(self) -> Iterable[tuple[str, tuple, float]]:
+        with self._lock:
+            items = list(self._series.items())
+        for values, hist in items:
+            yield from _histogram_samples(self.name, values, hist.snapshot())
+
+
+def _histogram_samples(name: str, values: tuple, snap: dict) -> Iterable[tuple[str, tuple, float]]:
+    for bound, n in snap["buckets"].items():
+        yield f"{name}_bucket", (*values, ("le", bound)), n
+    yield f"{name}_sum", values, snap["sum"]
+    yield f"{name}_count", values, snap["count"]
+
+
+class CounterGroup:
+    """Compteurs de mêmes labels incrémentés ensemble : un appel, un verrou.
+
+    Exporté via `Registry.collector(group.collect)`.
+    """
+
+    def __init__(self, metrics: tuple[tuple[str, str], ...], labels: tuple[str, ...]) -> None:
+        self.metrics = metrics  # ((nom, help), ...)
+        self.labels = labels
+        self._values: dict[tuple, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values: tuple, amounts: tuple[float, ...]) -> None:
+        with self._lock:
+            current = self._values.get(label_values)
+            if current is None:
+                self._values[label_values] = list(amounts)
+            else:
+                for i, n in enumerate(amounts):
+                    current[i] += n
+
+    def value(self, name: str, *label_values: str) -> float:
+        i = [m for m, _ in self.metrics].index(name)
+        with self._lock:
+            return self._values.get(label_values, [0] * len(self.metrics))[i]
+
+    def collect(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for i, (name, help) in enumerate(self.metrics):
+            yield name, "counter", help, self.labels, [(k, v[i]) for k, v in items]
+
+
+# (nom, type, help, labels, [(labels values, valeur)]) — produit au scrape.
+Collected = tuple[str, str, str, tuple[str, ...], list[tuple[tuple, Any]]]
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._families: list[_Family] = []
+        self._collectors: list[Callable[[], Iterable[Collected]]] = []
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        family = Counter(name, help, labels)
+        self._families.append(family)
+        return family
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), **kw) -> LabeledHistogram:
+        family = LabeledHistogram(name, help, labels, **kw)
+        self._families.append(family)
+        return family
+
+    def collector(self, fn: Callable[[], Iterable[Collected]]) -> Callable[[], Iterable[Collected]]:
+        """Décorateur : `fn()` lu à chaque scrape (métriques tenues ailleurs)."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for family in self._families:
+            _header(lines, family.name, family.kind, family.help)
+            for name, values, v in family.samples():
+                lines.append(_sample(name, family.labels, values, v))
+        for collect in self._collectors:
+            for name, kind, help, labels, points in collect():
+                _header(lines, name, kind, help)
+                for values, v in points:
+                    if kind == "histogram":
+                        for sname, svalues, sv in _histogram_samples(name, values, v):
+                            lines.append(_sample(sname, labels, svalues, sv))
+                    else:
+                        lines.append(_sample(name, labels, values, v))
+        return "\n".join(lines) + "\n"
+
+
+def _fmt(v: float) -> str:
+    if isinstance(v, float):
+        if math.isinf(v):
+            return "+Inf"
+        return repr(v) if v != int(v) or abs(v) >= 1e15 else f"{v:.1f}"
+    return str(v)
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _header(lines: list[str], name: str, kind: str, help: str) -> None:
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _sample(name: str, labels: tuple[str, ...], values: tuple, v: float) -> str:
+    # Dernier élément éventuel : `("le", borne)` des buckets.
+    pairs = list(zip(labels, values))
+    if len(values) > len(labels):
+        pairs.append(values[-1])
+    label_str = ",".join(f'{k}="{_escape(val)}"' for k, val in pairs)
+    return f"{name}{{{label_str}}} {_fmt(v)}" if label_str else f"{name} {_fmt(v)}"
+
+
+REGISTRY = Registry()
+
+HTTP_DURATION = REGISTRY.histogram(
+    "samsunghealth_http_request_duration_seconds", "Latence des requêtes HTTP.", ("route", "method", "status")
+)
+REQUEST_DB_SECONDS = REGISTRY.histogram(
+    "samsunghealth_request_db_seconds", "Temps SQL (driver) par requête.", ("route",)
+)
+# Ordre = tuple passé à `ROUTE_DB.inc`.
+ROUTE_DB = CounterGroup(
+    (
+        ("samsunghealth_db_queries_total", "Requêtes SQL exécutées."),
+        ("samsunghealth_db_rows_total", "Lignes renvoyées par les SELECT bufferisés."),
+        ("samsunghealth_decrypt_total", "Blobs AES-GCM déchiffrés."),
+    ),
+    ("route",),
+)
+REGISTRY.collector(ROUTE_DB.collect)
+RATE_LIMIT_HITS = REGISTRY.counter("samsunghealth_rate_limit_hits_total", "Réponses 429.", ("route",))
+
+
+# ── Cumul par requête ─────────────────────────────────────────────────────
+_STAT_KEYS = ("db_checkouts", "db_checkout_ms", "db_wait_ms", "db_queries", "db_time_ms", "db_rows", "decrypts")
+
+
+@lru_cache(maxsize=1)
+def n_plus_one_threshold() -> int:
+    """Seuil du détecteur N+1, 0 si désactivé (lu une fois ; `cache_clear()` en test)."""
+    raw = os.environ.get(N_PLUS_ONE_ENV)
+    if raw is None:
+        dev = os.environ.get("APP_ENV", "prod").lower() in ("dev", "test")
+        return DEFAULT_N_PLUS_ONE_THRESHOLD if dev else 0
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        return 0
+
+
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|\$\d+|\?|(?<!:):\w+")
+_LIST_RE = re.compile(r"\?(?:\s*,\s*\?)+")
+_ROWS_RE = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+
+
+def statement_shape(statement: str) -> str:
+    """Forme d'un statement : espaces normalisés, paramètres / listes IN / VALUES → `?`."""
+    shape = _PARAM_RE.sub("?", " ".join(statement.split()))
+    return _ROWS_RE.sub("(?)", _LIST_RE.sub("?", shape))
+
+
+def track_request():
+    """Ouvre le cumul de la requête courante (middleware) ; fermé par `request_stats(token)`."""
+    stats: dict[str, Any] = dict.fromkeys(_STAT_KEYS, 0)
+    if n_plus_one_threshold():
+        stats["shapes"] = _Tally()
+    return _request_stats.set(stats)
+
+
+def current_request_stats() -> dict[str, float] | None:
+    """Dict de la requête en cours (None hors requête : scripts, tâches de fond)."""
+    return _request_stats.get()
+
+
+def request_stats(token) -> dict[str, Any]:
+    """Cumul de la requête, clés à zéro omises (champs du log `request.complete`).
+
+    Détecteur actif : `n_plus_one` = `[{"statement", "count"}]` des formes
+    répétées au-delà du seuil.
+    """
+    current = _request_stats.get()
+    _request_stats.reset(token)
+    shapes = current.pop("shapes", None)
+    if not current["db_checkouts"] and not current["db_queries"] and not current["decrypts"]:
+        return {}
+    out: dict[str, Any] = {k: round(v, 3) if isinstance(v, float) else v for k, v in current.items() if v}
+    if shapes:
+        threshold = n_plus_one_threshold()
+        repeated = [
+            {"statement": shape[:_SHAPE_MAX_CHARS], "count": n} for shape, n in shapes.most_common() if n > threshold
+        ]
+        if repeated:
+            out["n_plus_one"] = repeated
+    return out
+
+
+def count_decrypts(n: int) -> None:
+    if n and (current := _request_stats.get()) is not None:
+        current["decrypts"] += n
+
+
+def observe_request(route: str | None, method: str, status: int, seconds: float, stats: dict[str, float]) -> None:
+    """Fin de requête : histogrammes + compteurs depuis le cumul `stats`."""
+    route = route or UNMATCHED_ROUTE
+    HTTP_DURATION.observe(seconds, route, method, str(status))
+    if not stats:
+        return
+    queries = stats.get("db_queries", 0)
+    if queries:
+        REQUEST_DB_SECONDS.observe(stats.get("db_time_ms", 0) / 1000.0, route)
+    decrypts = stats.get("decrypts", 0)
+    if queries or decrypts:
+        ROUTE_DB.inc((route,), (queries, stats.get("db_rows", 0), decrypts))
+
+
+# ── Temps SQL par requête (tous les engines, sync et async) ───────────────
+# Début du statement posé sur son ExecutionContext : jeté avec lui si le
+# statement lève (pas d'`after_cursor_execute`), rien ne reste sur la connexion poolée.
+_QUERY_START = "_metrics_query_start"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _request_stats.get() is not None:
+        setattr(context, _QUERY_START, time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    current = _request_stats.get()
+    start = getattr(context, _QUERY_START, None)
+    if current is None or start is None:
+        return
+    current["db_time_ms"] += (time.perf_counter() - start) * 1000.0
+    current["db_queries"] += 1
+    if (shapes := current.get("shapes")) is not None:
+        shapes[statement_shape(statement)] += 1
+    if context is not None and not (context.isinsert or context.isupdate or context.isdelete or context.isddl):
+        rowcount = cursor.rowcount
+        if rowcount > 0:
+            current["db_rows"] += rowcount
+
+
+def instrument_engines() -> None:
+    """Listeners `before/after_cursor_execute` sur la classe `Engine` (idempotent)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
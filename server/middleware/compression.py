@@ -0,0 +1,255 @@
+"""Compression des réponses (gzip, + br / zstd si le client les annonce).
+
+Middleware ASGI pur, le plus interne de la pile : RequestContext (X-Request-ID,
+log `request.complete`) et SecurityHeaders posent leurs headers sur la
+réponse déjà compressée, sans toucher au corps.
+
+- Négociation `Accept-Encoding` (q-values, `*`, `identity;q=0`), préférence
+  serveur zstd > br > gzip parmi les codecs installés (`zstandard`, `brotli`
+  optionnels, gzip toujours dispo).
+- Corps d'un seul message : compressé si >= `SAMSUNGHEALTH_COMPRESS_MIN_BYTES`
+  (défaut 1024). En dessous, le framing coûte plus qu'il ne rapporte.
+- Corps streamé (NDJSON, FileResponse) : compressé au fil de l'eau, flush à
+  chaque chunk (une ligne NDJSON émise arrive au client sans attendre la
+  suivante), `Content-Length` retiré. Un stream annonçant une
+  `Content-Length` sous le seuil passe tel quel.
+- Types compressibles seulement (texte, JSON/NDJSON, JS, SVG, polices TTF).
+- Jamais : réponse déjà encodée (statiques précompressés, cf.
+  server/static_assets.py), `Cache-Control: no-transform`, HEAD, 204/304,
+  et pages/API `/auth/` et `/admin/` — elles portent tokens et CSRF, pas de
+  compression à côté d'entrées réfléchies (BREACH).
+- ETag fort → faible (`W/`) sur la représentation compressée (pas octet pour
+  octet la même) ; `server.etag._matches` et StaticFiles comparent en faible.
+- `Vary: Accept-Encoding` sur toute réponse compressible, compressée ou non.
+- Compteur `samsunghealth_compressed_responses_total{encoding}` (GET /metrics).
+"""
+from __future__ import annotations
+
+import os
+import zlib
+from collections.abc import Sequence
+
+from server.metrics import REGISTRY
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover — br désactivé
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover — zstd désactivé
+    zstandard = None
+
+
+DEFAULT_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+_EXCLUDED_PREFIXES = ("/auth/", "/admin/")
+_COMPRESSIBLE_TYPES = frozenset(
+    {
+        "application/json",
+        "application/x-ndjson",
+        "application/javascript",
+        "application/xml",
+        "image/svg+xml",
+        "font/ttf",
+    }
+)
+
+
+class _Gzip:
+    def __init__(self) -> None:
+        self._z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush()
+
+
+class _Brotli:
+    def __init__(self) -> None:
+        self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.finish()
+
+
+class _Zstd:
+    def __init__(self) -> None:
+        self._c = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush()
+
+
+COMPRESSED = REGISTRY.counter(
+    "samsunghealth_compressed_responses_total", "Réponses compressées à la volée.", ("encoding",)
+)
+
+
+# Ordre = préférence serveur à q égal.
+ENCODERS: dict[str, type] = {
+    **({"zstd": _Zstd} if zstandard is not None else {}),
+    **({"br": _Brotli} if brotli is not None else {}),
+    "gzip": _Gzip,
+}
+
+
+def _negotiate(accept_encoding: str, available: Sequence[str]) -> str | None:
+    """Codage de `available` au q le plus haut (> 0), préférence serveur à égalité."""
+    q: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        q[name.strip()] = weight
+    best, best_q = None, 0.0
+    for enc in available:
+        weight = q.get(enc, q.get("*", 0.0))
+        if weight > best_q:
+            best, best_q = enc, weight
+    return best
+
+
+def _min_bytes() -> int:
+    try:
+        return int(os.environ.get("SAMSUNGHEALTH_COMPRESS_MIN_BYTES", DEFAULT_MIN_BYTES))
+    except ValueError:
+        return DEFAULT_MIN_BYTES
+
+
+def _compressible(content_type: str) -> bool:
+    media = content_type.split(";", 1)[0].strip().lower()
+    return (
+        media.startswith("text/")
+        or media in _COMPRESSIBLE_TYPES
+        or media.endswith("+json")
+        or media.endswith("+xml")
+    )
+
+
+def _header(headers: list, name: bytes) -> bytes | None:
+    for k, v in headers:
+        if k.lower() == name:
+            return v
+    return None
+
+
+def _set_header(headers: list, name: bytes, value: bytes) -> list:
+    return [(k, v) for k, v in headers if k.lower() != name] + [(name, value)]
+
+
+def _add_vary(headers: list) -> list:
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return headers + [(b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower() or vary.strip() == b"*":
+        return headers
+    return _set_header(headers, b"vary", vary + b", Accept-Encoding")
+
+
+def _weaken_etag(headers: list) -> list:
+    etag = _header(headers, b"etag")
+    if etag is None or etag.startswith(b"W/"):
+        return headers
+    return _set_header(headers, b"etag", b"W/" + etag)
+
+
+class CompressionMiddleware:
+    """ASGI pur. Monté en premier (`add_middleware`) → le plus interne."""
+
+    def __init__(self, app, minimum_size: int | None = None):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        path = scope.get("path", "")
+        accept = _header(scope.get("headers") or [], b"accept-encoding")
+        encoding = _negotiate(accept.decode("latin-1"), tuple(ENCODERS)) if accept else None
+        if encoding is None or path.startswith(_EXCLUDED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        # FileResponse enverrait un `pathsend` (fichier hors corps) : on veut le corps.
+        # Scope modifié en place : RequestContext y relit `route` après coup.
+        extensions = scope.get("extensions") or {}
+        if "http.response.pathsend" in extensions:
+            scope["extensions"] = {k: v for k, v in extensions.items() if k != "http.response.pathsend"}
+
+        minimum = self.minimum_size if self.minimum_size is not None else _min_bytes()
+        start: dict | None = None
+        encoder = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, encoder, passthrough
+            kind = message["type"]
+            if kind == "http.response.start":
+                headers = list(message.get("headers") or [])
+                content_type = _header(headers, b"content-type")
+                cache_control = _header(headers, b"cache-control") or b""
+                if (
+                    message["status"] < 200
+                    or message["status"] in (204, 304)
+                    or content_type is None
+                    or not _compressible(content_type.decode("latin-1"))
+                    or _header(headers, b"content-encoding") is not None
+                    or b"no-transform" in cache_control.lower()
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                start = {**message, "headers": _add_vary(headers)}
+                return
+            if kind != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if encoder is None:
+                # 1er chunk : décision selon taille (corps entier ou Content-Length annoncée).
+                length = _header(start["headers"], b"content-length")
+                size = int(length) if length is not None else (None if more else len(body))
+                if size is not None and size < minimum:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                encoder = ENCODERS[encoding]()
+                COMPRESSED.inc(encoding)
+                headers = _set_header(_weaken_etag(start["headers"]), b"content-encoding", encoding.encode())
+                if more:
+                    headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+                    await send({**start, "headers": headers})
+                else:
+                    data = encoder.finish(body)
+                    headers = _set_header(headers, b"content-length", str(len(data)).encode())
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": data, "more_body": False})
+                    return
+            data = encoder.chunk(body) if more else encoder.finish(body)
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
@@ -6,7 +6,13 @@ Pure ASGI middleware qui :
   émis pendant la request via `structlog.contextvars.merge_contextvars`.
 - Renvoie le `X-Request-ID` dans response headers.
 - Mesure la latence (`perf_counter`) et émet `request.complete` (INFO/WARNING/ERROR
-  selon status code) avec `latency_ms` + `route` (template FastAPI).
+  selon status code) avec `latency_ms` + `route` (template FastAPI), et si la
+  requête a touché la DB : `db_checkouts`, `db_checkout_ms`, `db_wait_ms`
+  (attente pool plein), `db_queries`, `db_time_ms`, `db_rows`, `decrypts`.
+- Dev / test : warning `db.n_plus_one` si un même statement (forme) est
+  exécuté plus de N fois dans la requête (cf. server/metrics.py).
+- Alimente le registre de server/metrics.py (histogramme de latence par
+  route / méthode / status, temps SQL, 429) exposé par GET /metrics.
 """
 from __future__ import annotations
 
@@ -18,6 +24,7 @@ from contextvars import ContextVar
 import structlog
 
 from server.logging_config import get_logger
+from server.metrics import observe_request, request_stats, track_request
 
 
 request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
@@ -83,6 +90,9 @@ class RequestContextMiddleware:
             user_id=None,
         )
 
+        # Dict partagé avec `request.state` des handlers (`etag` / `cache` : hit|miss)
+        state = scope.setdefault("state", {})
+        token_stats = track_request()
         start = time.perf_counter()
         status_holder: dict = {"code": 500, "started": False}
 
@@ -129,10 +139,17 @@ class RequestContextMiddleware:
                     )
                 raise
         finally:
-            latency_ms = (time.perf_counter() - start) * 1000.0
+            elapsed = time.perf_counter() - start
+            latency_ms = elapsed * 1000.0
             route = _resolve_route_template(scope)
+            stats = request_stats(token_stats)
+            repeated = stats.pop("n_plus_one", None)
+            matched = getattr(scope.get("route"), "path", None)
+            observe_request(matched, scope.get("method"), status_holder["code"], elapsed, stats)
             level = _level_for_status(status_holder["code"])
             log = get_logger("server.middleware.request_context")
+            if repeated:
+                log.warning("db.n_plus_one", route=route, method=scope.get("method"), statements=repeated)
             log_method = getattr(log, level)
             log_method(
                 "request.complete",
@@ -140,6 +157,8 @@ class RequestContextMiddleware:
                 method=scope.get("method"),
                 status=status_holder["code"],
                 latency_ms=round(latency_ms, 3),
+                **{k: state[k] for k in ("etag", "cache") if k in state},
+                **stats,
             )
             structlog.contextvars.unbind_contextvars("request_id", "user_id")
             request_id_var.reset(token_rid)
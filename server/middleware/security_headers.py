@@ -11,7 +11,7 @@ Applique sur TOUS les responses :
 - Content-Security-Policy différencié par path (auth strict / dashboard tolère
   unsafe-inline pour D3 / api minimal)
 - Cache-Control sur pages auth (no-store) et statics (no-cache si pas de ?v=,
-  immutable si versionné)
+  immutable si versionné ou copie hashée sous /static/dist/)
 """
 from __future__ import annotations
 
@@ -21,6 +21,8 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
 
+from server.static_assets import DIST_PREFIX
+
 
 _HSTS_VALUE = "max-age=63072000; includeSubDomains"
 
@@ -75,8 +77,8 @@ def _cache_control_for(path: str, query: str) -> str | None:
         # Pages HTML auth — no-store (sensitive surface).
         return "no-store"
     if path.startswith("/static/"):
-        # Versioned static asset (?v=...) → cached 1 year immutable.
-        if query and "v=" in query:
+        # Versioned static asset (?v=... ou nom hashé du build) → cached 1 year immutable.
+        if path.startswith(DIST_PREFIX) or (query and "v=" in query):
             return "public, max-age=31536000, immutable"
         return "no-cache"
     return None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
 
 
 class SleepStageIn(BaseModel):
@@ -35,7 +35,7 @@ class SleepBulkIn(BaseModel):
 
 
 class StepsHourlyIn(BaseModel):
-    date: str
+    date: date
     hour: int
     step_count: int
 
@@ -50,8 +50,15 @@ class StepsBulkIn(BaseModel):
     records: list[StepsHourlyIn]
 
 
+# GET ?granularity=day|week|month — period_start = 1er jour de la période
+class StepsRollupOut(BaseModel):
+    period_start: str
+    step_count: int
+    hour_count: int
+
+
 class HeartRateHourlyIn(BaseModel):
-    date: str
+    date: date
     hour: int
     min_bpm: int
     max_bpm: int
@@ -72,6 +79,15 @@ class HeartRateBulkIn(BaseModel):
     records: list[HeartRateHourlyIn]
 
 
+class HeartRateRollupOut(BaseModel):
+    period_start: str
+    min_bpm: int
+    max_bpm: int
+    avg_bpm: int
+    sample_count: int
+    hour_count: int
+
+
 class ExerciseSessionIn(BaseModel):
     exercise_type: str
     exercise_start: str
@@ -113,3 +129,26 @@ class MoodOut(BaseModel):
 
 class MoodBulkIn(BaseModel):
     entries: list[MoodIn]
+
+
+# NDJSON streaming ingest (POST /api/*/stream) — compteurs de fin de flux
+class NdjsonIngestOut(BaseModel):
+    lines: int
+    inserted: int
+    skipped: int
+    batches: int
+    rejected: int
+    rejected_lines: list[int]
+
+
+# GET /api/trends — agrégats du mois (None si aucune donnée sur la période)
+class TrendsOut(BaseModel):
+    avg_sleep_hours: float | None = None
+    avg_daily_steps: int | None = None
+    resting_hr: int | None = None
+    exercise_count: int
+
+
+# GET ?format=columnar — 1 tableau par champ du *Out de la route (+ `_delta` : unité
+# par colonne temporelle si `&delta=true`), cf. server/columnar.py
+ColumnarOut = dict[str, list | dict[str, str]]
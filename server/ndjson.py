@@ -0,0 +1,139 @@
+"""NDJSON streaming ingest — variante `/stream` des routes POST santé (backfills).
+
+Le body `application/x-ndjson` est lu par chunks (`request.stream()`), découpé
+en lignes, validé ligne par ligne contre le modèle `*In` de la route puis
+flushé en DB par batches de taille fixe (1 commit par batch). La mémoire reste
+bornée par `batch_size` + `MAX_LINE_BYTES` quelle que soit la taille de l'upload.
+
+Une ligne invalide (JSON cassé, schéma, ligne > `MAX_LINE_BYTES`) est rejetée
+sans interrompre le flux ; son numéro (1-based) est rapporté en fin de réponse.
+Les lignes vides sont ignorées.
+"""
+from __future__ import annotations
+
+import json
+from collections.abc import AsyncIterator, Callable, Sequence
+from uuid import UUID
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.orm import Session
+
+from server.database import run_in_thread
+from server.logging_config import get_logger
+from server.models import NdjsonIngestOut
+
+
+_log = get_logger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+DEFAULT_BATCH_SIZE = 500
+MAX_LINE_BYTES = 64 * 1024
+# Au-delà, seul le compteur `rejected` progresse (liste bornée = mémoire bornée).
+MAX_REPORTED_REJECTS = 1000
+
+
+def ndjson_openapi(item_model: type[BaseModel]) -> dict:
+    """`openapi_extra` documentant un body NDJSON (1 objet `item_model` par ligne)."""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {NDJSON_MEDIA_TYPE: {"schema": item_model.model_json_schema()}},
+        }
+    }
+
+
+def _require_ndjson(request: Request) -> None:
+    ctype = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if ctype != NDJSON_MEDIA_TYPE:
+        raise HTTPException(status_code=415, detail="unsupported_media_type")
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[tuple[int, bytes | None]]:
+    """Yield `(lineno, line)` ; `line=None` pour une ligne dépassant `MAX_LINE_BYTES`."""
+    buf = bytearray()
+    lineno = 0
+    oversized = False
+    async for chunk in request.stream():
+        buf.extend(chunk)
+        while True:
+            nl = buf.find(b"\n")
+            if nl < 0:
+                break
+            lineno += 1
+            line = bytes(buf[:nl])
+            del buf[: nl + 1]
+            if oversized:
+                oversized = False
+                yield lineno, None
+            elif len(line) > MAX_LINE_BYTES:
+                yield lineno, None
+            else:
+                yield lineno, line
+        if len(buf) > MAX_LINE_BYTES:
+            # Ligne trop longue sans newline : on jette ce qui est bufferisé
+            # jusqu'à la prochaine fin de ligne.
+            oversized = True
+            buf.clear()
+    if oversized or buf:
+        lineno += 1
+        yield lineno, None if oversized else bytes(buf)
+
+
+async def ingest_ndjson(
+    request: Request,
+    db: Session,
+    user_id: UUID,
+    item_model: type[BaseModel],
+    insert_batch: Callable[[Session, UUID, Sequence], int],
+    *,
+    route: str,
+    batch_size: int | None = None,
+) -> NdjsonIngestOut:
+    """Stream le body, valide chaque ligne en `item_model`, flush via `insert_batch`.
+
+    `insert_batch(db, user_id, items) -> inserted` est la fonction set-based
+    (sync) du router, même chemin que le POST JSON : exécutée avec son commit
+    dans un worker thread (`run_in_thread`), le chiffrement et les rollups du
+    lot ne bloquent pas l'event loop pendant la lecture du body. 1 commit par lot.
+    """
+    _require_ndjson(request)
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    out = NdjsonIngestOut(lines=0, inserted=0, skipped=0, batches=0, rejected=0, rejected_lines=[])
+    batch: list = []
+
+    async def _flush_batch() -> None:
+        inserted = await run_in_thread(db, insert_batch, user_id, batch)
+        out.inserted += inserted
+        out.skipped += len(batch) - inserted
+        out.batches += 1
+        _log.info(
+            "ingest.ndjson.batch",
+            route=route,
+            batch=out.batches,
+            lines=out.lines,
+            inserted=out.inserted,
+            skipped=out.skipped,
+            rejected=out.rejected,
+        )
+        batch.clear()
+
+    async for lineno, line in _iter_lines(request):
+        out.lines = lineno
+        if line is not None and not line.strip():
+            continue
+        try:
+            if line is None:
+                raise ValueError("line too long")
+            item = item_model.model_validate(json.loads(line))
+        except (ValueError, ValidationError):
+            out.rejected += 1
+            if len(out.rejected_lines) < MAX_REPORTED_REJECTS:
+                out.rejected_lines.append(lineno)
+            continue
+        batch.append(item)
+        if len(batch) >= batch_size:
+            await _flush_batch()
+    if batch:
+        await _flush_batch()
+    return out
@@ -0,0 +1,114 @@
+"""Pagination keyset + GET streamés (NDJSON) des séries santé.
+
+Pagination (opt-in, `?limit=N`) : l'ordre est la clé naturelle de la table
+(colonnes du UNIQUE après `user_id`, cf. migration 0012) et le curseur de la
+page suivante est renvoyé dans le header `X-Next-Cursor` (absent = dernière
+page). `?cursor=` reprend strictement après cette clé — `(k1, k2) > (:v1, :v2)`,
+range scan sur l'index composite : coût constant quelle que soit la page, pas
+d'OFFSET. Le corps reste une liste JSON (compat front). Curseur opaque :
+base64url d'une liste JSON des valeurs de clé.
+
+Streaming (`?format=ndjson`) : `StreamingResponse` application/x-ndjson, lignes
+lues par partitions d'un curseur serveur (`db.stream`, `yield_per`) et
+sérialisées lot par lot, sans entités ORM ni modèles Pydantic : mémoire
+constante quelle que soit la plage. `cursor` / `limit` s'appliquent aussi
+(reprise, plafond).
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from collections.abc import AsyncIterable, Callable, Mapping, Sequence
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any
+
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, literal, tuple_
+
+from server.logging_config import get_logger
+from server.ndjson import NDJSON_MEDIA_TYPE
+from server.responses import dumps
+from server.security.crypto import DecryptionError
+
+
+_log = get_logger(__name__)
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_LIMIT = 5000
+STREAM_BATCH_SIZE = 1000
+
+
+def encode_cursor(values: Sequence) -> str:
+    plain = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(plain, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, parsers: Sequence[Callable[[Any], Any]]) -> list:
+    """Valeurs de clé du curseur, parsées colonne par colonne. 400 si invalide."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise ValueError("arité")
+        return [parse(v) for parse, v in zip(parsers, values)]
+    except (ValueError, TypeError, binascii.Error) as exc:
+        raise HTTPException(status_code=400, detail="invalid_cursor") from exc
+
+
+@dataclass(frozen=True)
+class Keyset:
+    """Clé de tri unique d'une série (colonnes ORM) + parseurs des valeurs du curseur."""
+
+    cols: tuple
+    parsers: tuple[Callable[[Any], Any], ...]
+
+    def apply(self, stmt: Select, cursor: str | None, limit: int | None, *, lookahead: bool = True) -> Select:
+        """ORDER BY clé, reprise après `cursor`, LIMIT (+1 ligne sonde si `lookahead`)."""
+        if cursor:
+            values = decode_cursor(cursor, self.parsers)
+            stmt = stmt.where(
+                tuple_(*self.cols) > tuple_(*(literal(v, c.type) for c, v in zip(self.cols, values)))
+            )
+        stmt = stmt.order_by(*self.cols)
+        if limit:
+            stmt = stmt.limit(limit + 1 if lookahead else limit)
+        return stmt
+
+    def page(self, rows: Sequence, limit: int | None, response: Response) -> Sequence:
+        """Tronque la ligne sonde et pose `X-Next-Cursor` s'il reste des lignes."""
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(last, c.key) for c in self.cols])
+        return rows
+
+
+def ndjson_response(
+    chunks: AsyncIterable[Sequence],
+    serialize: Callable[[Any], dict],
+    *,
+    route: str,
+    headers: Mapping[str, str] | None = None,
+) -> StreamingResponse:
+    """1 objet JSON par ligne, 1 écriture par lot de lignes.
+
+    Un échec de déchiffrement en cours de flux (statut 200 déjà envoyé) termine
+    le flux par une ligne `{"error": "internal_decryption_error"}`. `headers` :
+    headers déjà posés sur la `Response` injectée (FastAPI ne les reporte pas sur
+    une `Response` retournée), cf. `server.etag.cache_headers`.
+    """
+
+    async def _body():
+        try:
+            async for chunk in chunks:
+                if chunk:
+                    yield b"".join(dumps(serialize(r)) + b"\n" for r in chunk)
+        except DecryptionError:
+            _log.error("stream.decryption_failed", route=route)
+            yield b'{"error":"internal_decryption_error"}\n'
+
+    return StreamingResponse(_body(), media_type=NDJSON_MEDIA_TYPE, headers=headers)
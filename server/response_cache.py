@@ -0,0 +1,235 @@
+"""Cache de réponses in-process des GET santé (LRU + TTL, borné en octets).
+
+Le téléphone synchronise quelques fois par jour, le dashboard relit en boucle :
+le corps JSON déjà sérialisé d'un GET est gardé, clé
+`(user_id, route, query string triée)` (plage, granularité, format, page...).
+Un hit rejoue octets + ETag / `X-Next-Cursor` sans toucher la DB (ni watermark
+ETag, ni lecture, ni déchiffrement) ; `If-None-Match` y est honoré (304).
+
+Invalidation par user :
+- POST d'ingest (`invalidate_on_commit`) → entrées de la route (+ `/api/trends`
+  qui agrège sleep / steps / heartrate / exercise) ;
+- `erase_user_cascade` → toutes les entrées du user (Art.9 déchiffré ne survit
+  pas aux données) ;
+- l'invalidation est rejouée à chaque commit de la session (ingest NDJSON =
+  1 commit par batch) et incrémente une génération par user : un GET démarré
+  avant ne stocke pas sa réponse (lue avant le commit).
+Écritures hors API (scripts d'import) : bornées par le TTL.
+
+Kill switch : `SAMSUNGHEALTH_RESPONSE_CACHE=false`. Désactivé aussi si
+`SAMSUNGHEALTH_DEPLOYMENT_INSTANCES` > 1 (invalidation locale au process).
+NDJSON, 304 et erreurs ne sont jamais mis en cache.
+"""
+from __future__ import annotations
+
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Collection
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
+from fastapi import Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from server.etag import _matches, _record
+from server.metrics import REGISTRY
+from server.pagination import NEXT_CURSOR_HEADER
+from server.responses import FastJSONResponse, fast_json
+
+
+CACHE_ENV = "SAMSUNGHEALTH_RESPONSE_CACHE"
+MAX_BYTES_ENV = "SAMSUNGHEALTH_RESPONSE_CACHE_MAX_BYTES"
+TTL_ENV = "SAMSUNGHEALTH_RESPONSE_CACHE_TTL_S"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL_S = 300.0
+# Une seule réponse ne peut pas occuper plus de 1/8 du budget (pas de purge totale).
+MAX_ENTRY_FRACTION = 8
+
+_REPLAYED_HEADERS = ("etag", "cache-control", NEXT_CURSOR_HEADER.lower())
+_PENDING_KEY = "response_cache_invalidate"
+
+CacheKey = tuple[UUID, str, tuple]
+
+
+@dataclass(frozen=True, slots=True)
+class _Entry:
+    body: bytes
+    headers: dict[str, str]
+    expires_at: float
+
+
+def _env_number(name: str, default, cast):
+    raw = os.environ.get(name)
+    if not raw:
+        return default
+    try:
+        return max(cast(0), cast(raw))
+    except ValueError:
+        return default
+
+
+def cache_enabled() -> bool:
+    if os.environ.get(CACHE_ENV, "true").lower() == "false":
+        return False
+    try:
+        return int(os.environ.get("SAMSUNGHEALTH_DEPLOYMENT_INSTANCES", "1")) <= 1
+    except ValueError:
+        return True
+
+
+class ResponseCache:
+    """LRU `OrderedDict` borné par la somme des tailles de corps, TTL vérifié à la lecture."""
+
+    def __init__(self, max_bytes: int, ttl_s: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._entries: OrderedDict[CacheKey, _Entry] = OrderedDict()
+        self._by_user: dict[UUID, set[CacheKey]] = {}
+        self._generations: dict[UUID, int] = {}
+        self._bytes = 0
+        self._stats = {"hit": 0, "miss": 0, "eviction": 0, "invalidation": 0}
+        self._lock = threading.Lock()
+
+    def _drop(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+
+    def get(self, key: CacheKey) -> _Entry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= self._clock():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self._stats["miss"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hit"] += 1
+            return entry
+
+    def generation(self, user_id: UUID) -> int:
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def put(self, key: CacheKey, generation: int, body: bytes, headers: dict[str, str]) -> bool:
+        """Stocke si aucune invalidation du user depuis `generation`. Retourne True si stocké."""
+        if len(body) * MAX_ENTRY_FRACTION > self.max_bytes:
+            return False
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(body, headers, self._clock() + self.ttl_s)
+            self._by_user.setdefault(key[0], set()).add(key)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._stats["eviction"] += 1
+            return True
+
+    def invalidate(self, user_id: UUID, routes: Collection[str] = ()) -> int:
+        """Supprime les entrées du user (de `routes` seulement si non vide). Retourne le nombre supprimé."""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            keys = [k for k in self._by_user.get(user_id, ()) if not routes or k[1] in routes]
+            for key in keys:
+                self._drop(key)
+            self._stats["invalidation"] += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self._generations.clear()
+            self._bytes = 0
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "bytes": self._bytes}
+
+
+RESPONSE_CACHE = ResponseCache(
+    max_bytes=_env_number(MAX_BYTES_ENV, DEFAULT_MAX_BYTES, int),
+    ttl_s=_env_number(TTL_ENV, DEFAULT_TTL_S, float),
+)
+
+
+@REGISTRY.collector
+def _cache_metrics():
+    stats = RESPONSE_CACHE.stats()
+    events = [((event,), stats[event]) for event in ("hit", "miss", "eviction", "invalidation")]
+    yield "samsunghealth_response_cache_events_total", "counter", "Cache de réponses : hit / miss / éviction / invalidation.", ("event",), events
+    yield "samsunghealth_response_cache_entries", "gauge", "Entrées en cache.", (), [((), stats["entries"])]
+    yield "samsunghealth_response_cache_bytes", "gauge", "Octets de corps en cache.", (), [((), stats["bytes"])]
+
+
+def invalidate_on_commit(db: Session, user_id: UUID, *routes: str) -> None:
+    """Invalide maintenant, puis à chaque commit de `db` (données visibles des autres sessions).
+
+    Sans `routes` : toutes les entrées du user.
+    """
+    RESPONSE_CACHE.invalidate(user_id, routes)
+    db.info.setdefault(_PENDING_KEY, set()).add((user_id, routes))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for user_id, routes in session.info.get(_PENDING_KEY, ()):
+        RESPONSE_CACHE.invalidate(user_id, routes)
+
+
+def _replay(request, entry: _Entry) -> Response:
+    etag = entry.headers.get("etag")
+    if etag and _matches(request.headers.get("if-none-match"), etag):
+        _record(request, request.url.path, "hit")
+        headers = {k: v for k, v in entry.headers.items() if k != NEXT_CURSOR_HEADER.lower()}
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=entry.headers)
+
+
+def cached_json(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """Décorateur de GET santé (`async def`) ; l'endpoint déclare `request`, `response`, `current_user`.
+
+    Miss : le corps d'une `FastJSONResponse` (ou le résultat encodé par
+    `fast_json`) est stocké tel quel. Une autre `Response` retournée (304 ETag,
+    NDJSON) passe sans être stockée.
+    """
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        if not cache_enabled():
+            return await endpoint(*args, **kwargs)
+        request, response = kwargs["request"], kwargs["response"]
+        user_id = kwargs["current_user"].id
+        key = (user_id, request.url.path, tuple(sorted(request.query_params.multi_items())))
+        entry = RESPONSE_CACHE.get(key)
+        if entry is not None:
+            request.state.cache = "hit"
+            return _replay(request, entry)
+        request.state.cache = "miss"
+        generation = RESPONSE_CACHE.generation(user_id)
+        out = await endpoint(*args, **kwargs)
+        if not isinstance(out, Response):
+            out = fast_json(out, response)
+        elif not isinstance(out, FastJSONResponse):
+            return out
+        if out.status_code == 200:
+            headers = {k: out.headers[k] for k in _REPLAYED_HEADERS if k in out.headers}
+            RESPONSE_CACHE.put(key, generation, out.body, headers)
+        return out
+
+    return wrapper
@@ -0,0 +1,48 @@
+"""Réponses JSON rapides des GET santé.
+
+Retourner des modèles `*Out` fait valider puis ré-encoder chaque objet par
+FastAPI : sur ~9k lignes HR (1 an) c'est l'essentiel du CPU de la requête.
+Les routers construisent des dicts de types JSON natifs directement depuis les
+`Row` (`select(colonnes)`) et retournent `fast_json(...)` : pas de validation,
+encodage orjson (pydantic-core, Rust aussi, si orjson n'est pas installé).
+Le schéma OpenAPI reste celui des `*Out` (annotation de retour du handler),
+les dicts ont exactement leurs champs.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json, to_jsonable_python
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover — repli pydantic-core
+    orjson = None
+
+
+_DROPPED_HEADERS = ("content-length", "content-type")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON compact. Datetimes UTC en `Z` et modèles pydantic acceptés, comme pydantic-core."""
+    if orjson is not None:
+        return orjson.dumps(content, default=to_jsonable_python, option=orjson.OPT_UTC_Z)
+    return to_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """`JSONResponse` encodée par `dumps` (aucune validation du contenu)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_json(content: Any, response: Response) -> FastJSONResponse:
+    """`content` encodé + headers posés sur la `Response` injectée (ETag, X-Next-Cursor...).
+
+    FastAPI ne reporte pas ces headers sur une `Response` retournée.
+    """
+    headers = {k: v for k, v in response.headers.items() if k not in _DROPPED_HEADERS}
+    return FastJSONResponse(content, headers=headers)
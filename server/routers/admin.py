@@ -31,7 +31,6 @@ from typing import Any
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
-from fastapi.responses import FileResponse
 from pydantic import BaseModel, ConfigDict, Field
 from sqlalchemy import select, update
 from sqlalchemy.orm import Session
@@ -40,9 +39,11 @@ from server.database import get_session
 from server.db.models import AuthEvent, IdentityProvider, User, VerificationToken
 from server.logging_config import get_logger
 from server.security.auth import PUBLIC_BASE_URL_ENV
+from server.security.auth_cache import invalidate_user_on_commit
 from server.security.csrf import check_sec_fetch_site
 from server.security.email_outbound import _outbound_link_cache
 from server.security.rate_limit import _ip_hash, _pure_ip_key, _resolve_client_ip, limiter
+from server.static_assets import html_page
 
 
 _log = get_logger(__name__)
@@ -284,11 +285,7 @@ def list_pending_verifications(
 ):
     # V2.3.3.3 — content negotiation: serve HTML page when browser asks.
     if _wants_html(request):
-        return FileResponse(
-            _STATIC_ADMIN_DIR / "pending-verifications.html",
-            media_type="text/html",
-            headers=_NO_STORE,
-        )
+        return html_page(_STATIC_ADMIN_DIR / "pending-verifications.html", headers=_NO_STORE)
 
     _check_admin_token(x_registration_token)
 
@@ -349,11 +346,7 @@ async def list_users(
 ):
     """List users (JSON) — admin gated. Content-negotiates: text/html → page."""
     if _wants_html(request):
-        return FileResponse(
-            _STATIC_ADMIN_DIR / "users.html",
-            media_type="text/html",
-            headers=_NO_STORE,
-        )
+        return html_page(_STATIC_ADMIN_DIR / "users.html", headers=_NO_STORE)
 
     await _check_admin_token_async(
         request,
@@ -390,11 +383,7 @@ async def get_user_detail(
 ):
     """User detail (JSON) — admin gated. Content-negotiates: text/html → page."""
     if _wants_html(request):
-        return FileResponse(
-            _STATIC_ADMIN_DIR / "user-detail.html",
-            media_type="text/html",
-            headers=_NO_STORE,
-        )
+        return html_page(_STATIC_ADMIN_DIR / "user-detail.html", headers=_NO_STORE)
 
     await _check_admin_token_async(
         request,
@@ -505,6 +494,7 @@ def lock_user(
     db.execute(
         update(User).where(User.id == uid).values(locked_until=locked_until)
     )
+    invalidate_user_on_commit(db, uid)
     db.add(
         AuthEvent(
             event_type="admin_user_locked",
@@ -548,6 +538,7 @@ def unlock_user(
     db.execute(
         update(User).where(User.id == uid).values(failed_login_count=0, locked_until=None)
     )
+    invalidate_user_on_commit(db, uid)
     db.add(
         AuthEvent(
             event_type="admin_user_unlocked",
@@ -17,6 +17,7 @@ from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from server.security.auth_cache import invalidate_user_on_commit
 from server.security.csrf import check_sec_fetch_site
 from server.security.lockout import (
     is_user_locked,
@@ -440,6 +441,8 @@ def logout(
         user_uuid = _uuid.UUID(str(access_payload.get("sub")))
     except Exception:
         user_uuid = None
+    if user_uuid is not None:
+        invalidate_user_on_commit(db, user_uuid)
 
     _record_event(
         db, event_type="logout", user_id=user_uuid, email_hash=None
@@ -759,6 +762,7 @@ def confirm_password_reset(
 
     user.password_hash = new_hash
     user.password_changed_at = now
+    invalidate_user_on_commit(db, user.id)
 
     # V2.3.3.1 — password reset confirms ownership → unlock user (clear admin lock).
     was_locked = user.locked_until is not None and user.locked_until > now
@@ -1,15 +1,26 @@
+from collections.abc import Sequence
 from datetime import datetime, timezone
+from typing import Literal
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy import select
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from server.database import get_session
-from server.db.models import ExerciseSession, User
+from server.columnar import Columns
+from server.database import get_async_session, get_session, run_in_thread
+from server.db.bulk import insert_on_conflict_do_nothing
+from server.db.encrypted import stream_decrypted
+from server.db.models import ExerciseSession
+from server.etag import cache_headers, not_modified, watermark
 from server.logging_config import get_logger
-from server.models import ExerciseBulkIn, ExerciseSessionOut
-from server.security.auth import get_current_user
+from server.models import ColumnarOut, ExerciseBulkIn, ExerciseSessionIn, ExerciseSessionOut, NdjsonIngestOut
+from server.ndjson import ingest_ndjson, ndjson_openapi
+from server.pagination import MAX_PAGE_LIMIT, STREAM_BATCH_SIZE, Keyset, ndjson_response
+from server.response_cache import cached_json, invalidate_on_commit
+from server.responses import fast_json
+from server.security.auth import CurrentUser, get_current_user, get_current_user_sync
 from server.security.rate_limit import _api_post_cap, _user_id_key, limiter
 
 _log = get_logger(__name__)
@@ -30,63 +41,107 @@ def _iso(dt: datetime | None) -> str:
     return dt.isoformat()
 
 
+def _insert_sessions(db: Session, user_id: UUID, sessions: Sequence[ExerciseSessionIn]) -> int:
+    invalidate_on_commit(db, user_id, "/api/exercise", "/api/trends")
+    rows = [
+        dict(
+            user_id=user_id,
+            exercise_type=s.exercise_type,
+            exercise_start=_to_dt(s.exercise_start),
+            exercise_end=_to_dt(s.exercise_end),
+            duration_minutes=s.duration_minutes,
+        )
+        for s in sessions
+    ]
+    return len(
+        insert_on_conflict_do_nothing(
+            db, ExerciseSession, rows, ["user_id", "exercise_start", "exercise_end"]
+        )
+    )
+
+
 @router.post("", status_code=201)
 @limiter.limit(_api_post_cap, key_func=_user_id_key)
-def create_exercise(
+async def create_exercise(
     request: Request,
     body: ExerciseBulkIn,
     response: Response,
     db: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user_sync),
 ) -> dict:
-    inserted = 0
-    skipped = 0
-    for s in body.sessions:
-        stmt = (
-            pg_insert(ExerciseSession)
-            .values(
-                user_id=current_user.id,
-                exercise_type=s.exercise_type,
-                exercise_start=_to_dt(s.exercise_start),
-                exercise_end=_to_dt(s.exercise_end),
-                duration_minutes=s.duration_minutes,
-            )
-            .on_conflict_do_nothing(
-                index_elements=["user_id", "exercise_start", "exercise_end"]
-            )
-            .returning(ExerciseSession.id)
-        )
-        if db.execute(stmt).first() is not None:
-            inserted += 1
-        else:
-            skipped += 1
-    db.commit()
-    return {"inserted": inserted, "skipped": skipped}
+    inserted = await run_in_thread(db, _insert_sessions, current_user.id, body.sessions)
+    return {"inserted": inserted, "skipped": len(body.sessions) - inserted}
+
+
+@router.post("/stream", status_code=201, openapi_extra=ndjson_openapi(ExerciseSessionIn))
+@limiter.limit(_api_post_cap, key_func=_user_id_key)
+async def create_exercise_stream(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_session),
+    current_user: CurrentUser = Depends(get_current_user_sync),
+) -> NdjsonIngestOut:
+    return await ingest_ndjson(
+        request, db, current_user.id, ExerciseSessionIn, _insert_sessions, route="/api/exercise/stream"
+    )
+
+
+_KEYSET = Keyset(
+    cols=(ExerciseSession.exercise_start, ExerciseSession.exercise_end),
+    parsers=(datetime.fromisoformat, datetime.fromisoformat),
+)
+_COLUMNS = Columns(
+    fields=("exercise_type", "exercise_start", "exercise_end", "duration_minutes"),
+    convert={"exercise_start": _iso, "exercise_end": _iso},
+    delta={"exercise_start": "s", "exercise_end": "s"},
+)
+
+
+def _row_out(r) -> dict:
+    return {
+        "exercise_type": r.exercise_type,
+        "exercise_start": _iso(r.exercise_start),
+        "exercise_end": _iso(r.exercise_end),
+        "duration_minutes": r.duration_minutes,
+    }
 
 
 @router.get("")
-def get_exercise(
+@cached_json
+async def get_exercise(
+    request: Request,
+    response: Response,
     from_date: str | None = Query(None, alias="from"),
     to_date: str | None = Query(None, alias="to"),
-    db: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
-) -> list[ExerciseSessionOut]:
-    stmt = select(ExerciseSession).where(ExerciseSession.user_id == current_user.id)
+    cursor: str | None = Query(None),
+    limit: int | None = Query(None, gt=0, le=MAX_PAGE_LIMIT),
+    fmt: Literal["json", "ndjson", "columnar"] = Query("json", alias="format"),
+    delta: bool = Query(False),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> list[ExerciseSessionOut] | ColumnarOut:
+    filters = [ExerciseSession.user_id == current_user.id]
     if from_date:
         d_from = datetime.fromisoformat(from_date).replace(tzinfo=timezone.utc)
-        stmt = stmt.where(ExerciseSession.exercise_start >= d_from)
+        filters.append(ExerciseSession.exercise_start >= d_from)
     if to_date:
         d_to = datetime.fromisoformat(to_date).replace(tzinfo=timezone.utc)
         d_to_eod = d_to.replace(hour=23, minute=59, second=59)
-        stmt = stmt.where(ExerciseSession.exercise_start <= d_to_eod)
-    stmt = stmt.order_by(ExerciseSession.exercise_start)
-    rows = db.execute(stmt).scalars().all()
-    return [
-        ExerciseSessionOut(
-            exercise_type=r.exercise_type,
-            exercise_start=_iso(r.exercise_start),
-            exercise_end=_iso(r.exercise_end),
-            duration_minutes=r.duration_minutes,
-        )
-        for r in rows
-    ]
+        filters.append(ExerciseSession.exercise_start <= d_to_eod)
+    mark = watermark(ExerciseSession, *filters)
+    if cached := await not_modified(request, response, db, current_user.id, mark, route="/api/exercise"):
+        return cached
+    stmt = select(
+        ExerciseSession.exercise_type,
+        ExerciseSession.exercise_start,
+        ExerciseSession.exercise_end,
+        ExerciseSession.duration_minutes,
+    ).where(*filters)
+    stmt = _KEYSET.apply(stmt, cursor, limit, lookahead=fmt != "ndjson")
+    if fmt == "ndjson":
+        chunks = stream_decrypted(db, stmt, STREAM_BATCH_SIZE)
+        return ndjson_response(chunks, _row_out, route="/api/exercise", headers=cache_headers(response))
+    rows = _KEYSET.page((await db.execute(stmt)).all(), limit, response)
+    if fmt == "columnar":
+        return fast_json(_COLUMNS.encode(rows, delta=delta), response)
+    return fast_json([_row_out(r) for r in rows], response)
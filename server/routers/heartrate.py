@@ -1,13 +1,35 @@
+from collections.abc import Sequence
+from datetime import date
+from typing import Literal
+from uuid import UUID
+
 from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy import select
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from server.database import get_session
-from server.db.models import HeartRateHourly, User
+from server.columnar import Columns
+from server.database import get_async_session, get_session, run_in_thread
+from server.db.bulk import insert_on_conflict_do_nothing
+from server.db.encrypted import execute_decrypted_async
+from server.db.models import HeartRateHourly, HeartRateRollup
+from server.db.rollups import period_start, refresh_heart_rate_rollups
+from server.db.row_crypto import HEART_RATE_ROW, execute_row_decrypted_async, stream_row_decrypted
+from server.etag import cache_headers, not_modified, watermark
 from server.logging_config import get_logger
-from server.models import HeartRateBulkIn, HeartRateHourlyOut
-from server.security.auth import get_current_user
+from server.models import (
+    ColumnarOut,
+    HeartRateBulkIn,
+    HeartRateHourlyIn,
+    HeartRateHourlyOut,
+    HeartRateRollupOut,
+    NdjsonIngestOut,
+)
+from server.ndjson import ingest_ndjson, ndjson_openapi
+from server.pagination import MAX_PAGE_LIMIT, STREAM_BATCH_SIZE, Keyset, ndjson_response
+from server.response_cache import cached_json, invalidate_on_commit
+from server.responses import fast_json
+from server.security.auth import CurrentUser, get_current_user, get_current_user_sync
 from server.security.rate_limit import _api_post_cap, _user_id_key, limiter
 
 _log = get_logger(__name__)
@@ -15,22 +37,12 @@ _log = get_logger(__name__)
 router = APIRouter(prefix="/api/heartrate", tags=["heartrate"])
 
 
-@router.post("", status_code=201)
-@limiter.limit(_api_post_cap, key_func=_user_id_key)
-def create_heartrate(
-    request: Request,
-    body: HeartRateBulkIn,
-    response: Response,
-    db: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
-) -> dict:
-    inserted = 0
-    skipped = 0
-    for r in body.records:
-        stmt = (
-            pg_insert(HeartRateHourly)
-            .values(
-                user_id=current_user.id,
+def _insert_records(db: Session, user_id: UUID, records: Sequence[HeartRateHourlyIn]) -> int:
+    invalidate_on_commit(db, user_id, "/api/heartrate", "/api/trends")
+    rows = [
+        HEART_RATE_ROW.to_storage(
+            dict(
+                user_id=user_id,
                 date=r.date,
                 hour=r.hour,
                 min_bpm=r.min_bpm,
@@ -38,39 +50,131 @@ def create_heartrate(
                 avg_bpm=r.avg_bpm,
                 sample_count=r.sample_count,
             )
-            .on_conflict_do_nothing(index_elements=["user_id", "date", "hour"])
-            .returning(HeartRateHourly.id)
         )
-        if db.execute(stmt).first() is not None:
-            inserted += 1
-        else:
-            skipped += 1
-    db.commit()
-    return {"inserted": inserted, "skipped": skipped}
+        for r in records
+    ]
+    inserted = insert_on_conflict_do_nothing(
+        db, HeartRateHourly, rows, ["user_id", "date", "hour"], returning=(HeartRateHourly.date,)
+    )
+    refresh_heart_rate_rollups(db, user_id, {r.date for r in inserted})
+    return len(inserted)
 
 
-@router.get("")
-def get_heartrate(
-    from_date: str | None = Query(None, alias="from"),
-    to_date: str | None = Query(None, alias="to"),
+@router.post("", status_code=201)
+@limiter.limit(_api_post_cap, key_func=_user_id_key)
+async def create_heartrate(
+    request: Request,
+    body: HeartRateBulkIn,
+    response: Response,
     db: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
-) -> list[HeartRateHourlyOut]:
-    stmt = select(HeartRateHourly).where(HeartRateHourly.user_id == current_user.id)
+    current_user: CurrentUser = Depends(get_current_user_sync),
+) -> dict:
+    inserted = await run_in_thread(db, _insert_records, current_user.id, body.records)
+    return {"inserted": inserted, "skipped": len(body.records) - inserted}
+
+
+@router.post("/stream", status_code=201, openapi_extra=ndjson_openapi(HeartRateHourlyIn))
+@limiter.limit(_api_post_cap, key_func=_user_id_key)
+async def create_heartrate_stream(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_session),
+    current_user: CurrentUser = Depends(get_current_user_sync),
+) -> NdjsonIngestOut:
+    return await ingest_ndjson(
+        request, db, current_user.id, HeartRateHourlyIn, _insert_records, route="/api/heartrate/stream"
+    )
+
+
+def _rollup_filters(user_id: UUID, granularity: str, from_date: date | None, to_date: date | None) -> list:
+    filters = [HeartRateRollup.user_id == user_id, HeartRateRollup.granularity == granularity]
     if from_date:
-        stmt = stmt.where(HeartRateHourly.date >= from_date)
+        filters.append(HeartRateRollup.period_start >= period_start(from_date, granularity))
     if to_date:
-        stmt = stmt.where(HeartRateHourly.date <= to_date)
-    stmt = stmt.order_by(HeartRateHourly.date, HeartRateHourly.hour)
-    rows = db.execute(stmt).scalars().all()
-    return [
-        HeartRateHourlyOut(
-            date=r.date,
-            hour=r.hour,
-            min_bpm=r.min_bpm,
-            max_bpm=r.max_bpm,
-            avg_bpm=r.avg_bpm,
-            sample_count=r.sample_count,
-        )
-        for r in rows
-    ]
+        filters.append(HeartRateRollup.period_start <= to_date)
+    return filters
+
+
+async def _get_rollups(db: AsyncSession, filters: list) -> list:
+    stmt = select(
+        HeartRateRollup.period_start,
+        HeartRateRollup.min_bpm,
+        HeartRateRollup.max_bpm,
+        HeartRateRollup.avg_bpm,
+        HeartRateRollup.sample_count,
+        HeartRateRollup.hour_count,
+    ).where(*filters)
+    return await execute_decrypted_async(db, stmt.order_by(HeartRateRollup.period_start))
+
+
+_KEYSET = Keyset(cols=(HeartRateHourly.date, HeartRateHourly.hour), parsers=(date.fromisoformat, int))
+_COLUMNS = Columns(
+    fields=("date", "hour", "min_bpm", "max_bpm", "avg_bpm", "sample_count"),
+    delta={"date": "day"},
+)
+_ROLLUP_COLUMNS = Columns(
+    fields=("period_start", "min_bpm", "max_bpm", "avg_bpm", "sample_count", "hour_count"),
+    delta={"period_start": "day"},
+)
+
+
+def _row_out(r) -> dict:
+    return {
+        "date": r.date,
+        "hour": r.hour,
+        "min_bpm": r.min_bpm,
+        "max_bpm": r.max_bpm,
+        "avg_bpm": r.avg_bpm,
+        "sample_count": r.sample_count,
+    }
+
+
+@router.get("")
+@cached_json
+async def get_heartrate(
+    request: Request,
+    response: Response,
+    from_date: date | None = Query(None, alias="from"),
+    to_date: date | None = Query(None, alias="to"),
+    granularity: Literal["hour", "day", "week", "month"] = "hour",
+    cursor: str | None = Query(None),
+    limit: int | None = Query(None, gt=0, le=MAX_PAGE_LIMIT),
+    fmt: Literal["json", "ndjson", "columnar"] = Query("json", alias="format"),
+    delta: bool = Query(False),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> list[HeartRateHourlyOut] | list[HeartRateRollupOut] | ColumnarOut:
+    if granularity != "hour":
+        filters = _rollup_filters(current_user.id, granularity, from_date, to_date)
+        mark = watermark(HeartRateRollup, *filters)
+        if cached := await not_modified(request, response, db, current_user.id, mark, route="/api/heartrate"):
+            return cached
+        rows = await _get_rollups(db, filters)
+        if fmt == "columnar":
+            return fast_json(_ROLLUP_COLUMNS.encode(rows, delta=delta), response)
+        return fast_json([r._asdict() for r in rows], response)
+    filters = [HeartRateHourly.user_id == current_user.id]
+    if from_date:
+        filters.append(HeartRateHourly.date >= from_date)
+    if to_date:
+        filters.append(HeartRateHourly.date <= to_date)
+    mark = watermark(HeartRateHourly, *filters)
+    if cached := await not_modified(request, response, db, current_user.id, mark, route="/api/heartrate"):
+        return cached
+    stmt = select(
+        HeartRateHourly.date,
+        HeartRateHourly.hour,
+        HeartRateHourly.min_bpm,
+        HeartRateHourly.max_bpm,
+        HeartRateHourly.avg_bpm,
+        HeartRateHourly.sample_count,
+    ).where(*filters)
+    stmt = _KEYSET.apply(stmt, cursor, limit, lookahead=fmt != "ndjson")
+    if fmt == "ndjson":
+        chunks = stream_row_decrypted(db, stmt, HEART_RATE_ROW, STREAM_BATCH_SIZE)
+        return ndjson_response(chunks, _row_out, route="/api/heartrate", headers=cache_headers(response))
+    # Déchiffrement batch : par colonne (crypto_v=1) ou par ligne (crypto_v=2).
+    rows = _KEYSET.page(await execute_row_decrypted_async(db, stmt, HEART_RATE_ROW), limit, response)
+    if fmt == "columnar":
+        return fast_json(_COLUMNS.encode(rows, delta=delta), response)
+    return fast_json([_row_out(r) for r in rows], response)
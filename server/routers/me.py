@@ -8,6 +8,9 @@
 - GET  /me/audit-log         : paginated audit events scoped to current_user (admin_* filtered by default)
 
 Helpers + Pydantic models live in `server/security/rgpd.py` (other agent).
+Handlers sync sur `Session` (comme auth/admin) : FastAPI les exécute dans le
+threadpool, argon2 et la construction du ZIP ne bloquent pas l'event loop.
+Routes rate-limitées (5/h), le coût en threads reste marginal.
 """
 from __future__ import annotations
 
@@ -20,7 +23,7 @@ from sqlalchemy.orm import Session
 
 from server.database import get_session
 from server.db.models import AuthEvent, User
-from server.security.auth import get_current_user
+from server.security.auth import CurrentUser, get_current_user_row, get_current_user_sync
 from server.security.csrf import check_sec_fetch_site
 from server.security.rate_limit import _user_id_key, limiter
 from server.security.rgpd import (
@@ -47,12 +50,12 @@ router = APIRouter(tags=["rgpd"])
 # ── 1. POST /me/export/request ────────────────────────────────────────────
 @router.post("/me/export/request", response_model=ExportRequestOut)
 @limiter.limit("5/hour", key_func=_user_id_key)
-async def export_request(
+def export_request(
     request: Request,
     response: Response,
     body: ExportRequestIn,
     db: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_row),
 ) -> ExportRequestOut:
     """Re-auth (password or OAuth nonce) + create export_token (TTL 5 min, single-use)."""
     check_sec_fetch_site(request)
@@ -73,13 +76,13 @@ async def export_request(
 # ── 2. GET /me/export/confirm ─────────────────────────────────────────────
 @router.get("/me/export/confirm")
 @limiter.limit("5/hour", key_func=_user_id_key)
-async def export_confirm(
+def export_confirm(
     request: Request,
     response: Response,
     export_token: str = Query(..., min_length=32),
     full: bool = Query(False),
     db: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_row),
 ) -> StreamingResponse:
     """Consume token, stream ZIP archive (filename générique, no user_id leak)."""
     consumed = _consume_verification_token_atomic(
@@ -118,12 +121,12 @@ async def export_confirm(
 # ── 3. POST /me/erase/request ─────────────────────────────────────────────
 @router.post("/me/erase/request", response_model=EraseRequestOut)
 @limiter.limit("5/hour", key_func=_user_id_key)
-async def erase_request(
+def erase_request(
     request: Request,
     response: Response,
     body: EraseRequestIn,
     db: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_row),
 ) -> EraseRequestOut:
     """Re-auth + create erase_token (TTL 5 min, single-use, purpose=account_erase_confirm)."""
     check_sec_fetch_site(request)
@@ -144,12 +147,12 @@ async def erase_request(
 # ── 4. POST /me/erase/confirm ─────────────────────────────────────────────
 @router.post("/me/erase/confirm", status_code=204)
 @limiter.limit("5/hour", key_func=_user_id_key)
-async def erase_confirm(
+def erase_confirm(
     request: Request,
     response: Response,
     body: EraseConfirmIn,
     db: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_row),
 ) -> Response:
     """Consume token + cascade delete (21 health tables + identity_providers + auth bits) → 204."""
     check_sec_fetch_site(request)
@@ -168,14 +171,14 @@ async def erase_confirm(
 # ── 5. GET /me/audit-log ──────────────────────────────────────────────────
 @router.get("/me/audit-log", response_model=AuditLogPage)
 @limiter.limit("60/hour", key_func=_user_id_key)
-async def audit_log_my_account(
+def audit_log_my_account(
     request: Request,
     response: Response,
     limit: int = Query(50, gt=0, le=200),
     offset: int = Query(0, ge=0),
     include_admin: bool = Query(False),
     db: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user_sync),
 ) -> AuditLogPage:
     """RGPD Art. 15 — droit d'accès. Liste des auth_events liés au current_user.
 
@@ -0,0 +1,36 @@
+"""GET /metrics — registre du process au format texte Prometheus (server/metrics.py).
+
+Endpoint d'infrastructure comme /readyz : hors schéma OpenAPI, pas de rate-limit,
+à restreindre au réseau interne côté reverse-proxy. Si
+`SAMSUNGHEALTH_METRICS_TOKEN` est défini, `Authorization: Bearer <token>`
+est exigé (401 sinon, comparaison constant-time).
+"""
+from __future__ import annotations
+
+import os
+import secrets
+
+from fastapi import APIRouter, Header, HTTPException, Response
+
+from server.metrics import CONTENT_TYPE, REGISTRY
+
+
+METRICS_TOKEN_ENV = "SAMSUNGHEALTH_METRICS_TOKEN"
+
+router = APIRouter(tags=["health"], include_in_schema=False)
+
+
+def _check_metrics_token(authorization: str | None) -> None:
+    expected = os.environ.get(METRICS_TOKEN_ENV)
+    if not expected:
+        return
+    scheme, _, provided = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(provided.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="metrics_token_required")
+
+
+@router.get("/metrics")
+def metrics(authorization: str | None = Header(default=None)) -> Response:
+    """Latences HTTP, temps SQL, pools DB, ETag, cache de réponses, compression, 429."""
+    _check_metrics_token(authorization)
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
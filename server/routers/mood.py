@@ -1,17 +1,28 @@
 """V2.2 — router /api/mood avec champs Art.9 chiffrés transparent via TypeDecorator."""
+from collections.abc import Sequence
 from datetime import datetime, timezone
+from typing import Literal
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import ValidationError
 from sqlalchemy import select
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from server.database import get_session
-from server.db.models import Mood, User
+from server.columnar import Columns
+from server.database import get_async_session, get_session, run_in_thread
+from server.db.bulk import insert_on_conflict_do_nothing
+from server.db.encrypted import execute_decrypted_async, stream_decrypted
+from server.db.models import Mood
+from server.etag import cache_headers, not_modified, watermark
 from server.logging_config import get_logger
-from server.models import MoodBulkIn, MoodIn, MoodOut
-from server.security.auth import get_current_user
+from server.models import ColumnarOut, MoodBulkIn, MoodIn, MoodOut, NdjsonIngestOut
+from server.ndjson import ingest_ndjson, ndjson_openapi
+from server.pagination import MAX_PAGE_LIMIT, STREAM_BATCH_SIZE, Keyset, ndjson_response
+from server.response_cache import cached_json, invalidate_on_commit
+from server.responses import fast_json
+from server.security.auth import CurrentUser, get_current_user, get_current_user_sync
 from server.security.crypto import DecryptionError
 from server.security.rate_limit import _api_post_cap, _user_id_key, limiter
 
@@ -59,72 +70,108 @@ def _normalize_payload(raw: dict) -> list[MoodIn]:
     raise HTTPException(status_code=422, detail="missing entries or moods")
 
 
+def _insert_entries(db: Session, user_id: UUID, entries: Sequence[MoodIn]) -> int:
+    invalidate_on_commit(db, user_id, "/api/mood")
+    rows = [
+        dict(
+            user_id=user_id,
+            start_time=_to_dt(entry.start_time),
+            mood_type=entry.mood_type,
+            emotions=entry.emotions,
+            factors=entry.factors,
+            notes=entry.notes,
+            place=entry.place,
+            company=entry.company,
+        )
+        for entry in entries
+    ]
+    return len(insert_on_conflict_do_nothing(db, Mood, rows, ["user_id", "start_time"]))
+
+
 @router.post("", status_code=201)
 @limiter.limit(_api_post_cap, key_func=_user_id_key)
 async def create_mood_entries(
     request: Request,
     response: Response,
     db: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user_sync),
 ) -> dict:
     raw = await request.json()
     entries = _normalize_payload(raw)
-    inserted = 0
-    skipped = 0
-    for entry in entries:
-        stmt = (
-            pg_insert(Mood)
-            .values(
-                user_id=current_user.id,
-                start_time=_to_dt(entry.start_time),
-                mood_type=entry.mood_type,
-                emotions=entry.emotions,
-                factors=entry.factors,
-                notes=entry.notes,
-                place=entry.place,
-                company=entry.company,
-            )
-            .on_conflict_do_nothing(index_elements=["user_id", "start_time"])
-            .returning(Mood.id)
-        )
-        if db.execute(stmt).first() is not None:
-            inserted += 1
-        else:
-            skipped += 1
-    db.commit()
-    return {"inserted": inserted, "skipped": skipped}
+    inserted = await run_in_thread(db, _insert_entries, current_user.id, entries)
+    return {"inserted": inserted, "skipped": len(entries) - inserted}
+
+
+@router.post("/stream", status_code=201, openapi_extra=ndjson_openapi(MoodIn))
+@limiter.limit(_api_post_cap, key_func=_user_id_key)
+async def create_mood_entries_stream(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_session),
+    current_user: CurrentUser = Depends(get_current_user_sync),
+) -> NdjsonIngestOut:
+    """1 `MoodIn` par ligne NDJSON (le format legacy `moods` n'est pas accepté ici)."""
+    return await ingest_ndjson(
+        request, db, current_user.id, MoodIn, _insert_entries, route="/api/mood/stream"
+    )
+
+
+_KEYSET = Keyset(cols=(Mood.start_time,), parsers=(datetime.fromisoformat,))
+_COLUMNS = Columns(
+    fields=("start_time", "mood_type", "emotions", "factors", "notes", "place", "company"),
+    convert={"start_time": _iso},
+    delta={"start_time": "s"},
+)
+
+
+def _row_out(r) -> dict:
+    return {
+        "start_time": _iso(r.start_time),
+        "mood_type": r.mood_type,
+        "emotions": r.emotions,
+        "factors": r.factors,
+        "notes": r.notes,
+        "place": r.place,
+        "company": r.company,
+    }
 
 
 @router.get("")
-def get_mood_entries(
+@cached_json
+async def get_mood_entries(
+    request: Request,
+    response: Response,
     from_date: str | None = Query(None, alias="from"),
     to_date: str | None = Query(None, alias="to"),
-    db: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
-) -> list[MoodOut]:
-    stmt = select(Mood).where(Mood.user_id == current_user.id)
+    cursor: str | None = Query(None),
+    limit: int | None = Query(None, gt=0, le=MAX_PAGE_LIMIT),
+    fmt: Literal["json", "ndjson", "columnar"] = Query("json", alias="format"),
+    delta: bool = Query(False),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> list[MoodOut] | ColumnarOut:
+    filters = [Mood.user_id == current_user.id]
     if from_date:
         d_from = _to_dt(from_date)
-        stmt = stmt.where(Mood.start_time >= d_from)
+        filters.append(Mood.start_time >= d_from)
     if to_date:
         d_to = _to_dt(to_date).replace(hour=23, minute=59, second=59)
-        stmt = stmt.where(Mood.start_time <= d_to)
-    stmt = stmt.order_by(Mood.start_time)
+        filters.append(Mood.start_time <= d_to)
+    mark = watermark(Mood, *filters)
+    if cached := await not_modified(request, response, db, current_user.id, mark, route="/api/mood"):
+        return cached
+    stmt = select(
+        Mood.start_time, Mood.mood_type, Mood.emotions, Mood.factors, Mood.notes, Mood.place, Mood.company
+    ).where(*filters)
+    stmt = _KEYSET.apply(stmt, cursor, limit, lookahead=fmt != "ndjson")
+    if fmt == "ndjson":
+        chunks = stream_decrypted(db, stmt, STREAM_BATCH_SIZE)
+        return ndjson_response(chunks, _row_out, route="/api/mood", headers=cache_headers(response))
     try:
-        rows = db.execute(stmt).scalars().all()
-        out = [
-            MoodOut(
-                start_time=_iso(r.start_time),
-                mood_type=r.mood_type,
-                emotions=r.emotions,
-                factors=r.factors,
-                notes=r.notes,
-                place=r.place,
-                company=r.company,
-            )
-            for r in rows
-        ]
+        rows = _KEYSET.page(await execute_decrypted_async(db, stmt), limit, response)
     except DecryptionError as exc:
         # V2.2 §16 — sanitization erreur : 500 générique, pas de leak (clé tournée ? tampering ?)
         raise HTTPException(status_code=500, detail="internal_decryption_error") from exc
-    return out
+    if fmt == "columnar":
+        return fast_json(_COLUMNS.encode(rows, delta=delta), response)
+    return fast_json([_row_out(r) for r in rows], response)
@@ -1,14 +1,33 @@
+from collections.abc import AsyncIterable, AsyncIterator, Sequence
 from datetime import date, datetime, timedelta, timezone
+from typing import Literal
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy import select
-from sqlalchemy.orm import Session, selectinload
-
-from server.database import get_session
-from server.db.models import SleepSession, SleepStage, User
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from server.columnar import Columns
+from server.database import get_async_session, get_session, run_in_thread
+from server.db.bulk import insert_on_conflict_do_nothing
+from server.db.encrypted import stream_decrypted
+from server.db.models import SleepSession, SleepStage
+from server.db.uuid7 import uuid7
+from server.etag import cache_headers, not_modified, watermark
 from server.logging_config import get_logger
-from server.models import SleepBulkIn, SleepSessionOut, SleepStageOut
-from server.security.auth import get_current_user
+from server.models import (
+    ColumnarOut,
+    NdjsonIngestOut,
+    SleepBulkIn,
+    SleepSessionIn,
+    SleepSessionOut,
+)
+from server.ndjson import ingest_ndjson, ndjson_openapi
+from server.pagination import MAX_PAGE_LIMIT, STREAM_BATCH_SIZE, Keyset, ndjson_response
+from server.response_cache import cached_json, invalidate_on_commit
+from server.responses import fast_json
+from server.security.auth import CurrentUser, get_current_user, get_current_user_sync
 from server.security.rate_limit import _api_post_cap, _user_id_key, limiter
 
 _log = get_logger(__name__)
@@ -20,49 +39,73 @@ def _parse_day(s: str) -> date:
     return datetime.fromisoformat(s).date()
 
 
+def _insert_sessions(db: Session, user_id: UUID, sessions: Sequence[SleepSessionIn]) -> int:
+    """Pipeline set-based : 1 INSERT sessions + 1 INSERT stages (par chunk). Retourne inserted.
+
+    Les ids UUID v7 sont assignés côté Python avant l'INSERT : le RETURNING id
+    identifie les sessions effectivement créées (les conflits ne reviennent pas)
+    et permet de rattacher leurs stages sans re-SELECT ni flush par session.
+    Caller responsable du commit.
+    """
+    invalidate_on_commit(db, user_id, "/api/sleep", "/api/trends")
+    session_rows = []
+    stages_by_id: dict[UUID, list] = {}
+    for s in sessions:
+        sid = uuid7()
+        session_rows.append(
+            dict(id=sid, user_id=user_id, sleep_start=s.sleep_start, sleep_end=s.sleep_end)
+        )
+        stages_by_id[sid] = s.stages or []
+
+    returned = insert_on_conflict_do_nothing(
+        db,
+        SleepSession,
+        session_rows,
+        ["user_id", "sleep_start", "sleep_end"],
+        returning=(SleepSession.id, SleepSession.sleep_start, SleepSession.sleep_end),
+    )
+    stage_rows = [
+        dict(
+            user_id=user_id,
+            session_id=r.id,
+            stage_type=st.stage_type,
+            stage_start=st.stage_start,
+            stage_end=st.stage_end,
+        )
+        for r in returned
+        for st in stages_by_id[r.id]
+    ]
+    insert_on_conflict_do_nothing(
+        db, SleepStage, stage_rows, ["user_id", "stage_start", "stage_end"]
+    )
+    return len(returned)
+
+
 @router.post("", status_code=201)
 @limiter.limit(_api_post_cap, key_func=_user_id_key)
-def create_sleep_sessions(
+async def create_sleep_sessions(
     request: Request,
     body: SleepBulkIn,
     response: Response,
     db: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user_sync),
 ) -> dict:
-    inserted = 0
-    skipped = 0
-    for s in body.sessions:
-        existing = db.execute(
-            select(SleepSession).where(
-                SleepSession.user_id == current_user.id,
-                SleepSession.sleep_start == s.sleep_start,
-                SleepSession.sleep_end == s.sleep_end,
-            )
-        ).scalar_one_or_none()
-        if existing is not None:
-            skipped += 1
-            continue
-        new_session = SleepSession(
-            user_id=current_user.id,
-            sleep_start=s.sleep_start,
-            sleep_end=s.sleep_end,
-        )
-        db.add(new_session)
-        db.flush()
-        if s.stages:
-            for st in s.stages:
-                db.add(
-                    SleepStage(
-                        user_id=current_user.id,
-                        session_id=new_session.id,
-                        stage_type=st.stage_type,
-                        stage_start=st.stage_start,
-                        stage_end=st.stage_end,
-                    )
-                )
-        inserted += 1
-    db.commit()
-    return {"inserted": inserted, "skipped": skipped}
+    inserted = await run_in_thread(db, _insert_sessions, current_user.id, body.sessions)
+    return {"inserted": inserted, "skipped": len(body.sessions) - inserted}
+
+
+@router.post("/stream", status_code=201, openapi_extra=ndjson_openapi(SleepSessionIn))
+@limiter.limit(_api_post_cap, key_func=_user_id_key)
+async def create_sleep_sessions_stream(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_session),
+    current_user: CurrentUser = Depends(get_current_user_sync),
+) -> NdjsonIngestOut:
+    """1 session (avec ses stages) par ligne NDJSON."""
+    return await ingest_ndjson(
+        request, db, current_user.id, SleepSessionIn, _insert_sessions, route="/api/sleep/stream"
+    )
 
 
 def _to_iso(value) -> str:
@@ -73,48 +116,109 @@ def _to_iso(value) -> str:
     return str(value)
 
 
-def _serialize(session: SleepSession, include_stages: bool) -> SleepSessionOut:
-    out = SleepSessionOut(
-        id=str(session.id),
-        sleep_start=_to_iso(session.sleep_start),
-        sleep_end=_to_iso(session.sleep_end),
-        created_at=_to_iso(session.created_at) if session.created_at else None,
-    )
-    if include_stages:
-        out.stages = [
-            SleepStageOut(
-                id=str(st.id),
-                session_id=str(st.session_id),
-                stage_type=st.stage_type,
-                stage_start=_to_iso(st.stage_start),
-                stage_end=_to_iso(st.stage_end),
-            )
-            for st in session.stages
-        ]
+def _row_out(r, stages: dict | None = None) -> dict:
+    out = {
+        "id": str(r.id),
+        "sleep_start": _to_iso(r.sleep_start),
+        "sleep_end": _to_iso(r.sleep_end),
+        "created_at": _to_iso(r.created_at) if r.created_at else None,
+        "stages": None,
+    }
+    if stages is not None:
+        out["stages"] = stages.get(r.id, [])
     return out
 
 
+_COLUMNS = Columns(
+    fields=("id", "sleep_start", "sleep_end", "created_at"),
+    convert={
+        "id": str,
+        "sleep_start": _to_iso,
+        "sleep_end": _to_iso,
+        "created_at": lambda v: _to_iso(v) if v else None,
+    },
+    delta={"sleep_start": "s", "sleep_end": "s"},
+)
+
+
+async def _stages_by_session(db: AsyncSession, session_ids: Sequence[UUID]) -> dict[UUID, list[dict]]:
+    """Stages des sessions d'une page / d'un lot : 1 SELECT ... IN (idx_stages_session)."""
+    by_session: dict[UUID, list[dict]] = {sid: [] for sid in session_ids}
+    if not session_ids:
+        return by_session
+    stmt = select(
+        SleepStage.id, SleepStage.session_id, SleepStage.stage_type, SleepStage.stage_start, SleepStage.stage_end
+    ).where(SleepStage.session_id.in_(session_ids))
+    # Tri côté Python : volume d'une page, et pas de Sort sur idx_stages_session.
+    for st in sorted((await db.execute(stmt)).all(), key=lambda st: st.stage_start):
+        by_session[st.session_id].append(
+            {
+                "id": str(st.id),
+                "session_id": str(st.session_id),
+                "stage_type": st.stage_type,
+                "stage_start": _to_iso(st.stage_start),
+                "stage_end": _to_iso(st.stage_end),
+            }
+        )
+    return by_session
+
+
+async def _with_stages(db: AsyncSession, chunks: AsyncIterable[Sequence]) -> AsyncIterator[list[dict]]:
+    async for chunk in chunks:
+        stages = await _stages_by_session(db, [r.id for r in chunk])
+        yield [_row_out(r, stages) for r in chunk]
+
+
+_KEYSET = Keyset(
+    cols=(SleepSession.sleep_start, SleepSession.sleep_end),
+    parsers=(datetime.fromisoformat, datetime.fromisoformat),
+)
+
+
 @router.get("")
-def get_sleep_sessions(
+@cached_json
+async def get_sleep_sessions(
+    request: Request,
+    response: Response,
     from_date: str | None = Query(None, alias="from"),
     to_date: str | None = Query(None, alias="to"),
     include_stages: bool = Query(False),
-    db: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
-) -> list[SleepSessionOut]:
-    stmt = select(SleepSession).where(SleepSession.user_id == current_user.id)
-    if include_stages:
-        stmt = stmt.options(selectinload(SleepSession.stages))
-
+    cursor: str | None = Query(None),
+    limit: int | None = Query(None, gt=0, le=MAX_PAGE_LIMIT),
+    fmt: Literal["json", "ndjson", "columnar"] = Query("json", alias="format"),
+    delta: bool = Query(False),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> list[SleepSessionOut] | ColumnarOut:
+    filters = [SleepSession.user_id == current_user.id]
     if from_date:
         d_from = _parse_day(from_date)
         start_dt = datetime.combine(d_from, datetime.min.time(), tzinfo=timezone.utc)
-        stmt = stmt.where(SleepSession.sleep_start >= start_dt)
+        filters.append(SleepSession.sleep_start >= start_dt)
     if to_date:
         d_to = _parse_day(to_date) + timedelta(days=1)
         end_dt = datetime.combine(d_to, datetime.min.time(), tzinfo=timezone.utc)
-        stmt = stmt.where(SleepSession.sleep_start < end_dt)
-
-    stmt = stmt.order_by(SleepSession.sleep_start)
-    sessions = db.execute(stmt).scalars().all()
-    return [_serialize(s, include_stages) for s in sessions]
+        filters.append(SleepSession.sleep_start < end_dt)
+
+    # Stages hors watermark : insérés uniquement avec leur session (count bouge).
+    mark = watermark(SleepSession, *filters)
+    if cached := await not_modified(request, response, db, current_user.id, mark, route="/api/sleep"):
+        return cached
+    stmt = select(
+        SleepSession.id, SleepSession.sleep_start, SleepSession.sleep_end, SleepSession.created_at
+    ).where(*filters)
+    stmt = _KEYSET.apply(stmt, cursor, limit, lookahead=fmt != "ndjson")
+    if fmt == "ndjson":
+        chunks = stream_decrypted(db, stmt, STREAM_BATCH_SIZE)
+        if include_stages:
+            return ndjson_response(
+                _with_stages(db, chunks), lambda d: d, route="/api/sleep", headers=cache_headers(response)
+            )
+        return ndjson_response(chunks, _row_out, route="/api/sleep", headers=cache_headers(response))
+    rows = _KEYSET.page((await db.execute(stmt)).all(), limit, response)
+    stages = await _stages_by_session(db, [r.id for r in rows]) if include_stages else None
+    if fmt == "columnar":
+        # Colonne `stages` seulement si demandée (pas de tableau de `null`).
+        extra = {"stages": [stages[r.id] for r in rows]} if stages is not None else None
+        return fast_json(_COLUMNS.encode(rows, delta=delta, extra=extra), response)
+    return fast_json([_row_out(r, stages) for r in rows], response)
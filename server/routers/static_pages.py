@@ -12,7 +12,9 @@ from __future__ import annotations
 from pathlib import Path
 
 from fastapi import APIRouter
-from fastapi.responses import FileResponse
+from fastapi.responses import HTMLResponse
+
+from server.static_assets import html_page
 
 
 router = APIRouter()
@@ -24,56 +26,56 @@ _ADMIN_DIR = _STATIC_DIR / "admin"
 _NO_STORE = {"Cache-Control": "no-store"}
 
 
-def _serve(name: str) -> FileResponse:
-    return FileResponse(_AUTH_DIR / f"{name}.html", media_type="text/html", headers=_NO_STORE)
+def _serve(name: str) -> HTMLResponse:
+    return html_page(_AUTH_DIR / f"{name}.html", headers=_NO_STORE)
 
 
-def _serve_admin(name: str) -> FileResponse:
-    return FileResponse(_ADMIN_DIR / f"{name}.html", media_type="text/html", headers=_NO_STORE)
+def _serve_admin(name: str) -> HTMLResponse:
+    return html_page(_ADMIN_DIR / f"{name}.html", headers=_NO_STORE)
 
 
 @router.get("/auth/login", include_in_schema=False)
-async def login_page() -> FileResponse:
+async def login_page() -> HTMLResponse:
     return _serve("login")
 
 
 @router.get("/auth/register", include_in_schema=False)
-async def register_page() -> FileResponse:
+async def register_page() -> HTMLResponse:
     return _serve("register")
 
 
 @router.get("/auth/reset-request", include_in_schema=False)
-async def reset_request_page() -> FileResponse:
+async def reset_request_page() -> HTMLResponse:
     return _serve("reset-request")
 
 
 @router.get("/auth/reset-confirm", include_in_schema=False)
-async def reset_confirm_page() -> FileResponse:
+async def reset_confirm_page() -> HTMLResponse:
     return _serve("reset-confirm")
 
 
 @router.get("/auth/verify-email", include_in_schema=False)
-async def verify_email_page() -> FileResponse:
+async def verify_email_page() -> HTMLResponse:
     return _serve("verify-email")
 
 
 @router.get("/auth/oauth-link-confirm", include_in_schema=False)
-async def oauth_link_confirm_page() -> FileResponse:
+async def oauth_link_confirm_page() -> HTMLResponse:
     return _serve("oauth-link-confirm")
 
 
 @router.get("/auth/oauth-success", include_in_schema=False)
-async def oauth_success_page() -> FileResponse:
+async def oauth_success_page() -> HTMLResponse:
     return _serve("oauth-success")
 
 
 @router.get("/auth/oauth-error", include_in_schema=False)
-async def oauth_error_page() -> FileResponse:
+async def oauth_error_page() -> HTMLResponse:
     return _serve("oauth-error")
 
 
 @router.get("/auth/oauth-link-pending", include_in_schema=False)
-async def oauth_link_pending_page() -> FileResponse:
+async def oauth_link_pending_page() -> HTMLResponse:
     return _serve("oauth-link-pending")
 
 
@@ -82,5 +84,5 @@ async def oauth_link_pending_page() -> FileResponse:
 # (`/admin/users`, `/admin/users/{id}`, `/admin/pending-verifications`) sont
 # gérées dans `admin.py` via content negotiation Accept header.
 @router.get("/admin/login", include_in_schema=False)
-async def admin_login_page() -> FileResponse:
+async def admin_login_page() -> HTMLResponse:
     return _serve_admin("login")
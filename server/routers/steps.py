@@ -1,13 +1,34 @@
+from collections.abc import Sequence
+from datetime import date
+from typing import Literal
+from uuid import UUID
+
 from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy import select
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from server.database import get_session
-from server.db.models import StepsHourly, User
+from server.columnar import Columns
+from server.database import get_async_session, get_session, run_in_thread
+from server.db.bulk import insert_on_conflict_do_nothing
+from server.db.encrypted import stream_decrypted
+from server.db.models import StepsHourly, StepsRollup
+from server.db.rollups import period_start, refresh_steps_rollups
+from server.etag import cache_headers, not_modified, watermark
 from server.logging_config import get_logger
-from server.models import StepsBulkIn, StepsHourlyOut
-from server.security.auth import get_current_user
+from server.models import (
+    ColumnarOut,
+    NdjsonIngestOut,
+    StepsBulkIn,
+    StepsHourlyIn,
+    StepsHourlyOut,
+    StepsRollupOut,
+)
+from server.ndjson import ingest_ndjson, ndjson_openapi
+from server.pagination import MAX_PAGE_LIMIT, STREAM_BATCH_SIZE, Keyset, ndjson_response
+from server.response_cache import cached_json, invalidate_on_commit
+from server.responses import fast_json
+from server.security.auth import CurrentUser, get_current_user, get_current_user_sync
 from server.security.rate_limit import _api_post_cap, _user_id_key, limiter
 
 _log = get_logger(__name__)
@@ -15,49 +36,111 @@ _log = get_logger(__name__)
 router = APIRouter(prefix="/api/steps", tags=["steps"])
 
 
+def _insert_records(db: Session, user_id: UUID, records: Sequence[StepsHourlyIn]) -> int:
+    invalidate_on_commit(db, user_id, "/api/steps", "/api/trends")
+    rows = [
+        dict(
+            user_id=user_id,
+            date=r.date,
+            hour=r.hour,
+            step_count=r.step_count,
+        )
+        for r in records
+    ]
+    inserted = insert_on_conflict_do_nothing(
+        db, StepsHourly, rows, ["user_id", "date", "hour"], returning=(StepsHourly.date,)
+    )
+    refresh_steps_rollups(db, user_id, {r.date for r in inserted})
+    return len(inserted)
+
+
 @router.post("", status_code=201)
 @limiter.limit(_api_post_cap, key_func=_user_id_key)
-def create_steps(
+async def create_steps(
     request: Request,
     body: StepsBulkIn,
     response: Response,
     db: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user_sync),
 ) -> dict:
-    inserted = 0
-    skipped = 0
-    for r in body.records:
-        stmt = (
-            pg_insert(StepsHourly)
-            .values(
-                user_id=current_user.id,
-                date=r.date,
-                hour=r.hour,
-                step_count=r.step_count,
-            )
-            .on_conflict_do_nothing(index_elements=["user_id", "date", "hour"])
-            .returning(StepsHourly.id)
-        )
-        if db.execute(stmt).first() is not None:
-            inserted += 1
-        else:
-            skipped += 1
-    db.commit()
-    return {"inserted": inserted, "skipped": skipped}
+    inserted = await run_in_thread(db, _insert_records, current_user.id, body.records)
+    return {"inserted": inserted, "skipped": len(body.records) - inserted}
 
 
-@router.get("")
-def get_steps(
-    from_date: str | None = Query(None, alias="from"),
-    to_date: str | None = Query(None, alias="to"),
+@router.post("/stream", status_code=201, openapi_extra=ndjson_openapi(StepsHourlyIn))
+@limiter.limit(_api_post_cap, key_func=_user_id_key)
+async def create_steps_stream(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
-) -> list[StepsHourlyOut]:
-    stmt = select(StepsHourly).where(StepsHourly.user_id == current_user.id)
+    current_user: CurrentUser = Depends(get_current_user_sync),
+) -> NdjsonIngestOut:
+    return await ingest_ndjson(
+        request, db, current_user.id, StepsHourlyIn, _insert_records, route="/api/steps/stream"
+    )
+
+
+def _rollup_filters(user_id: UUID, granularity: str, from_date: date | None, to_date: date | None) -> list:
+    filters = [StepsRollup.user_id == user_id, StepsRollup.granularity == granularity]
+    if from_date:
+        filters.append(StepsRollup.period_start >= period_start(from_date, granularity))
+    if to_date:
+        filters.append(StepsRollup.period_start <= to_date)
+    return filters
+
+
+async def _get_rollups(db: AsyncSession, filters: list) -> list:
+    stmt = select(StepsRollup.period_start, StepsRollup.step_count, StepsRollup.hour_count).where(*filters)
+    return (await db.execute(stmt.order_by(StepsRollup.period_start))).all()
+
+
+_KEYSET = Keyset(cols=(StepsHourly.date, StepsHourly.hour), parsers=(date.fromisoformat, int))
+_COLUMNS = Columns(fields=("date", "hour", "step_count"), delta={"date": "day"})
+_ROLLUP_COLUMNS = Columns(fields=("period_start", "step_count", "hour_count"), delta={"period_start": "day"})
+
+
+def _row_out(r) -> dict:
+    return {"date": r.date, "hour": r.hour, "step_count": r.step_count}
+
+
+@router.get("")
+@cached_json
+async def get_steps(
+    request: Request,
+    response: Response,
+    from_date: date | None = Query(None, alias="from"),
+    to_date: date | None = Query(None, alias="to"),
+    granularity: Literal["hour", "day", "week", "month"] = "hour",
+    cursor: str | None = Query(None),
+    limit: int | None = Query(None, gt=0, le=MAX_PAGE_LIMIT),
+    fmt: Literal["json", "ndjson", "columnar"] = Query("json", alias="format"),
+    delta: bool = Query(False),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> list[StepsHourlyOut] | list[StepsRollupOut] | ColumnarOut:
+    if granularity != "hour":
+        filters = _rollup_filters(current_user.id, granularity, from_date, to_date)
+        mark = watermark(StepsRollup, *filters)
+        if cached := await not_modified(request, response, db, current_user.id, mark, route="/api/steps"):
+            return cached
+        rows = await _get_rollups(db, filters)
+        if fmt == "columnar":
+            return fast_json(_ROLLUP_COLUMNS.encode(rows, delta=delta), response)
+        return fast_json([r._asdict() for r in rows], response)
+    filters = [StepsHourly.user_id == current_user.id]
     if from_date:
-        stmt = stmt.where(StepsHourly.date >= from_date)
+        filters.append(StepsHourly.date >= from_date)
     if to_date:
-        stmt = stmt.where(StepsHourly.date <= to_date)
-    stmt = stmt.order_by(StepsHourly.date, StepsHourly.hour)
-    rows = db.execute(stmt).scalars().all()
-    return [StepsHourlyOut(date=r.date, hour=r.hour, step_count=r.step_count) for r in rows]
+        filters.append(StepsHourly.date <= to_date)
+    mark = watermark(StepsHourly, *filters)
+    if cached := await not_modified(request, response, db, current_user.id, mark, route="/api/steps"):
+        return cached
+    stmt = select(StepsHourly.date, StepsHourly.hour, StepsHourly.step_count).where(*filters)
+    stmt = _KEYSET.apply(stmt, cursor, limit, lookahead=fmt != "ndjson")
+    if fmt == "ndjson":
+        chunks = stream_decrypted(db, stmt, STREAM_BATCH_SIZE)
+        return ndjson_response(chunks, _row_out, route="/api/steps", headers=cache_headers(response))
+    rows = _KEYSET.page((await db.execute(stmt)).all(), limit, response)
+    if fmt == "columnar":
+        return fast_json(_COLUMNS.encode(rows, delta=delta), response)
+    return fast_json([_row_out(r) for r in rows], response)
@@ -0,0 +1,90 @@
+"""GET /api/trends — agrégats de l'onglet Trends calculés côté serveur.
+
+Remplace les 4 GET bruts (sleep/steps/heartrate/exercise) que `renderTrends()`
+moyennait dans le navigateur par un seul payload de 4 nombres :
+
+- durée moyenne de sommeil (h) — AVG en SQL sur `sleep_end - sleep_start`
+- moyenne de pas / jour — SUM / COUNT(DISTINCT date) en SQL
+- FC de repos — moyenne des `avg_bpm` des heures 0–5 ; `avg_bpm` est chiffré
+  (Art.9) donc le filtre horaire est fait en SQL et seule cette colonne est
+  déchiffrée, en une passe
+- nombre de séances d'exercice — COUNT en SQL
+
+Bornes `from`/`to` (YYYY-MM-DD, incluses, 422 si invalides) avec la même
+sémantique que les routers unitaires.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.database import get_async_session
+from server.db.models import ExerciseSession, HeartRateHourly, SleepSession, StepsHourly
+from server.db.row_crypto import HEART_RATE_ROW, execute_row_decrypted_async
+from server.logging_config import get_logger
+from server.models import TrendsOut
+from server.response_cache import cached_json
+from server.security.auth import CurrentUser, get_current_user
+
+_log = get_logger(__name__)
+
+router = APIRouter(prefix="/api/trends", tags=["trends"])
+
+RESTING_HR_HOURS = range(0, 6)
+
+
+def _day_start(d: date) -> datetime:
+    return datetime.combine(d, datetime.min.time(), tzinfo=timezone.utc)
+
+
+@router.get("")
+@cached_json
+async def get_trends(
+    request: Request,
+    response: Response,
+    from_date: date | None = Query(None, alias="from"),
+    to_date: date | None = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> TrendsOut:
+    uid = current_user.id
+
+    sleep_q = select(
+        func.avg(func.extract("epoch", SleepSession.sleep_end - SleepSession.sleep_start))
+    ).where(SleepSession.user_id == uid)
+    steps_q = select(
+        func.sum(StepsHourly.step_count), func.count(distinct(StepsHourly.date))
+    ).where(StepsHourly.user_id == uid)
+    hr_q = select(HeartRateHourly.avg_bpm).where(
+        HeartRateHourly.user_id == uid,
+        HeartRateHourly.hour >= RESTING_HR_HOURS.start,
+        HeartRateHourly.hour < RESTING_HR_HOURS.stop,
+    )
+    ex_q = select(func.count()).select_from(ExerciseSession).where(ExerciseSession.user_id == uid)
+
+    if from_date:
+        start = _day_start(from_date)
+        sleep_q = sleep_q.where(SleepSession.sleep_start >= start)
+        steps_q = steps_q.where(StepsHourly.date >= from_date)
+        hr_q = hr_q.where(HeartRateHourly.date >= from_date)
+        ex_q = ex_q.where(ExerciseSession.exercise_start >= start)
+    if to_date:
+        end = _day_start(to_date + timedelta(days=1))
+        sleep_q = sleep_q.where(SleepSession.sleep_start < end)
+        steps_q = steps_q.where(StepsHourly.date <= to_date)
+        hr_q = hr_q.where(HeartRateHourly.date <= to_date)
+        ex_q = ex_q.where(ExerciseSession.exercise_start < end)
+
+    avg_sleep_s = (await db.execute(sleep_q)).scalar_one()
+    step_total, step_days = (await db.execute(steps_q)).one()
+    # Seule colonne chiffrée touchée, déchiffrée en une passe.
+    resting = [r.avg_bpm for r in await execute_row_decrypted_async(db, hr_q, HEART_RATE_ROW)]
+    exercise_count = (await db.execute(ex_q)).scalar_one()
+
+    return TrendsOut(
+        avg_sleep_hours=round(float(avg_sleep_s) / 3600, 2) if avg_sleep_s is not None else None,
+        avg_daily_steps=round(step_total / step_days) if step_days else None,
+        resting_hr=round(sum(resting) / len(resting)) if resting else None,
+        exercise_count=exercise_count,
+    )
@@ -6,7 +6,9 @@ Modules-level responsibilities:
 - `create_access_token` / `create_refresh_token` / `decode_*` — PyJWT HS256 with strict validation
 - `_validate_jwt_secret_at_boot` / `_validate_registration_token` — boot-time fail-fast
 - `rotate_refresh_token` / `revoke_refresh_token` — DB-backed refresh chain
-- `get_current_user` — FastAPI dependency
+- `get_current_user` — FastAPI dependency (snapshot `CurrentUser`, cache token → user)
+- `get_current_user_sync` — même dependency sur la `Session` sync (routes d'écriture, /me/*)
+- `get_current_user_row` — ligne ORM `User` pour les flux /me/* qui la modifient
 """
 from __future__ import annotations
 
@@ -23,12 +25,21 @@ from datetime import datetime, timedelta, timezone
 import jwt
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError, InvalidHashError, VerificationError
-from fastapi import Depends, Header, HTTPException
+from fastapi import Depends, Header, HTTPException, Request
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from server.database import get_session
+from server.database import get_async_session, get_session
 from server.logging_config import get_logger
+from server.security.auth_cache import (
+    AUTH_CACHE,
+    CurrentUser,
+    auth_cache_enabled,
+    cached_user,
+    remember_payload,
+    request_payload,
+)
 
 
 _log = get_logger(__name__)
@@ -312,45 +323,119 @@ def rotate_refresh_token(
 
 
 # ── get_current_user dep ───────────────────────────────────────────────────
-def get_current_user(
-    authorization: str | None = Header(default=None),
-    db: Session = Depends(get_session),
-):
-    """FastAPI dependency: parse Bearer token, decode, fetch active user, bind contextvars."""
-    import structlog
-
-    from server.db.models import User
-    from server.middleware.request_context import user_id_var
-
+def _bearer_token(authorization: str | None) -> str:
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="invalid_credentials")
+    return authorization[7:]
 
-    token = authorization[7:]
-    try:
-        payload = decode_access_token(token)
-    except Exception:
-        raise HTTPException(status_code=401, detail="invalid_credentials")
+
+def _token_subject(request: Request, token: str) -> tuple[_uuid.UUID, dict]:
+    """(user id, payload) du token ; payload repris de la key_func slowapi s'il a déjà été décodé."""
+    payload = request_payload(request, token)
+    if payload is None:
+        try:
+            payload = decode_access_token(token)
+        except Exception:
+            raise HTTPException(status_code=401, detail="invalid_credentials")
+        # Repris par la key_func slowapi des routes décorées (appelée après les dépendances).
+        remember_payload(request, token, payload)
 
     sub = payload.get("sub")
     if not sub:
         raise HTTPException(status_code=401, detail="invalid_credentials")
 
     try:
-        user_uuid = _uuid.UUID(sub)
+        return _uuid.UUID(sub), payload
     except (ValueError, TypeError):
         raise HTTPException(status_code=401, detail="invalid_credentials")
 
-    user = db.execute(
-        select(User).where(User.id == user_uuid, User.is_active.is_(True))
-    ).scalar_one_or_none()
-    if user is None:
+
+def _active_user_id(user_uuid: _uuid.UUID):
+    from server.db.models import User
+
+    return select(User.id).where(User.id == user_uuid, User.is_active.is_(True))
+
+
+def _verified_user(token: str, found, generation: int, payload: dict) -> CurrentUser:
+    if found is None:
         raise HTTPException(status_code=401, detail="invalid_credentials")
+    user = CurrentUser(id=found)
+    if auth_cache_enabled():
+        AUTH_CACHE.put(token, user, generation, payload["exp"])
+    return user
+
+
+def _bind_user(user: CurrentUser) -> CurrentUser:
+    import structlog
+
+    from server.middleware.request_context import user_id_var
 
     user_id_var.set(str(user.id))
     structlog.contextvars.bind_contextvars(user_id=str(user.id))
     return user
 
 
+async def get_current_user(
+    request: Request,
+    authorization: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_async_session),
+) -> CurrentUser:
+    """FastAPI dependency: parse Bearer token, decode, fetch active user, bind contextvars.
+
+    Async : même `AsyncSession` que les handlers qui déclarent `get_async_session`
+    (cache de dépendances par requête). Token déjà vérifié → snapshot du cache
+    (server/security/auth_cache.py), sans décodage ni lecture `users` ; sinon
+    payload repris de la key_func slowapi s'il a déjà été décodé.
+    """
+    token = _bearer_token(authorization)
+    user = cached_user(token)
+    if user is None:
+        user_uuid, payload = _token_subject(request, token)
+        generation = AUTH_CACHE.generation(user_uuid)
+        found = (await db.execute(_active_user_id(user_uuid))).scalar_one_or_none()
+        user = _verified_user(token, found, generation, payload)
+    return _bind_user(user)
+
+
+def get_current_user_sync(
+    request: Request,
+    authorization: str | None = Header(default=None),
+    db: Session = Depends(get_session),
+) -> CurrentUser:
+    """`get_current_user` sur la `Session` sync de la requête (ingest santé, /me/*).
+
+    Les routes qui travaillent sur `get_session` n'ouvrent ainsi qu'un pool :
+    en cas d'échec du cache, la lecture `users` passe par leur propre Session.
+    """
+    token = _bearer_token(authorization)
+    user = cached_user(token)
+    if user is None:
+        user_uuid, payload = _token_subject(request, token)
+        generation = AUTH_CACHE.generation(user_uuid)
+        found = db.execute(_active_user_id(user_uuid)).scalar_one_or_none()
+        user = _verified_user(token, found, generation, payload)
+    return _bind_user(user)
+
+
+def get_current_user_row(
+    current_user: CurrentUser = Depends(get_current_user_sync),
+    db: Session = Depends(get_session),
+):
+    """Ligne `User` attachée à la `Session` sync de la requête (re-auth, export, effacement /me/*).
+
+    Relue à chaque appel : hash du mot de passe et compteurs de lockout à jour.
+    Sync : les handlers /me/* (argon2, ZIP) tournent dans le threadpool.
+    """
+    from server.db.models import User
+
+    user = db.execute(
+        select(User).where(User.id == current_user.id, User.is_active.is_(True))
+    ).scalar_one_or_none()
+    if user is None:
+        raise HTTPException(status_code=401, detail="invalid_credentials")
+    return user
+
+
 # ── helpers used by routers ────────────────────────────────────────────────
 def check_registration_token(provided: str | None) -> None:
     """Constant-time compare of header X-Registration-Token vs env var.
@@ -0,0 +1,200 @@
+"""Cache in-process token d'accès → user authentifié (`get_current_user`).
+
+Chaque appel API décodait le JWT (2 décodages si le secret précédent est
+configuré), une fois dans la key_func slowapi (`_user_id_key`) et une fois
+dans la dépendance, puis relisait `users` (id + is_active). Un token déjà
+vérifié est gardé ici avec un snapshot minimal du user (`CurrentUser`) :
+en régime établi un GET authentifié ne fait ni décodage ni lecture `users`.
+
+- Clé : le token brut (signature déjà vérifiée à l'insertion).
+- Durée : `SAMSUNGHEALTH_AUTH_CACHE_TTL_S` (défaut 30 s), jamais au-delà de
+  l'`exp` du token. LRU borné à `SAMSUNGHEALTH_AUTH_CACHE_MAX_ENTRIES`.
+- Invalidation immédiate par user (`invalidate_user_on_commit`, rejouée au
+  commit) : lock / unlock admin, `erase_user_cascade`, reset du mot de passe,
+  logout. Génération par user : une résolution démarrée avant ne stocke pas.
+- Décodage partagé dans la requête : le payload vérifié par `_user_id_key`
+  (pré-auth slowapi) est posé dans `request.state` et repris par la dépendance.
+
+Kill switch : `SAMSUNGHEALTH_AUTH_CACHE=false`. Désactivé aussi si
+`SAMSUNGHEALTH_DEPLOYMENT_INSTANCES` > 1 (invalidation locale au process).
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from server.metrics import REGISTRY
+from server.response_cache import _env_number
+
+
+AUTH_CACHE_ENV = "SAMSUNGHEALTH_AUTH_CACHE"
+TTL_ENV = "SAMSUNGHEALTH_AUTH_CACHE_TTL_S"
+MAX_ENTRIES_ENV = "SAMSUNGHEALTH_AUTH_CACHE_MAX_ENTRIES"
+DEFAULT_TTL_S = 30.0
+DEFAULT_MAX_ENTRIES = 10_000
+
+# `request.state` : (token, payload) vérifié une fois par requête.
+STATE_PAYLOAD = "access_payload"
+_PENDING_KEY = "auth_cache_invalidate"
+
+
+@dataclass(frozen=True, slots=True)
+class CurrentUser:
+    """User authentifié de la requête (snapshot, détaché de toute session)."""
+
+    id: UUID
+
+
+@dataclass(frozen=True, slots=True)
+class _Entry:
+    user: CurrentUser
+    expires_at: float
+
+
+def auth_cache_enabled() -> bool:
+    if os.environ.get(AUTH_CACHE_ENV, "true").lower() == "false":
+        return False
+    try:
+        return int(os.environ.get("SAMSUNGHEALTH_DEPLOYMENT_INSTANCES", "1")) <= 1
+    except ValueError:
+        return True
+
+
+class AuthCache:
+    """LRU `OrderedDict` token → `CurrentUser`, TTL vérifié à la lecture."""
+
+    def __init__(self, max_entries: int, ttl_s: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._by_user: dict[UUID, set[str]] = {}
+        self._generations: dict[UUID, int] = {}
+        self._stats = {"hit": 0, "miss": 0, "eviction": 0, "invalidation": 0}
+        self._lock = threading.Lock()
+
+    def _drop(self, token: str) -> None:
+        entry = self._entries.pop(token)
+        tokens = self._by_user.get(entry.user.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[entry.user.id]
+
+    def get(self, token: str) -> CurrentUser | None:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry.expires_at <= self._clock():
+                self._drop(token)
+                entry = None
+            if entry is None:
+                self._stats["miss"] += 1
+                return None
+            self._entries.move_to_end(token)
+            self._stats["hit"] += 1
+            return entry.user
+
+    def generation(self, user_id: UUID) -> int:
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def put(self, token: str, user: CurrentUser, generation: int, token_exp: float) -> bool:
+        """Stocke si aucune invalidation du user depuis `generation`. `token_exp` : epoch (claim exp)."""
+        ttl = min(self.ttl_s, token_exp - time.time())
+        if ttl <= 0 or not self.max_entries:
+            return False
+        with self._lock:
+            if self._generations.get(user.id, 0) != generation:
+                return False
+            if token in self._entries:
+                self._drop(token)
+            self._entries[token] = _Entry(user, self._clock() + ttl)
+            self._by_user.setdefault(user.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._stats["eviction"] += 1
+            return True
+
+    def invalidate(self, user_id: UUID) -> int:
+        """Supprime tous les tokens du user. Retourne le nombre supprimé."""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            tokens = list(self._by_user.get(user_id, ()))
+            for token in tokens:
+                self._drop(token)
+            self._stats["invalidation"] += len(tokens)
+            return len(tokens)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self._generations.clear()
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+
+AUTH_CACHE = AuthCache(
+    max_entries=_env_number(MAX_ENTRIES_ENV, DEFAULT_MAX_ENTRIES, int),
+    ttl_s=_env_number(TTL_ENV, DEFAULT_TTL_S, float),
+)
+
+
+@REGISTRY.collector
+def _auth_cache_metrics():
+    stats = AUTH_CACHE.stats()
+    events = [((event,), stats[event]) for event in ("hit", "miss", "eviction", "invalidation")]
+    yield "samsunghealth_auth_cache_events_total", "counter", "Cache token → user : hit / miss / éviction / invalidation.", ("event",), events
+    yield "samsunghealth_auth_cache_entries", "gauge", "Tokens d'accès en cache.", (), [((), stats["entries"])]
+
+
+def cached_user(token: str) -> CurrentUser | None:
+    """User du token s'il est en cache (None si absent, expiré ou cache désactivé)."""
+    if not auth_cache_enabled():
+        return None
+    return AUTH_CACHE.get(token)
+
+
+def invalidate_user_on_commit(db: Session, user_id: UUID) -> None:
+    """Invalide maintenant, puis au commit de `db` (état visible des autres sessions)."""
+    AUTH_CACHE.invalidate(user_id)
+    db.info.setdefault(_PENDING_KEY, set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        AUTH_CACHE.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    # Rien n'a été écrit : pas de seconde invalidation à un commit ultérieur.
+    session.info.pop(_PENDING_KEY, None)
+
+
+def request_payload(request: Any, token: str) -> dict | None:
+    """Payload déjà vérifié pour `token` dans cette requête (posé par `remember_payload`)."""
+    state = getattr(request, "state", None)
+    remembered = getattr(state, STATE_PAYLOAD, None) if state is not None else None
+    if remembered is not None and remembered[0] == token:
+        return remembered[1]
+    return None
+
+
+def remember_payload(request: Any, token: str, payload: dict) -> None:
+    state = getattr(request, "state", None)
+    if state is not None:
+        setattr(state, STATE_PAYLOAD, (token, payload))
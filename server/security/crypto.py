@@ -8,12 +8,15 @@ from __future__ import annotations
 import base64
 import os
 import secrets
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 
 from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 from server.logging_config import get_logger
+from server.metrics import count_decrypts
 
 
 _log = get_logger(__name__)
@@ -21,6 +24,12 @@ _log = get_logger(__name__)
 KEY_ENV_VAR = "SAMSUNGHEALTH_ENCRYPTION_KEY"
 NONCE_BYTES = 12
 KEY_BYTES = 32
+TAG_BYTES = 16
+# Déchiffrement batch : nb de threads (0/1 = boucle dans le thread appelant).
+# `cryptography` relâche le GIL pendant l'AEAD → gain réel sur gros result sets.
+DECRYPT_WORKERS_ENV_VAR = "SAMSUNGHEALTH_DECRYPT_WORKERS"
+# En dessous, le coût de dispatch du pool dépasse le gain.
+PARALLEL_DECRYPT_MIN_BATCH = 4096
 _ZERO_KEY = b"\x00" * KEY_BYTES
 
 
@@ -60,24 +69,110 @@ def _aesgcm() -> AESGCM:
     return AESGCM(load_encryption_key())
 
 
-def encrypt_field(plaintext: bytes) -> bytes:
-    """Chiffre AES-256-GCM. Retourne nonce(12) || ciphertext_avec_tag."""
+def encrypt_field(plaintext: bytes, aad: bytes | None = None) -> bytes:
+    """Chiffre AES-256-GCM. Retourne nonce(12) || ciphertext_avec_tag.
+
+    `aad` (associated data, non chiffrée) lie le blob à son contexte : le
+    déchiffrement échoue si on ne fournit pas exactement la même valeur.
+    """
     nonce = secrets.token_bytes(NONCE_BYTES)
-    ct = _aesgcm().encrypt(nonce, plaintext, associated_data=None)
+    ct = _aesgcm().encrypt(nonce, plaintext, associated_data=aad)
     return nonce + ct
 
 
-def decrypt_field(blob: bytes) -> bytes:
+def decrypt_field(blob: bytes, aad: bytes | None = None) -> bytes:
     """Déchiffre AES-256-GCM. Raise DecryptionError si tampering / clé invalide."""
-    if len(blob) < NONCE_BYTES + 16:  # nonce + min tag
+    if len(blob) < NONCE_BYTES + TAG_BYTES:
         raise DecryptionError("blob trop court")
     nonce, ct = blob[:NONCE_BYTES], blob[NONCE_BYTES:]
+    count_decrypts(1)
     try:
-        return _aesgcm().decrypt(nonce, ct, associated_data=None)
+        return _aesgcm().decrypt(nonce, ct, associated_data=aad)
     except InvalidTag as exc:
         raise DecryptionError("decryption failed") from exc
 
 
+def encrypt_fields(
+    plaintexts: Sequence[bytes | None], *, aads: Sequence[bytes | None] | None = None
+) -> list[bytes | None]:
+    """Chiffre une colonne entière (`None` préservés, ordre conservé).
+
+    Même format que `encrypt_field` ; une seule résolution de clé et un seul
+    tirage d'aléa pour les nonces du lot (chemins bulk : import COPY).
+    """
+    encrypt = _aesgcm().encrypt
+    nonces = secrets.token_bytes(NONCE_BYTES * len(plaintexts))
+    out: list[bytes | None] = []
+    append = out.append
+    for i, plaintext in enumerate(plaintexts):
+        if plaintext is None:
+            append(None)
+            continue
+        nonce = nonces[i * NONCE_BYTES : (i + 1) * NONCE_BYTES]
+        append(nonce + encrypt(nonce, plaintext, aads[i] if aads is not None else None))
+    return out
+
+
+def _decrypt_many(
+    blobs: Sequence[bytes | None], aads: Sequence[bytes | None] | None = None
+) -> list[bytes | None]:
+    decrypt = _aesgcm().decrypt
+    out: list[bytes | None] = []
+    append = out.append
+    try:
+        for i, blob in enumerate(blobs):
+            if blob is None:
+                append(None)
+                continue
+            if len(blob) < NONCE_BYTES + TAG_BYTES:
+                raise DecryptionError("blob trop court")
+            append(decrypt(blob[:NONCE_BYTES], blob[NONCE_BYTES:], aads[i] if aads is not None else None))
+    except InvalidTag as exc:
+        raise DecryptionError("decryption failed") from exc
+    return out
+
+
+def _decrypt_workers() -> int:
+    try:
+        return max(0, int(os.environ.get(DECRYPT_WORKERS_ENV_VAR, "0")))
+    except ValueError:
+        return 0
+
+
+@lru_cache(maxsize=4)
+def _decrypt_pool(workers: int) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decrypt")
+
+
+def decrypt_fields(
+    blobs: Sequence[bytes | None],
+    *,
+    aads: Sequence[bytes | None] | None = None,
+    workers: int | None = None,
+) -> list[bytes | None]:
+    """Déchiffre une colonne entière (`None` préservés, ordre conservé).
+
+    Même format que `decrypt_field`, mais une seule résolution de clé et une
+    boucle serrée. `aads`, si fourni, est aligné sur `blobs`. Si `workers > 1`
+    (défaut : env `SAMSUNGHEALTH_DECRYPT_WORKERS`) et au moins
+    `PARALLEL_DECRYPT_MIN_BATCH` blobs, découpe en tranches réparties sur un
+    pool de threads. Raise DecryptionError au premier blob invalide.
+    """
+    count_decrypts(len(blobs) - blobs.count(None))
+    if workers is None:
+        workers = _decrypt_workers()
+    if workers <= 1 or len(blobs) < PARALLEL_DECRYPT_MIN_BATCH:
+        return _decrypt_many(blobs, aads)
+    size = -(-len(blobs) // workers)
+    starts = range(0, len(blobs), size)
+    parts = [blobs[i : i + size] for i in starts]
+    aad_parts = [aads[i : i + size] if aads is not None else None for i in starts]
+    out: list[bytes | None] = []
+    for part in _decrypt_pool(workers).map(_decrypt_many, parts, aad_parts):
+        out.extend(part)
+    return out
+
+
 def reset_key_cache() -> None:
     """Test-only — invalide le cache de la clé après monkeypatch env."""
     _aesgcm.cache_clear()
@@ -6,7 +6,8 @@
   entries) so that a flood of distinct keys cannot OOM the process.
 - `_rate_limit_exceeded_handler` returns the uniform `{"detail":"rate_limit_exceeded"}`
   body + `Retry-After` with random jitter (+0-5s, anti-sync attacker) and only
-  emits `X-RateLimit-*` headers when not in production (anti-leak bucket state).
+  emits `X-RateLimit-*` headers when not in production (anti-leak bucket state),
+  and counts the hit per route template (`samsunghealth_rate_limit_hits_total`).
 - `_validate_trusted_proxies_at_boot` parses `SAMSUNGHEALTH_TRUSTED_PROXIES` and
   fails fast in production if the env var is empty (else all clients hit the
   same bucket — DoS auth global).
@@ -26,8 +27,10 @@ from fastapi.responses import JSONResponse
 from limits.storage import SCHEMES
 from slowapi import Limiter
 from slowapi.errors import RateLimitExceeded
+from starlette.routing import Match
 
 from server.logging_config import get_logger
+from server.metrics import RATE_LIMIT_HITS, UNMATCHED_ROUTE
 from server.security.rate_limit_storage import LruMemoryStorage
 
 
@@ -172,10 +175,19 @@ def _user_id_key(request: Any) -> str:
     if headers is not None:
         auth = headers.get("authorization") or headers.get("Authorization")
     if auth and auth.startswith("Bearer "):
+        token = auth[7:]
         try:
             from server.security.auth import decode_access_token
-
-            payload = decode_access_token(auth[7:])
+            from server.security.auth_cache import cached_user, remember_payload, request_payload
+
+            user = cached_user(token)
+            if user is not None:
+                return f"api:user:{user.id}"
+            # Décodage unique par requête, que `get_current_user` passe avant ou après.
+            payload = request_payload(request, token)
+            if payload is None:
+                payload = decode_access_token(token)
+                remember_payload(request, token, payload)
             sub = payload.get("sub")
             if sub:
                 return f"api:user:{sub}"
@@ -209,8 +221,20 @@ limiter = Limiter(
 
 
 # ── 429 response ──────────────────────────────────────────────────────────
+def _route_template(request: Request) -> str:
+    """Route template (bounded label). Pre-auth 429s fire before routing, so match here."""
+    route = request.scope.get("route")
+    if route is None:
+        for candidate in getattr(request.app, "routes", ()):
+            if candidate.matches(request.scope)[0] == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
 def _rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> JSONResponse:
     """Uniform 429 body + Retry-After with jitter + headers conditional on env."""
+    RATE_LIMIT_HITS.inc(_route_template(request))
     # exc.limit is a slowapi Limit wrapping a limits RateLimitItem.
     try:
         retry_after = int(exc.limit.limit.get_expiry()) + random.randint(0, 5)
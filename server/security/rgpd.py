@@ -4,6 +4,7 @@ Module réutilisé par `server.routers.me` (router) et testé directement par
 les fixtures Phase 3 :
 
 - `HEALTH_TABLES` — liste des 21 tables santé (ordre stable, vérifié contre models)
+- `DERIVED_TABLES` — rollups dérivés, purgés par l'erase, non exportés
 - Pydantic models : `Export*`, `Erase*`, `EraseStats`, `AuditEventOut`, `AuditLogPage`
 - `_verify_reauth(db, user, password, oauth_nonce)` — password argon2 OU OAuth nonce
 - `_verify_oauth_nonce(...)` — stub patchable (tests mock via `patch(...)`)
@@ -38,8 +39,11 @@ from server.db.models import (
     User,
     VerificationToken,
 )
+from server.db.row_crypto import ROW_CODECS, execute_row_decrypted
 from server.logging_config import get_logger
+from server.response_cache import invalidate_on_commit
 from server.security.audit import audit_event
+from server.security.auth_cache import invalidate_user_on_commit
 from server.security.auth import (
     OAUTH_SENTINEL,
     generate_verification_token,
@@ -79,6 +83,13 @@ HEALTH_TABLES: tuple[str, ...] = (
     "ecg",
 )
 
+# Tables dérivées (rollups recalculables depuis HEALTH_TABLES) : purgées par
+# l'erase, absentes de l'export.
+DERIVED_TABLES: tuple[str, ...] = (
+    "steps_rollup",
+    "heart_rate_rollup",
+)
+
 # Cap export ZIP aggregate size (pentester §9). Above → 413.
 EXPORT_MAX_BYTES = 50 * 1024 * 1024
 # SpooledTemporaryFile threshold — stays in RAM under 10MB then auto-spills disk.
@@ -374,6 +385,23 @@ def _anonymize_auth_events(db: Session, user_id: UUID | str) -> None:
 # ── ZIP export ────────────────────────────────────────────────────────────
 
 
+#: Columns never exported : credentials, and the crypto_v=2 ciphertext
+#: (`row_blob`, exported decoded through its RowCodec instead).
+_EXPORT_EXCLUDED_COLUMNS = frozenset({"password_hash", "row_blob"})
+
+_ROW_CODECS_BY_TABLE = {codec.table: codec for codec in ROW_CODECS}
+
+
+def _serializable_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    return value
+
+
 def _row_to_serializable(row: Any) -> dict[str, Any]:
     """Convert a SQLAlchemy ORM row to a JSON-serializable dict.
 
@@ -385,19 +413,9 @@ def _row_to_serializable(row: Any) -> dict[str, Any]:
         return out
     for col in mapper.columns:
         name = col.key
-        if name == "password_hash":
+        if name in _EXPORT_EXCLUDED_COLUMNS:
             continue
-        value = getattr(row, name, None)
-        if isinstance(value, datetime):
-            out[name] = value.isoformat()
-        elif isinstance(value, date):
-            out[name] = value.isoformat()
-        elif isinstance(value, UUID):
-            out[name] = str(value)
-        elif isinstance(value, (bytes, bytearray)):
-            out[name] = value.hex()
-        else:
-            out[name] = value
+        out[name] = _serializable_value(getattr(row, name, None))
     return out
 
 
@@ -463,18 +481,28 @@ def _write_table_to_zip(
             orm_rows = (
                 db.execute(select(cls).where(cls.id.in_(ids))).scalars().all()
             )
+        serialized = [_row_to_serializable(r) for r in orm_rows]
     else:
         if not hasattr(cls, "user_id"):
             zf.writestr(f"health/{table_name}.csv", "")
             zf.writestr(f"health/{table_name}.json", "[]")
             return
-        orm_rows = (
-            db.execute(select(cls).where(cls.user_id == user_id)).scalars().all()
-        )
+        codec = _ROW_CODECS_BY_TABLE.get(table_name)
+        if codec is not None:
+            # Row-level crypto : same batch decode as the API (v1 and v2 rows).
+            stmt = select(
+                *(c for c in cls.__mapper__.columns if c.key not in _EXPORT_EXCLUDED_COLUMNS)
+            ).where(cls.user_id == user_id)
+            rows = execute_row_decrypted(db, stmt, codec)
+            serialized = [{k: _serializable_value(v) for k, v in r._asdict().items()} for r in rows]
+        else:
+            orm_rows = (
+                db.execute(select(cls).where(cls.user_id == user_id)).scalars().all()
+            )
+            serialized = [_row_to_serializable(r) for r in orm_rows]
 
-    serialized = [_row_to_serializable(r) for r in orm_rows]
     # CSV — collect headers from the mapper for a stable shape even when empty.
-    columns = [c.key for c in cls.__mapper__.columns if c.key != "password_hash"]
+    columns = [c.key for c in cls.__mapper__.columns if c.key not in _EXPORT_EXCLUDED_COLUMNS]
     csv_buf = io.StringIO()
     writer = csv.DictWriter(csv_buf, fieldnames=columns, extrasaction="ignore")
     writer.writeheader()
@@ -601,10 +629,14 @@ def erase_user_cascade(db: Session, user_id: UUID | str) -> EraseStats:
     1. SELECT FOR UPDATE on users.id (block concurrent export — HIGH 4).
     2. `_safe_audit_event("rgpd.erase.confirmed")` BEFORE delete users
        (so the audit row exists ; will be anonymized just after — LOW).
-    3. DELETE from each of the 21 health tables WHERE user_id = ?.
-    4. DELETE from identity_providers, refresh_tokens, verification_tokens.
+    3. DELETE from each of the 21 health tables WHERE user_id = ?, then
+       from the derived rollup tables.
+    4. DELETE from identity_providers, refresh_tokens, verification_tokens,
+       import_manifest.
     5. `_anonymize_auth_events(db, user_id)` — RGPD Art. 17.
     6. DELETE FROM users WHERE id = ?.
+    7. Purge du cache de réponses GET et des tokens en cache du user
+       (maintenant + au commit).
 
     Returns `EraseStats(tables={table: rowcount}, total_rows=sum)`.
     """
@@ -647,8 +679,15 @@ def erase_user_cascade(db: Session, user_id: UUID | str) -> EraseStats:
             )
         stats[table] = res.rowcount or 0
 
+    for table in DERIVED_TABLES:
+        res = db.execute(
+            text(f"DELETE FROM {table} WHERE user_id = :uid"),
+            {"uid": uid_str},
+        )
+        stats[table] = res.rowcount or 0
+
     # 4. Auxiliary auth tables.
-    for table in ("identity_providers", "refresh_tokens", "verification_tokens"):
+    for table in ("identity_providers", "refresh_tokens", "verification_tokens", "import_manifest"):
         res = db.execute(
             text(f"DELETE FROM {table} WHERE user_id = :uid"),
             {"uid": uid_str},
@@ -661,4 +700,8 @@ def erase_user_cascade(db: Session, user_id: UUID | str) -> EraseStats:
     # 6. Finally delete the users row.
     db.execute(text("DELETE FROM users WHERE id = :uid"), {"uid": uid_str})
 
+    # 7. Pas de contenu Art.9 déchiffré en mémoire au-delà des données.
+    invalidate_on_commit(db, UUID(uid_str))
+    invalidate_user_on_commit(db, UUID(uid_str))
+
     return EraseStats(tables=stats, total_rows=sum(stats.values()))
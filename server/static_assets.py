@@ -0,0 +1,138 @@
+"""Statiques : noms hashés, siblings précompressés, cache immutable.
+
+Build (`scripts/build_static.py`, lancé par le Dockerfile) : chaque asset de
+static/ est copié en `static/dist/<chemin>.<hash>.<ext>` (sha256 du contenu,
+10 hex) avec des siblings `.gz` (niveau 9) et `.br` (qualité 11, si `brotli`)
+pour les types compressibles, et `static/dist/manifest.json` :
+`{"js/theme.js": "js/theme.1a2b3c4d5e.js", ...}`.
+
+Service :
+- `PrecompressedStaticFiles` (monté sur /static) sert le sibling `.br` /
+  `.gz` négocié, `Content-Encoding` posé et type du fichier d'origine — le
+  middleware de compression le laisse passer tel quel ;
+- `/static/dist/*` : `Cache-Control: public, max-age=31536000, immutable`
+  (SecurityHeadersMiddleware) — un contenu modifié change de nom ;
+- `html_page()` : pages HTML avec leurs `/static/<asset>[?v=...]` réécrits
+  vers `/static/dist/<asset hashé>` d'après le manifest. Sans build (dev,
+  tests), HTML tel quel et `?v=` comme avant.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from mimetypes import guess_type
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, HTMLResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from server.middleware.compression import _compressible, _negotiate
+
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_PATH = DIST_DIR / "manifest.json"
+DIST_PREFIX = "/static/dist/"
+HASH_LEN = 10
+
+# Siblings précompressés, dans l'ordre de préférence serveur.
+PRECOMPRESSED = {"br": ".br", "gzip": ".gz"}
+
+# `/static/<chemin>` (+ `?v=...` éventuel) dans un attribut HTML, srcset ou url() CSS.
+_ASSET_URL_RE = re.compile(r"/static/(?!dist/)([A-Za-z0-9_./-]+?)(?:\?v=[^\"'()\s]*)?(?=[\"'()\s])")
+
+_manifest: tuple[float, dict[str, str]] | None = None
+_pages: dict[Path, tuple[float, float, str]] = {}
+
+
+def hashed_name(rel: str, data: bytes) -> str:
+    """`js/theme.js` → `js/theme.<sha256[:10]>.js`."""
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LEN]
+    stem, dot, ext = rel.rpartition(".")
+    return f"{stem}.{digest}.{ext}" if dot and "/" not in ext else f"{rel}.{digest}"
+
+
+def media_type_for(path: str) -> str:
+    return guess_type(path)[0] or "text/plain"
+
+
+def precompressible(path: str) -> bool:
+    return _compressible(media_type_for(path))
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+def load_manifest() -> dict[str, str]:
+    """Manifest du dernier build (rechargé si le fichier change), `{}` sans build."""
+    global _manifest
+    mtime = _mtime(MANIFEST_PATH)
+    if _manifest is None or _manifest[0] != mtime:
+        mapping = json.loads(MANIFEST_PATH.read_text(encoding="utf-8")) if mtime else {}
+        _manifest = (mtime, mapping)
+    return _manifest[1]
+
+
+def rewrite_asset_urls(text: str, manifest: dict[str, str]) -> str:
+    """`/static/x.css?v=...` → `/static/dist/x.<hash>.css` pour les assets du manifest."""
+
+    def _sub(m: re.Match) -> str:
+        hashed = manifest.get(m.group(1))
+        return f"{DIST_PREFIX}{hashed}" if hashed else m.group(0)
+
+    return _ASSET_URL_RE.sub(_sub, text) if manifest else text
+
+
+def html_page(path: Path, headers: dict[str, str] | None = None) -> HTMLResponse:
+    """Page HTML statique, URLs d'assets réécrites (mémoïsé par mtime page + manifest)."""
+    manifest = load_manifest()
+    key = (_mtime(path), _mtime(MANIFEST_PATH))
+    cached = _pages.get(path)
+    if cached is None or cached[:2] != key:
+        cached = (*key, rewrite_asset_urls(path.read_text(encoding="utf-8"), manifest))
+        _pages[path] = cached
+    return HTMLResponse(cached[2], headers=headers)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """`StaticFiles` qui sert `<fichier>.br` / `<fichier>.gz` quand le client les accepte."""
+
+    def file_response(
+        self,
+        full_path: os.PathLike | str,
+        stat_result: os.stat_result,
+        scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        siblings = {}
+        for encoding, suffix in PRECOMPRESSED.items():
+            try:
+                siblings[encoding] = os.stat(full_path + suffix)
+            except FileNotFoundError:
+                continue
+        accept = request_headers.get("accept-encoding")
+        encoding = _negotiate(accept, tuple(siblings)) if accept and siblings else None
+        if encoding is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        else:
+            response = FileResponse(
+                full_path + PRECOMPRESSED[encoding],
+                status_code=status_code,
+                stat_result=siblings[encoding],
+                media_type=media_type_for(full_path),
+                headers={"Content-Encoding": encoding},
+            )
+        if siblings:
+            response.headers["Vary"] = "Accept-Encoding"
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -52,21 +52,47 @@
     };
   }
 
-  function aggregateSteps(records) {
+  // ?format=columnar&delta=true : 1 tableau par champ, `date` en écarts de
+  // jours depuis 1970-01-01 (somme cumulée → "YYYY-MM-DD", mémoïsé).
+  const DAY_MS = 86400000;
+  const EMPTY_COLUMNS = { date: [], hour: [], step_count: [], avg_bpm: [] };
+
+  function decodeDays(days) {
+    const isoByDay = new Map();
+    let acc = 0;
+    return days.map((delta) => {
+      acc += delta;
+      let iso = isoByDay.get(acc);
+      if (iso === undefined) {
+        iso = new Date(acc * DAY_MS).toISOString().slice(0, 10);
+        isoByDay.set(acc, iso);
+      }
+      return iso;
+    });
+  }
+
+  async function columnsOf(res) {
+    if (!res.ok) return EMPTY_COLUMNS;
+    const cols = await res.json();
+    if (cols._delta && cols._delta.date === "day") cols.date = decodeDays(cols.date);
+    return cols;
+  }
+
+  function aggregateSteps({ date, step_count }) {
     const steps = {};
-    for (const r of records) {
-      steps[r.date] = (steps[r.date] || 0) + r.step_count;
+    for (let i = 0; i < date.length; i++) {
+      steps[date[i]] = (steps[date[i]] || 0) + step_count[i];
     }
     return steps;
   }
 
-  function aggregateHR(records) {
+  function aggregateHR({ date, hour, avg_bpm }) {
     const hr = {};
     const counts = {};
-    for (const r of records) {
-      if (r.hour >= 0 && r.hour <= 6) {
-        hr[r.date] = (hr[r.date] || 0) + r.avg_bpm;
-        counts[r.date] = (counts[r.date] || 0) + 1;
+    for (let i = 0; i < date.length; i++) {
+      if (hour[i] >= 0 && hour[i] <= 6) {
+        hr[date[i]] = (hr[date[i]] || 0) + avg_bpm[i];
+        counts[date[i]] = (counts[date[i]] || 0) + 1;
       }
     }
     const result = {};
@@ -146,12 +172,12 @@
     const toDate = rawSessions[rawSessions.length - 1].sleep_end.slice(0, 10);
 
     const [stepsRes, hrRes] = await Promise.all([
-      fetch(`/api/steps?from=${fromDate}&to=${toDate}`),
-      fetch(`/api/heartrate?from=${fromDate}&to=${toDate}`),
+      fetch(`/api/steps?from=${fromDate}&to=${toDate}&format=columnar&delta=true`),
+      fetch(`/api/heartrate?from=${fromDate}&to=${toDate}&format=columnar&delta=true`),
     ]);
 
-    const rawSteps = stepsRes.ok ? await stepsRes.json() : [];
-    const rawHR = hrRes.ok ? await hrRes.json() : [];
+    const rawSteps = await columnsOf(stepsRes);
+    const rawHR = await columnsOf(hrRes);
 
     const sessions = rawSessions.map((s, i) => computeSession(s, i));
     const steps = aggregateSteps(rawSteps);
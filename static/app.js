@@ -99,6 +99,40 @@ function dominantStage(stages) {
     return best;
 }
 
+// ─── Format colonnes (?format=columnar&delta=true) ───
+
+const DAY_MS = 86400000;
+
+// Deltas → absolus (somme cumulée), puis jours epoch → "YYYY-MM-DD".
+// Les dates horaires se répètent 24 fois : conversion mémoïsée.
+function decodeDeltas(cols) {
+    for (const [name, unit] of Object.entries(cols._delta || {})) {
+        const values = cols[name];
+        let acc = 0;
+        const isoByDay = new Map();
+        for (let i = 0; i < values.length; i++) {
+            acc += values[i];
+            if (unit === "day") {
+                let iso = isoByDay.get(acc);
+                if (iso === undefined) {
+                    iso = new Date(acc * DAY_MS).toISOString().slice(0, 10);
+                    isoByDay.set(acc, iso);
+                }
+                values[i] = iso;
+            } else {
+                values[i] = new Date(acc * 1000).toISOString();
+            }
+        }
+    }
+    delete cols._delta;
+    return cols;
+}
+
+async function fetchColumns(url) {
+    const resp = await fetch(`${url}&format=columnar&delta=true`);
+    return decodeDeltas(await resp.json());
+}
+
 function formatTime(isoStr) {
     const d = parseLocalDate(isoStr);
     return d.toLocaleString(undefined, {
@@ -183,12 +217,11 @@ async function renderSteps() {
     const container = document.getElementById("steps-chart");
     const { fromDate, toDate, numDays } = getMonthRange();
 
-    const resp = await fetch(`/api/steps?from=${fromDate}&to=${toDate}`);
-    const records = await resp.json();
+    const { date, step_count } = await fetchColumns(`/api/steps?from=${fromDate}&to=${toDate}`);
 
     const dailyTotals = {};
-    for (const r of records) {
-        dailyTotals[r.date] = (dailyTotals[r.date] || 0) + r.step_count;
+    for (let i = 0; i < date.length; i++) {
+        dailyTotals[date[i]] = (dailyTotals[date[i]] || 0) + step_count[i];
     }
 
     const maxSteps = Math.max(1, ...Object.values(dailyTotals));
@@ -219,18 +252,19 @@ async function renderHeartRate() {
     const container = document.getElementById("hr-chart");
     const { fromDate, toDate, numDays } = getMonthRange();
 
-    const resp = await fetch(`/api/heartrate?from=${fromDate}&to=${toDate}`);
-    const records = await resp.json();
+    const { date, min_bpm, max_bpm, avg_bpm } = await fetchColumns(
+        `/api/heartrate?from=${fromDate}&to=${toDate}`
+    );
 
     const dailyStats = {};
-    for (const r of records) {
-        if (!dailyStats[r.date]) {
-            dailyStats[r.date] = { min: r.min_bpm, max: r.max_bpm, sumAvg: 0, count: 0 };
+    for (let i = 0; i < date.length; i++) {
+        if (!dailyStats[date[i]]) {
+            dailyStats[date[i]] = { min: min_bpm[i], max: max_bpm[i], sumAvg: 0, count: 0 };
         }
-        const d = dailyStats[r.date];
-        d.min = Math.min(d.min, r.min_bpm);
-        d.max = Math.max(d.max, r.max_bpm);
-        d.sumAvg += r.avg_bpm;
+        const d = dailyStats[date[i]];
+        d.min = Math.min(d.min, min_bpm[i]);
+        d.max = Math.max(d.max, max_bpm[i]);
+        d.sumAvg += avg_bpm[i];
         d.count++;
     }
 
@@ -331,46 +365,16 @@ async function renderExercise() {
 
 async function renderTrends() {
     const container = document.getElementById("trends-grid");
-    const { from, fromDate, toDate } = getMonthRange();
-
-    const [sleepResp, stepsResp, hrResp, exResp] = await Promise.all([
-        fetch(`/api/sleep?from=${from}&to=${toDate}`),
-        fetch(`/api/steps?from=${fromDate}&to=${toDate}`),
-        fetch(`/api/heartrate?from=${fromDate}&to=${toDate}`),
-        fetch(`/api/exercise?from=${fromDate}&to=${toDate}`),
-    ]);
-
-    const sleepSessions = await sleepResp.json();
-    const stepsRecords = await stepsResp.json();
-    const hrRecords = await hrResp.json();
-    const exSessions = await exResp.json();
-
-    // Avg sleep duration
-    let avgSleep = "—";
-    if (sleepSessions.length > 0) {
-        const totalMs = sleepSessions.reduce((sum, s) => {
-            return sum + (parseLocalDate(s.sleep_end) - parseLocalDate(s.sleep_start));
-        }, 0);
-        const avgHrs = (totalMs / sleepSessions.length / 3600000).toFixed(1);
-        avgSleep = avgHrs;
-    }
-
-    // Daily step average
-    const dailySteps = {};
-    for (const r of stepsRecords) {
-        dailySteps[r.date] = (dailySteps[r.date] || 0) + r.step_count;
-    }
-    const stepDays = Object.keys(dailySteps).length;
-    const avgSteps = stepDays > 0 ? Math.round(Object.values(dailySteps).reduce((a, b) => a + b, 0) / stepDays) : "—";
+    const { fromDate, toDate } = getMonthRange();
 
-    // Resting HR (avg of nighttime hours 0-5)
-    const restingBpms = hrRecords.filter((r) => r.hour >= 0 && r.hour < 6);
-    const restingHR = restingBpms.length > 0
-        ? Math.round(restingBpms.reduce((sum, r) => sum + r.avg_bpm, 0) / restingBpms.length)
-        : "—";
+    // Agrégats calculés côté serveur (GET /api/trends) : 1 requête, 4 nombres.
+    const resp = await fetch(`/api/trends?from=${fromDate}&to=${toDate}`);
+    const t = await resp.json();
 
-    // Exercise frequency
-    const exFreq = exSessions.length;
+    const avgSleep = t.avg_sleep_hours != null ? t.avg_sleep_hours.toFixed(1) : "—";
+    const avgSteps = t.avg_daily_steps != null ? t.avg_daily_steps : "—";
+    const restingHR = t.resting_hr != null ? t.resting_hr : "—";
+    const exFreq = t.exercise_count;
 
     container.innerHTML = `<div class="stat-grid">
         <div class="stat-card">
@@ -4,12 +4,15 @@ Fixtures Postgres + chiffrement pour les specs server-side.
 Requiert testcontainers[postgres] et Docker. Si l'un des deux manque,
 les tests dépendant de `pg_url` sont skip avec message clair.
 """
+import asyncio
 import base64
 import os
 import secrets
 
 import pytest
 
+from query_budget import QueryRecorder
+
 
 _TEST_KEY_B64 = base64.b64encode(b"v2_2_test_key_32_bytes_exactly__")[:44].decode("ascii")
 
@@ -71,6 +74,8 @@ _NO_AUTO_AUTH_FILES = frozenset(
         "test_me_audit_log.py",
         # Phase 6 CI/CD MVP — public liveness/readiness probes (no Bearer).
         "test_healthz.py",
+        # Cache token → user : chaque test logue ses propres users.
+        "test_auth_cache.py",
     }
 )
 
@@ -163,7 +168,18 @@ def _set_auth_env_defaults(monkeypatch):
     # HTTPS-style behaviour can monkeypatch this back to "true".
     if not os.environ.get("SAMSUNGHEALTH_FORCE_HTTPS"):
         monkeypatch.setenv("SAMSUNGHEALTH_FORCE_HTTPS", "false")
+    # Cache de réponses GET off par défaut : des tests écrivent en DB hors API
+    # entre deux GET. test_response_cache.py le réactive.
+    if not os.environ.get("SAMSUNGHEALTH_RESPONSE_CACHE"):
+        monkeypatch.setenv("SAMSUNGHEALTH_RESPONSE_CACHE", "false")
+    # Idem cache token → user : des tests désactivent / suppriment des users en
+    # SQL direct. test_auth_cache.py le réactive.
+    if not os.environ.get("SAMSUNGHEALTH_AUTH_CACHE"):
+        monkeypatch.setenv("SAMSUNGHEALTH_AUTH_CACHE", "false")
     yield
+    from server.security.auth_cache import AUTH_CACHE
+
+    AUTH_CACHE.clear()
 
 
 @pytest.fixture(autouse=True)
@@ -520,17 +536,24 @@ def _expire_sibling_sessions_on_commit():
 
 @pytest.fixture
 def client_pg(pg_url, engine):
-    """TestClient FastAPI avec dependency_override sur get_session vers le testcontainer PG.
+    """TestClient FastAPI avec dependency_override sur get_session / get_async_session
+    vers le testcontainer PG.
 
     Requiert que le schema soit déjà migré (utiliser conjointement avec un fixture qui run alembic upgrade head).
+    Engine async en NullPool : la boucle du TestClient (thread portal) n'hérite
+    d'aucune connexion ouverte sur une autre boucle.
     """
     from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
     from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import NullPool
 
-    from server.database import get_session
+    from server.database import get_async_session, get_session
     from server.main import app
 
     SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+    async_engine = create_async_engine(pg_url, poolclass=NullPool)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 
     def _override():
         sess = SessionLocal()
@@ -539,7 +562,19 @@ def client_pg(pg_url, engine):
         finally:
             sess.close()
 
+    async def _override_async():
+        async with AsyncSessionLocal() as sess:
+            yield sess
+
     app.dependency_overrides[get_session] = _override
+    app.dependency_overrides[get_async_session] = _override_async
     with TestClient(app) as client:
         yield client
     app.dependency_overrides.clear()
+    asyncio.run(async_engine.dispose())
+
+
+@pytest.fixture
+def query_budget():
+    """Fabrique de `QueryRecorder` (context manager) ; budgets vérifiés à la sortie du bloc."""
+    return QueryRecorder
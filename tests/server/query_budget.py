@@ -0,0 +1,65 @@
+"""
+Budget de requêtes SQL par endpoint (`QueryRecorder`, fixture `query_budget` de conftest.py).
+
+Enregistre tous les statements exécutés, tous engines confondus (listener
+`before_cursor_execute` sur `Engine`, donc aussi l'engine async du TestClient
+qui tourne dans un autre thread), pendant le bloc `with` :
+
+    def test_ingest(client_pg_ready, query_budget):
+        with query_budget(max_statements=6, max_same_shape=1) as q:
+            client_pg_ready.post("/api/steps", json=...)
+        assert q.count == ...
+
+Dépassement → échec avec la liste des formes (`server.metrics.statement_shape`)
+les plus répétées. Un `executemany` compte pour un statement.
+"""
+from __future__ import annotations
+
+import threading
+from collections import Counter
+
+import pytest
+from sqlalchemy import Engine, event
+
+from server.metrics import statement_shape
+
+
+class QueryRecorder:
+    def __init__(self, max_statements: int | None = None, max_same_shape: int | None = None) -> None:
+        self.max_statements = max_statements
+        self.max_same_shape = max_same_shape
+        self.statements: list[str] = []
+        self._lock = threading.Lock()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.statements.append(statement)
+
+    def __enter__(self) -> QueryRecorder:
+        event.listen(Engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        event.remove(Engine, "before_cursor_execute", self._record)
+        if exc_type is None:
+            self.check()
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def shapes(self) -> Counter[str]:
+        return Counter(statement_shape(s) for s in self.statements)
+
+    def report(self, top: int = 5) -> str:
+        return "\n".join(f"  {n} × {shape[:160]}" for shape, n in self.shapes.most_common(top))
+
+    def check(self) -> None:
+        if self.max_statements is not None and self.count > self.max_statements:
+            pytest.fail(f"{self.count} statements SQL > budget {self.max_statements}\n{self.report()}")
+        if self.max_same_shape is not None and self.statements:
+            shape, n = self.shapes.most_common(1)[0]
+            if n > self.max_same_shape:
+                pytest.fail(f"N+1 : {n} × même statement > {self.max_same_shape}\n{self.report()}")
+
@@ -0,0 +1,191 @@
+"""
+Pile async : AsyncSession pour les lectures des routers santé et `get_current_user` ;
+écritures (AES, rollups) et /me/* (argon2, ZIP) sur Session sync hors de l'event loop.
+
+Cibles : server/database.py (get_async_session, run_in_thread), server/db/encrypted.py
+(stream_decrypted, decode_off_loop), server/security/auth.py.
+
+Classes: TestAsyncStack, TestAsyncRoutes
+"""
+import asyncio
+import inspect
+
+import pytest
+
+
+READ_HANDLERS = [
+    ("server.routers.steps", ["get_steps"]),
+    ("server.routers.heartrate", ["get_heartrate"]),
+    ("server.routers.exercise", ["get_exercise"]),
+    ("server.routers.mood", ["get_mood_entries"]),
+    ("server.routers.sleep", ["get_sleep_sessions"]),
+    ("server.routers.trends", ["get_trends"]),
+]
+WRITE_HANDLERS = [
+    ("server.routers.steps", ["create_steps", "create_steps_stream"]),
+    ("server.routers.heartrate", ["create_heartrate", "create_heartrate_stream"]),
+    ("server.routers.exercise", ["create_exercise", "create_exercise_stream"]),
+    ("server.routers.mood", ["create_mood_entries", "create_mood_entries_stream"]),
+    ("server.routers.sleep", ["create_sleep_sessions", "create_sleep_sessions_stream"]),
+]
+ME_HANDLERS = ["export_request", "export_confirm", "erase_request", "erase_confirm", "audit_log_my_account"]
+
+
+def _db_dependency(fn):
+    return inspect.signature(fn).parameters["db"].default.dependency
+
+
+def _user_dependency(fn):
+    return inspect.signature(fn).parameters["current_user"].default.dependency
+
+
+class TestAsyncStack:
+    @pytest.mark.parametrize("module, names", READ_HANDLERS)
+    def test_read_handlers_are_coroutines_on_async_session(self, module, names):
+        import importlib
+
+        from server.database import get_async_session
+
+        mod = importlib.import_module(module)
+        for name in names:
+            fn = getattr(mod, name)
+            assert inspect.iscoroutinefunction(fn), name
+            # Jamais la Session sync dans une route async (bloquerait la boucle).
+            assert _db_dependency(fn) is get_async_session, name
+
+    @pytest.mark.parametrize("module, names", WRITE_HANDLERS)
+    def test_write_handlers_use_sync_session_in_thread(self, module, names):
+        """Chiffrement + rollups sur une Session sync via `run_in_thread`, pas sur la boucle."""
+        import importlib
+
+        from server.database import get_session
+        from server.security.auth import get_current_user_sync
+
+        mod = importlib.import_module(module)
+        for name in names:
+            fn = getattr(mod, name)
+            assert inspect.iscoroutinefunction(fn), name
+            assert _db_dependency(fn) is get_session, name
+            # Un seul pool par requête : l'auth lit `users` sur la même Session.
+            assert _user_dependency(fn) is get_current_user_sync, name
+            assert "run_sync" not in inspect.getsource(fn), name
+
+    def test_me_handlers_run_in_threadpool(self):
+        """argon2 / ZIP RGPD : handlers sync, exécutés par FastAPI hors de l'event loop."""
+        from server.database import get_session
+        from server.routers import me
+        from server.security.auth import get_current_user_row, get_current_user_sync
+
+        for name in ME_HANDLERS:
+            fn = getattr(me, name)
+            assert not inspect.iscoroutinefunction(fn), name
+            assert _db_dependency(fn) is get_session, name
+            assert _user_dependency(fn) in (get_current_user_sync, get_current_user_row), name
+        assert _user_dependency(get_current_user_row) is get_current_user_sync
+
+    def test_run_in_thread_commits_off_the_loop(self):
+        import threading
+
+        from server.database import run_in_thread
+
+        class _Session:
+            committed = rolled_back = 0
+
+            def commit(self):
+                self.committed += 1
+
+            def rollback(self):
+                self.rolled_back += 1
+
+        def _work(db, x):
+            return threading.get_ident(), x * 2
+
+        def _fail(db):
+            raise ValueError("boom")
+
+        async def _main():
+            db = _Session()
+            thread, value = await run_in_thread(db, _work, 21)
+            assert thread != threading.get_ident() and value == 42
+            with pytest.raises(ValueError):
+                await run_in_thread(db, _fail)
+            return db
+
+        db = asyncio.run(_main())
+        assert (db.committed, db.rolled_back) == (1, 1)
+
+    def test_large_decode_batches_leave_the_loop(self):
+        import threading
+
+        from server.db.encrypted import OFFLOAD_MIN_ROWS, decode_off_loop
+
+        async def _main():
+            loop_thread = threading.get_ident()
+            small = await decode_off_loop([0], threading.get_ident)
+            large = await decode_off_loop([0] * OFFLOAD_MIN_ROWS, threading.get_ident)
+            return loop_thread, small, large
+
+        loop_thread, small, large = asyncio.run(_main())
+        assert small == loop_thread and large != loop_thread
+
+    def test_get_current_user_is_async(self):
+        from server.database import get_async_session
+        from server.security.auth import get_current_user
+
+        assert inspect.iscoroutinefunction(get_current_user)
+        assert inspect.signature(get_current_user).parameters["db"].default.dependency is get_async_session
+
+    def test_get_current_user_sync_shares_request_session(self):
+        from server.database import get_session
+        from server.security.auth import get_current_user_sync
+
+        assert not inspect.iscoroutinefunction(get_current_user_sync)
+        assert _db_dependency(get_current_user_sync) is get_session
+
+    def test_get_async_session_yields_and_closes(self, monkeypatch):
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        from server import database
+
+        database.get_async_engine.cache_clear()
+        database._async_session_factory.cache_clear()
+        monkeypatch.setenv("DATABASE_URL", "postgresql+psycopg://u:p@127.0.0.1:1/none")
+
+        async def _one():
+            gen = database.get_async_session()
+            session = await anext(gen)
+            assert isinstance(session, AsyncSession)
+            await gen.aclose()
+            await database.get_async_engine().dispose()
+
+        try:
+            asyncio.run(_one())
+        finally:
+            database.get_async_engine.cache_clear()
+            database._async_session_factory.cache_clear()
+
+
+class TestAsyncRoutes:
+    def test_concurrent_gets_share_nothing(self, client_pg_ready):
+        """GET parallèles : chaque requête sa session, résultats identiques."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        client_pg_ready.post("/api/steps", json={"records": [
+            {"date": "2026-03-01", "hour": h, "step_count": h} for h in range(24)
+        ]})
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda _: client_pg_ready.get("/api/steps").json(), range(16)))
+        assert all(r == results[0] for r in results) and len(results[0]) == 24
+
+    def test_ndjson_stream_from_async_cursor(self, client_pg_ready):
+        client_pg_ready.post("/api/steps", json={"records": [
+            {"date": "2026-03-01", "hour": h, "step_count": h} for h in range(24)
+        ]})
+        r = client_pg_ready.get("/api/steps?format=ndjson")
+        assert r.status_code == 200
+        assert len(r.text.splitlines()) == 24
+
+    def test_me_audit_log_in_threadpool(self, client_pg_ready):
+        r = client_pg_ready.get("/me/audit-log")
+        assert r.status_code == 200
+        assert r.json()["limit"] == 50
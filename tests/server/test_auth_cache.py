@@ -0,0 +1,227 @@
+"""
+Cache token d'accès → user de `get_current_user` — server/security/auth_cache.py.
+
+Classes: TestAuthCacheUnit, TestSharedDecode, TestCachedAuth
+"""
+import time
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+
+_TEST_REGISTRATION_TOKEN = "registration-token-32-chars-or-more-test1234"
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def auth_cache_on(monkeypatch):
+    from server.security.auth_cache import AUTH_CACHE
+
+    monkeypatch.setenv("SAMSUNGHEALTH_AUTH_CACHE", "true")
+    AUTH_CACHE.clear()
+    yield AUTH_CACHE
+    AUTH_CACHE.clear()
+
+
+class TestAuthCacheUnit:
+    def test_ttl_and_token_exp_bound_entries(self):
+        from server.security.auth_cache import AuthCache, CurrentUser
+
+        clock = _Clock()
+        cache = AuthCache(max_entries=10, ttl_s=30, clock=clock)
+        user = CurrentUser(id=uuid4())
+        assert cache.put("a", user, 0, time.time() + 3600)
+        assert cache.put("b", user, 0, time.time() + 5)
+        assert not cache.put("expired", user, 0, time.time() - 1)
+        clock.now = 10
+        assert cache.get("a") == user and cache.get("b") is None
+        clock.now = 31
+        assert cache.get("a") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_lru_bounded(self):
+        from server.security.auth_cache import AuthCache, CurrentUser
+
+        cache = AuthCache(max_entries=2, ttl_s=30)
+        exp = time.time() + 60
+        for token in ("a", "b"):
+            cache.put(token, CurrentUser(id=uuid4()), 0, exp)
+        cache.get("a")
+        cache.put("c", CurrentUser(id=uuid4()), 0, exp)
+        assert cache.get("b") is None and cache.get("a") is not None
+        assert cache.stats()["eviction"] == 1
+
+    def test_invalidate_all_tokens_of_user_and_stale_put(self):
+        from server.security.auth_cache import AuthCache, CurrentUser
+
+        cache = AuthCache(max_entries=10, ttl_s=30)
+        user, other = CurrentUser(id=uuid4()), CurrentUser(id=uuid4())
+        exp = time.time() + 60
+        gen = cache.generation(user.id)
+        cache.put("t1", user, gen, exp)
+        cache.put("t2", user, gen, exp)
+        cache.put("t3", other, 0, exp)
+        assert cache.invalidate(user.id) == 2
+        assert cache.get("t1") is None and cache.get("t3") == other
+        # Résolution démarrée avant l'invalidation : pas stockée.
+        assert not cache.put("t1", user, gen, exp)
+
+    def test_disabled_by_env_or_instances(self, monkeypatch):
+        from server.security.auth_cache import auth_cache_enabled
+
+        monkeypatch.setenv("SAMSUNGHEALTH_AUTH_CACHE", "true")
+        monkeypatch.setenv("SAMSUNGHEALTH_DEPLOYMENT_INSTANCES", "1")
+        assert auth_cache_enabled()
+        monkeypatch.setenv("SAMSUNGHEALTH_DEPLOYMENT_INSTANCES", "3")
+        assert not auth_cache_enabled()
+        monkeypatch.setenv("SAMSUNGHEALTH_DEPLOYMENT_INSTANCES", "1")
+        monkeypatch.setenv("SAMSUNGHEALTH_AUTH_CACHE", "false")
+        assert not auth_cache_enabled()
+
+
+def _request(token):
+    return SimpleNamespace(headers={"authorization": f"Bearer {token}"}, state=SimpleNamespace())
+
+
+class TestSharedDecode:
+    def test_rate_limit_key_remembers_payload(self, monkeypatch):
+        from server.security import auth
+        from server.security.auth_cache import request_payload
+        from server.security.rate_limit import _user_id_key
+
+        monkeypatch.setenv("SAMSUNGHEALTH_AUTH_CACHE", "false")
+        uid = uuid4()
+        token = auth.create_access_token(str(uid))
+        calls = []
+        real = auth.decode_access_token
+        monkeypatch.setattr(auth, "decode_access_token", lambda t: calls.append(t) or real(t))
+
+        request = _request(token)
+        assert _user_id_key(request) == f"api:user:{uid}"
+        assert request_payload(request, token)["sub"] == str(uid)
+        assert request_payload(request, "other-token") is None
+        assert calls == [token]
+
+    def test_rate_limit_key_from_cache_without_decode(self, auth_cache_on, monkeypatch):
+        from server.security import auth
+        from server.security.auth_cache import CurrentUser
+        from server.security.rate_limit import _user_id_key
+
+        uid = uuid4()
+        token = auth.create_access_token(str(uid))
+        auth_cache_on.put(token, CurrentUser(id=uid), 0, time.time() + 60)
+        monkeypatch.setattr(auth, "decode_access_token", lambda t: pytest.fail("decode inattendu"))
+        assert _user_id_key(_request(token)) == f"api:user:{uid}"
+
+
+def _login(client, email):
+    client.post(
+        "/auth/register",
+        headers={"X-Registration-Token": _TEST_REGISTRATION_TOKEN},
+        json={"email": email, "password": "longpassword12345"},
+    )
+    r = client.post("/auth/login", json={"email": email, "password": "longpassword12345"})
+    return r.json()
+
+
+def _user_lookups(statements):
+    return [s for s in statements if "FROM users" in s and "users.is_active" in s]
+
+
+class TestCachedAuth:
+    def test_steady_state_get_has_no_user_lookup(self, client_pg_ready, auth_cache_on, query_budget, monkeypatch):
+        from server.security import auth
+
+        tokens = _login(client_pg_ready, "auth-cache-1@example.com")
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        with query_budget() as first:
+            assert client_pg_ready.get("/api/steps", headers=headers).status_code == 200
+        assert len(_user_lookups(first.statements)) == 1
+
+        monkeypatch.setattr(auth, "decode_access_token", lambda t: pytest.fail("decode inattendu"))
+        with query_budget() as steady:
+            assert client_pg_ready.get("/api/steps", headers=headers).status_code == 200
+            assert client_pg_ready.get("/api/heartrate", headers=headers).status_code == 200
+        assert _user_lookups(steady.statements) == []
+
+    def test_single_decode_per_request_on_miss(self, client_pg_ready, monkeypatch):
+        from server.security import auth
+
+        tokens = _login(client_pg_ready, "auth-cache-2@example.com")
+        calls = []
+        real = auth.decode_access_token
+        monkeypatch.setattr(auth, "decode_access_token", lambda t: calls.append(t) or real(t))
+        r = client_pg_ready.post(
+            "/api/steps",
+            headers={"Authorization": f"Bearer {tokens['access_token']}"},
+            json={"records": [{"date": "2026-03-01", "hour": 1, "step_count": 5}]},
+        )
+        assert r.status_code == 201
+        assert len(calls) == 1
+
+    def test_logout_and_admin_lock_invalidate(self, client_pg_ready, auth_cache_on):
+        tokens = _login(client_pg_ready, "auth-cache-3@example.com")
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        client_pg_ready.get("/api/steps", headers=headers)
+        assert auth_cache_on.stats()["entries"] == 1
+
+        uid = next(iter(auth_cache_on._by_user))
+        r = client_pg_ready.post(
+            f"/admin/users/{uid}/lock",
+            headers={"X-Registration-Token": _TEST_REGISTRATION_TOKEN},
+            json={"duration_minutes": 60, "reason": "suspicious"},
+        )
+        assert r.status_code in (200, 204)
+        assert auth_cache_on.stats()["entries"] == 0
+
+        client_pg_ready.get("/api/steps", headers=headers)
+        assert auth_cache_on.stats()["entries"] == 1
+        r = client_pg_ready.post("/auth/logout", headers=headers, json={"refresh_token": tokens["refresh_token"]})
+        assert r.status_code == 204
+        assert auth_cache_on.stats()["entries"] == 0
+
+    def test_deactivated_user_rejected_after_invalidation(self, client_pg_ready, auth_cache_on, db_session):
+        from sqlalchemy import update
+
+        from server.db.models import User
+        from server.security.auth_cache import invalidate_user_on_commit
+
+        tokens = _login(client_pg_ready, "auth-cache-4@example.com")
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        assert client_pg_ready.get("/api/steps", headers=headers).status_code == 200
+        uid = next(iter(auth_cache_on._by_user))
+
+        db_session.execute(update(User).where(User.id == uid).values(is_active=False))
+        invalidate_user_on_commit(db_session, uid)
+        db_session.commit()
+        assert client_pg_ready.get("/api/steps", headers=headers).status_code == 401
+
+    def test_pending_invalidation_is_one_shot(self, db_session, auth_cache_on):
+        import uuid
+
+        from sqlalchemy import text
+
+        from server.security.auth_cache import _PENDING_KEY, invalidate_user_on_commit
+
+        uid = uuid.uuid4()
+        invalidate_user_on_commit(db_session, uid)
+        db_session.commit()
+        generation = auth_cache_on.generation(uid)
+        db_session.commit()
+        assert auth_cache_on.generation(uid) == generation
+        assert _PENDING_KEY not in db_session.info
+
+        db_session.execute(text("SELECT 1"))  # transaction ouverte, comme après un UPDATE users
+        invalidate_user_on_commit(db_session, uid)
+        db_session.rollback()
+        generation = auth_cache_on.generation(uid)
+        db_session.commit()
+        assert auth_cache_on.generation(uid) == generation
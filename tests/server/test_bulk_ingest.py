@@ -0,0 +1,174 @@
+"""
+Bulk ingest POST /api/steps + /api/heartrate — INSERT multi-VALUES chunké.
+
+Classes: TestChunking, TestStepsBulkIngest, TestHeartRateBulkIngest, TestCopyLoad
+"""
+from datetime import date, timedelta
+
+import pytest
+
+
+def _hourly_slots(n: int, start: date = date(2026, 1, 1)):
+    for i in range(n):
+        yield (start + timedelta(days=i // 24)).isoformat(), i % 24
+
+
+class _RecordingSession:
+    """Session factice : compte les statements sans toucher Postgres."""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, stmt):
+        self.statements.append(stmt)
+
+        class _Result:
+            @staticmethod
+            def all():
+                return []
+
+        return _Result()
+
+
+class TestChunking:
+    def test_chunk_size_stays_under_pg_param_limit(self):
+        from server.db.bulk import PG_MAX_BIND_PARAMS, chunk_size_for
+        from server.db.models import HeartRateHourly, StepsHourly
+
+        for model in (StepsHourly, HeartRateHourly):
+            size = chunk_size_for(model, max_rows=100_000)
+            assert size * len(model.__table__.columns) <= PG_MAX_BIND_PARAMS
+
+    def test_one_statement_per_chunk(self):
+        from server.db.bulk import chunk_size_for, insert_on_conflict_do_nothing
+        from server.db.models import StepsHourly
+
+        size = chunk_size_for(StepsHourly)
+        rows = [
+            dict(user_id="00000000-0000-0000-0000-000000000000", date=d, hour=h, step_count=1)
+            for d, h in _hourly_slots(2 * size + 1)
+        ]
+        db = _RecordingSession()
+        insert_on_conflict_do_nothing(db, StepsHourly, rows, ["user_id", "date", "hour"])
+        assert len(db.statements) == 3
+
+    def test_empty_rows_no_statement(self):
+        from server.db.bulk import insert_on_conflict_do_nothing
+        from server.db.models import StepsHourly
+
+        db = _RecordingSession()
+        assert insert_on_conflict_do_nothing(db, StepsHourly, [], ["user_id", "date", "hour"]) == []
+        assert db.statements == []
+
+    def test_statement_is_multi_values_on_conflict(self):
+        from sqlalchemy.dialects import postgresql
+
+        from server.db.bulk import insert_on_conflict_do_nothing
+        from server.db.models import StepsHourly
+
+        rows = [
+            dict(user_id="00000000-0000-0000-0000-000000000000", date=d, hour=h, step_count=1)
+            for d, h in _hourly_slots(3)
+        ]
+        db = _RecordingSession()
+        insert_on_conflict_do_nothing(db, StepsHourly, rows, ["user_id", "date", "hour"])
+        sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+        assert sql.count("VALUES") == 1
+        assert "ON CONFLICT (user_id, date, hour) DO NOTHING" in sql
+        assert "RETURNING" in sql
+
+
+class TestStepsBulkIngest:
+    def test_backfill_90_days_counts(self, client_pg_ready):
+        # Payload au format Android HealthApi.postSteps (StepsBulkPayload).
+        records = [
+            {"date": d, "hour": h, "step_count": 100 + h}
+            for d, h in _hourly_slots(90 * 24)
+        ]
+        r = client_pg_ready.post("/api/steps", json={"records": records})
+        assert r.status_code == 201, r.text
+        assert r.json() == {"inserted": 2160, "skipped": 0}
+
+        r = client_pg_ready.post("/api/steps", json={"records": records})
+        assert r.json() == {"inserted": 0, "skipped": 2160}
+
+    def test_partial_overlap_and_intra_payload_duplicate(self, client_pg_ready):
+        first = [{"date": "2026-04-20", "hour": h, "step_count": 10} for h in range(5)]
+        client_pg_ready.post("/api/steps", json={"records": first})
+
+        second = [{"date": "2026-04-20", "hour": h, "step_count": 10} for h in range(3, 8)]
+        second.append({"date": "2026-04-20", "hour": 7, "step_count": 99})
+        r = client_pg_ready.post("/api/steps", json={"records": second})
+        assert r.json() == {"inserted": 3, "skipped": 3}
+
+    def test_empty_records(self, client_pg_ready):
+        r = client_pg_ready.post("/api/steps", json={"records": []})
+        assert r.status_code == 201
+        assert r.json() == {"inserted": 0, "skipped": 0}
+
+
+class TestHeartRateBulkIngest:
+    def test_backfill_counts_and_decrypt_round_trip(self, client_pg_ready):
+        records = [
+            {"date": d, "hour": h, "min_bpm": 50, "max_bpm": 120, "avg_bpm": 70 + h, "sample_count": 60}
+            for d, h in _hourly_slots(30 * 24)
+        ]
+        r = client_pg_ready.post("/api/heartrate", json={"records": records})
+        assert r.status_code == 201, r.text
+        assert r.json() == {"inserted": 720, "skipped": 0}
+
+        r = client_pg_ready.post("/api/heartrate", json={"records": records[:10]})
+        assert r.json() == {"inserted": 0, "skipped": 10}
+
+        rows = client_pg_ready.get("/api/heartrate", params={"from": "2026-01-01", "to": "2026-01-01"}).json()
+        assert [row["avg_bpm"] for row in rows] == [70 + h for h in range(24)]
+
+    @pytest.mark.parametrize("n", [1, 5000])
+    def test_sizes_around_chunk_boundary(self, client_pg_ready, n):
+        records = [
+            {"date": d, "hour": h, "min_bpm": 50, "max_bpm": 120, "avg_bpm": 80, "sample_count": 1}
+            for d, h in _hourly_slots(n)
+        ]
+        r = client_pg_ready.post("/api/heartrate", json={"records": records})
+        assert r.json() == {"inserted": n, "skipped": 0}
+
+
+class TestCopyLoad:
+    """COPY en staging + INSERT ... SELECT ON CONFLICT DO NOTHING (imports CSV)."""
+
+    def test_counts_duplicates_and_encrypted_round_trip(self, default_user_db, db_session):
+        from datetime import datetime, timedelta, timezone
+
+        from sqlalchemy import select
+
+        from server.db.bulk import copy_insert_on_conflict_do_nothing
+        from server.db.models import Stress
+
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        rows = [
+            dict(user_id=default_user_db.id, start_time=start + timedelta(minutes=i),
+                 end_time=start + timedelta(minutes=i + 1), score=float(i), tag_id=None)
+            for i in range(25)
+        ]
+        res = copy_insert_on_conflict_do_nothing(
+            db_session, Stress, iter(rows + rows[:3]), ["user_id", "start_time", "end_time"], batch_rows=10
+        )
+        db_session.commit()
+        assert (res.staged, res.inserted) == (28, 25)
+
+        res = copy_insert_on_conflict_do_nothing(
+            db_session, Stress, rows[20:], ["user_id", "start_time", "end_time"],
+            returning=(Stress.start_time,),
+        )
+        db_session.commit()
+        assert (res.staged, res.inserted, res.returned) == (5, 0, [])
+        scores = db_session.execute(select(Stress.score).order_by(Stress.start_time)).scalars().all()
+        assert scores == [float(i) for i in range(25)]
+
+    def test_empty_iterable_no_statement(self):
+        from server.db.bulk import copy_insert_on_conflict_do_nothing
+        from server.db.models import Stress
+
+        db = _RecordingSession()
+        res = copy_insert_on_conflict_do_nothing(db, Stress, iter(()), ["user_id", "start_time", "end_time"])
+        assert tuple(res) == (0, 0, []) and db.statements == []
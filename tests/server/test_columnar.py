@@ -0,0 +1,119 @@
+"""
+Format colonnes (struct-of-arrays) des GET séries — server/columnar.py.
+
+Classes: TestEncode, TestColumnarRoutes
+"""
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+from itertools import accumulate
+
+import pytest
+
+
+Hour = namedtuple("Hour", "date hour step_count")
+
+
+def _transpose(records: list[dict], fields: list[str]) -> dict:
+    return {f: [r[f] for r in records] for f in fields}
+
+
+def _days_to_iso(deltas: list[int]) -> list[str]:
+    return [(date(1970, 1, 1) + timedelta(days=n)).isoformat() for n in accumulate(deltas)]
+
+
+def _hr(day: str, n: int = 24) -> list[dict]:
+    return [
+        {"date": day, "hour": h, "min_bpm": 40 + h, "max_bpm": 120 + h, "avg_bpm": 60 + h, "sample_count": h}
+        for h in range(n)
+    ]
+
+
+class TestEncode:
+    def test_transposes_rows(self):
+        from server.columnar import Columns
+
+        rows = [Hour("2026-03-01", 0, 5), Hour("2026-03-01", 1, 7)]
+        cols = Columns(fields=("date", "hour", "step_count")).encode(rows)
+        assert cols == {"date": ["2026-03-01", "2026-03-01"], "hour": [0, 1], "step_count": [5, 7]}
+
+    def test_empty_keeps_every_field(self):
+        from server.columnar import Columns
+
+        cols = Columns(fields=("date", "hour"), delta={"date": "day"}).encode([], delta=True)
+        assert cols == {"date": [], "hour": [], "_delta": {"date": "day"}}
+
+    def test_convert_skipped_for_delta_columns(self):
+        from server.columnar import Columns
+
+        ts = datetime(2026, 3, 1, 23, 0, tzinfo=timezone.utc)
+        Row = namedtuple("Row", "start n")
+        spec = Columns(fields=("start", "n"), convert={"start": datetime.isoformat}, delta={"start": "s"})
+        rows = [Row(ts, 1), Row(ts + timedelta(minutes=30), 2)]
+        assert spec.encode(rows)["start"] == [ts.isoformat(), (ts + timedelta(minutes=30)).isoformat()]
+        assert spec.encode(rows, delta=True)["start"] == [int(ts.timestamp()), 1800]
+
+    def test_day_deltas_round_trip(self):
+        from server.columnar import Columns
+
+        rows = [Hour(date(2026, 3, 1 + i // 24), i % 24, i) for i in range(72)]
+        cols = Columns(fields=("date", "hour", "step_count"), delta={"date": "day"}).encode(rows, delta=True)
+        assert cols["date"].count(1) == 2 and cols["date"][1:24] == [0] * 23
+        assert _days_to_iso(cols["date"]) == [r.date.isoformat() for r in rows]
+
+    def test_extra_columns_merged(self):
+        from server.columnar import Columns
+
+        cols = Columns(fields=("hour",)).encode([Hour("2026-03-01", 3, 0)], extra={"stages": [[]]})
+        assert cols == {"hour": [3], "stages": [[]]}
+
+
+class TestColumnarRoutes:
+    def test_heartrate_matches_transposed_json(self, client_pg_ready):
+        client_pg_ready.post("/api/heartrate", json={"records": _hr("2026-03-01") + _hr("2026-03-02")})
+        rows = client_pg_ready.get("/api/heartrate").json()
+        r = client_pg_ready.get("/api/heartrate?format=columnar")
+        assert r.status_code == 200
+        assert r.json() == _transpose(rows, list(rows[0]))
+
+    def test_delta_dates_decode_to_json_dates(self, client_pg_ready):
+        client_pg_ready.post("/api/heartrate", json={"records": _hr("2026-03-01") + _hr("2026-03-03")})
+        rows = client_pg_ready.get("/api/heartrate").json()
+        cols = client_pg_ready.get("/api/heartrate?format=columnar&delta=true").json()
+        assert cols["_delta"] == {"date": "day"}
+        assert _days_to_iso(cols["date"]) == [r["date"] for r in rows]
+
+    def test_pagination_matches_json_pages(self, client_pg_ready):
+        client_pg_ready.post("/api/steps", json={"records": [
+            {"date": "2026-03-01", "hour": h, "step_count": h} for h in range(10)
+        ]})
+        page = client_pg_ready.get("/api/steps?limit=4")
+        cols = client_pg_ready.get("/api/steps?limit=4&format=columnar")
+        assert cols.json()["hour"] == [r["hour"] for r in page.json()]
+        assert cols.headers["X-Next-Cursor"] == page.headers["X-Next-Cursor"]
+
+    @pytest.mark.parametrize(
+        "url",
+        ["/api/steps?granularity=day", "/api/heartrate?granularity=week", "/api/exercise", "/api/mood", "/api/sleep"],
+    )
+    def test_other_series_match_json(self, client_pg_ready, url):
+        client_pg_ready.post("/api/steps", json={"records": [{"date": "2026-03-01", "hour": 8, "step_count": 100}]})
+        client_pg_ready.post("/api/heartrate", json={"records": _hr("2026-03-01", 2)})
+        client_pg_ready.post("/api/exercise", json={"sessions": [
+            {"exercise_type": "run", "exercise_start": "2026-03-05T08:00:00", "exercise_end": "2026-03-05T09:00:00", "duration_minutes": 60},
+        ]})
+        client_pg_ready.post("/api/mood", json={"entries": [{"start_time": "2026-03-01T20:00:00", "mood_type": 4}]})
+        client_pg_ready.post("/api/sleep", json={"sessions": [
+            {"sleep_start": "2026-03-01T23:00:00+00:00", "sleep_end": "2026-03-02T07:00:00+00:00"},
+        ]})
+        rows = client_pg_ready.get(url).json()
+        cols = client_pg_ready.get(f"{url}&format=columnar" if "?" in url else f"{url}?format=columnar").json()
+        assert rows
+        assert cols == _transpose(rows, [f for f in rows[0] if f != "stages"])
+
+    def test_sleep_stages_column_when_requested(self, client_pg_ready):
+        client_pg_ready.post("/api/sleep", json={"sessions": [
+            {"sleep_start": "2026-03-01T23:00:00+00:00", "sleep_end": "2026-03-02T07:00:00+00:00"},
+        ]})
+        rows = client_pg_ready.get("/api/sleep?include_stages=true").json()
+        cols = client_pg_ready.get("/api/sleep?include_stages=true&format=columnar").json()
+        assert cols["stages"] == [r["stages"] for r in rows]
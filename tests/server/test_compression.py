@@ -0,0 +1,227 @@
+"""
+Compression des réponses + statiques précompressés / hashés.
+
+Cibles : server/middleware/compression.py, server/static_assets.py,
+scripts/build_static.py.
+
+Classes: TestNegotiate, TestCompressionMiddleware, TestPrecompressedStatic, TestBuildStatic
+"""
+import gzip
+import json
+import sys
+import zlib
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+BIG = {"rows": [{"date": "2026-03-01", "hour": h, "avg_bpm": 60 + h} for h in range(200)]}
+
+
+def _app(minimum_size=1024):
+    from fastapi import FastAPI, Response
+    from fastapi.responses import JSONResponse
+
+    from server.middleware.compression import CompressionMiddleware
+    from server.middleware.request_context import RequestContextMiddleware
+    from server.middleware.security_headers import SecurityHeadersMiddleware
+
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=minimum_size)
+    app.add_middleware(RequestContextMiddleware)
+    app.add_middleware(SecurityHeadersMiddleware)
+
+    @app.get("/api/big")
+    def big():
+        return JSONResponse(BIG, headers={"ETag": '"abc"'})
+
+    @app.get("/api/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/api/png")
+    def png():
+        return Response(b"\x89PNG" + b"\0" * 4096, media_type="image/png")
+
+    @app.get("/auth/big")
+    def auth_big():
+        return BIG
+
+    return app
+
+
+def _raw_get(app, path, accept="gzip"):
+    """Corps brut (non décodé par httpx) + headers."""
+    with TestClient(app).stream("GET", path, headers={"Accept-Encoding": accept}) as r:
+        return r, b"".join(r.iter_raw())
+
+
+class TestNegotiate:
+    @pytest.mark.parametrize(
+        "accept, expected",
+        [
+            ("gzip, deflate, br", "br"),
+            ("gzip;q=1.0, br;q=0.5", "gzip"),
+            ("br;q=0, gzip", "gzip"),
+            ("*", "br"),
+            ("identity", None),
+            ("gzip;q=0", None),
+            ("", None),
+        ],
+    )
+    def test_q_values_and_server_preference(self, accept, expected):
+        from server.middleware.compression import _negotiate
+
+        assert _negotiate(accept, ("br", "gzip")) == expected
+
+
+class TestCompressionMiddleware:
+    def test_large_json_gzipped_with_weak_etag(self):
+        r, raw = _raw_get(_app(), "/api/big")
+        assert r.headers["content-encoding"] == "gzip"
+        assert json.loads(gzip.decompress(raw)) == BIG
+        assert int(r.headers["content-length"]) == len(raw)
+        assert r.headers["etag"] == 'W/"abc"'
+        assert r.headers["vary"] == "Accept-Encoding"
+        # Headers des couches externes toujours posés.
+        assert "x-request-id" in r.headers and r.headers["x-frame-options"] == "DENY"
+
+    def test_below_threshold_passthrough(self):
+        r, raw = _raw_get(_app(), "/api/small")
+        assert "content-encoding" not in r.headers
+        assert json.loads(raw) == {"ok": True}
+        assert r.headers["vary"] == "Accept-Encoding"
+
+    def test_stream_compressed_and_flushed_per_chunk(self):
+        import asyncio
+
+        from server.middleware.compression import CompressionMiddleware
+
+        lines = [json.dumps({"i": i}).encode() + b"\n" for i in range(3)]
+
+        async def ndjson_app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"application/x-ndjson")]})
+            for i, line in enumerate(lines):
+                await send({"type": "http.response.body", "body": line, "more_body": i < len(lines) - 1})
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/api/stream", "headers": [(b"accept-encoding", b"gzip")]}
+        asyncio.run(CompressionMiddleware(ndjson_app, minimum_size=1024)(scope, None, send))
+
+        headers = dict(sent[0]["headers"])
+        assert headers[b"content-encoding"] == b"gzip" and b"content-length" not in headers
+        # Chaque message se décompresse dès réception (Z_SYNC_FLUSH) : aucune ligne retenue.
+        d = zlib.decompressobj(31)
+        assert [d.decompress(m["body"]) for m in sent[1:]] == lines
+        assert d.eof
+
+    def test_skips_binary_identity_and_auth(self):
+        app = _app(minimum_size=0)
+        assert "content-encoding" not in _raw_get(app, "/api/png")[0].headers
+        assert "content-encoding" not in _raw_get(app, "/api/big", accept="identity")[0].headers
+        assert "content-encoding" not in _raw_get(app, "/auth/big")[0].headers
+
+    def test_brotli_when_available(self):
+        brotli = pytest.importorskip("brotli")
+        r, raw = _raw_get(_app(), "/api/big", accept="br, gzip")
+        assert r.headers["content-encoding"] == "br"
+        assert json.loads(brotli.decompress(raw)) == BIG
+
+
+@pytest.fixture
+def static_tree(tmp_path):
+    (tmp_path / "js").mkdir()
+    (tmp_path / "css").mkdir()
+    (tmp_path / "fonts").mkdir()
+    (tmp_path / "js" / "app.js").write_text("console.log('x');\n" * 200)
+    (tmp_path / "fonts" / "a.ttf").write_bytes(b"\0\1" * 100)
+    (tmp_path / "css" / "site.css").write_text("@font-face { src: url('/static/fonts/a.ttf?v=1'); }\n")
+    (tmp_path / "index.html").write_text('<script src="/static/js/app.js?v=2"></script>')
+    return tmp_path
+
+
+def _build(static_dir):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "scripts"))
+    try:
+        import build_static
+    finally:
+        sys.path.pop(0)
+    return build_static.build(static_dir)
+
+
+class TestPrecompressedStatic:
+    def _client(self, static_dir):
+        from fastapi import FastAPI
+
+        from server.middleware.compression import CompressionMiddleware
+        from server.static_assets import PrecompressedStaticFiles
+
+        app = FastAPI()
+        app.add_middleware(CompressionMiddleware)
+        app.mount("/static", PrecompressedStaticFiles(directory=str(static_dir)), name="static")
+        return app
+
+    def test_serves_gz_sibling_with_original_type(self, static_tree):
+        manifest = _build(static_tree)
+        app = self._client(static_tree)
+        r, raw = _raw_get(app, f"/static/dist/{manifest['js/app.js']}")
+        assert r.headers["content-encoding"] == "gzip"
+        assert r.headers["content-type"].startswith("text/javascript")
+        assert gzip.decompress(raw) == (static_tree / "js" / "app.js").read_bytes()
+        assert r.headers["vary"] == "Accept-Encoding"
+
+        etag = r.headers["etag"]
+        again = TestClient(app).get(
+            f"/static/dist/{manifest['js/app.js']}", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+        assert again.status_code == 304
+
+    def test_identity_gets_plain_file(self, static_tree):
+        manifest = _build(static_tree)
+        r, raw = _raw_get(self._client(static_tree), f"/static/dist/{manifest['js/app.js']}", accept="identity")
+        assert "content-encoding" not in r.headers
+        assert raw == (static_tree / "js" / "app.js").read_bytes()
+
+    def test_dist_immutable_unversioned_no_cache(self):
+        from server.middleware.security_headers import _cache_control_for
+
+        assert "immutable" in _cache_control_for("/static/dist/js/theme.0123456789.js", "")
+        assert _cache_control_for("/static/js/theme.js", "") == "no-cache"
+
+
+class TestBuildStatic:
+    def test_manifest_hashes_and_siblings(self, static_tree):
+        manifest = _build(static_tree)
+        dist = static_tree / "dist"
+        assert set(manifest) == {"js/app.js", "fonts/a.ttf", "css/site.css"}
+        assert manifest["js/app.js"].startswith("js/app.") and manifest["js/app.js"].endswith(".js")
+        assert json.loads((dist / "manifest.json").read_text()) == manifest
+        assert (dist / (manifest["js/app.js"] + ".gz")).exists()
+        assert not (dist / "index.html").exists()
+
+    def test_css_urls_point_to_hashed_copies(self, static_tree):
+        manifest = _build(static_tree)
+        css = (static_tree / "dist" / manifest["css/site.css"]).read_text()
+        assert f"url('/static/dist/{manifest['fonts/a.ttf']}')" in css
+
+    def test_rebuild_is_reproducible_and_content_addressed(self, static_tree):
+        first = _build(static_tree)
+        assert _build(static_tree) == first
+        (static_tree / "js" / "app.js").write_text("console.log('y');\n")
+        second = _build(static_tree)
+        assert second["js/app.js"] != first["js/app.js"]
+        assert second["fonts/a.ttf"] == first["fonts/a.ttf"]
+
+    def test_html_rewrite(self, static_tree):
+        from server.static_assets import rewrite_asset_urls
+
+        manifest = _build(static_tree)
+        html = (static_tree / "index.html").read_text()
+        assert rewrite_asset_urls(html, manifest) == f'<script src="/static/dist/{manifest["js/app.js"]}"></script>'
+        assert rewrite_asset_urls(html, {}) == html
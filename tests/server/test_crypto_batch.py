@@ -0,0 +1,149 @@
+"""
+Déchiffrement batch — decrypt_fields / decode_many / execute_decrypted.
+
+Classes: TestDecryptFields, TestDecodeMany, TestExecuteDecrypted, TestDecryptBenchmark
+
+`TestDecryptBenchmark` est un micro-benchmark : il rapporte decrypts/sec des
+chemins par-cellule, batch et batch multi-thread (visible avec `pytest -s`,
+aussi exposé en `record_property` pour le rapport junit).
+"""
+import time
+
+import pytest
+
+
+N_BENCH = 20_000
+
+
+class TestDecryptFields:
+    def test_round_trip_preserves_order_and_none(self):
+        from server.security.crypto import decrypt_fields, encrypt_field
+
+        blobs = [encrypt_field(b"a"), None, encrypt_field(b"bc")]
+        assert decrypt_fields(blobs) == [b"a", None, b"bc"]
+
+    def test_tampered_blob_raises(self):
+        from server.security.crypto import DecryptionError, decrypt_fields, encrypt_field
+
+        bad = bytearray(encrypt_field(b"x"))
+        bad[-1] ^= 0x01
+        with pytest.raises(DecryptionError):
+            decrypt_fields([encrypt_field(b"ok"), bytes(bad)])
+
+    def test_short_blob_raises(self):
+        from server.security.crypto import DecryptionError, decrypt_fields
+
+        with pytest.raises(DecryptionError):
+            decrypt_fields([b"\x00" * 10])
+
+    def test_parallel_matches_serial(self, monkeypatch):
+        import server.security.crypto as crypto
+
+        monkeypatch.setattr(crypto, "PARALLEL_DECRYPT_MIN_BATCH", 8)
+        blobs = [crypto.encrypt_field(str(i).encode()) for i in range(100)]
+        assert crypto.decrypt_fields(blobs, workers=4) == crypto.decrypt_fields(blobs, workers=0)
+
+    def test_workers_from_env(self, monkeypatch):
+        from server.security.crypto import _decrypt_workers
+
+        monkeypatch.setenv("SAMSUNGHEALTH_DECRYPT_WORKERS", "3")
+        assert _decrypt_workers() == 3
+        monkeypatch.setenv("SAMSUNGHEALTH_DECRYPT_WORKERS", "nope")
+        assert _decrypt_workers() == 0
+
+
+class TestDecodeMany:
+    @pytest.mark.parametrize(
+        "type_name, values",
+        [
+            ("EncryptedInt", [0, -7, 182, None]),
+            ("EncryptedFloat", [0.1, -2.5, 1e-300, None]),
+            ("EncryptedString", ["", "café", None]),
+            ("EncryptedBytes", [b"\x00\xff", None]),
+        ],
+    )
+    def test_matches_per_cell_path(self, type_name, values):
+        import server.db.encrypted as enc
+
+        td = getattr(enc, type_name)()
+        blobs = [td.process_bind_param(v, dialect=None) for v in values]
+        assert td.decode_many(blobs) == [td.process_result_value(b, dialect=None) for b in blobs] == values
+
+    @pytest.mark.parametrize("type_name, values", [("EncryptedInt", [3, None, 90]), ("EncryptedString", ["a", None])])
+    def test_encode_many_round_trip(self, type_name, values):
+        import server.db.encrypted as enc
+
+        td = getattr(enc, type_name)()
+        blobs = td.encode_many(values)
+        assert [td.process_result_value(b, dialect=None) for b in blobs] == values
+        # Nonce propre à chaque cellule, même tiré en un lot.
+        assert len({b[:12] for b in blobs if b is not None}) == len(values) - values.count(None)
+
+
+class TestExecuteDecrypted:
+    def test_raw_select_coerces_only_encrypted_columns(self):
+        from sqlalchemy import select
+        from sqlalchemy.dialects import postgresql
+
+        from server.db.models import HeartRateHourly
+
+        captured = {}
+
+        class _Result:
+            def keys(self):
+                return ["date", "avg_bpm"]
+
+            def all(self):
+                return []
+
+        class _Session:
+            def execute(self, stmt):
+                captured["stmt"] = stmt
+                return _Result()
+
+        from server.db.encrypted import execute_decrypted
+
+        stmt = select(HeartRateHourly.date, HeartRateHourly.avg_bpm)
+        assert execute_decrypted(_Session(), stmt) == []
+        raw = captured["stmt"]
+        # avg_bpm relu en BYTEA brut : plus de TypeDecorator sur la colonne.
+        assert [type(c.type).__name__ for c in raw.selected_columns] == ["IsoDate", "LargeBinary"]
+        assert "FROM heart_rate_hourly" in str(raw.compile(dialect=postgresql.dialect()))
+
+    def test_heartrate_get_round_trip(self, client_pg_ready):
+        records = [
+            {"date": "2026-03-01", "hour": h, "min_bpm": 40 + h, "max_bpm": 120 + h, "avg_bpm": 60 + h, "sample_count": h}
+            for h in range(24)
+        ]
+        client_pg_ready.post("/api/heartrate", json={"records": records})
+        got = client_pg_ready.get("/api/heartrate?from=2026-03-01&to=2026-03-01").json()
+        assert got == records
+
+
+class TestDecryptBenchmark:
+    def test_report_decrypts_per_sec(self, record_property):
+        from server.db.encrypted import EncryptedInt
+
+        td = EncryptedInt()
+        blobs = [td.process_bind_param(60 + i % 80, dialect=None) for i in range(N_BENCH)]
+
+        def _rate(fn) -> float:
+            t0 = time.perf_counter()
+            out = fn()
+            elapsed = time.perf_counter() - t0
+            assert len(out) == N_BENCH
+            return N_BENCH / elapsed
+
+        per_cell = _rate(lambda: [td.process_result_value(b, dialect=None) for b in blobs])
+        batch = _rate(lambda: td.decode_many(blobs))
+
+        import server.security.crypto as crypto
+
+        t0 = time.perf_counter()
+        crypto.decrypt_fields(blobs, workers=4)
+        threaded = N_BENCH / (time.perf_counter() - t0)
+
+        for name, rate in (("per_cell", per_cell), ("batch", batch), ("batch_4_threads", threaded)):
+            record_property(f"decrypts_per_sec_{name}", round(rate))
+            print(f"\n  decrypt {name:<16} {rate:>12,.0f} decrypts/s ({N_BENCH} × EncryptedInt)", end="")
+        assert per_cell > 0 and batch > 0 and threaded > 0
@@ -0,0 +1,109 @@
+"""
+ETag + GET conditionnels (304) des séries santé — server/etag.py.
+
+Classes: TestMatching, TestConditionalGet, TestCounters
+"""
+import pytest
+
+
+_TEST_REGISTRATION_TOKEN = "registration-token-32-chars-or-more-test1234"
+ROUTES = ("/api/sleep", "/api/steps", "/api/heartrate", "/api/exercise", "/api/mood")
+
+
+def _login_other_user(client, email="etag-other@samsunghealth.local", password="longpassword12345") -> str:
+    client.post(
+        "/auth/register",
+        headers={"X-Registration-Token": _TEST_REGISTRATION_TOKEN},
+        json={"email": email, "password": password},
+    )
+    return client.post("/auth/login", json={"email": email, "password": password}).json()["access_token"]
+
+
+def _steps(n: int, day: str = "2026-03-01") -> list[dict]:
+    return [{"date": day, "hour": h, "step_count": 100 + h} for h in range(n)]
+
+
+class TestMatching:
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            ('"abc"', True),
+            ('W/"abc"', True),
+            ('"zzz", "abc"', True),
+            ("*", True),
+            ('"zzz"', False),
+            ("abc", False),
+            (None, False),
+        ],
+    )
+    def test_if_none_match(self, header, expected):
+        from server.etag import _matches
+
+        assert _matches(header, '"abc"') is expected
+
+
+class TestConditionalGet:
+    @pytest.mark.parametrize("route", ROUTES)
+    def test_etag_then_304(self, client_pg_ready, route):
+        r = client_pg_ready.get(route)
+        assert r.status_code == 200
+        etag = r.headers["ETag"]
+        assert etag.startswith('"') and r.headers["Cache-Control"] == "private, no-cache"
+
+        again = client_pg_ready.get(route, headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.content == b""
+        assert again.headers["ETag"] == etag
+
+    def test_post_in_range_changes_etag(self, client_pg_ready):
+        client_pg_ready.post("/api/steps", json={"records": _steps(3)})
+        url = "/api/steps?from=2026-03-01&to=2026-03-31"
+        etag = client_pg_ready.get(url).headers["ETag"]
+
+        client_pg_ready.post("/api/steps", json={"records": _steps(3, "2026-04-02")})
+        assert client_pg_ready.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+        client_pg_ready.post("/api/steps", json={"records": _steps(5)})
+        r = client_pg_ready.get(url, headers={"If-None-Match": etag})
+        assert r.status_code == 200 and len(r.json()) == 5
+        assert r.headers["ETag"] != etag
+
+    def test_rollup_upsert_changes_etag(self, client_pg_ready):
+        client_pg_ready.post("/api/heartrate", json={"records": [
+            {"date": "2026-03-02", "hour": 8, "min_bpm": 50, "max_bpm": 90, "avg_bpm": 70, "sample_count": 3},
+        ]})
+        url = "/api/heartrate?granularity=month"
+        etag = client_pg_ready.get(url).headers["ETag"]
+        # Même période, même count de rollups : seule la ligne upsertée change.
+        client_pg_ready.post("/api/heartrate", json={"records": [
+            {"date": "2026-03-03", "hour": 8, "min_bpm": 40, "max_bpm": 150, "avg_bpm": 80, "sample_count": 3},
+        ]})
+        r = client_pg_ready.get(url, headers={"If-None-Match": etag})
+        assert r.status_code == 200 and r.json()[0]["max_bpm"] == 150
+
+    def test_representation_params_change_etag(self, client_pg_ready):
+        client_pg_ready.post("/api/steps", json={"records": _steps(3)})
+        etags = {
+            client_pg_ready.get(url).headers["ETag"]
+            for url in ("/api/steps", "/api/steps?format=ndjson", "/api/steps?limit=2", "/api/steps?granularity=day")
+        }
+        assert len(etags) == 4
+
+    def test_etag_is_per_user(self, client_pg_ready):
+        etag = client_pg_ready.get("/api/steps").headers["ETag"]
+        token = _login_other_user(client_pg_ready)
+        r = client_pg_ready.get(
+            "/api/steps", headers={"Authorization": f"Bearer {token}", "If-None-Match": etag}
+        )
+        assert r.status_code == 200 and r.headers["ETag"] != etag
+
+
+class TestCounters:
+    def test_hit_and_miss_counted_per_route(self, client_pg_ready):
+        from server.etag import etag_counters, reset_etag_counters
+
+        reset_etag_counters()
+        etag = client_pg_ready.get("/api/exercise").headers["ETag"]
+        client_pg_ready.get("/api/exercise", headers={"If-None-Match": etag})
+        client_pg_ready.get("/api/exercise", headers={"If-None-Match": etag})
+        assert etag_counters() == {"/api/exercise": {"hit": 2, "miss": 1}}
@@ -0,0 +1,176 @@
+"""
+Registre de métriques Prometheus + GET /metrics — server/metrics.py.
+
+Classes: TestRegistry, TestRequestMetrics, TestMetricsEndpoint
+"""
+import re
+
+import pytest
+
+
+def _value(text: str, sample: str) -> float:
+    """Valeur d'une ligne d'exposition `nom{labels} valeur` (0 si absente)."""
+    m = re.search(rf"^{re.escape(sample)} (\S+)$", text, re.M)
+    return float(m.group(1)) if m else 0.0
+
+
+class TestRegistry:
+    def test_histogram_cumulative_exposition(self):
+        from server.metrics import Registry
+
+        reg = Registry()
+        hist = reg.histogram("x_seconds", "Aide.", ("route",), bounds=(0.1, 1.0))
+        for v in (0.05, 0.5, 5):
+            hist.observe(v, "/a")
+        text = reg.render()
+        assert "# TYPE x_seconds histogram" in text
+        assert 'x_seconds_bucket{route="/a",le="0.1"} 1' in text
+        assert 'x_seconds_bucket{route="/a",le="1.0"} 2' in text
+        assert 'x_seconds_bucket{route="/a",le="+Inf"} 3' in text
+        assert 'x_seconds_count{route="/a"} 3' in text
+        assert _value(text, 'x_seconds_sum{route="/a"}') == pytest.approx(5.55)
+
+    def test_counters_collectors_and_escaping(self):
+        from server.metrics import CounterGroup, Registry
+
+        reg = Registry()
+        reg.counter("hits_total", "Aide.", ("route",)).inc('/a"b')
+        group = CounterGroup((("q_total", "Q."), ("r_total", "R.")), ("route",))
+        reg.collector(group.collect)
+        group.inc(("/a",), (2, 10))
+        group.inc(("/a",), (1, 5))
+        text = reg.render()
+        assert 'hits_total{route="/a\\"b"} 1' in text
+        assert 'q_total{route="/a"} 3' in text and 'r_total{route="/a"} 15' in text
+
+    def test_request_stats_omit_zeroes(self):
+        from server.metrics import count_decrypts, request_stats, track_request
+
+        assert request_stats(track_request()) == {}
+        token = track_request()
+        count_decrypts(24)
+        assert request_stats(token) == {"decrypts": 24}
+        count_decrypts(5)  # hors requête : no-op
+
+
+class TestRequestMetrics:
+    def _app(self):
+        from fastapi import FastAPI
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.pool import StaticPool
+
+        from server.metrics import instrument_engines
+        from server.middleware.request_context import RequestContextMiddleware
+        from server.security.crypto import decrypt_fields, encrypt_field
+
+        instrument_engines()
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        blobs = [encrypt_field(b"x") for _ in range(3)]
+        app = FastAPI()
+        app.add_middleware(RequestContextMiddleware)
+
+        @app.get("/api/thing/{thing_id}")
+        def thing(thing_id: int):
+            with engine.connect() as conn:
+                rows = conn.execute(text("SELECT 1 UNION ALL SELECT 2")).all()
+            decrypt_fields(blobs + [None])
+            return {"rows": len(rows)}
+
+        return app
+
+    def test_latency_db_and_decrypts_per_route_template(self):
+        from fastapi.testclient import TestClient
+
+        from server.metrics import HTTP_DURATION, REGISTRY, ROUTE_DB
+
+        route = "/api/thing/{thing_id}"
+        before = HTTP_DURATION.series(route, "GET", "200").snapshot()["count"]
+        queries = ROUTE_DB.value("samsunghealth_db_queries_total", route)
+        decrypts = ROUTE_DB.value("samsunghealth_decrypt_total", route)
+        client = TestClient(self._app())
+        assert client.get("/api/thing/1").status_code == 200
+        assert client.get("/api/thing/2").status_code == 200
+        assert client.get("/nope").status_code == 404
+
+        assert HTTP_DURATION.series(route, "GET", "200").snapshot()["count"] == before + 2
+        assert ROUTE_DB.value("samsunghealth_db_queries_total", route) == queries + 2
+        assert ROUTE_DB.value("samsunghealth_decrypt_total", route) == decrypts + 6
+        text = REGISTRY.render()
+        # Path brut jamais en label : cardinalité bornée.
+        assert "/nope" not in text and 'route="<unmatched>",method="GET",status="404"' in text
+
+    def test_failed_statement_leaves_nothing_on_pooled_connection(self):
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.exc import OperationalError
+        from sqlalchemy.pool import StaticPool
+
+        from server.metrics import instrument_engines, request_stats, track_request
+
+        instrument_engines()
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        token = track_request()
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    conn.execute(text("SELECT * FROM missing_table"))
+            conn.execute(text("SELECT 1"))
+            assert dict(conn.connection.info) == {} and dict(conn.info) == {}
+        assert request_stats(token)["db_queries"] == 1
+
+    def test_rate_limit_hits_labelled_by_template(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from slowapi.errors import RateLimitExceeded
+
+        from server.metrics import RATE_LIMIT_HITS
+        from server.security.rate_limit import _rate_limit_exceeded_handler
+
+        app = FastAPI()
+
+        @app.get("/api/limited/{x}")
+        def limited(x: int):
+            return {}
+
+        # 429 pré-auth : émis avant le routage (pas de `scope["route"]`).
+        @app.middleware("http")
+        async def limit_everything(request, call_next):
+            return _rate_limit_exceeded_handler(request, RateLimitExceeded.__new__(RateLimitExceeded))
+
+        before = RATE_LIMIT_HITS.value("/api/limited/{x}")
+        assert TestClient(app).get("/api/limited/7").status_code == 429
+        assert RATE_LIMIT_HITS.value("/api/limited/{x}") == before + 1
+
+
+class TestMetricsEndpoint:
+    def _client(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        import server.main  # noqa: F401 — modules qui enregistrent leurs collecteurs
+        from server.routers import metrics
+
+        app = FastAPI()
+        app.include_router(metrics.router)
+        return TestClient(app)
+
+    def test_prometheus_text_without_token(self, monkeypatch):
+        monkeypatch.delenv("SAMSUNGHEALTH_METRICS_TOKEN", raising=False)
+        r = self._client().get("/metrics")
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+        for family in (
+            "samsunghealth_http_request_duration_seconds",
+            "samsunghealth_db_pool_checkout_seconds",
+            "samsunghealth_etag_total",
+            "samsunghealth_response_cache_events_total",
+            "samsunghealth_compressed_responses_total",
+            "samsunghealth_rate_limit_hits_total",
+        ):
+            assert f"# TYPE {family} " in r.text
+
+    def test_bearer_required_when_configured(self, monkeypatch):
+        monkeypatch.setenv("SAMSUNGHEALTH_METRICS_TOKEN", "s3cret")
+        client = self._client()
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
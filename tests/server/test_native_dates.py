@@ -0,0 +1,172 @@
+"""
+Colonnes jour natives (horaires, quotidiennes, rollups) — migration 0013 + server/db/dates.py (IsoDate).
+
+Classes: TestIsoDate, TestDateColumns, TestOnlineMigration
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+from datetime import date, datetime, timezone
+
+import pytest
+
+
+PRE_0013 = "5f8a9b0c1d24"
+
+
+def _run_alembic(cmd: list[str], pg_url: str) -> subprocess.CompletedProcess:
+    env = os.environ.copy()
+    env["DATABASE_URL"] = pg_url
+    return subprocess.run(["alembic"] + cmd, capture_output=True, text=True, env=env, check=False)
+
+
+class TestIsoDate:
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("2026-03-01", date(2026, 3, 1)),
+            (date(2026, 3, 1), date(2026, 3, 1)),
+            (datetime(2026, 3, 1, 23, 59, tzinfo=timezone.utc), date(2026, 3, 1)),
+            (None, None),
+        ],
+    )
+    def test_bind(self, value, expected):
+        from server.db.dates import IsoDate
+
+        assert IsoDate().process_bind_param(value, dialect=None) == expected
+
+    def test_bind_rejects_non_iso(self):
+        from server.db.dates import IsoDate
+
+        with pytest.raises(ValueError):
+            IsoDate().process_bind_param("01/03/2026", dialect=None)
+
+    def test_result_keeps_iso_str_contract(self):
+        from server.db.dates import IsoDate
+
+        assert IsoDate().process_result_value(date(2026, 3, 1), dialect=None) == "2026-03-01"
+
+
+class TestDateColumns:
+    @pytest.mark.parametrize(
+        "table, column",
+        [
+            ("steps_hourly", "date"),
+            ("heart_rate_hourly", "date"),
+            ("steps_daily", "day_date"),
+            ("activity_daily", "day_date"),
+            ("vitality_score", "day_date"),
+            ("floors_daily", "day_date"),
+            ("steps_rollup", "period_start"),
+            ("heart_rate_rollup", "period_start"),
+        ],
+    )
+    def test_column_is_date(self, schema_ready, engine, table, column):
+        from sqlalchemy import text
+
+        with engine.connect() as conn:
+            data_type, nullable = conn.execute(
+                text(
+                    "SELECT data_type, is_nullable FROM information_schema.columns "
+                    "WHERE table_name = :t AND column_name = :c"
+                ),
+                {"t": table, "c": column},
+            ).one()
+        assert (data_type, nullable) == ("date", "NO")
+
+    def test_api_shape_unchanged(self, client_pg_ready):
+        records = [
+            {"date": "2026-02-28", "hour": 23, "step_count": 5},
+            {"date": "2026-03-01", "hour": 0, "step_count": 7},
+        ]
+        assert client_pg_ready.post("/api/steps", json={"records": records}).status_code == 201
+        assert client_pg_ready.get("/api/steps?from=2026-02-28&to=2026-03-01").json() == records
+        hr = {"date": "2026-03-01", "hour": 4, "min_bpm": 48, "max_bpm": 131, "avg_bpm": 62, "sample_count": 12}
+        client_pg_ready.post("/api/heartrate", json={"records": [hr]})
+        assert client_pg_ready.get("/api/heartrate?from=2026-03-01&to=2026-03-01").json() == [hr]
+
+    def test_rollup_period_filters_compare_dates(self, client_pg_ready):
+        records = [{"date": "2026-03-04", "hour": 8, "step_count": 5}]
+        assert client_pg_ready.post("/api/steps", json={"records": records}).status_code == 201
+        # Mercredi → semaine du lundi 2026-03-02, incluse par from/to en milieu de semaine.
+        week = client_pg_ready.get("/api/steps?granularity=week&from=2026-03-04&to=2026-03-04").json()
+        assert week == [{"period_start": "2026-03-02", "step_count": 5, "hour_count": 1}]
+        assert client_pg_ready.get("/api/steps?granularity=day&from=2026-03-05").json() == []
+
+    def test_invalid_dates_are_422(self, client_pg_ready):
+        bad = {"date": "2026-02-30", "hour": 1, "step_count": 5}
+        assert client_pg_ready.post("/api/steps", json={"records": [bad]}).status_code == 422
+        assert client_pg_ready.get("/api/steps?from=yesterday").status_code == 422
+        assert client_pg_ready.get("/api/heartrate?to=2026-13-01").status_code == 422
+
+
+class TestOnlineMigration:
+    def test_upgrade_converts_existing_rows(self, pg_url, engine):
+        from sqlalchemy import text
+
+        _run_alembic(["downgrade", "base"], pg_url)
+        assert _run_alembic(["upgrade", PRE_0013], pg_url).returncode == 0
+        with engine.begin() as conn:
+            uid = conn.execute(
+                text(
+                    "INSERT INTO users (id, email, password_hash) "
+                    "VALUES (gen_random_uuid(), 'dates@samsunghealth.local', 'x') RETURNING id"
+                )
+            ).scalar_one()
+            conn.execute(
+                text(
+                    "INSERT INTO steps_hourly (id, user_id, date, hour, step_count) "
+                    "SELECT gen_random_uuid(), :uid, to_char(DATE '2026-01-01' + d, 'YYYY-MM-DD'), 9, d "
+                    "FROM generate_series(0, 99) d"
+                ),
+                {"uid": uid},
+            )
+
+        result = _run_alembic(["upgrade", "head"], pg_url)
+        assert result.returncode == 0, result.stderr
+
+        with engine.connect() as conn:
+            days = conn.execute(
+                text("SELECT min(date), max(date), count(*) FROM steps_hourly")
+            ).one()
+            assert days == (date(2026, 1, 1), date(2026, 4, 10), 100)
+            leftovers = conn.execute(
+                text("SELECT count(*) FROM pg_proc WHERE proname LIKE '%\\_d\\_sync'")
+            ).scalar_one()
+            assert leftovers == 0
+            constraints = {
+                r[0] for r in conn.execute(
+                    text("SELECT conname FROM pg_constraint WHERE conrelid = 'steps_hourly'::regclass")
+                )
+            }
+            assert "uq_steps_hourly_user_window" in constraints
+            assert not any(c.endswith("_d_not_null") for c in constraints)
+
+    def test_upgrade_refuses_invalid_values(self, pg_url, engine):
+        from sqlalchemy import text
+
+        _run_alembic(["downgrade", "base"], pg_url)
+        assert _run_alembic(["upgrade", PRE_0013], pg_url).returncode == 0
+        with engine.begin() as conn:
+            uid = conn.execute(
+                text(
+                    "INSERT INTO users (id, email, password_hash) "
+                    "VALUES (gen_random_uuid(), 'dates-bad@samsunghealth.local', 'x') RETURNING id"
+                )
+            ).scalar_one()
+            conn.execute(
+                text(
+                    "INSERT INTO floors_daily (id, user_id, day_date) "
+                    "VALUES (gen_random_uuid(), :uid, '2026-02-30')"
+                ),
+                {"uid": uid},
+            )
+
+        result = _run_alembic(["upgrade", "head"], pg_url)
+        assert result.returncode != 0
+        assert "floors_daily.day_date: 1" in result.stderr
+
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM floors_daily"))
+        assert _run_alembic(["upgrade", "head"], pg_url).returncode == 0
@@ -0,0 +1,114 @@
+"""
+Streaming NDJSON ingest — POST /api/{sleep,steps,heartrate,exercise,mood}/stream.
+
+Classes: TestLineSplitter, TestNdjsonRoutes
+"""
+import asyncio
+import json
+
+import pytest
+
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+def _ndjson(objs) -> bytes:
+    return b"\n".join(json.dumps(o).encode() for o in objs) + b"\n"
+
+
+def _chunked(body: bytes, size: int = 37):
+    for i in range(0, len(body), size):
+        yield body[i : i + size]
+
+
+class _FakeRequest:
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    async def stream(self):
+        for c in self._chunks:
+            yield c
+
+
+def _collect_lines(chunks):
+    from server.ndjson import _iter_lines
+
+    async def _run():
+        return [item async for item in _iter_lines(_FakeRequest(chunks))]
+
+    return asyncio.run(_run())
+
+
+class TestLineSplitter:
+    def test_lines_split_across_chunks(self):
+        assert _collect_lines([b'{"a"', b':1}\n{"b":2', b"}\n"]) == [(1, b'{"a":1}'), (2, b'{"b":2}')]
+
+    def test_trailing_line_without_newline(self):
+        assert _collect_lines([b"x\ny"]) == [(1, b"x"), (2, b"y")]
+
+    def test_oversized_line_is_dropped_and_numbered(self, monkeypatch):
+        import server.ndjson as nd
+
+        monkeypatch.setattr(nd, "MAX_LINE_BYTES", 8)
+        lines = _collect_lines([b"ok\n", b"x" * 20, b"y" * 20, b"\nok2\n"])
+        assert lines == [(1, b"ok"), (2, None), (3, b"ok2")]
+
+
+class TestNdjsonRoutes:
+    def test_steps_stream_batches_and_counts(self, client_pg_ready, monkeypatch):
+        import server.ndjson as nd
+
+        monkeypatch.setattr(nd, "DEFAULT_BATCH_SIZE", 100)
+        records = [{"date": f"2026-02-{1 + i // 24:02d}", "hour": i % 24, "step_count": i} for i in range(250)]
+        body = _ndjson(records)
+        r = client_pg_ready.post("/api/steps/stream", content=_chunked(body), headers=NDJSON)
+        assert r.status_code == 201, r.text
+        assert r.json() == {
+            "lines": 250, "inserted": 250, "skipped": 0, "batches": 3, "rejected": 0, "rejected_lines": [],
+        }
+
+        r = client_pg_ready.post("/api/steps/stream", content=body, headers=NDJSON)
+        assert r.json()["skipped"] == 250
+
+    def test_rejected_line_numbers(self, client_pg_ready):
+        body = (
+            b'{"date":"2026-02-01","hour":1,"min_bpm":50,"max_bpm":90,"avg_bpm":60,"sample_count":3}\n'
+            b"not json\n"
+            b"\n"
+            b'{"date":"2026-02-01","hour":"abc"}\n'
+            b'{"date":"2026-02-01","hour":2,"min_bpm":50,"max_bpm":90,"avg_bpm":61,"sample_count":3}\n'
+        )
+        r = client_pg_ready.post("/api/heartrate/stream", content=body, headers=NDJSON)
+        out = r.json()
+        assert out["inserted"] == 2
+        assert out["rejected"] == 2
+        assert out["rejected_lines"] == [2, 4]
+
+    def test_sleep_stream_one_session_per_line(self, client_pg_ready):
+        sessions = [
+            {
+                "sleep_start": f"2026-02-{d:02d}T23:00:00Z",
+                "sleep_end": f"2026-02-{d + 1:02d}T07:00:00Z",
+                "stages": [{"stage_type": "deep", "stage_start": f"2026-02-{d:02d}T23:00:00Z", "stage_end": f"2026-02-{d:02d}T23:30:00Z"}],
+            }
+            for d in range(1, 11)
+        ]
+        r = client_pg_ready.post("/api/sleep/stream", content=_ndjson(sessions), headers=NDJSON)
+        assert r.json()["inserted"] == 10
+        got = client_pg_ready.get("/api/sleep?from=2026-02-01&to=2026-02-28&include_stages=true").json()
+        assert len(got) == 10 and all(len(s["stages"]) == 1 for s in got)
+
+    def test_exercise_and_mood_stream(self, client_pg_ready):
+        ex = [{"exercise_type": "run", "exercise_start": "2026-02-01T08:00:00", "exercise_end": "2026-02-01T09:00:00", "duration_minutes": 60}]
+        r = client_pg_ready.post("/api/exercise/stream", content=_ndjson(ex), headers=NDJSON)
+        assert r.json()["inserted"] == 1
+
+        moods = [{"start_time": "2026-02-01T12:00:00", "mood_type": 3, "notes": "ok"}]
+        r = client_pg_ready.post("/api/mood/stream", content=_ndjson(moods), headers=NDJSON)
+        assert r.json()["inserted"] == 1
+        assert client_pg_ready.get("/api/mood?from=2026-02-01&to=2026-02-01").json()[0]["notes"] == "ok"
+
+    @pytest.mark.parametrize("ctype", ["application/json", "text/plain"])
+    def test_wrong_content_type_415(self, client_pg_ready, ctype):
+        r = client_pg_ready.post("/api/steps/stream", content=b"{}\n", headers={"Content-Type": ctype})
+        assert r.status_code == 415
@@ -0,0 +1,146 @@
+"""
+Pagination keyset + GET streamés NDJSON — server/pagination.py.
+
+Classes: TestCursor, TestKeysetPages, TestNdjsonStreaming
+"""
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+
+def _steps(n: int) -> list[dict]:
+    return [{"date": f"2026-03-{1 + i // 24:02d}", "hour": i % 24, "step_count": i} for i in range(n)]
+
+
+def _walk(client, url: str, limit: int) -> tuple[list, int]:
+    """Suit `X-Next-Cursor` jusqu'à la dernière page. Retourne (lignes, nb de pages)."""
+    out, pages, cursor = [], 0, None
+    while True:
+        sep = "&" if "?" in url else "?"
+        q = f"{url}{sep}limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        r = client.get(q)
+        assert r.status_code == 200, r.text
+        out += r.json()
+        pages += 1
+        cursor = r.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return out, pages
+
+
+def _ndjson(r) -> list[dict]:
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in r.text.splitlines()]
+
+
+class TestCursor:
+    def test_round_trip_with_datetimes(self):
+        from server.pagination import decode_cursor, encode_cursor
+
+        ts = datetime(2026, 3, 1, 23, 0, tzinfo=timezone.utc)
+        cursor = encode_cursor(["2026-03-01", 9, ts])
+        assert "=" not in cursor
+        assert decode_cursor(cursor, (str, int, datetime.fromisoformat)) == ["2026-03-01", 9, ts]
+
+    @pytest.mark.parametrize("cursor", ["%%%", "bm90LWpzb24", "WzFd", "WyJ4Il0"])
+    def test_invalid_cursor_400(self, cursor):
+        from fastapi import HTTPException
+
+        from server.pagination import decode_cursor
+
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(cursor, (int,) if cursor == "WyJ4Il0" else (str, int))
+        assert exc.value.status_code == 400
+
+    def test_apply_is_row_comparison_on_key(self):
+        from sqlalchemy import select
+        from sqlalchemy.dialects import postgresql
+
+        from server.db.models import StepsHourly
+        from server.pagination import Keyset, encode_cursor
+
+        ks = Keyset(cols=(StepsHourly.date, StepsHourly.hour), parsers=(str, int))
+        stmt = ks.apply(select(StepsHourly.step_count), encode_cursor(["2026-03-01", 9]), 50)
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "(steps_hourly.date, steps_hourly.hour) > (" in sql
+        assert "ORDER BY steps_hourly.date, steps_hourly.hour" in sql
+        assert stmt._limit == 51
+
+
+class TestKeysetPages:
+    def test_steps_pages_concatenate_to_full_range(self, client_pg_ready):
+        client_pg_ready.post("/api/steps", json={"records": _steps(50)})
+        full = client_pg_ready.get("/api/steps").json()
+        assert "X-Next-Cursor" not in client_pg_ready.get("/api/steps").headers
+
+        rows, pages = _walk(client_pg_ready, "/api/steps?from=2026-03-01&to=2026-03-31", 20)
+        assert pages == 3 and rows == full
+
+    def test_heartrate_pages_decrypt(self, client_pg_ready):
+        records = [
+            {"date": "2026-03-01", "hour": h, "min_bpm": 40 + h, "max_bpm": 120 + h, "avg_bpm": 60 + h, "sample_count": h}
+            for h in range(24)
+        ]
+        client_pg_ready.post("/api/heartrate", json={"records": records})
+        rows, pages = _walk(client_pg_ready, "/api/heartrate", 10)
+        assert pages == 3 and rows == records
+
+    def test_sleep_pages_with_stages(self, client_pg_ready):
+        sessions = [
+            {
+                "sleep_start": f"2026-03-{d:02d}T23:00:00+00:00",
+                "sleep_end": f"2026-03-{d + 1:02d}T07:00:00+00:00",
+                "stages": [
+                    {"stage_type": "light", "stage_start": f"2026-03-{d:02d}T23:00:00+00:00", "stage_end": f"2026-03-{d + 1:02d}T01:00:00+00:00"},
+                    {"stage_type": "deep", "stage_start": f"2026-03-{d + 1:02d}T01:00:00+00:00", "stage_end": f"2026-03-{d + 1:02d}T02:00:00+00:00"},
+                ],
+            }
+            for d in range(1, 8)
+        ]
+        client_pg_ready.post("/api/sleep", json={"sessions": sessions})
+        full = client_pg_ready.get("/api/sleep?include_stages=true").json()
+        rows, pages = _walk(client_pg_ready, "/api/sleep?include_stages=true", 3)
+        assert pages == 3 and rows == full
+        assert [s["stage_type"] for s in rows[0]["stages"]] == ["light", "deep"]
+
+    def test_invalid_cursor_and_limit(self, client_pg_ready):
+        assert client_pg_ready.get("/api/mood?cursor=not-a-cursor").status_code == 400
+        assert client_pg_ready.get("/api/exercise?limit=0").status_code == 422
+
+
+class TestNdjsonStreaming:
+    def test_stream_matches_json(self, client_pg_ready):
+        client_pg_ready.post("/api/steps", json={"records": _steps(30)})
+        client_pg_ready.post("/api/heartrate", json={"records": [
+            {"date": "2026-03-01", "hour": h, "min_bpm": 50, "max_bpm": 90, "avg_bpm": 70, "sample_count": 3}
+            for h in range(5)
+        ]})
+        client_pg_ready.post("/api/mood", json={"entries": [
+            {"start_time": "2026-03-01T20:00:00", "mood_type": 4, "notes": "calme"},
+        ]})
+        client_pg_ready.post("/api/exercise", json={"sessions": [
+            {"exercise_type": "run", "exercise_start": "2026-03-05T08:00:00", "exercise_end": "2026-03-05T09:00:00", "duration_minutes": 60},
+        ]})
+        for route in ("/api/steps", "/api/heartrate", "/api/mood", "/api/exercise", "/api/sleep"):
+            assert _ndjson(client_pg_ready.get(f"{route}?format=ndjson")) == client_pg_ready.get(route).json()
+
+    def test_stream_resumes_from_cursor_with_limit(self, client_pg_ready):
+        client_pg_ready.post("/api/steps", json={"records": _steps(30)})
+        first = client_pg_ready.get("/api/steps?limit=10")
+        rest = _ndjson(client_pg_ready.get(f"/api/steps?format=ndjson&limit=15&cursor={first.headers['X-Next-Cursor']}"))
+        assert rest == _steps(30)[10:25]
+
+    def test_iter_decrypted_yields_bounded_partitions(self, client_pg_ready, db_session):
+        from sqlalchemy import select
+
+        from server.db.models import HeartRateHourly
+        from server.db.row_crypto import HEART_RATE_ROW, iter_row_decrypted
+
+        client_pg_ready.post("/api/heartrate", json={"records": [
+            {"date": "2026-03-01", "hour": h, "min_bpm": 50, "max_bpm": 90, "avg_bpm": 60 + h, "sample_count": 3}
+            for h in range(24)
+        ]})
+        stmt = select(HeartRateHourly.hour, HeartRateHourly.avg_bpm).order_by(HeartRateHourly.hour)
+        chunks = list(iter_row_decrypted(db_session, stmt, HEART_RATE_ROW, 10))
+        assert [len(c) for c in chunks] == [10, 10, 4]
+        assert [r.avg_bpm for c in chunks for r in c] == [60 + h for h in range(24)]
@@ -0,0 +1,97 @@
+"""
+Pool de connexions configurable + métriques — server/db/pool.py.
+
+Classes: TestEngineOptions, TestPoolMetrics
+"""
+import pytest
+
+
+PG = "postgresql+psycopg://u:p@localhost/db"
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+
+    from server.db.pool import engine_options
+
+    monkeypatch.setenv("SAMSUNGHEALTH_DB_POOL_SIZE", "1")
+    monkeypatch.setenv("SAMSUNGHEALTH_DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("SAMSUNGHEALTH_DB_POOL_TIMEOUT_S", "0.05")
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    eng = create_engine(url, **engine_options(url, "test"))
+    yield eng
+    eng.dispose()
+
+
+class TestEngineOptions:
+    def test_defaults(self, monkeypatch):
+        from server.db.pool import engine_options
+
+        for name in ("POOL_SIZE", "MAX_OVERFLOW", "POOL_TIMEOUT_S", "POOL_RECYCLE_S", "PRE_PING", "EXTERNAL_POOLER"):
+            monkeypatch.delenv(f"SAMSUNGHEALTH_DB_{name}", raising=False)
+        opts = engine_options(PG, "test")
+        assert (opts["pool_size"], opts["max_overflow"], opts["pool_timeout"]) == (5, 10, 30.0)
+        assert opts["pool_recycle"] == 1800 and opts["pool_pre_ping"] is True
+        assert "connect_args" not in opts
+
+    def test_env_overrides_and_invalid_fallback(self, monkeypatch):
+        from server.db.pool import engine_options
+
+        monkeypatch.setenv("SAMSUNGHEALTH_DB_POOL_SIZE", "20")
+        monkeypatch.setenv("SAMSUNGHEALTH_DB_MAX_OVERFLOW", "abc")
+        monkeypatch.setenv("SAMSUNGHEALTH_DB_POOL_RECYCLE_S", "-1")
+        monkeypatch.setenv("SAMSUNGHEALTH_DB_PRE_PING", "false")
+        opts = engine_options(PG, "test")
+        assert opts["pool_size"] == 20 and opts["max_overflow"] == 10
+        assert opts["pool_recycle"] == -1 and opts["pool_pre_ping"] is False
+
+    def test_external_pooler_disables_prepared_statements(self, monkeypatch):
+        from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+        from server.db.pool import engine_options
+
+        monkeypatch.setenv("SAMSUNGHEALTH_DB_EXTERNAL_POOLER", "transaction")
+        opts = engine_options(PG, "test", is_async=True)
+        assert opts["connect_args"] == {"prepare_threshold": None}
+        assert issubclass(opts["poolclass"], AsyncAdaptedQueuePool)
+
+
+class TestPoolMetrics:
+    def test_checkouts_counted_and_tracked_per_request(self, sqlite_engine):
+        from sqlalchemy import text
+
+        from server.db.pool import POOL_METRICS, pool_snapshot
+        from server.metrics import request_stats, track_request
+
+        token = track_request()
+        for _ in range(3):
+            with sqlite_engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        stats = request_stats(token)
+        assert stats["db_checkouts"] == 3 and "db_wait_ms" not in stats
+
+        snap = pool_snapshot(sqlite_engine.pool)
+        assert snap["checkouts"] == 3 and snap["checked_out"] == 0 and snap["size"] == 1
+        assert snap["checkout_s"]["count"] == 3 and snap["checkout_s"]["buckets"]["+Inf"] == 3
+        assert POOL_METRICS["test"].counters()["timeouts"] == 0
+
+    def test_saturated_pool_counts_wait_and_timeout(self, sqlite_engine):
+        from sqlalchemy import exc
+
+        from server.db.pool import pool_snapshot
+
+        held = sqlite_engine.connect()
+        try:
+            with pytest.raises(exc.TimeoutError):
+                sqlite_engine.connect()
+            snap = pool_snapshot(sqlite_engine.pool)
+            assert snap["checked_out"] == 1
+            assert snap["timeouts"] == 1 and snap["waits"] == 1
+            assert snap["wait_s"]["sum"] >= 0.04
+        finally:
+            held.close()
+
+    def test_survives_pool_recreate(self, sqlite_engine):
+        sqlite_engine.dispose()
+        assert sqlite_engine.pool.metrics is not None
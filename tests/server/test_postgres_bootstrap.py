@@ -36,6 +36,8 @@ EXPECTED_TABLES = {
     "floors_daily",
     "activity_level",
     "ecg",
+    "steps_rollup",
+    "heart_rate_rollup",
     "alembic_version",  # table technique alembic
 }
 
@@ -0,0 +1,161 @@
+"""
+Détecteur N+1 par requête + fixture `query_budget` — server/metrics.py,
+tests/server/query_budget.py.
+
+Classes: TestStatementShape, TestNPlusOneDetector, TestQueryBudget
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+
+class TestStatementShape:
+    def test_params_in_lists_and_values_collapse(self):
+        from server.metrics import statement_shape
+
+        a = statement_shape("SELECT * FROM t WHERE id IN (%(p1)s, %(p2)s, %(p3)s) AND u = %(u)s")
+        b = statement_shape("SELECT *\n  FROM t WHERE id IN (%(p1)s) AND u = %(u)s")
+        assert a == b == "SELECT * FROM t WHERE id IN (?) AND u = ?"
+        rows = statement_shape("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)")
+        assert rows == "INSERT INTO t (a, b) VALUES (?)"
+        assert statement_shape("SELECT x::text FROM t WHERE a = :a") == "SELECT x::text FROM t WHERE a = ?"
+
+    @pytest.mark.parametrize("env, raw, expected", [
+        ("dev", None, 10), ("test", None, 10), ("prod", None, 0), ("prod", "3", 3), ("dev", "0", 0), ("dev", "x", 0),
+    ])
+    def test_threshold(self, monkeypatch, env, raw, expected):
+        from server.metrics import N_PLUS_ONE_ENV, n_plus_one_threshold
+
+        monkeypatch.setenv("APP_ENV", env)
+        if raw is None:
+            monkeypatch.delenv(N_PLUS_ONE_ENV, raising=False)
+        else:
+            monkeypatch.setenv(N_PLUS_ONE_ENV, raw)
+        n_plus_one_threshold.cache_clear()
+        try:
+            assert n_plus_one_threshold() == expected
+        finally:
+            n_plus_one_threshold.cache_clear()
+
+
+class TestNPlusOneDetector:
+    @pytest.fixture
+    def threshold(self, monkeypatch):
+        from server.metrics import N_PLUS_ONE_ENV, n_plus_one_threshold
+
+        monkeypatch.setenv(N_PLUS_ONE_ENV, "3")
+        n_plus_one_threshold.cache_clear()
+        yield 3
+        n_plus_one_threshold.cache_clear()
+
+    def _client(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.pool import StaticPool
+
+        from server.metrics import instrument_engines
+        from server.middleware.request_context import RequestContextMiddleware
+
+        instrument_engines()
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        app = FastAPI()
+        app.add_middleware(RequestContextMiddleware)
+
+        @app.get("/loop/{n}")
+        def loop(n: int):
+            with engine.connect() as conn:
+                for i in range(n):
+                    conn.execute(text("SELECT :i"), {"i": i})
+            return {}
+
+        return TestClient(app)
+
+    def test_warning_above_threshold(self, threshold):
+        import structlog
+
+        client = self._client()
+        with structlog.testing.capture_logs() as logs:
+            client.get("/loop/3")
+        assert not [e for e in logs if e["event"] == "db.n_plus_one"]
+
+        with structlog.testing.capture_logs() as logs:
+            client.get("/loop/5")
+        [warning] = [e for e in logs if e["event"] == "db.n_plus_one"]
+        assert warning["route"] == "/loop/{n}"
+        assert warning["statements"] == [{"statement": "SELECT ?", "count": 5}]
+        [complete] = [e for e in logs if e["event"] == "request.complete"]
+        assert complete["db_queries"] == 5 and "n_plus_one" not in complete
+
+    def test_disabled_keeps_no_shapes(self, monkeypatch):
+        from server.metrics import (
+            N_PLUS_ONE_ENV,
+            current_request_stats,
+            n_plus_one_threshold,
+            request_stats,
+            track_request,
+        )
+
+        monkeypatch.setenv(N_PLUS_ONE_ENV, "0")
+        n_plus_one_threshold.cache_clear()
+        try:
+            token = track_request()
+            assert "shapes" not in current_request_stats()
+            assert request_stats(token) == {}
+        finally:
+            n_plus_one_threshold.cache_clear()
+
+    def test_recorder_fails_over_budget(self, query_budget):
+        from sqlalchemy import create_engine, text
+
+        engine = create_engine("sqlite://")
+        with pytest.raises(pytest.fail.Exception, match=r"N\+1 : 4 × même statement > 1"):
+            with query_budget(max_same_shape=1):
+                with engine.connect() as conn:
+                    for i in range(4):
+                        conn.execute(text("SELECT :i"), {"i": i})
+        with query_budget(max_statements=1) as q:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        assert q.count == 1
+
+
+def _sleep_sessions(n: int) -> list[dict]:
+    start = datetime(2026, 1, 1, 23)
+    out = []
+    for i in range(n):
+        s = start + timedelta(days=i)
+        out.append({
+            "sleep_start": s.isoformat(),
+            "sleep_end": (s + timedelta(hours=8)).isoformat(),
+            "stages": [
+                {"stage_type": "light", "stage_start": s.isoformat(), "stage_end": (s + timedelta(hours=4)).isoformat()},
+                {"stage_type": "deep", "stage_start": (s + timedelta(hours=4)).isoformat(),
+                 "stage_end": (s + timedelta(hours=8)).isoformat()},
+            ],
+        })
+    return out
+
+
+class TestQueryBudget:
+    """Nombre de statements constant en volume : une régression N+1 casse ici."""
+
+    def test_sleep_ingest_constant_in_sessions(self, client_pg_ready, query_budget):
+        with query_budget() as small:
+            assert client_pg_ready.post("/api/sleep", json={"sessions": _sleep_sessions(2)}).status_code == 201
+        with query_budget(max_statements=small.count, max_same_shape=2):
+            client_pg_ready.post("/api/sleep", json={"sessions": _sleep_sessions(60)[2:]})
+
+    def test_sleep_get_stages_not_per_session(self, client_pg_ready, query_budget):
+        client_pg_ready.post("/api/sleep", json={"sessions": _sleep_sessions(40)})
+        with query_budget(max_same_shape=2):
+            r = client_pg_ready.get("/api/sleep")
+        assert r.status_code == 200 and len(r.json()) == 40
+
+    def test_steps_get_constant_in_rows(self, client_pg_ready, query_budget):
+        client_pg_ready.post("/api/steps", json={"records": [
+            {"date": "2026-03-01", "hour": h, "step_count": h} for h in range(24)
+        ]})
+        with query_budget(max_same_shape=3):
+            r = client_pg_ready.get("/api/steps")
+        assert r.status_code == 200 and len(r.json()) == 24
@@ -0,0 +1,156 @@
+"""
+Régression de plans — EXPLAIN (FORMAT JSON) des requêtes des GET santé.
+
+Classes: TestPlanWalker, TestRouterQueryPlans
+
+Les SELECT réellement émis par les routers sont capturés (`before_cursor_execute`)
+sur une base seedée, puis rejoués en `EXPLAIN (FORMAT JSON)` avec
+`enable_seqscan = off` : le plan ne dépend plus du volume de la base de test,
+il reste un Seq Scan seulement si aucun index n'est utilisable. Échec si le plan
+contient un Seq Scan, un Index Scan sans `Index Cond` (parcours complet) ou un
+Sort explicite (l'index composite (user_id, temps) doit fournir l'ordre).
+"""
+from contextlib import contextmanager
+
+import pytest
+
+
+ROUTER_GETS = [
+    "/api/sleep?from=2026-03-01&to=2026-03-31&include_stages=true",
+    "/api/steps?from=2026-03-01&to=2026-03-31",
+    "/api/steps?granularity=day&from=2026-03-01&to=2026-03-31",
+    "/api/heartrate?from=2026-03-01&to=2026-03-31",
+    "/api/heartrate?granularity=week&from=2026-03-01&to=2026-03-31",
+    "/api/exercise?from=2026-03-01&to=2026-03-31",
+    "/api/mood?from=2026-03-01&to=2026-03-31",
+    "/api/trends?from=2026-03-01&to=2026-03-31",
+    "/me/audit-log",
+]
+
+
+def _plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _plan_nodes(child)
+
+
+def _plan_problems(plan: dict) -> list[str]:
+    problems = []
+    for node in _plan_nodes(plan):
+        kind = node["Node Type"]
+        if kind == "Seq Scan":
+            problems.append(f"Seq Scan on {node['Relation Name']}")
+        elif kind in ("Index Scan", "Index Only Scan") and "Index Cond" not in node:
+            problems.append(f"full {kind} using {node['Index Name']}")
+        elif kind in ("Sort", "Incremental Sort"):
+            problems.append(f"{kind} on {', '.join(node.get('Sort Key', ()))}")
+    return problems
+
+
+@contextmanager
+def _capture_selects():
+    """SELECT de tous les engines (les routers santé passent par l'engine async)."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    captured: list[tuple[str, object]] = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", _before)
+    try:
+        yield captured
+    finally:
+        event.remove(Engine, "before_cursor_execute", _before)
+
+
+def _seed(client) -> None:
+    client.post("/api/sleep", json={"sessions": [
+        {
+            "sleep_start": f"2026-03-{d:02d}T23:00:00Z",
+            "sleep_end": f"2026-03-{d + 1:02d}T07:00:00Z",
+            "stages": [{
+                "stage_type": "deep",
+                "stage_start": f"2026-03-{d:02d}T23:30:00Z",
+                "stage_end": f"2026-03-{d + 1:02d}T01:00:00Z",
+            }],
+        }
+        for d in range(1, 28)
+    ]})
+    client.post("/api/steps", json={"records": [
+        {"date": f"2026-03-{d:02d}", "hour": h, "step_count": 100 * h}
+        for d in range(1, 29) for h in range(24)
+    ]})
+    client.post("/api/heartrate", json={"records": [
+        {"date": f"2026-03-{d:02d}", "hour": h, "min_bpm": 45, "max_bpm": 130, "avg_bpm": 60 + h, "sample_count": 12}
+        for d in range(1, 29) for h in range(24)
+    ]})
+    client.post("/api/exercise", json={"sessions": [
+        {
+            "exercise_type": "run",
+            "exercise_start": f"2026-03-{d:02d}T08:00:00",
+            "exercise_end": f"2026-03-{d:02d}T09:00:00",
+            "duration_minutes": 60,
+        }
+        for d in range(1, 29)
+    ]})
+    client.post("/api/mood", json={"entries": [
+        {"start_time": f"2026-03-{d:02d}T20:00:00", "mood_type": 3} for d in range(1, 29)
+    ]})
+
+
+class TestPlanWalker:
+    def test_flags_seq_scan_full_index_scan_and_sort(self):
+        plan = {
+            "Node Type": "Sort",
+            "Sort Key": ["steps_hourly.date"],
+            "Plans": [
+                {"Node Type": "Seq Scan", "Relation Name": "steps_hourly"},
+                {"Node Type": "Index Scan", "Index Name": "steps_hourly_pkey"},
+            ],
+        }
+        assert _plan_problems(plan) == [
+            "Sort on steps_hourly.date",
+            "Seq Scan on steps_hourly",
+            "full Index Scan using steps_hourly_pkey",
+        ]
+
+    def test_ordered_range_scan_is_clean(self):
+        plan = {
+            "Node Type": "Limit",
+            "Plans": [{
+                "Node Type": "Index Scan",
+                "Index Name": "idx_auth_events_user_created",
+                "Index Cond": "(user_id = $1)",
+            }],
+        }
+        assert _plan_problems(plan) == []
+
+
+class TestRouterQueryPlans:
+    def test_router_queries_use_user_time_indexes(self, client_pg_ready, engine):
+        from sqlalchemy import text
+
+        _seed(client_pg_ready)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+
+        with _capture_selects() as captured:
+            for url in ROUTER_GETS:
+                r = client_pg_ready.get(url)
+                assert r.status_code == 200, f"{url}: {r.text}"
+        assert captured
+
+        failures = []
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SET enable_seqscan = off")
+            for statement, params in captured:
+                plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, params).scalar_one()
+                problems = _plan_problems(plan[0]["Plan"])
+                if problems:
+                    failures.append(f"{'; '.join(problems)}\n    {' '.join(statement.split())}")
+            conn.rollback()
+        if failures:
+            pytest.fail("plans sans index (user_id, temps) :\n  " + "\n  ".join(failures))
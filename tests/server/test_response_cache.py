@@ -0,0 +1,176 @@
+"""
+Cache de réponses in-process des GET santé — server/response_cache.py.
+
+Classes: TestResponseCacheUnit, TestCachedRoutes, TestInvalidation
+"""
+from uuid import uuid4
+
+import pytest
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _key(user_id, route="/api/steps", query=()):
+    return (user_id, route, tuple(query))
+
+
+@pytest.fixture
+def cache_on(monkeypatch):
+    from server.response_cache import RESPONSE_CACHE
+
+    monkeypatch.setenv("SAMSUNGHEALTH_RESPONSE_CACHE", "true")
+    RESPONSE_CACHE.clear()
+    yield RESPONSE_CACHE
+    RESPONSE_CACHE.clear()
+
+
+def _steps(day: str, n: int = 3) -> list[dict]:
+    return [{"date": day, "hour": h, "step_count": 10 + h} for h in range(n)]
+
+
+class TestResponseCacheUnit:
+    def test_ttl_expiry(self):
+        from server.response_cache import ResponseCache
+
+        clock = _Clock()
+        cache = ResponseCache(max_bytes=1024, ttl_s=10, clock=clock)
+        uid = uuid4()
+        assert cache.put(_key(uid), 0, b"[]", {})
+        clock.now = 9.9
+        assert cache.get(_key(uid)).body == b"[]"
+        clock.now = 10.0
+        assert cache.get(_key(uid)) is None
+        assert cache.stats()["entries"] == 0
+
+    def test_lru_bounded_by_bytes(self):
+        from server.response_cache import ResponseCache
+
+        cache = ResponseCache(max_bytes=800, ttl_s=60)
+        uid = uuid4()
+        for i in range(8):
+            cache.put(_key(uid, query=[("n", str(i))]), 0, b"x" * 100, {})
+        cache.get(_key(uid, query=[("n", "0")]))
+        cache.put(_key(uid, query=[("n", "8")]), 0, b"x" * 100, {})
+        assert cache.get(_key(uid, query=[("n", "0")])) is not None
+        assert cache.get(_key(uid, query=[("n", "1")])) is None
+        assert cache.stats()["bytes"] <= 800
+        assert cache.stats()["eviction"] == 1
+
+    def test_oversized_entry_not_stored(self):
+        from server.response_cache import ResponseCache
+
+        cache = ResponseCache(max_bytes=800, ttl_s=60)
+        assert not cache.put(_key(uuid4()), 0, b"x" * 101, {})
+
+    def test_invalidate_scoped_to_user_and_routes(self):
+        from server.response_cache import ResponseCache
+
+        cache = ResponseCache(max_bytes=1024, ttl_s=60)
+        alice, bob = uuid4(), uuid4()
+        for uid in (alice, bob):
+            for route in ("/api/steps", "/api/mood"):
+                cache.put(_key(uid, route), 0, b"[]", {})
+        assert cache.invalidate(alice, ("/api/steps",)) == 1
+        assert cache.get(_key(alice, "/api/mood")) is not None
+        assert cache.invalidate(alice) == 1
+        assert cache.get(_key(bob, "/api/steps")) is not None
+
+    def test_put_refused_after_concurrent_invalidation(self):
+        from server.response_cache import ResponseCache
+
+        cache = ResponseCache(max_bytes=1024, ttl_s=60)
+        uid = uuid4()
+        generation = cache.generation(uid)
+        cache.invalidate(uid, ("/api/steps",))
+        assert not cache.put(_key(uid), generation, b"[]", {})
+
+    def test_kill_switch(self, monkeypatch):
+        from server.response_cache import cache_enabled
+
+        monkeypatch.setenv("SAMSUNGHEALTH_RESPONSE_CACHE", "false")
+        assert not cache_enabled()
+        monkeypatch.setenv("SAMSUNGHEALTH_RESPONSE_CACHE", "true")
+        monkeypatch.setenv("SAMSUNGHEALTH_DEPLOYMENT_INSTANCES", "3")
+        assert not cache_enabled()
+
+
+class TestCachedRoutes:
+    @pytest.mark.parametrize(
+        "route",
+        ["/api/sleep", "/api/steps?granularity=day", "/api/heartrate", "/api/exercise", "/api/mood", "/api/trends"],
+    )
+    def test_second_get_is_replayed(self, client_pg_ready, cache_on, route):
+        first = client_pg_ready.get(route)
+        second = client_pg_ready.get(route)
+        assert first.status_code == second.status_code == 200
+        assert second.json() == first.json()
+        assert cache_on.stats()["hit"] == 1
+
+    def test_replay_keeps_headers_and_honours_if_none_match(self, client_pg_ready, cache_on):
+        client_pg_ready.post("/api/steps", json={"records": _steps("2026-03-01", 5)})
+        first = client_pg_ready.get("/api/steps?limit=2")
+        replay = client_pg_ready.get("/api/steps?limit=2")
+        assert replay.content == first.content
+        assert replay.headers["ETag"] == first.headers["ETag"]
+        assert replay.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+        r = client_pg_ready.get("/api/steps?limit=2", headers={"If-None-Match": first.headers["ETag"]})
+        assert r.status_code == 304
+
+    def test_ndjson_not_cached(self, client_pg_ready, cache_on):
+        client_pg_ready.get("/api/steps?format=ndjson")
+        assert cache_on.stats()["entries"] == 0
+
+    def test_kill_switch_bypasses_cache(self, client_pg_ready, cache_on, monkeypatch):
+        monkeypatch.setenv("SAMSUNGHEALTH_RESPONSE_CACHE", "false")
+        client_pg_ready.get("/api/steps")
+        client_pg_ready.get("/api/steps")
+        assert cache_on.stats() == {"hit": 0, "miss": 0, "eviction": 0, "invalidation": 0, "entries": 0, "bytes": 0}
+
+
+class TestInvalidation:
+    def test_post_invalidates_route_and_trends(self, client_pg_ready, cache_on):
+        client_pg_ready.post("/api/steps", json={"records": _steps("2026-03-01")})
+        assert len(client_pg_ready.get("/api/steps").json()) == 3
+        client_pg_ready.get("/api/trends")
+        client_pg_ready.get("/api/mood")
+
+        client_pg_ready.post("/api/steps", json={"records": _steps("2026-03-02")})
+        assert len(client_pg_ready.get("/api/steps").json()) == 6
+        assert client_pg_ready.get("/api/trends").json()["avg_daily_steps"] is not None
+        client_pg_ready.get("/api/mood")
+        assert cache_on.stats()["hit"] == 1
+
+    def test_ndjson_ingest_invalidates(self, client_pg_ready, cache_on):
+        import json
+
+        client_pg_ready.get("/api/steps")
+        body = "\n".join(json.dumps(r) for r in _steps("2026-03-03"))
+        client_pg_ready.post(
+            "/api/steps/stream", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert len(client_pg_ready.get("/api/steps").json()) == 3
+
+    def test_erase_purges_user_entries(self, client_pg_ready, cache_on, db_session):
+        from sqlalchemy import select
+
+        from server.db.models import User
+        from server.security.rgpd import erase_user_cascade
+
+        client_pg_ready.post("/api/mood", json={"entries": [
+            {"start_time": "2026-03-01T20:00:00", "mood_type": 4, "notes": "Art.9"},
+        ]})
+        client_pg_ready.get("/api/mood")
+        assert cache_on.stats()["entries"] == 1
+
+        user = db_session.execute(
+            select(User).where(User.email == "default-test-user@samsunghealth.local")
+        ).scalar_one()
+        erase_user_cascade(db_session, user.id)
+        db_session.commit()
+        assert cache_on.stats()["entries"] == 0
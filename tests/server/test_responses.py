@@ -0,0 +1,93 @@
+"""
+Réponses JSON rapides (dicts depuis Row + orjson) — server/responses.py.
+
+Classes: TestDumps, TestOpenApiSchema, TestFastPathShape
+"""
+from datetime import date, datetime, timezone
+
+import pytest
+
+
+HR_RECORDS = [
+    {"date": "2026-03-01", "hour": h, "min_bpm": 40 + h, "max_bpm": 120 + h, "avg_bpm": 60 + h, "sample_count": h}
+    for h in range(24)
+]
+
+
+class TestDumps:
+    def test_matches_pydantic_encoding(self):
+        from pydantic_core import to_json
+
+        from server.models import TrendsOut
+        from server.responses import dumps
+
+        content = [
+            {"ts": datetime(2026, 3, 1, 23, tzinfo=timezone.utc), "day": date(2026, 3, 1), "x": 1.5, "n": None},
+            TrendsOut(exercise_count=2),
+            "é",
+        ]
+        assert dumps(content) == to_json(content)
+
+    def test_response_carries_injected_headers(self):
+        from fastapi import Response
+
+        from server.responses import fast_json
+
+        injected = Response()
+        injected.headers["ETag"] = '"abc"'
+        r = fast_json([{"a": 1}], injected)
+        assert r.body == b'[{"a":1}]'
+        assert r.headers["etag"] == '"abc"'
+        assert r.headers["content-type"] == "application/json"
+
+
+class TestOpenApiSchema:
+    @pytest.mark.parametrize(
+        "path, ref",
+        [
+            ("/api/heartrate", "HeartRateHourlyOut"),
+            ("/api/steps", "StepsHourlyOut"),
+            ("/api/sleep", "SleepSessionOut"),
+            ("/api/exercise", "ExerciseSessionOut"),
+            ("/api/mood", "MoodOut"),
+        ],
+    )
+    def test_get_schema_still_documents_out_models(self, path, ref):
+        from server.main import app
+
+        schema = app.openapi()["paths"][path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert f"#/components/schemas/{ref}" in str(schema)
+
+
+class TestFastPathShape:
+    def test_heartrate_rows_validate_against_out_model(self, client_pg_ready):
+        from pydantic import TypeAdapter
+
+        from server.models import HeartRateHourlyOut
+
+        client_pg_ready.post("/api/heartrate", json={"records": HR_RECORDS})
+        r = client_pg_ready.get("/api/heartrate")
+        adapter = TypeAdapter(list[HeartRateHourlyOut])
+        assert adapter.dump_json(adapter.validate_json(r.content)) == r.content
+        assert r.json() == HR_RECORDS
+
+    def test_rollups_and_sessions_validate(self, client_pg_ready):
+        from pydantic import TypeAdapter
+
+        from server.models import ExerciseSessionOut, HeartRateRollupOut, SleepSessionOut
+
+        client_pg_ready.post("/api/heartrate", json={"records": HR_RECORDS})
+        client_pg_ready.post("/api/exercise", json={"sessions": [
+            {"exercise_type": "run", "exercise_start": "2026-03-05T08:00:00", "exercise_end": "2026-03-05T09:00:00", "duration_minutes": 60},
+        ]})
+        client_pg_ready.post("/api/sleep", json={"sessions": [
+            {"sleep_start": "2026-03-01T23:00:00+00:00", "sleep_end": "2026-03-02T07:00:00+00:00"},
+        ]})
+        for url, model in (
+            ("/api/heartrate?granularity=day", HeartRateRollupOut),
+            ("/api/exercise", ExerciseSessionOut),
+            ("/api/sleep?include_stages=true", SleepSessionOut),
+        ):
+            r = client_pg_ready.get(url)
+            adapter = TypeAdapter(list[model])
+            assert adapter.dump_json(adapter.validate_json(r.content)) == r.content, url
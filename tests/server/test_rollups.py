@@ -0,0 +1,214 @@
+"""
+Rollups jour / semaine / mois — server/db/rollups.py + GET ?granularity=.
+
+Classes: TestPeriods, TestFold, TestRollupIngest, TestRollupMaintenance, TestRollupConcurrency
+"""
+from datetime import date
+
+import pytest
+
+
+def _client_user_id(db_session):
+    from sqlalchemy import select
+
+    from server.db.models import User
+
+    return db_session.execute(
+        select(User.id).where(User.email == "default-test-user@samsunghealth.local")
+    ).scalar_one()
+
+
+def _hr(day: str, hour: int, lo: int, hi: int, avg: int, n: int) -> dict:
+    return {"date": day, "hour": hour, "min_bpm": lo, "max_bpm": hi, "avg_bpm": avg, "sample_count": n}
+
+
+class TestPeriods:
+    @pytest.mark.parametrize(
+        "day, granularity, expected",
+        [
+            ("2026-03-04", "day", "2026-03-04"),
+            ("2026-03-04", "week", "2026-03-02"),  # mercredi → lundi ISO
+            ("2026-03-01", "week", "2026-02-23"),  # dimanche → lundi précédent
+            ("2026-03-31", "month", "2026-03-01"),
+        ],
+    )
+    def test_period_start(self, day, granularity, expected):
+        from server.db.rollups import period_start
+
+        assert period_start(date.fromisoformat(day), granularity).isoformat() == expected
+
+    def test_unknown_granularity(self):
+        from server.db.rollups import period_start
+
+        with pytest.raises(ValueError):
+            period_start(date(2026, 3, 1), "year")
+
+    def test_covering_ranges_merge_week_across_month(self):
+        from server.db.rollups import _covering_ranges, affected_periods
+
+        # 2026-03-31 (mardi) : sa semaine déborde sur avril → plage fusionnée.
+        assert _covering_ranges(affected_periods(["2026-03-31", "2026-01-05"])) == [
+            (date(2026, 1, 1), date(2026, 1, 31)),
+            (date(2026, 3, 1), date(2026, 4, 5)),
+        ]
+
+
+class TestFold:
+    def test_fold_steps(self):
+        from server.db.rollups import fold_steps
+
+        out = fold_steps([("2026-03-30", 100, 2), ("2026-04-01", 50, 1)])
+        assert out[("week", "2026-03-30")] == {"step_count": 150, "hour_count": 3}
+        assert out[("month", "2026-03-01")] == {"step_count": 100, "hour_count": 2}
+        assert out[("day", "2026-04-01")] == {"step_count": 50, "hour_count": 1}
+
+    def test_fold_heart_rate_weighted_avg(self):
+        from server.db.rollups import fold_heart_rate
+
+        out = fold_heart_rate([("2026-03-30", 50, 100, 60, 10), ("2026-03-30", 55, 120, 90, 30)])
+        assert out[("day", "2026-03-30")] == {
+            "min_bpm": 50, "max_bpm": 120, "avg_bpm": 82, "sample_count": 40, "hour_count": 2,
+        }
+
+    def test_fold_heart_rate_zero_samples_falls_back_to_hour_mean(self):
+        from server.db.rollups import fold_heart_rate
+
+        out = fold_heart_rate([("2026-03-30", 40, 60, 50, 0), ("2026-03-30", 40, 80, 61, 0)])
+        assert out[("day", "2026-03-30")]["avg_bpm"] == 56
+
+    def test_fold_heart_rate_week_from_days(self):
+        from server.db.rollups import _merge_heart_rate, fold_heart_rate
+
+        out = fold_heart_rate([
+            ("2026-03-30", 50, 100, 61, 3), ("2026-03-30", 55, 90, 70, 4), ("2026-03-31", 40, 120, 80, 10),
+        ])
+        days = [out[("day", "2026-03-30")], out[("day", "2026-03-31")]]
+        # Semaine / mois repliés depuis les jours, comme le rafraîchissement incrémental.
+        assert out[("week", "2026-03-30")] == _merge_heart_rate(days)
+        assert out[("week", "2026-03-30")]["hour_count"] == 3
+
+
+class TestRollupIngest:
+    def test_steps_granularities(self, client_pg_ready):
+        records = [
+            {"date": "2026-03-01", "hour": 9, "step_count": 1000},
+            {"date": "2026-03-01", "hour": 10, "step_count": 500},
+            {"date": "2026-03-02", "hour": 9, "step_count": 2000},
+            {"date": "2026-04-01", "hour": 9, "step_count": 7},
+        ]
+        assert client_pg_ready.post("/api/steps", json={"records": records}).status_code == 201
+
+        day = client_pg_ready.get("/api/steps?granularity=day&from=2026-03-01&to=2026-03-31").json()
+        assert day == [
+            {"period_start": "2026-03-01", "step_count": 1500, "hour_count": 2},
+            {"period_start": "2026-03-02", "step_count": 2000, "hour_count": 1},
+        ]
+        week = client_pg_ready.get("/api/steps?granularity=week&from=2026-03-01&to=2026-03-31").json()
+        assert [(w["period_start"], w["step_count"]) for w in week] == [
+            ("2026-02-23", 1500),
+            ("2026-03-02", 2000),
+            ("2026-03-30", 7),
+        ]
+        month = client_pg_ready.get("/api/steps?granularity=month").json()
+        assert [(m["period_start"], m["step_count"]) for m in month] == [("2026-03-01", 3500), ("2026-04-01", 7)]
+
+    def test_incremental_update_on_later_ingest(self, client_pg_ready):
+        client_pg_ready.post("/api/steps", json={"records": [{"date": "2026-03-01", "hour": 9, "step_count": 10}]})
+        client_pg_ready.post("/api/steps", json={"records": [{"date": "2026-03-01", "hour": 10, "step_count": 5}]})
+        month = client_pg_ready.get("/api/steps?granularity=month").json()
+        assert month == [{"period_start": "2026-03-01", "step_count": 15, "hour_count": 2}]
+
+    def test_heartrate_rollup_via_stream(self, client_pg_ready):
+        import json
+
+        body = "\n".join(
+            json.dumps(r) for r in (_hr("2026-03-01", 0, 50, 70, 60, 10), _hr("2026-03-01", 1, 45, 90, 80, 30))
+        ).encode()
+        r = client_pg_ready.post("/api/heartrate/stream", content=body, headers={"Content-Type": "application/x-ndjson"})
+        assert r.json()["inserted"] == 2
+        day = client_pg_ready.get("/api/heartrate?granularity=day").json()
+        assert day == [{
+            "period_start": "2026-03-01", "min_bpm": 45, "max_bpm": 90, "avg_bpm": 75,
+            "sample_count": 40, "hour_count": 2,
+        }]
+
+    def test_default_granularity_is_hourly(self, client_pg_ready):
+        client_pg_ready.post("/api/steps", json={"records": [{"date": "2026-03-01", "hour": 9, "step_count": 10}]})
+        assert client_pg_ready.get("/api/steps").json() == [{"date": "2026-03-01", "hour": 9, "step_count": 10}]
+
+    def test_invalid_granularity_422(self, client_pg_ready):
+        assert client_pg_ready.get("/api/steps?granularity=year").status_code == 422
+
+
+class TestRollupMaintenance:
+    def test_check_then_rebuild(self, client_pg_ready, db_session):
+        from sqlalchemy import update
+
+        from server.db.models import StepsRollup
+        from server.db.rollups import check_rollups, rebuild_rollups
+
+        client_pg_ready.post("/api/steps", json={"records": [{"date": "2026-03-01", "hour": 9, "step_count": 10}]})
+        client_pg_ready.post("/api/heartrate", json={"records": [_hr("2026-03-01", 3, 50, 60, 55, 5)]})
+        uid = _client_user_id(db_session)
+        assert check_rollups(db_session, uid) == []
+
+        db_session.execute(update(StepsRollup).where(StepsRollup.granularity == "month").values(step_count=999))
+        db_session.commit()
+        problems = check_rollups(db_session, uid)
+        assert len(problems) == 1 and "month 2026-03-01" in problems[0]
+
+        rebuild_rollups(db_session, uid)
+        db_session.commit()
+        assert check_rollups(db_session, uid) == []
+
+    def test_erase_purges_rollups(self, client_pg_ready, db_session):
+        from sqlalchemy import func, select
+
+        from server.db.models import HeartRateRollup, StepsRollup
+        from server.security.rgpd import erase_user_cascade
+
+        client_pg_ready.post("/api/steps", json={"records": [{"date": "2026-03-01", "hour": 9, "step_count": 10}]})
+        client_pg_ready.post("/api/heartrate", json={"records": [_hr("2026-03-01", 3, 50, 60, 55, 5)]})
+        uid = _client_user_id(db_session)
+        erase_user_cascade(db_session, uid)
+        db_session.commit()
+        for model in (StepsRollup, HeartRateRollup):
+            assert db_session.execute(select(func.count()).select_from(model)).scalar_one() == 0
+
+
+class TestRollupConcurrency:
+    def test_concurrent_ingests_serialised(self, engine, default_user_db):
+        import threading
+
+        from sqlalchemy import select
+        from sqlalchemy.orm import Session
+
+        from server.db.bulk import insert_on_conflict_do_nothing
+        from server.db.models import StepsHourly, StepsRollup
+        from server.db.rollups import check_rollups, refresh_steps_rollups
+
+        uid = default_user_db.id
+
+        def ingest(db, hour):
+            inserted = insert_on_conflict_do_nothing(
+                db, StepsHourly, [dict(user_id=uid, date="2026-03-01", hour=hour, step_count=10)],
+                ["user_id", "date", "hour"], returning=(StepsHourly.date,),
+            )
+            refresh_steps_rollups(db, uid, {r.date for r in inserted})
+
+        with Session(engine) as first, Session(engine) as second:
+            ingest(first, 9)
+            other = threading.Thread(target=lambda: (ingest(second, 10), second.commit()))
+            other.start()
+            other.join(0.5)
+            assert other.is_alive()  # bloqué sur le verrou de `first`
+            first.commit()
+            other.join(10)
+            assert not other.is_alive()
+
+        with Session(engine) as db:
+            assert check_rollups(db, uid) == []
+            month = select(StepsRollup.step_count).where(
+                StepsRollup.user_id == uid, StepsRollup.granularity == "month"
+            )
+            assert db.execute(month).scalar_one() == 20
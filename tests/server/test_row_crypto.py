@@ -0,0 +1,172 @@
+"""
+Chiffrement row-level crypto_v=2 — server/db/row_crypto.py + scripts/reencrypt_rows.py.
+
+Classes: TestRowCodec, TestRowCryptoStorage, TestReencryptJob
+"""
+import pytest
+
+
+UID = "0190f3a4-0000-7000-8000-000000000001"
+
+
+def _hr_values(**over) -> dict:
+    values = dict(user_id=UID, date="2026-03-01", hour=4, min_bpm=48, max_bpm=131, avg_bpm=62, sample_count=12)
+    values.update(over)
+    return values
+
+
+class TestRowCodec:
+    def test_pack_unpack_with_nulls(self):
+        from server.db.row_crypto import HEART_RATE_ROW
+
+        packed = HEART_RATE_ROW.pack({"min_bpm": 48, "max_bpm": None, "avg_bpm": -3})
+        assert len(packed) == 1 + 3 * 2
+        assert HEART_RATE_ROW.unpack(packed) == {"min_bpm": 48, "max_bpm": None, "avg_bpm": -3}
+
+    def test_to_storage_v2_is_one_compact_blob(self):
+        from server.db.encrypted import EncryptedInt
+        from server.db.row_crypto import HEART_RATE_ROW
+
+        row = HEART_RATE_ROW.to_storage(_hr_values(), 2)
+        assert row["min_bpm"] is row["max_bpm"] is row["avg_bpm"] is None
+        assert row["min_bpm_crypto_v"] == row["max_bpm_crypto_v"] == row["avg_bpm_crypto_v"] == 2
+        assert row["sample_count"] == 12 and row["date"] == "2026-03-01"
+
+        td = EncryptedInt()
+        v1_bytes = sum(len(td.process_bind_param(v, dialect=None)) for v in (48, 131, 62))
+        assert len(row["row_blob"]) == 12 + 7 + 16
+        assert len(row["row_blob"]) < v1_bytes / 2
+
+        assert HEART_RATE_ROW.decrypt(row["row_blob"], [UID, "2026-03-01", 4]) == {
+            "min_bpm": 48, "max_bpm": 131, "avg_bpm": 62,
+        }
+
+    def test_blob_is_bound_to_its_row(self):
+        from server.db.row_crypto import HEART_RATE_ROW
+        from server.security.crypto import DecryptionError
+
+        blob = HEART_RATE_ROW.to_storage(_hr_values(), 2)["row_blob"]
+        with pytest.raises(DecryptionError):
+            HEART_RATE_ROW.decrypt(blob, [UID, "2026-03-01", 5])
+
+    def test_to_storage_v1_same_keys(self):
+        from server.db.row_crypto import HEART_RATE_ROW
+
+        v1 = HEART_RATE_ROW.to_storage(_hr_values(), 1)
+        v2 = HEART_RATE_ROW.to_storage(_hr_values(), 2)
+        assert v1.keys() == v2.keys()
+        assert v1["row_blob"] is None and v1["avg_bpm"] == 62 and v1["avg_bpm_crypto_v"] == 1
+
+    def test_out_of_range_value_falls_back_to_v1(self):
+        from server.db.row_crypto import HEART_RATE_ROW
+
+        row = HEART_RATE_ROW.to_storage(_hr_values(max_bpm=70_000), 2)
+        assert row["row_blob"] is None and row["max_bpm"] == 70_000 and row["avg_bpm_crypto_v"] == 1
+
+    def test_write_version_env_rollback(self, monkeypatch):
+        from server.db.row_crypto import write_crypto_v
+
+        assert write_crypto_v() == 2
+        monkeypatch.setenv("SAMSUNGHEALTH_ROW_CRYPTO_V", "1")
+        assert write_crypto_v() == 1
+
+
+class TestRowCryptoStorage:
+    def test_post_stores_v2_and_reads_back(self, client_pg_ready, db_session):
+        from sqlalchemy import select, text
+
+        from server.db.models import HeartRateHourly
+
+        rec = {"date": "2026-03-01", "hour": 4, "min_bpm": 48, "max_bpm": 131, "avg_bpm": 62, "sample_count": 12}
+        assert client_pg_ready.post("/api/heartrate", json={"records": [rec]}).status_code == 201
+
+        raw = db_session.execute(
+            text("SELECT min_bpm, avg_bpm_crypto_v, octet_length(row_blob) FROM heart_rate_hourly")
+        ).one()
+        assert raw == (None, 2, 35)
+
+        assert client_pg_ready.get("/api/heartrate").json() == [rec]
+        # ORM : hook `load` → attributs remplis depuis row_blob (export RGPD).
+        orm = db_session.execute(select(HeartRateHourly)).scalar_one()
+        assert (orm.min_bpm, orm.max_bpm, orm.avg_bpm) == (48, 131, 62)
+
+    def test_mixed_versions_in_one_result(self, client_pg_ready, db_session, monkeypatch):
+        monkeypatch.setenv("SAMSUNGHEALTH_ROW_CRYPTO_V", "1")
+        client_pg_ready.post("/api/heartrate", json={"records": [
+            {"date": "2026-03-01", "hour": 1, "min_bpm": 50, "max_bpm": 60, "avg_bpm": 55, "sample_count": 1},
+        ]})
+        monkeypatch.delenv("SAMSUNGHEALTH_ROW_CRYPTO_V")
+        client_pg_ready.post("/api/heartrate", json={"records": [
+            {"date": "2026-03-01", "hour": 2, "min_bpm": 51, "max_bpm": 61, "avg_bpm": 56, "sample_count": 1},
+        ]})
+        got = client_pg_ready.get("/api/heartrate").json()
+        assert [r["avg_bpm"] for r in got] == [55, 56]
+
+
+    def test_rgpd_export_decodes_rows_without_ciphertext(self, client_pg_ready, db_session, monkeypatch):
+        import csv
+        import io
+        import json
+        import zipfile
+
+        from sqlalchemy import select
+
+        from server.db.models import User
+        from server.security.rgpd import build_user_export_zip
+
+        monkeypatch.setenv("SAMSUNGHEALTH_ROW_CRYPTO_V", "1")
+        client_pg_ready.post("/api/heartrate", json={"records": [
+            {"date": "2026-03-01", "hour": 1, "min_bpm": 50, "max_bpm": 60, "avg_bpm": 55, "sample_count": 1},
+        ]})
+        monkeypatch.delenv("SAMSUNGHEALTH_ROW_CRYPTO_V")
+        client_pg_ready.post("/api/heartrate", json={"records": [
+            {"date": "2026-03-01", "hour": 2, "min_bpm": 51, "max_bpm": 61, "avg_bpm": 56, "sample_count": 1},
+        ]})
+
+        user = db_session.execute(
+            select(User).where(User.email == "default-test-user@samsunghealth.local")
+        ).scalar_one()
+        spool = build_user_export_zip(db_session, user)
+        db_session.rollback()
+        with zipfile.ZipFile(spool) as zf:
+            rows = json.loads(zf.read("health/heart_rate_hourly.json"))
+            header = next(csv.reader(io.StringIO(zf.read("health/heart_rate_hourly.csv").decode())))
+        assert sorted((r["hour"], r["min_bpm"], r["max_bpm"], r["avg_bpm"]) for r in rows) == [
+            (1, 50, 60, 55), (2, 51, 61, 56),
+        ]
+        assert "row_blob" not in header and all("row_blob" not in r for r in rows)
+
+
+class TestReencryptJob:
+    def test_resumable_round_trip(self, client_pg_ready, db_session, monkeypatch):
+        from sqlalchemy import text
+
+        from server.db.row_crypto import HEART_RATE_ROW, reencrypt_batch
+
+        monkeypatch.setenv("SAMSUNGHEALTH_ROW_CRYPTO_V", "1")
+        records = [
+            {"date": "2026-03-01", "hour": h, "min_bpm": 40 + h, "max_bpm": 100 + h, "avg_bpm": 60 + h, "sample_count": h}
+            for h in range(10)
+        ]
+        client_pg_ready.post("/api/heartrate", json={"records": records})
+
+        def _versions():
+            return sorted(
+                r[0] for r in db_session.execute(text("SELECT avg_bpm_crypto_v FROM heart_rate_hourly"))
+            )
+
+        # Batch interrompu après 4 lignes, puis reprise depuis zéro.
+        n, _ = reencrypt_batch(db_session, HEART_RATE_ROW, 2, limit=4)
+        db_session.commit()
+        assert n == 4 and _versions() == [1] * 6 + [2] * 4
+        while reencrypt_batch(db_session, HEART_RATE_ROW, 2, limit=4)[0]:
+            db_session.commit()
+        db_session.commit()
+        assert _versions() == [2] * 10
+        assert client_pg_ready.get("/api/heartrate").json() == records
+
+        while reencrypt_batch(db_session, HEART_RATE_ROW, 1, limit=100)[0]:
+            db_session.commit()
+        db_session.commit()
+        assert _versions() == [1] * 10
+        assert client_pg_ready.get("/api/heartrate").json() == records
@@ -2,7 +2,7 @@
 Tests RED — V2.1.2 refonte scripts vers SQLAlchemy.
 
 Mappé sur frontmatter tested_by: tests/server/test_scripts_csv_import.py
-Classes: TestImportSamsungCsv, TestGenerateSample
+Classes: TestImportSamsungCsv, TestImportManifest, TestColumnarParsing, TestParallelImport, TestGenerateSample
 """
 import csv
 import importlib
@@ -121,6 +121,310 @@ class TestImportSamsungCsv:
         assert count_after_first == 1
         assert count_after_second == 1, "ON CONFLICT DO NOTHING devrait empêcher le doublon"
 
+    def test_import_heart_rate_copy_report_and_rollups(self, schema_ready, db_session, csv_export_dir, capsys, monkeypatch):
+        from server.db.models import HeartRateHourly, HeartRateRollup
+
+        pfx = "com.samsung.health.heart_rate."
+        path = csv_export_dir / "com.samsung.shealth.tracker.heart_rate.20260424.csv"
+        with path.open("w", newline="", encoding="utf-8") as f:
+            f.write("\n")
+            writer = csv.DictWriter(f, fieldnames=[f"{pfx}start_time", f"{pfx}heart_rate"])
+            writer.writeheader()
+            for h in range(3):
+                for bpm in (60, 80):
+                    writer.writerow({f"{pfx}start_time": f"2026-04-20 0{h}:10:00.000", f"{pfx}heart_rate": bpm})
+
+        import scripts.import_samsung_csv as mod
+        mod.import_heart_rate_hourly(db_session)
+        mod.import_heart_rate_hourly(db_session)  # inchangé : sauté via le manifest
+        monkeypatch.setattr(mod, "FULL_IMPORT", True)
+        mod.import_heart_rate_hourly(db_session)
+
+        out = capsys.readouterr().out.splitlines()
+        assert "inserted      3 | skipped      0" in out[0]
+        assert "unchanged (manifest)" in out[1]
+        assert "inserted      0 | skipped      3" in out[2]
+        rows = db_session.execute(select(HeartRateHourly).order_by(HeartRateHourly.hour)).scalars().all()
+        assert [(r.min_bpm, r.max_bpm, r.avg_bpm) for r in rows] == [(60, 80, 70)] * 3
+        assert db_session.execute(select(HeartRateRollup)).first() is not None
+
+    def test_out_of_order_hours_replace_only_this_runs_buckets(
+        self, schema_ready, db_session, csv_export_dir, capsys, monkeypatch
+    ):
+        import functools
+        from uuid import UUID
+
+        import scripts.import_samsung_csv as mod
+        from server.db.models import StepsHourly
+
+        # Heure 01 déjà en base (autre source) : ne doit pas être écrasée.
+        db_session.add(StepsHourly(user_id=UUID(mod.TARGET_USER_ID), date="2026-04-20", hour=1, step_count=999))
+        db_session.commit()
+        # Lignes tardives : buckets 00 (émis partiel par ce run) et 01 déjà en base.
+        _write_steps_csv(csv_export_dir, late=[("00:30", 5), ("01:30", 7)])
+        monkeypatch.setattr(mod, "iter_column_chunks", functools.partial(mod.iter_column_chunks, chunk_rows=2))
+        mod.import_steps_hourly(db_session)
+
+        out = capsys.readouterr().out
+        assert "re-aggregated 1 out-of-order hours (0 new)" in out
+        db_session.expire_all()
+        rows = db_session.execute(select(StepsHourly).order_by(StepsHourly.hour)).scalars().all()
+        assert [r.step_count for r in rows[:3]] == [15, 999, 10]
+
+
+def _write_steps_csv(export_dir: Path, late: list[tuple[str, int]]) -> None:
+    """10 pas par heure de 00h à 09h le 2026-04-20, puis les lignes tardives `late` (HH:MM, pas)."""
+    pfx = "com.samsung.health.step_count."
+    path = export_dir / "com.samsung.shealth.tracker.pedometer_step_count.20260424.csv"
+    with path.open("w", newline="", encoding="utf-8") as f:
+        f.write("\n")
+        writer = csv.writer(f)
+        writer.writerow([f"{pfx}start_time", f"{pfx}count"])
+        for h in range(10):
+            writer.writerow([f"2026-04-20 {h:02d}:00:00.000", 10])
+        for hhmm, count in late:
+            writer.writerow([f"2026-04-20 {hhmm}:00.000", count])
+
+
+def _write_stress_csv(export_dir: Path, minutes: range, days: tuple[str, ...] = ()) -> None:
+    """Une ligne par minute le 2026-04-20 à 10h, précédée d'une ligne à 10h00 par jour de `days`."""
+    with (export_dir / "com.samsung.shealth.stress.20260424.csv").open("w", newline="") as f:
+        f.write("\n")
+        writer = csv.writer(f)
+        writer.writerow(["start_time", "end_time", "score", "tag_id"])
+        for day in days:
+            writer.writerow([f"{day} 10:00:00.000", f"{day} 10:00:30.000", 0, ""])
+        for m in minutes:
+            writer.writerow([f"2026-04-20 10:{m:02d}:00.000", f"2026-04-20 10:{m:02d}:30.000", m, ""])
+
+
+class TestImportManifest:
+    def _manifest(self, db_session):
+        from server.db.models import ImportManifest
+
+        db_session.expire_all()
+        return db_session.execute(select(ImportManifest)).scalar_one()
+
+    def test_changed_file_resumes_from_watermark(self, schema_ready, db_session, csv_export_dir, capsys):
+        import scripts.import_samsung_csv as mod
+        from server.db.models import Stress
+
+        _write_stress_csv(csv_export_dir, range(3))
+        mod.import_stress(db_session)
+        _write_stress_csv(csv_export_dir, range(5))  # export plus récent
+        mod.import_stress(db_session)
+
+        out = capsys.readouterr().out.splitlines()
+        # Lignes déjà importées (dans la marge du watermark) re-fusionnées sans effet.
+        assert "inserted      2 | skipped      3" in out[1]
+        assert len(db_session.execute(select(Stress)).scalars().all()) == 5
+        entry = self._manifest(db_session)
+        assert (entry.row_count, entry.completed) == (5, True)
+        assert entry.max_start_time.minute == 4
+
+    def test_changed_file_merges_late_rows_within_margin(self, schema_ready, db_session, csv_export_dir, capsys):
+        import scripts.import_samsung_csv as mod
+        from server.db.models import Stress
+
+        _write_stress_csv(csv_export_dir, range(3))
+        mod.import_stress(db_session)
+        # Resync tardif : une ligne de la veille (dans la marge) et une trop ancienne.
+        _write_stress_csv(csv_export_dir, range(3), days=("2026-04-01", "2026-04-19"))
+        mod.import_stress(db_session)
+
+        out = capsys.readouterr().out.splitlines()
+        assert "inserted      1 | skipped      4" in out[1]
+        starts = {s.start_time.day for s in db_session.execute(select(Stress)).scalars()}
+        assert starts == {19, 20}
+        assert self._manifest(db_session).max_start_time.minute == 2
+
+    def test_crash_resumes_from_last_committed_batch(self, schema_ready, db_session, csv_export_dir, capsys, monkeypatch):
+        import scripts.import_samsung_csv as mod
+        from server.db.models import Stress
+
+        _write_stress_csv(csv_export_dir, range(5))
+        monkeypatch.setattr(mod, "CHECKPOINT_ROWS", 2)
+        real_load, calls = mod._load, []
+
+        def crashing_load(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError("crash")
+            return real_load(*args, **kwargs)
+
+        monkeypatch.setattr(mod, "_load", crashing_load)
+        with pytest.raises(RuntimeError):
+            mod.import_stress(db_session)
+        db_session.rollback()
+        entry = self._manifest(db_session)
+        assert (entry.row_count, entry.completed) == (2, False)
+        started_at = entry.run_started_at
+
+        monkeypatch.setattr(mod, "_load", real_load)
+        capsys.readouterr()
+        mod.import_stress(db_session)
+        assert "inserted      3 | skipped      2" in capsys.readouterr().out
+        assert len(db_session.execute(select(Stress)).scalars().all()) == 5
+        entry = self._manifest(db_session)
+        # Reprise : même run, son début est conservé.
+        assert entry.completed and entry.run_started_at == started_at
+
+        _write_stress_csv(csv_export_dir, range(6))  # export plus récent : nouveau run
+        mod.import_stress(db_session)
+        assert self._manifest(db_session).run_started_at > started_at
+
+    def test_crash_then_resume_replaces_partial_hour_from_before_crash(
+        self, schema_ready, db_session, csv_export_dir, capsys, monkeypatch
+    ):
+        import functools
+
+        import scripts.import_samsung_csv as mod
+        from server.db.models import StepsHourly, StepsRollup
+
+        # Bucket 00 émis partiel (10) et commité au 1er lot, sa ligne tardive arrive en fin de fichier.
+        _write_steps_csv(csv_export_dir, late=[("00:30", 5)])
+        monkeypatch.setattr(mod, "iter_column_chunks", functools.partial(mod.iter_column_chunks, chunk_rows=2))
+        monkeypatch.setattr(mod, "CHECKPOINT_ROWS", 2)
+        real_load, calls = mod._load, []
+
+        def crashing_load(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError("crash")
+            return real_load(*args, **kwargs)
+
+        monkeypatch.setattr(mod, "_load", crashing_load)
+        with pytest.raises(RuntimeError):
+            mod.import_steps_hourly(db_session)
+        db_session.rollback()
+        assert self._manifest(db_session).row_count == 2
+
+        monkeypatch.setattr(mod, "_load", real_load)
+        capsys.readouterr()
+        mod.import_steps_hourly(db_session)
+
+        assert "re-aggregated 1 out-of-order hours (0 new)" in capsys.readouterr().out
+        db_session.expire_all()
+        rows = db_session.execute(select(StepsHourly).order_by(StepsHourly.hour)).scalars().all()
+        assert [r.step_count for r in rows] == [15] + [10] * 9
+        day = db_session.execute(select(StepsRollup).where(StepsRollup.granularity == "day")).scalar_one()
+        assert day.step_count == 105
+
+
+class TestColumnarParsing:
+    TIMESTAMPS = [
+        "2026-04-20 00:10:00.000",
+        "2026-04-20 00:59:59.5",
+        "2026-04-20 01:00:00",  # autre format : repli parse_dt
+        "2026-04-20",
+        "",
+        "2026-04-20 25:00:00.000",  # heure invalide
+        "2026-04-20 02:61:00.000",  # minute invalide
+        "2026-02-30 03:00:00.000",  # jour invalide
+        "20/04/2026 04:00",  # format inconnu
+        "2026-04-20 00:30:00.000",
+    ]
+
+    def _legacy(self, timestamps, values):
+        from scripts.import_samsung_csv import parse_dt
+
+        buckets = {}
+        for ts, value in zip(timestamps, values):
+            start = parse_dt(ts or None)
+            if not start or value is None:
+                continue
+            buckets.setdefault((start.date(), start.hour), []).append(value)
+        return {k: (len(v), sum(v), min(v), max(v)) for k, v in buckets.items()}
+
+    def _stream(self, timestamps, values, chunk):
+        """Comme import_*_hourly : 1re passe en flux, 2e passe exacte sur les heures en désordre."""
+        from scripts.import_samsung_csv import HourlyAggregator
+
+        def run(agg):
+            out = {}
+            for i in range(0, len(timestamps), chunk):
+                out.update(agg.add(timestamps[i : i + chunk], values[i : i + chunk]))
+            out.update(agg.finish())
+            return out
+
+        first = HourlyAggregator(lateness_h=2)
+        out = run(first)
+        if first.dirty:
+            out.update(run(HourlyAggregator(only=first.dirty)))
+        return out, first.dirty
+
+    @pytest.fixture(params=[True, False], ids=["numpy", "pure-python"])
+    def backend(self, request, monkeypatch):
+        import scripts.import_samsung_csv as mod
+
+        if not request.param:
+            monkeypatch.setattr(mod, "np", None)
+        elif mod.np is None:
+            pytest.skip("numpy absent")
+
+    @pytest.mark.parametrize("chunk", [1, 3, 100])
+    def test_streaming_aggregates_match_row_by_row(self, backend, chunk):
+        for values in ([60.0, 75.5, 80.0, 55.0, 70.0, 90.0, 91.0, 92.0, 93.0, None], [10, 20, 30, 40, 50, 60, 70, 80, 90, 5]):
+            out, dirty = self._stream(self.TIMESTAMPS, values, chunk)
+            assert out == self._legacy(self.TIMESTAMPS, values) and not dirty
+
+    def test_out_of_order_rows_reaggregated(self, backend):
+        timestamps = [f"2026-04-20 {h:02d}:00:00.000" for h in range(10)] + ["2026-04-20 01:30:00.000"]
+        values = list(range(60, 71))
+        out, dirty = self._stream(timestamps, values, chunk=2)
+        assert len(dirty) == 1
+        assert out == self._legacy(timestamps, values)
+
+    def test_completed_hours_emitted_before_end(self, backend):
+        from scripts.import_samsung_csv import HourlyAggregator
+
+        agg = HourlyAggregator(lateness_h=1)
+        assert list(agg.add(["2026-04-20 00:10:00.000"], [1])) == []
+        emitted = list(agg.add(["2026-04-20 02:10:00.000"], [2]))
+        assert [key[1] for key, _ in emitted] == [0]
+        assert [key[1] for key, _ in agg.finish()] == [2]
+
+    def test_column_chunks_like_dictreader(self, tmp_path, monkeypatch):
+        import scripts.import_samsung_csv as mod
+
+        monkeypatch.setattr(mod, "EXPORT_DIR", tmp_path)
+        (tmp_path / "x.20260424.csv").write_text("descriptor\na,b,a\n1,2,3\n\n4\n")
+        chunks = list(mod.iter_column_chunks("x", "a", "b", "absente", chunk_rows=1))
+        assert chunks == [(["3"], ["2"], [""]), ([""], [""], [""])]
+        assert list(mod.iter_column_chunks("manquant", "a")) == []
+
+
+class TestParallelImport:
+    def test_jobs_schedule_stages_after_sessions(self, schema_ready, db_session, csv_export_dir, pg_url, monkeypatch):
+        import scripts.import_samsung_csv as mod
+        from server.db.models import SleepSession, SleepStage
+
+        monkeypatch.setenv("DATABASE_URL", pg_url)  # engine propre à chaque worker
+        _write_sleep_csv(
+            csv_export_dir,
+            [
+                {
+                    "com.samsung.health.sleep.start_time": "2026-04-20 23:00:00.000",
+                    "com.samsung.health.sleep.end_time": "2026-04-21 07:00:00.000",
+                    "com.samsung.health.sleep.datauuid": "uuid-par",
+                }
+            ],
+        )
+        with (csv_export_dir / "com.samsung.health.sleep_stage.20260424.csv").open("w", newline="") as f:
+            f.write("\n")
+            writer = csv.writer(f)
+            writer.writerow(["sleep_id", "stage", "start_time", "end_time"])
+            writer.writerow(["uuid-par", "40003", "2026-04-21 01:00:00.000", "2026-04-21 02:00:00.000"])
+            writer.writerow(["uuid-inconnu", "40002", "2026-04-21 03:00:00.000", "2026-04-21 04:00:00.000"])
+
+        importers = [e for e in mod.IMPORTERS if e[0] in ("sleep", "sleep_stages", "stress")]
+        timings = {t.name: t for t in mod.run_parallel(2, importers)}
+
+        assert set(timings) == {"sleep", "sleep_stages", "stress"}
+        assert timings["sleep"].rows == 1 and timings["sleep_stages"].rows == 2
+        assert len(db_session.execute(select(SleepSession)).scalars().all()) == 1
+        assert [s.stage_type for s in db_session.execute(select(SleepStage)).scalars()] == ["deep"]
+
 
 class TestGenerateSample:
     def test_generate_sample_creates_30d_data(self, schema_ready, db_session, monkeypatch):
@@ -41,3 +41,72 @@ def test_get_sleep_not_found(client_pg_ready):
     r = client.get("/api/sleep?from=2000-01-01&to=2000-01-02")
     assert r.status_code == 200
     assert r.json() == []
+
+
+def _nights(n, stages_per_night):
+    from datetime import datetime, timedelta, timezone
+
+    sessions = []
+    for d in range(n):
+        start = datetime(2026, 3, 1, 22, tzinfo=timezone.utc) + timedelta(days=d)
+        stages = [
+            {
+                "stage_type": ("light", "deep", "rem", "awake")[i % 4],
+                "stage_start": (start + timedelta(minutes=10 * i)).isoformat(),
+                "stage_end": (start + timedelta(minutes=10 * (i + 1))).isoformat(),
+            }
+            for i in range(stages_per_night)
+        ]
+        sessions.append(
+            {"sleep_start": start.isoformat(), "sleep_end": (start + timedelta(hours=8)).isoformat(), "stages": stages}
+        )
+    return sessions
+
+
+def test_post_sleep_bulk_sessions_and_stages(client_pg_ready, db_session):
+    from sqlalchemy import func, select
+
+    from server.db.models import SleepStage
+
+    client = client_pg_ready
+    payload = {"sessions": _nights(20, 12)}
+    r = client.post("/api/sleep", json=payload)
+    assert r.json() == {"inserted": 20, "skipped": 0}
+    assert db_session.execute(select(func.count()).select_from(SleepStage)).scalar_one() == 240
+
+    r = client.post("/api/sleep", json=payload)
+    assert r.json() == {"inserted": 0, "skipped": 20}
+    assert db_session.execute(select(func.count()).select_from(SleepStage)).scalar_one() == 240
+
+
+def test_post_sleep_intra_payload_duplicate_keeps_first_stages(client_pg_ready):
+    client = client_pg_ready
+    first, = _nights(1, 2)
+    dup = dict(first, stages=[])
+    r = client.post("/api/sleep", json={"sessions": [first, dup]})
+    assert r.json() == {"inserted": 1, "skipped": 1}
+    sessions = client.get("/api/sleep?from=2026-03-01&to=2026-03-01&include_stages=true").json()
+    assert len(sessions) == 1
+    assert len(sessions[0]["stages"]) == 2
+
+
+def test_insert_sessions_is_set_based(default_user_db, db_session):
+    from sqlalchemy import event
+
+    from server.models import SleepBulkIn
+    from server.routers.sleep import _insert_sessions
+
+    body = SleepBulkIn(sessions=_nights(30, 12))
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        assert _insert_sessions(db_session, default_user_db.id, body.sessions) == 30
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    # 1 INSERT sessions + 1 INSERT stages (360 stages < 1 chunk)
+    assert len(statements) == 2
@@ -0,0 +1,69 @@
+"""
+GET /api/trends — agrégats serveur de l'onglet Trends.
+
+Classes: TestTrendsAggregates
+"""
+
+
+def _hr(hour: int, avg: int) -> dict:
+    return {"date": "2026-03-01", "hour": hour, "min_bpm": 40, "max_bpm": 120, "avg_bpm": avg, "sample_count": 10}
+
+
+class TestTrendsAggregates:
+    def test_empty_period(self, client_pg_ready):
+        r = client_pg_ready.get("/api/trends?from=2031-01-01&to=2031-01-31")
+        assert r.status_code == 200, r.text
+        assert r.json() == {
+            "avg_sleep_hours": None,
+            "avg_daily_steps": None,
+            "resting_hr": None,
+            "exercise_count": 0,
+        }
+
+    def test_aggregates_match_client_formulas(self, client_pg_ready):
+        client_pg_ready.post(
+            "/api/sleep",
+            json={"sessions": [
+                {"sleep_start": "2026-03-01T23:00:00Z", "sleep_end": "2026-03-02T07:00:00Z"},
+                {"sleep_start": "2026-03-02T23:00:00Z", "sleep_end": "2026-03-03T06:00:00Z"},
+                # hors période
+                {"sleep_start": "2026-04-01T23:00:00Z", "sleep_end": "2026-04-02T09:00:00Z"},
+            ]},
+        )
+        client_pg_ready.post(
+            "/api/steps",
+            json={"records": [
+                {"date": "2026-03-01", "hour": 9, "step_count": 1000},
+                {"date": "2026-03-01", "hour": 10, "step_count": 2000},
+                {"date": "2026-03-02", "hour": 9, "step_count": 4000},
+            ]},
+        )
+        client_pg_ready.post(
+            "/api/heartrate",
+            json={"records": [_hr(0, 50), _hr(3, 55), _hr(5, 61), _hr(6, 90), _hr(14, 110)]},
+        )
+        client_pg_ready.post(
+            "/api/exercise",
+            json={"sessions": [
+                {"exercise_type": "run", "exercise_start": "2026-03-05T08:00:00", "exercise_end": "2026-03-05T09:00:00", "duration_minutes": 60},
+                {"exercise_type": "bike", "exercise_start": "2026-04-05T08:00:00", "exercise_end": "2026-04-05T09:00:00", "duration_minutes": 60},
+            ]},
+        )
+
+        r = client_pg_ready.get("/api/trends?from=2026-03-01&to=2026-03-31")
+        assert r.status_code == 200, r.text
+        assert r.json() == {
+            "avg_sleep_hours": 7.5,
+            "avg_daily_steps": 3500,
+            "resting_hr": 55,
+            "exercise_count": 1,
+        }
+
+    def test_invalid_dates_are_422(self, client_pg_ready):
+        assert client_pg_ready.get("/api/trends?from=yesterday").status_code == 422
+        assert client_pg_ready.get("/api/trends?to=2026-13-01").status_code == 422
+
+    def test_requires_auth(self, client_pg_ready):
+        client_pg_ready.headers.pop("Authorization", None)
+        r = client_pg_ready.get("/api/trends?from=2026-03-01&to=2026-03-31")
+        assert r.status_code == 401